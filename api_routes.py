@@ -1,48 +1,73 @@
-from flask import Flask, jsonify, render_template, request
-from omie_api import OmieAPI
+from flask import Flask, Response, jsonify, render_template, request
+from omie_api import get_omie_client, OmieAPIError
+from omie_stream import dumps_clientes
+from cliente_search import get_cliente_index
+from log_config import setup_logging
 import os
 
+import requests
+
+setup_logging()
+
 # Configura o caminho correto para os templates
 template_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'templates')
 app = Flask(__name__, template_folder=template_dir)
 
+# ListarClientes aceita no máximo 500 registros por página
+MAX_PAGE_SIZE = 500
+
+
+def _paginacao():
+    """page (>= 1) e pageSize (1 a MAX_PAGE_SIZE) da query string, já limitados"""
+    page = request.args.get('page', 1, type=int)
+    page_size = request.args.get('pageSize', 50, type=int)
+    return max(1, page), min(max(1, page_size), MAX_PAGE_SIZE)
+
+
 @app.route('/')
 def index():
     return render_template('teste_omie.html')
 
 @app.route('/api/clientes', methods=['GET'])
 def get_clientes():
-    page = request.args.get('page', 1, type=int)
-    page_size = request.args.get('pageSize', 50, type=int)
+    page, page_size = _paginacao()
     
-    omie = OmieAPI()
+    omie = get_omie_client()
+    if request.args.get('compact'):
+        # Caminho rápido: decodifica a página aos poucos e devolve registros compactos
+        meta = {}
+        try:
+            clientes = list(omie.listar_clientes_stream(pagina=page, registros_por_pagina=page_size, meta=meta))
+        except (OmieAPIError, requests.RequestException) as e:
+            # Mesma resposta do caminho completo, que também devolve falhas de rede assim
+            return jsonify({'success': False, 'error': str(e)})
+        return Response(dumps_clientes(clientes, meta), mimetype='application/json')
+
     response = omie.listar_clientes(pagina=page, registros_por_pagina=page_size)
     return jsonify(response)
 
+@app.route('/api/omie/cache', methods=['GET'])
+def get_cache_stats():
+    return jsonify(get_omie_client().cache.get_stats())
+
+@app.route('/api/omie/rate-limit', methods=['GET'])
+def get_rate_limit_metrics():
+    return jsonify(get_omie_client().limiter.get_metrics())
+
 @app.route('/api/clientes/busca', methods=['GET'])
 def search_clientes():
     query = request.args.get('q', '')
-    omie = OmieAPI()
-    
-    # Por enquanto, vamos usar a mesma função de listagem
-    # No futuro, podemos implementar uma busca específica na API Omie
-    response = omie.listar_clientes(pagina=1, registros_por_pagina=50)
-    
-    if response['success'] and response['data']:
-        # Filtrar os resultados baseado na query
-        clientes = response['data']['clientes_cadastro']
-        filtered = [
-            c for c in clientes 
-            if query.lower() in c['razao_social'].lower() or 
-               query.lower() in c.get('cnpj_cpf', '').lower() or 
-               query.lower() in c.get('cidade', '').lower()
-        ]
-        
-        response['data']['clientes_cadastro'] = filtered
-        response['data']['total_de_registros'] = len(filtered)
-        response['data']['registros'] = len(filtered)
-        
-    return jsonify(response)
+    page, page_size = _paginacao()
+
+    # Busca no índice em memória do cadastro completo (carregado em segundo plano
+    # a partir da primeira chamada e depois mantido por deltas)
+    index = get_cliente_index()
+    if not index.garantir_atualizado(get_omie_client()):
+        response = jsonify({'success': False, 'error': 'Índice de clientes em carregamento'})
+        response.headers['Retry-After'] = '5'
+        return response, 503
+
+    return jsonify(index.search(query, pagina=page, registros_por_pagina=page_size))
 
 if __name__ == '__main__':
     app.run(debug=True, port=5000)
@@ -1,11 +1,21 @@
 from flask import Flask, jsonify
 from flask_cors import CORS
-from database.connection import init_db, db
+from database.connection import init_db, db, get_pool_metrics
 from flask_migrate import Migrate
 from routes.auth import auth_bp
+from routes.resources import resources_bp
+from routes.sales import sales_bp
+from routes.dashboard import dashboard_bp
+from routes.reports import reports_bp
+from routes.service_orders import service_orders_bp
 from models import User, Role, Company
+from database.tenant import sem_tenant
+from log_config import setup_logging
+from database.instrumentation import init_query_stats
+from config import QUERY_DEBUG_ENDPOINT
 
 def create_app():
+    setup_logging()
     app = Flask(__name__)
     
     # Configurar CORS corretamente
@@ -19,16 +29,23 @@ def create_app():
     
     # Inicializa o banco de dados
     init_db(app)
+    init_query_stats(app, debug_endpoint=QUERY_DEBUG_ENDPOINT)
     
     # Registra os blueprints
     app.register_blueprint(auth_bp, url_prefix='/auth')
+    app.register_blueprint(resources_bp, url_prefix='/api')
+    app.register_blueprint(sales_bp, url_prefix='/api')
+    app.register_blueprint(dashboard_bp, url_prefix='/api')
+    app.register_blueprint(reports_bp, url_prefix='/api')
+    app.register_blueprint(service_orders_bp, url_prefix='/api')
     
     # Rota de teste
     @app.route('/test')
     def test():
         try:
             # Tenta buscar o usuário admin
-            admin = User.query.filter_by(email='admin@sistema.com').first()
+            with sem_tenant():
+                admin = User.query.filter_by(email='admin@sistema.com').first()
             if admin:
                 return jsonify({
                     'message': 'Conexão com banco de dados OK',
@@ -47,6 +64,15 @@ def create_app():
                 'error': str(e)
             }), 500
     
+    # Métricas do pool de conexões com o banco
+    @app.route('/db/pool')
+    def db_pool():
+        metricas = get_pool_metrics()
+        router = app.extensions.get('db_replicas')
+        if router is not None:
+            metricas['routing'] = router.get_metrics()
+        return jsonify(metricas)
+    
     return app
 
 app = create_app()
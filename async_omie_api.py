@@ -0,0 +1,257 @@
+import asyncio
+import json
+import logging
+import time
+import aiohttp
+from config import (
+    OMIE_APP_KEY, OMIE_APP_SECRET, OMIE_API_URL,
+    OMIE_CONNECT_TIMEOUT, OMIE_READ_TIMEOUT,
+    OMIE_MAX_RETRIES, OMIE_BACKOFF_FACTOR, OMIE_MAX_CONCURRENCY,
+    OMIE_PAGE_SIZE, OMIE_PAGE_WORKERS
+)
+from omie_api import OmieAPIError, OMIE_FAULT_SEM_REGISTROS, THROTTLE_STATUS
+from omie_ratelimit import get_rate_limiter, retry_after_segundos
+from log_config import amostrar
+
+logger = logging.getLogger('omie')
+
+_client = None
+
+# Mesmos status que o cliente síncrono repete (ver omie_api.criar_sessao)
+RETRY_STATUS = (502, 503, 504)
+
+
+class AsyncOmieAPI:
+    """
+    Cliente assíncrono da API do Omie, com a mesma interface de OmieAPI
+    """
+
+    def __init__(self, session=None, base_url=None, max_concurrency=OMIE_MAX_CONCURRENCY,
+                 connect_timeout=OMIE_CONNECT_TIMEOUT, read_timeout=OMIE_READ_TIMEOUT,
+                 max_retries=OMIE_MAX_RETRIES, backoff_factor=OMIE_BACKOFF_FACTOR, limiter=None):
+        self.app_key = OMIE_APP_KEY
+        self.app_secret = OMIE_APP_SECRET
+        self.base_url = base_url or OMIE_API_URL
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.timeout = aiohttp.ClientTimeout(sock_connect=connect_timeout, sock_read=read_timeout)
+        self.session = session
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self.limiter = limiter or get_rate_limiter()
+
+    def _get_session(self):
+        """
+        Cria a sessão (pool de conexões keep-alive) no primeiro uso, já dentro do event loop
+        """
+        if self.session is None or self.session.closed:
+            self.session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.max_concurrency),
+                timeout=self.timeout
+            )
+        return self.session
+
+    async def _post(self, url, data):
+        """
+        Faz o POST com retentativas: backoff exponencial para falhas de conexão e
+        502/503/504, e ajuste do rate limit para respostas de throttle (425/429)
+
+        Retorna (status, corpo em texto, número de retentativas).
+        """
+        session = self._get_session()
+        attempt = 0
+        while True:
+            await self.limiter.acquire_async()
+            try:
+                async with session.post(url, json=data) as response:
+                    body = await response.text()
+                    if attempt >= self.max_retries:
+                        return response.status, body, attempt
+                    if response.status in THROTTLE_STATUS:
+                        await self.limiter.on_throttle_async(retry_after_segundos(response.headers.get('Retry-After')))
+                        attempt += 1
+                        continue
+                    if response.status not in RETRY_STATUS:
+                        if response.status == 200:
+                            await self.limiter.on_success_async()
+                        return response.status, body, attempt
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError):
+                if attempt >= self.max_retries:
+                    raise
+            await asyncio.sleep(self.backoff_factor * (2 ** attempt))
+            attempt += 1
+
+    async def _make_request(self, endpoint, call, params):
+        """
+        Método base para fazer requisições à API do Omie sem bloquear o event loop
+        """
+        url = f"{self.base_url}/{endpoint}"
+
+        data = {
+            "app_key": self.app_key,
+            "app_secret": self.app_secret,
+            "call": call,
+            "param": [params]
+        }
+
+        inicio = time.perf_counter()
+        evento = {'omie_call': call, 'endpoint': endpoint}
+
+        try:
+            async with self._semaphore:
+                status, body, tentativas = await self._post(url, data)
+            evento.update(
+                status=status,
+                response_bytes=len(body),
+                retries=tentativas,
+                duration_ms=round((time.perf_counter() - inicio) * 1000, 1)
+            )
+
+            if status == 200:
+                if amostrar():
+                    logger.info('Requisição ao Omie concluída', extra=evento)
+                return {
+                    'success': True,
+                    'data': json.loads(body)
+                }
+            else:
+                erro = {
+                    'success': False,
+                    'error': f'Erro HTTP {status}'
+                }
+                try:
+                    fault = json.loads(body)
+                    erro['faultcode'] = fault.get('faultcode')
+                    erro['faultstring'] = fault.get('faultstring')
+                except (ValueError, AttributeError):
+                    pass
+                if erro.get('faultcode') == OMIE_FAULT_SEM_REGISTROS:
+                    logger.debug('Omie sem registros', extra=evento)
+                else:
+                    logger.warning(
+                        'Erro na resposta do Omie',
+                        extra=dict(evento, faultcode=erro.get('faultcode'), faultstring=erro.get('faultstring'))
+                    )
+                return erro
+
+        except Exception as e:
+            evento['duration_ms'] = round((time.perf_counter() - inicio) * 1000, 1)
+            logger.warning('Falha na requisição ao Omie', extra=dict(evento, error=str(e)))
+            return {
+                'success': False,
+                'error': str(e)
+            }
+
+    async def close(self):
+        """
+        Fecha as conexões abertas no pool
+        """
+        if self.session is not None:
+            await self.session.close()
+
+    async def listar_clientes(self, pagina=1, registros_por_pagina=50, apenas_importado_api="N", **filtros):
+        """
+        Lista os clientes cadastrados (ver OmieAPI.listar_clientes)
+        """
+        return await self._make_request(
+            "geral/clientes/",
+            "ListarClientes",
+            {
+                "pagina": pagina,
+                "registros_por_pagina": registros_por_pagina,
+                "apenas_importado_api": apenas_importado_api,
+                **filtros
+            }
+        )
+
+    async def _pagina_clientes(self, pagina, registros_por_pagina):
+        """
+        Busca uma página de clientes, levantando OmieAPIError em caso de falha
+        """
+        response = await self.listar_clientes(pagina=pagina, registros_por_pagina=registros_por_pagina)
+        if not response['success']:
+            if response.get('faultcode') == OMIE_FAULT_SEM_REGISTROS:
+                return {'pagina': pagina, 'total_de_paginas': 0, 'registros': 0, 'clientes_cadastro': []}
+            raise OmieAPIError(
+                f"Erro ao buscar a página {pagina}: {response.get('faultstring') or response.get('error')}"
+            )
+        return response['data']
+
+    async def iter_all_clientes(self, registros_por_pagina=OMIE_PAGE_SIZE,
+                                max_workers=OMIE_PAGE_WORKERS, ordered=True):
+        """
+        Versão assíncrona de OmieAPI.iter_all_clientes
+        """
+        primeira = await self._pagina_clientes(1, registros_por_pagina)
+        for cliente in primeira.get('clientes_cadastro', []):
+            yield cliente
+
+        total_paginas = primeira.get('total_de_paginas', 1)
+        paginas = iter(range(2, total_paginas + 1))
+        semaforo = asyncio.Semaphore(max_workers)
+        janela = max_workers * 2
+        pendentes = []
+
+        async def buscar(pagina):
+            async with semaforo:
+                return await self._pagina_clientes(pagina, registros_por_pagina)
+
+        def preencher():
+            while len(pendentes) < janela:
+                pagina = next(paginas, None)
+                if pagina is None:
+                    break
+                pendentes.append(asyncio.ensure_future(buscar(pagina)))
+
+        try:
+            preencher()
+            while pendentes:
+                if ordered:
+                    dados = await pendentes.pop(0)
+                else:
+                    concluidos, _ = await asyncio.wait(pendentes, return_when=asyncio.FIRST_COMPLETED)
+                    pronto = concluidos.pop()
+                    pendentes.remove(pronto)
+                    dados = pronto.result()
+                preencher()
+                for cliente in dados.get('clientes_cadastro', []):
+                    yield cliente
+        finally:
+            for tarefa in pendentes:
+                tarefa.cancel()
+
+    async def fetch_all_clientes(self, **kwargs):
+        """
+        Retorna a lista completa de clientes (ver iter_all_clientes)
+        """
+        return [cliente async for cliente in self.iter_all_clientes(**kwargs)]
+
+
+def get_async_omie_client():
+    """
+    Retorna o cliente assíncrono compartilhado pelo processo
+    """
+    global _client
+    if _client is None:
+        _client = AsyncOmieAPI()
+    return _client
+
+
+async def close_async_omie_client():
+    """
+    Fecha o cliente compartilhado (usar no shutdown da aplicação)
+    """
+    global _client
+    if _client is not None:
+        await _client.close()
+        _client = None
+
+
+if __name__ == "__main__":
+    async def main():
+        omie = get_async_omie_client()
+        response = await omie.listar_clientes(pagina=1, registros_por_pagina=5)
+        print(json.dumps(response, indent=2))
+        await close_async_omie_client()
+
+    asyncio.run(main())
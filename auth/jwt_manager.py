@@ -1,9 +1,16 @@
 import jwt
+import time
+import uuid
 from datetime import datetime, timedelta
 from functools import wraps
-from flask import request, jsonify, current_app
+from flask import request, jsonify, current_app, g
 import os
 from dotenv import load_dotenv
+from sqlalchemy import select
+from database.connection import db
+from models.user import User
+from models.role import Role
+from auth.token_cache import get_token_cache, get_denylist
 
 load_dotenv()
 
@@ -11,23 +18,84 @@ JWT_SECRET = os.getenv('JWT_SECRET_KEY', 'your-secret-key')
 JWT_ALGORITHM = 'HS256'
 JWT_EXPIRES_IN = 24  # horas
 
-def generate_token(user_id: str, role_id: str = None) -> str:
-    """Gera um token JWT para o usuário"""
+def generate_token(user_id: str, role_id: str = None, permissions_version: int = None,
+                   company_id: str = None) -> str:
+    """
+    Gera um token JWT para o usuário
+
+    permissions_version vai no claim pv: um processo com a matriz de permissões
+    mais antiga que o token recompila a matriz antes de checar (ver auth.permissions).
+    company_id vai no claim company_id e define o tenant das consultas (ver database.tenant).
+    """
     payload = {
         'user_id': user_id,
         'role_id': role_id,
-        'exp': datetime.utcnow() + timedelta(hours=JWT_EXPIRES_IN)
+        # iat e jti permitem revogar o token (ver revoke_token/revoke_user_tokens)
+        'iat': time.time(),
+        'jti': str(uuid.uuid4()),
+        'exp': datetime.utcnow() + timedelta(hours=JWT_EXPIRES_IN),
+        'company_id': company_id
     }
+    if permissions_version is not None:
+        payload['pv'] = permissions_version
     return jwt.encode(payload, JWT_SECRET, algorithm=JWT_ALGORITHM)
 
 def verify_token(token: str) -> dict:
-    """Verifica e decodifica um token JWT"""
+    """
+    Verifica e decodifica um token JWT
+
+    Tokens já verificados vêm do cache (até o exp); a denylist é conferida
+    sempre que houver revogação nova desde a verificação.
+    """
+    denylist = get_denylist()
+    denylist.sincronizar()
+    cache = get_token_cache()
+
+    em_cache = cache.get(token)
+    if em_cache is not None:
+        payload, versao = em_cache
+        if versao != denylist.versao:
+            if denylist.revogado(payload):
+                raise Exception('Token revogado')
+            cache.put(token, payload, denylist.versao)
+        return payload
+
     try:
-        return jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
+        payload = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
     except jwt.ExpiredSignatureError:
         raise Exception('Token expirado')
     except jwt.InvalidTokenError:
         raise Exception('Token inválido')
+    if denylist.revogado(payload):
+        raise Exception('Token revogado')
+    cache.put(token, payload, denylist.versao)
+    return payload
+
+def revoke_token(payload: dict):
+    """Revoga um token (logout)"""
+    get_denylist().revogar_token(payload)
+
+def revoke_user_tokens(user_id: str):
+    """Revoga todos os tokens já emitidos para o usuário"""
+    get_denylist().revogar_usuario(user_id, timedelta(hours=JWT_EXPIRES_IN))
+
+def _company_do_usuario(user_id):
+    """Empresa do usuário, para tokens sem o claim company_id"""
+    return db.session.execute(
+        select(User.company_id).where(User.id == user_id).execution_options(sem_tenant=True)
+    ).scalar()
+
+def get_current_user():
+    """Usuário do token da requisição, carregado do banco uma vez por requisição"""
+    if 'current_user' not in g:
+        g.current_user = db.session.get(User, request.user_id)
+    return g.current_user
+
+def get_current_role():
+    """Role do token da requisição, carregada do banco uma vez por requisição"""
+    if 'current_role' not in g:
+        g.current_role = db.session.get(Role, request.role_id) if request.role_id else None
+    return g.current_role
 
 def token_required(f):
     """Decorator para proteger rotas que necessitam de autenticação"""
@@ -50,6 +118,10 @@ def token_required(f):
             payload = verify_token(token)
             request.user_id = payload['user_id']
             request.role_id = payload.get('role_id')
+            request.token_payload = payload
+            # Sem empresa no token (tokens antigos ou usuário vinculado depois), vale a do cadastro;
+            # se continuar None, database.tenant não deixa passar nenhuma linha
+            request.company_id = payload.get('company_id') or _company_do_usuario(payload['user_id'])
         except Exception as e:
             return jsonify({'message': str(e)}), 401
             
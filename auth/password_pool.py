@@ -0,0 +1,76 @@
+import threading
+from werkzeug.security import generate_password_hash, check_password_hash
+from config import (
+    PASSWORD_HASH_METHOD, PASSWORD_POOL_WORKERS, PASSWORD_POOL_QUEUE, PASSWORD_RETRY_AFTER
+)
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+class PoolSaturado(Exception):
+    """Muitos hashes de senha pendentes; o cliente deve tentar de novo depois"""
+
+    def __init__(self, retry_after=PASSWORD_RETRY_AFTER):
+        super().__init__('Servidor ocupado processando senhas')
+        self.retry_after = retry_after
+
+
+class PasswordPool:
+    """
+    Limita os hashes de senha simultâneos do processo
+
+    O hash roda na própria thread da requisição: scrypt e pbkdf2 (hashlib)
+    liberam o GIL, então repassá-lo a outra thread só somaria a troca de
+    contexto. No máximo `workers` hashes rodam ao mesmo tempo e `max_pendentes`
+    requisições esperam a vez; além disso a chamada falha na hora com
+    PoolSaturado, em vez de prender mais uma thread do servidor atrás dos logins.
+    """
+
+    def __init__(self, workers=PASSWORD_POOL_WORKERS, max_pendentes=PASSWORD_POOL_QUEUE,
+                 method=PASSWORD_HASH_METHOD):
+        self.method = method
+        self._vagas = threading.BoundedSemaphore(workers + max_pendentes)
+        self._executando = threading.BoundedSemaphore(workers)
+        self._prefixo = None
+        self.stats = {'hashes': 0, 'verificacoes': 0, 'recusadas': 0}
+
+    def _executar(self, funcao, *args):
+        if not self._vagas.acquire(blocking=False):
+            self.stats['recusadas'] += 1
+            raise PoolSaturado()
+        try:
+            with self._executando:
+                return funcao(*args)
+        finally:
+            self._vagas.release()
+
+    def hash(self, password):
+        """Gera o hash da senha com o método (custo) configurado"""
+        self.stats['hashes'] += 1
+        return self._executar(generate_password_hash, password, self.method)
+
+    def verificar(self, password_hash, password):
+        """Verifica a senha contra o hash (qualquer método suportado pelo werkzeug)"""
+        self.stats['verificacoes'] += 1
+        return self._executar(check_password_hash, password_hash, password)
+
+    def precisa_rehash(self, password_hash):
+        """True se o hash foi gerado com um método ou custo diferente do configurado"""
+        if self._prefixo is None:
+            # Prefixo completo que o werkzeug grava para o método configurado
+            # (ex.: 'pbkdf2:sha256' vira 'pbkdf2:sha256:600000')
+            self._prefixo = generate_password_hash('', self.method).split('$', 1)[0]
+        return password_hash.split('$', 1)[0] != self._prefixo
+
+
+def get_password_pool():
+    """
+    Retorna o pool de hash de senhas compartilhado pelo processo
+    """
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = PasswordPool()
+    return _pool
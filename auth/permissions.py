@@ -0,0 +1,176 @@
+import logging
+import threading
+import time
+from functools import wraps
+from flask import request, jsonify
+from sqlalchemy import event, select, update
+from sqlalchemy.orm import Session
+from database.connection import db
+from models.permission import PermissionModule, RolePermission, PermissionMatrixVersion
+from auth.jwt_manager import token_required
+from config import PERMISSION_REFRESH
+
+logger = logging.getLogger(__name__)
+
+_matrix = None
+_matrix_lock = threading.Lock()
+
+# Ordem dos bits de cada módulo
+ACOES = ('read', 'write', 'delete')
+
+
+class PermissionMatrix:
+    """
+    role_permissions compilada em memória: um inteiro por role, com um bit por
+    (módulo, ação)
+
+    A checagem é um get em dict e um shift. A matriz é recompilada quando a
+    versão em permission_matrix_version muda (conferida a cada `refresh`
+    segundos) ou logo após um commit deste processo que altere permissões.
+    """
+
+    def __init__(self, refresh=PERMISSION_REFRESH):
+        self.refresh = refresh
+        self.versao = None
+        # (posições, bits) num único atributo: trocado e lido de uma vez
+        self._matriz = ({}, {})
+        self._conferido_em = None
+        self._recarregar = False
+        self._lock = threading.Lock()
+
+    def compilar(self, linhas, versao):
+        """
+        Monta a matriz a partir de (role_id, module_name, can_read, can_write, can_delete)
+        """
+        posicoes = {}
+        bits = {}
+        for role_id, modulo, *permitido in linhas:
+            for acao, pode in zip(ACOES, permitido):
+                posicao = posicoes.setdefault((modulo, acao), len(posicoes))
+                if pode:
+                    bits[role_id] = bits.get(role_id, 0) | (1 << posicao)
+        # Uma única atribuição: leitores concorrentes veem a matriz antiga ou a
+        # nova inteira, nunca as posições de uma com os bits da outra
+        self._matriz = (posicoes, bits)
+        self.versao = versao
+
+    def _versao_no_banco(self):
+        return db.session.execute(
+            select(PermissionMatrixVersion.version).where(PermissionMatrixVersion.id == 1)
+        ).scalar() or 0
+
+    def carregar(self):
+        """Lê role_permissions e a versão atual e recompila a matriz"""
+        versao = self._versao_no_banco()
+        linhas = db.session.execute(select(
+            RolePermission.role_id, RolePermission.module_name,
+            RolePermission.can_read, RolePermission.can_write, RolePermission.can_delete
+        )).all()
+        self.compilar(linhas, versao)
+
+    def sincronizar(self, versao_minima=None):
+        """
+        Recompila se a versão no banco mudou; consulta o banco no máximo uma vez
+        a cada `refresh` segundos, a menos que `versao_minima` (ex.: o claim pv
+        do token) seja maior que a versão compilada
+        """
+        agora = time.monotonic()
+        atrasada = versao_minima is not None and self.versao is not None and versao_minima > self.versao
+        if self.versao is not None and not atrasada and agora - self._conferido_em < self.refresh:
+            return
+        with self._lock:
+            if self.versao is not None and not atrasada and agora - self._conferido_em < self.refresh:
+                return
+            try:
+                if self.versao is None or self._recarregar or self._versao_no_banco() != self.versao:
+                    self._recarregar = False
+                    self.carregar()
+            except Exception:
+                if self.versao is None:
+                    raise
+                logger.exception('Erro ao sincronizar a matriz de permissões')
+            self._conferido_em = agora
+
+    def invalidar(self):
+        """Força a recompilação na próxima checagem"""
+        self._recarregar = True
+        self._conferido_em = float('-inf')
+
+    def pode(self, role_id, modulo, acao='read'):
+        posicoes, bits = self._matriz
+        posicao = posicoes.get((modulo, acao))
+        if posicao is None:
+            return False
+        return (bits.get(role_id, 0) >> posicao) & 1 == 1
+
+
+def get_permission_matrix():
+    """
+    Retorna a matriz de permissões compartilhada pelo processo
+    """
+    global _matrix
+    if _matrix is None:
+        with _matrix_lock:
+            if _matrix is None:
+                _matrix = PermissionMatrix()
+    return _matrix
+
+
+def bump_permission_version(session):
+    """
+    Incrementa a versão da matriz na transação da sessão
+
+    Chamada automaticamente no flush de RolePermission/PermissionModule; alterações
+    feitas com UPDATE/DELETE em massa (Core) precisam chamá-la explicitamente.
+    """
+    session.execute(
+        update(PermissionMatrixVersion)
+        .where(PermissionMatrixVersion.id == 1)
+        .values(version=PermissionMatrixVersion.version + 1)
+    )
+    session.info['permissoes_alteradas'] = True
+
+
+@event.listens_for(Session, 'before_flush')
+def _marcar_alteracao_de_permissoes(session, flush_context, instances):
+    alterados = session.new | session.dirty | session.deleted
+    if any(isinstance(obj, (RolePermission, PermissionModule)) for obj in alterados):
+        if not session.info.get('permissoes_alteradas'):
+            bump_permission_version(session)
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidar_apos_commit(session):
+    if session.info.pop('permissoes_alteradas', False) and _matrix is not None:
+        _matrix.invalidar()
+
+
+@event.listens_for(Session, 'after_rollback')
+def _descartar_marcacao(session):
+    session.info.pop('permissoes_alteradas', None)
+
+
+def require_permission(modulo, acao='read'):
+    """
+    Decorator para rotas que exigem permissão no módulo (inclui o token_required)
+
+    Exemplo: @require_permission('clientes', 'write')
+    """
+    if acao not in ACOES:
+        raise ValueError(f'Ação inválida: {acao}')
+
+    def decorator(f):
+        @wraps(f)
+        def verificar(*args, **kwargs):
+            # Os módulos são todos por empresa: sem empresa no token não há o que acessar
+            if not request.company_id:
+                return jsonify({'message': 'Usuário sem empresa vinculada'}), 403
+            matrix = get_permission_matrix()
+            matrix.sincronizar(request.token_payload.get('pv'))
+            if not matrix.pode(request.role_id, modulo, acao):
+                return jsonify({'message': 'Permissão negada'}), 403
+            return f(*args, **kwargs)
+
+        return token_required(verificar)
+
+    return decorator
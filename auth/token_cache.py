@@ -0,0 +1,203 @@
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from sqlalchemy import select
+from database.connection import db
+from models.token_revocation import TokenRevocation
+from config import TOKEN_CACHE_SIZE, TOKEN_DENYLIST_REFRESH
+
+logger = logging.getLogger(__name__)
+
+_cache = None
+_denylist = None
+_singleton_lock = threading.Lock()
+
+# Ids autoincrementais podem ser confirmados fora de ordem por transações
+# concorrentes: a cada sincronização relê esta quantidade de ids já vistos
+_MARGEM_IDS = 100
+
+
+class TokenCache:
+    """
+    Cache LRU de tokens JWT já verificados, indexado pelo sha256 do token
+
+    Cada entrada guarda o payload, o exp do token e a versão da denylist em que
+    foi verificada. Entradas expiradas nunca são devolvidas. O payload é
+    compartilhado entre as requisições e não deve ser alterado.
+    """
+
+    def __init__(self, max_entries=TOKEN_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entradas = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'evictions': 0}
+
+    def __len__(self):
+        return len(self._entradas)
+
+    @staticmethod
+    def _chave(token):
+        return hashlib.sha256(token.encode('utf-8')).digest()
+
+    def get(self, token):
+        """Retorna (payload, versao) ou None se o token não está em cache ou expirou"""
+        chave = self._chave(token)
+        with self._lock:
+            entrada = self._entradas.get(chave)
+            if entrada is None:
+                self.stats['misses'] += 1
+                return None
+            payload, expira_em, versao = entrada
+            if time.time() >= expira_em:
+                del self._entradas[chave]
+                self.stats['misses'] += 1
+                return None
+            self._entradas.move_to_end(chave)
+            self.stats['hits'] += 1
+            return payload, versao
+
+    def put(self, token, payload, versao):
+        """Guarda um token verificado; tokens sem exp não entram no cache"""
+        if not payload.get('exp'):
+            return
+        chave = self._chave(token)
+        with self._lock:
+            self._entradas[chave] = (payload, payload['exp'], versao)
+            self._entradas.move_to_end(chave)
+            while len(self._entradas) > self.max_entries:
+                self._entradas.popitem(last=False)
+                self.stats['evictions'] += 1
+
+    def invalidate(self):
+        with self._lock:
+            self._entradas.clear()
+
+    def get_stats(self):
+        with self._lock:
+            return dict(self.stats, entries=len(self._entradas), max_entries=self.max_entries)
+
+
+class Denylist:
+    """
+    Tokens revogados, espelhando a tabela token_revocations
+
+    A revogação vale para um token (jti) ou para todos os tokens de um usuário
+    emitidos antes de not_before. As revogações feitas por outros processos são
+    lidas do banco a cada `refresh` segundos. `versao` é um contador que sobe
+    sempre que uma revogação nova é aplicada (inclusive as confirmadas fora de
+    ordem, com id menor que o último lido); tokens em cache verificados na
+    versão atual não precisam ser checados de novo.
+    """
+
+    def __init__(self, refresh=TOKEN_DENYLIST_REFRESH):
+        self.refresh = refresh
+        self.versao = 0
+        # Maior id lido de token_revocations (cursor da sincronização)
+        self._ultimo_id = 0
+        self._jtis = {}
+        self._usuarios = {}
+        self._sincronizado_em = None
+        self._lock = threading.Lock()
+
+    def revogado(self, payload):
+        jti = payload.get('jti')
+        if jti and jti in self._jtis:
+            return True
+        revogacao = self._usuarios.get(payload.get('user_id'))
+        return revogacao is not None and payload.get('iat', 0) < revogacao[0]
+
+    def _aplicar(self, revogacao):
+        expira_em = revogacao.expires_at.replace(tzinfo=timezone.utc).timestamp()
+        nova = False
+        if revogacao.jti and revogacao.jti not in self._jtis:
+            self._jtis[revogacao.jti] = expira_em
+            nova = True
+        if revogacao.user_id and revogacao.not_before:
+            atual = self._usuarios.get(revogacao.user_id)
+            if atual is None or revogacao.not_before > atual[0]:
+                self._usuarios[revogacao.user_id] = (revogacao.not_before, expira_em)
+                nova = True
+        self._ultimo_id = max(self._ultimo_id, revogacao.id)
+        # Releituras da margem de ids não mudam a versão; revogação nova sempre muda
+        if nova:
+            self.versao += 1
+
+    def _limpar_expirados(self):
+        agora = time.time()
+        self._jtis = {jti: expira for jti, expira in self._jtis.items() if expira > agora}
+        self._usuarios = {uid: rev for uid, rev in self._usuarios.items() if rev[1] > agora}
+
+    def sincronizar(self, forcar=False):
+        """Lê do banco as revogações novas (no máximo uma vez a cada `refresh` segundos)"""
+        agora = time.monotonic()
+        if not forcar and self._sincronizado_em is not None and agora - self._sincronizado_em < self.refresh:
+            return
+        with self._lock:
+            if not forcar and self._sincronizado_em is not None and agora - self._sincronizado_em < self.refresh:
+                return
+            self._sincronizado_em = agora
+            try:
+                revogacoes = db.session.execute(
+                    select(TokenRevocation)
+                    .where(TokenRevocation.id > self._ultimo_id - _MARGEM_IDS,
+                           TokenRevocation.expires_at > datetime.utcnow())
+                    .order_by(TokenRevocation.id)
+                ).scalars().all()
+            except Exception:
+                # Sem banco, segue com a denylist que já tem
+                logger.exception('Erro ao sincronizar a denylist de tokens')
+                return
+            for revogacao in revogacoes:
+                self._aplicar(revogacao)
+            self._limpar_expirados()
+
+    def _gravar(self, revogacao):
+        db.session.add(revogacao)
+        db.session.commit()
+        with self._lock:
+            self._aplicar(revogacao)
+
+    def revogar_token(self, payload):
+        """Revoga um token pelo jti (até o exp dele)"""
+        if not payload.get('jti'):
+            raise ValueError('Token sem jti não pode ser revogado individualmente')
+        self._gravar(TokenRevocation(
+            jti=payload['jti'],
+            user_id=payload.get('user_id'),
+            expires_at=datetime.utcfromtimestamp(payload['exp'])
+        ))
+
+    def revogar_usuario(self, user_id, validade):
+        """Revoga todos os tokens do usuário emitidos até agora; `validade` é a duração máxima de um token"""
+        self._gravar(TokenRevocation(
+            user_id=user_id,
+            not_before=time.time(),
+            expires_at=datetime.utcnow() + validade
+        ))
+
+
+def get_token_cache():
+    """
+    Retorna o cache de tokens verificados compartilhado pelo processo
+    """
+    global _cache
+    if _cache is None:
+        with _singleton_lock:
+            if _cache is None:
+                _cache = TokenCache()
+    return _cache
+
+
+def get_denylist():
+    """
+    Retorna a denylist de tokens compartilhada pelo processo
+    """
+    global _denylist
+    if _denylist is None:
+        with _singleton_lock:
+            if _denylist is None:
+                _denylist = Denylist()
+    return _denylist
@@ -0,0 +1,322 @@
+import bisect
+import heapq
+import logging
+import re
+import threading
+import time
+import unicodedata
+from datetime import timedelta
+from config import CLIENTE_INDEX_TTL, CLIENTE_INDEX_FULL_RELOAD
+from omie_api import agora_omie
+
+logger = logging.getLogger(__name__)
+
+_index = None
+_index_lock = threading.Lock()
+
+_NAO_ALFANUMERICO = re.compile(r'[^a-z0-9]+')
+_NAO_DIGITO = re.compile(r'\D+')
+
+
+def normalizar(texto):
+    """
+    Remove acentos, converte para minúsculas e troca pontuação por espaço
+    """
+    if not texto:
+        return ''
+    decomposto = unicodedata.normalize('NFKD', str(texto))
+    sem_acento = ''.join(c for c in decomposto if not unicodedata.combining(c))
+    return _NAO_ALFANUMERICO.sub(' ', sem_acento.lower()).strip()
+
+
+def somente_digitos(texto):
+    """Mantém só os dígitos (CNPJ/CPF sem pontos, barras e traços)"""
+    return _NAO_DIGITO.sub('', texto or '')
+
+
+def _chave_cliente(cliente):
+    return (
+        cliente.get('codigo_cliente_omie')
+        or cliente.get('codigo_cliente_integracao')
+        or somente_digitos(cliente.get('cnpj_cpf'))
+    )
+
+
+class _PrefixIndex:
+    """Termos ordenados + postings, para busca por prefixo com bisect"""
+
+    def __init__(self):
+        self.termos = []
+        self.postings = {}
+
+    def add(self, termo, chave, ordenar=True):
+        postings = self.postings.get(termo)
+        if postings is None:
+            postings = self.postings[termo] = set()
+            if ordenar:
+                bisect.insort(self.termos, termo)
+        postings.add(chave)
+
+    def reordenar(self):
+        """Ordena todos os termos de uma vez (após carga em lote com ordenar=False)"""
+        self.termos = sorted(self.postings)
+
+    def discard(self, termo, chave):
+        postings = self.postings.get(termo)
+        if postings is None:
+            return
+        postings.discard(chave)
+        if not postings:
+            del self.postings[termo]
+            del self.termos[bisect.bisect_left(self.termos, termo)]
+
+    def prefix(self, prefixo):
+        encontrados = set()
+        for posicao in range(bisect.bisect_left(self.termos, prefixo), len(self.termos)):
+            termo = self.termos[posicao]
+            if not termo.startswith(prefixo):
+                break
+            encontrados |= self.postings[termo]
+        return encontrados
+
+
+class ClienteSearchIndex:
+    """
+    Índice invertido em memória sobre o cadastro de clientes do Omie
+
+    Busca por prefixo de token em razao_social, nome_fantasia e cidade (sem
+    acentos) e por prefixo dos dígitos do CNPJ/CPF. Todos os termos da busca
+    precisam casar (AND).
+
+    Depois da carga completa o índice é mantido por deltas: só os clientes
+    alterados desde a marca d'água (dAlt do Omie) são buscados e aplicados com
+    upsert_many; a ClienteSync também aplica aqui as páginas que grava. A carga
+    completa só se repete a cada CLIENTE_INDEX_FULL_RELOAD segundos (para
+    refletir exclusões, que não aparecem no delta).
+    """
+
+    # Folga no filtro do delta para alterações gravadas fora de ordem no Omie
+    MARGEM = timedelta(minutes=5)
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._carga_lock = threading.Lock()
+        self._clientes = {}
+        self._termos_cliente = {}
+        self._tokens = _PrefixIndex()
+        self._documentos = _PrefixIndex()
+        self._ordem = {}
+        self.atualizado_em = None
+        self.carregado_em = None
+        # Hora (no relógio do Omie) até onde as alterações já estão no índice
+        self.marca = None
+        self._atualizando = False
+        self._falhas = 0
+        self._falhou_em = None
+
+    def __len__(self):
+        return len(self._clientes)
+
+    def _termos(self, cliente):
+        texto = ' '.join(
+            cliente.get(campo) or ''
+            for campo in ('razao_social', 'nome_fantasia', 'cidade')
+        )
+        return set(normalizar(texto).split()), somente_digitos(cliente.get('cnpj_cpf'))
+
+    def _remover(self, chave):
+        termos = self._termos_cliente.pop(chave, None)
+        if termos is None:
+            return
+        tokens, documento = termos
+        for token in tokens:
+            self._tokens.discard(token, chave)
+        if documento:
+            self._documentos.discard(documento, chave)
+        del self._clientes[chave]
+        del self._ordem[chave]
+
+    def _adicionar(self, chave, cliente, ordenar=True):
+        tokens, documento = self._termos(cliente)
+        self._clientes[chave] = cliente
+        self._termos_cliente[chave] = (tokens, documento)
+        # Desempate pela chave: nomes iguais saem sempre na mesma ordem e a
+        # paginação não pula nem repete clientes (str: as chaves misturam tipos)
+        self._ordem[chave] = (normalizar(cliente.get('razao_social')), str(chave))
+        for token in tokens:
+            self._tokens.add(token, chave, ordenar)
+        if documento:
+            self._documentos.add(documento, chave, ordenar)
+
+    def upsert(self, cliente, ordenar=True):
+        """Inclui ou atualiza um cliente no índice"""
+        chave = _chave_cliente(cliente)
+        if not chave:
+            return
+        with self._lock:
+            self._remover(chave)
+            self._adicionar(chave, cliente, ordenar)
+
+    def upsert_many(self, clientes):
+        """Aplica um lote de clientes (página de delta) sob um único lock"""
+        with self._lock:
+            for cliente in clientes:
+                self.upsert(cliente)
+
+    def remove(self, chave):
+        """Remove um cliente pelo codigo_cliente_omie"""
+        with self._lock:
+            self._remover(chave)
+
+    def substituir(self, clientes):
+        """
+        Reconstrói o índice com o cadastro completo, trocando de uma vez só
+        """
+        novo = ClienteSearchIndex()
+        for cliente in clientes:
+            novo.upsert(cliente, ordenar=False)
+        novo._tokens.reordenar()
+        novo._documentos.reordenar()
+        with self._lock:
+            self._clientes = novo._clientes
+            self._termos_cliente = novo._termos_cliente
+            self._tokens = novo._tokens
+            self._documentos = novo._documentos
+            self._ordem = novo._ordem
+            self.atualizado_em = time.time()
+
+    def search(self, q, pagina=1, registros_por_pagina=50):
+        """
+        Busca clientes e devolve a página no mesmo formato de ListarClientes
+        """
+        termos = normalizar(q).split()
+        digitos = somente_digitos(q)
+
+        with self._lock:
+            if not termos and not digitos:
+                resultado = set(self._clientes)
+            else:
+                resultado = None
+            for termo in termos:
+                casados = self._tokens.prefix(termo)
+                resultado = casados if resultado is None else resultado & casados
+                if not resultado:
+                    break
+            resultado = resultado or set()
+            if len(digitos) >= 2:
+                resultado |= self._documentos.prefix(digitos)
+
+            total = len(resultado)
+            inicio = (pagina - 1) * registros_por_pagina
+            fim = inicio + registros_por_pagina
+            if fim * 4 < total:
+                # Primeiras páginas de resultados grandes: evita ordenar tudo
+                ordenados = heapq.nsmallest(fim, resultado, key=self._ordem.__getitem__)
+            else:
+                ordenados = sorted(resultado, key=self._ordem.__getitem__)
+            clientes = [self._clientes[chave] for chave in ordenados[inicio:fim]]
+
+        return {
+            'success': True,
+            'data': {
+                'pagina': pagina,
+                'total_de_paginas': max(1, -(-total // registros_por_pagina)),
+                'registros': len(clientes),
+                'total_de_registros': total,
+                'clientes_cadastro': clientes
+            }
+        }
+
+    def carregar(self, omie):
+        """
+        Carrega o cadastro completo do Omie (todas as páginas)
+        """
+        # A marca é o início da carga: o que mudar durante ela entra no próximo delta
+        inicio = agora_omie()
+        self.substituir(omie.iter_all_clientes(ordered=False))
+        self.marca = inicio
+        self.carregado_em = self.atualizado_em
+
+    def atualizar_delta(self, omie):
+        """
+        Busca no Omie só os clientes alterados desde a marca d'água e os aplica
+        no índice; retorna quantos registros vieram
+        """
+        inicio = agora_omie()
+        desde = self.marca - self.MARGEM
+        recebidos = 0
+        for dados in omie.iter_paginas_clientes(
+            ordered=False,
+            filtrar_por_data_de=desde.strftime('%d/%m/%Y'),
+            filtrar_por_hora_de=desde.strftime('%H:%M:%S')
+        ):
+            clientes = dados.get('clientes_cadastro', [])
+            self.upsert_many(clientes)
+            recebidos += len(clientes)
+        with self._lock:
+            self.marca = max(self.marca, inicio)
+            self.atualizado_em = time.time()
+        return recebidos
+
+    # Espera antes de tentar de novo após uma falha: dobra a cada falha seguida
+    ESPERA_FALHA = 5
+    ESPERA_FALHA_MAXIMA = 300
+
+    def _em_segundo_plano(self, funcao, omie):
+        def executar():
+            try:
+                funcao(omie)
+                self._falhas = 0
+            except Exception:
+                self._falhas += 1
+                self._falhou_em = time.monotonic()
+                logger.exception('Erro ao atualizar o índice de clientes', extra={'falhas': self._falhas})
+            finally:
+                self._atualizando = False
+
+        self._atualizando = True
+        threading.Thread(target=executar, daemon=True).start()
+
+    def _aguardando_falha(self):
+        if not self._falhas:
+            return False
+        espera = min(self.ESPERA_FALHA_MAXIMA, self.ESPERA_FALHA * 2 ** (self._falhas - 1))
+        return time.monotonic() - self._falhou_em < espera
+
+    def garantir_atualizado(self, omie, ttl=CLIENTE_INDEX_TTL, recarga=CLIENTE_INDEX_FULL_RELOAD):
+        """
+        Mantém o índice atualizado sem bloquear a requisição e retorna se ele já
+        pode responder
+
+        A primeira chamada dispara a carga completa em segundo plano e retorna
+        False até ela terminar. Depois, passado o TTL, aplica um delta (ou uma
+        nova carga completa, passado `recarga`) em segundo plano e continua
+        respondendo com os dados atuais. Após uma falha, a próxima tentativa
+        espera ESPERA_FALHA segundos, dobrando a cada falha seguida.
+        """
+        with self._carga_lock:
+            if self._atualizando or self._aguardando_falha():
+                return self.atualizado_em is not None
+            if self.atualizado_em is None:
+                self._em_segundo_plano(self.carregar, omie)
+                return False
+            agora = time.time()
+            if agora - self.atualizado_em < ttl:
+                return True
+            if self.marca is None or agora - self.carregado_em >= recarga:
+                self._em_segundo_plano(self.carregar, omie)
+            else:
+                self._em_segundo_plano(self.atualizar_delta, omie)
+            return True
+
+
+def get_cliente_index():
+    """
+    Retorna o índice de clientes compartilhado pelo processo
+    """
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = ClienteSearchIndex()
+    return _index
@@ -1,6 +0,0 @@
-# Configurações da API Omie
-OMIE_APP_KEY = "4822742510586"
-OMIE_APP_SECRET = "4d0d076f80955db93781f1bafcc3bc3e"
-
-# URL base da API
-OMIE_API_URL = "https://app.omie.com.br/api/v1"
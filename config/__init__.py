@@ -1 +1,139 @@
+import os
+from dotenv import load_dotenv
 
+load_dotenv()
+
+# Configurações da API Omie
+OMIE_APP_KEY = os.getenv('OMIE_APP_KEY', "4822742510586")
+OMIE_APP_SECRET = os.getenv('OMIE_APP_SECRET', "4d0d076f80955db93781f1bafcc3bc3e")
+
+# URL base da API
+OMIE_API_URL = os.getenv('OMIE_API_URL', "https://app.omie.com.br/api/v1")
+
+# Pool de conexões HTTP (keep-alive) compartilhado por todas as rotas
+OMIE_POOL_SIZE = int(os.getenv('OMIE_POOL_SIZE', '10'))
+OMIE_CONNECT_TIMEOUT = float(os.getenv('OMIE_CONNECT_TIMEOUT', '5'))
+OMIE_READ_TIMEOUT = float(os.getenv('OMIE_READ_TIMEOUT', '30'))
+
+# Retentativas com backoff exponencial (erros de conexão e 502/503/504)
+OMIE_MAX_RETRIES = int(os.getenv('OMIE_MAX_RETRIES', '3'))
+OMIE_BACKOFF_FACTOR = float(os.getenv('OMIE_BACKOFF_FACTOR', '0.5'))
+
+# Limite de chamadas simultâneas do cliente assíncrono (FastAPI)
+OMIE_MAX_CONCURRENCY = int(os.getenv('OMIE_MAX_CONCURRENCY', '20'))
+
+# Paginação paralela (ListarClientes aceita no máximo 500 registros por página)
+OMIE_PAGE_SIZE = int(os.getenv('OMIE_PAGE_SIZE', '500'))
+OMIE_PAGE_WORKERS = int(os.getenv('OMIE_PAGE_WORKERS', '4'))
+# Fuso das datas de alteração (dAlt/hAlt) devolvidas pelo Omie
+OMIE_TIMEZONE = os.getenv('OMIE_TIMEZONE', 'America/Sao_Paulo')
+
+# Envio em lote (IncluirClientesPorLote/UpsertClientesPorLote aceitam até 50 registros por lote)
+OMIE_LOTE_SIZE = int(os.getenv('OMIE_LOTE_SIZE', '50'))
+OMIE_LOTE_WORKERS = int(os.getenv('OMIE_LOTE_WORKERS', '4'))
+
+# Índice de busca de clientes: intervalo entre atualizações por delta (dAlt) e entre
+# recargas completas do cadastro do Omie, que refletem as exclusões (segundos)
+CLIENTE_INDEX_TTL = int(os.getenv('CLIENTE_INDEX_TTL', '300'))
+CLIENTE_INDEX_FULL_RELOAD = int(os.getenv('CLIENTE_INDEX_FULL_RELOAD', '86400'))
+
+# Cache de respostas do Omie: TTL por chamada ("Chamada=segundos", separadas por vírgula).
+# Só as chamadas listadas são guardadas em cache.
+OMIE_CACHE_TTLS = {
+    chamada.strip(): int(segundos)
+    for chamada, segundos in (
+        item.split('=') for item in os.getenv('OMIE_CACHE_TTLS', 'ListarClientes=60').split(',') if item.strip()
+    )
+}
+OMIE_CACHE_MAX_ENTRIES = int(os.getenv('OMIE_CACHE_MAX_ENTRIES', '1024'))
+OMIE_CACHE_STALE_TTL = int(os.getenv('OMIE_CACHE_STALE_TTL', '300'))
+
+# Rate limit do Omie (token bucket com AIMD), em requisições por segundo por app key.
+# OMIE_RATE_STATE_FILE compartilha o bucket entre processos da mesma máquina.
+OMIE_RATE_LIMIT = float(os.getenv('OMIE_RATE_LIMIT', '4'))
+OMIE_RATE_BURST = float(os.getenv('OMIE_RATE_BURST', '8'))
+OMIE_RATE_MIN = float(os.getenv('OMIE_RATE_MIN', '0.5'))
+OMIE_RATE_MAX = float(os.getenv('OMIE_RATE_MAX', '10'))
+OMIE_RATE_STATE_FILE = os.getenv('OMIE_RATE_STATE_FILE') or None
+
+# Logging estruturado (LOG_FORMAT: json ou text). OMIE_LOG_SAMPLE_RATE é a fração
+# das chamadas bem-sucedidas ao Omie que geram evento de log; erros sempre são logados.
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO').upper()
+LOG_FORMAT = os.getenv('LOG_FORMAT', 'json')
+OMIE_LOG_SAMPLE_RATE = float(os.getenv('OMIE_LOG_SAMPLE_RATE', '0.1'))
+
+# Hash de senhas (werkzeug). PASSWORD_HASH_METHOD define o custo, ex.: scrypt:32768:8:1
+# ou pbkdf2:sha256:600000; hashes antigos são refeitos no próximo login.
+# O pool limita os hashes simultâneos (calculados na thread da requisição); acima
+# de PASSWORD_POOL_QUEUE esperando a vez, /auth responde 503 com Retry-After.
+PASSWORD_HASH_METHOD = os.getenv('PASSWORD_HASH_METHOD', 'scrypt:32768:8:1')
+PASSWORD_POOL_WORKERS = int(os.getenv('PASSWORD_POOL_WORKERS', str(os.cpu_count() or 2)))
+PASSWORD_POOL_QUEUE = int(os.getenv('PASSWORD_POOL_QUEUE', str(PASSWORD_POOL_WORKERS * 4)))
+PASSWORD_RETRY_AFTER = int(os.getenv('PASSWORD_RETRY_AFTER', '1'))
+
+# Cache de tokens JWT já verificados (entradas) e intervalo, em segundos, para
+# buscar no banco as revogações feitas por outros processos
+TOKEN_CACHE_SIZE = int(os.getenv('TOKEN_CACHE_SIZE', '10000'))
+TOKEN_DENYLIST_REFRESH = float(os.getenv('TOKEN_DENYLIST_REFRESH', '5'))
+
+# Matriz de permissões: intervalo (segundos) para conferir no banco se outro
+# processo alterou role_permissions
+PERMISSION_REFRESH = float(os.getenv('PERMISSION_REFRESH', '5'))
+
+# Importação em massa (CSV/XLSX): linhas por lote de upsert e lotes gravados em paralelo
+IMPORT_BATCH_SIZE = int(os.getenv('IMPORT_BATCH_SIZE', '1000'))
+IMPORT_WORKERS = int(os.getenv('IMPORT_WORKERS', '4'))
+
+# API de listagem: tamanho padrão e máximo da página (paginação por cursor) e
+# linhas buscadas por vez nas exportações NDJSON/CSV
+LIST_PAGE_SIZE = int(os.getenv('LIST_PAGE_SIZE', '50'))
+LIST_MAX_PAGE_SIZE = int(os.getenv('LIST_MAX_PAGE_SIZE', '500'))
+EXPORT_CHUNK_SIZE = int(os.getenv('EXPORT_CHUNK_SIZE', '1000'))
+
+# Instrumentação de consultas por requisição (header Server-Timing). QUERY_BUDGET é o
+# máximo de consultas por requisição (0 = sem limite); com QUERY_BUDGET_STRICT (testes/CI)
+# passar do orçamento é erro. Um statement repetido QUERY_DUPLICATE_THRESHOLD vezes na
+# mesma requisição gera aviso de possível N+1. Em respostas em streaming (/export) o
+# orçamento conta as consultas do corpo e é conferido quando o stream termina.
+# QUERY_DEBUG_ENDPOINT liga GET /debug/queries (só para tokens da role admin).
+QUERY_STATS_ENABLED = os.getenv('QUERY_STATS_ENABLED', 'true').lower() in ('1', 'true', 'yes', 'sim')
+QUERY_BUDGET = int(os.getenv('QUERY_BUDGET', '0'))
+QUERY_BUDGET_STRICT = os.getenv('QUERY_BUDGET_STRICT', 'false').lower() in ('1', 'true', 'yes', 'sim')
+QUERY_DUPLICATE_THRESHOLD = int(os.getenv('QUERY_DUPLICATE_THRESHOLD', '5'))
+QUERY_DEBUG_ENDPOINT = os.getenv('QUERY_DEBUG_ENDPOINT', 'false').lower() in ('1', 'true', 'yes', 'sim')
+
+# Registro de vendas: tentativas quando a transação cai em deadlock/lock wait timeout
+# e maior quantidade de um produto numa venda
+SALE_RETRIES = int(os.getenv('SALE_RETRIES', '3'))
+SALE_MAX_QUANTITY = int(os.getenv('SALE_MAX_QUANTITY', '100000'))
+
+# Resumos de vendas (dashboards): workers do backfill e maior período, em dias,
+# aceito pela série diária do dashboard
+ROLLUP_BACKFILL_WORKERS = int(os.getenv('ROLLUP_BACKFILL_WORKERS', '4'))
+DASHBOARD_MAX_DAYS = int(os.getenv('DASHBOARD_MAX_DAYS', '366'))
+
+# Snapshot analítico (Arrow IPC) para os relatórios: pasta raiz, snapshots mantidos
+# por empresa e linhas lidas do banco por vez na exportação
+ANALYTICS_DIR = os.getenv('ANALYTICS_DIR', 'data/analytics')
+ANALYTICS_KEEP_SNAPSHOTS = int(os.getenv('ANALYTICS_KEEP_SNAPSHOTS', '2'))
+ANALYTICS_EXPORT_BATCH = int(os.getenv('ANALYTICS_EXPORT_BATCH', '50000'))
+
+# Agenda de ordens de serviço: duração máxima de uma reserva (limita a checagem de
+# conflito no banco), duração padrão, capacidade diária de um técnico para o cálculo
+# de utilização, segundos até a agenda em memória ser relida do banco e quantas
+# agendas de técnicos ficam em memória
+SCHEDULING_MAX_HOURS = int(os.getenv('SCHEDULING_MAX_HOURS', '24'))
+SCHEDULING_DEFAULT_MINUTES = int(os.getenv('SCHEDULING_DEFAULT_MINUTES', '60'))
+SCHEDULING_DAY_CAPACITY_MINUTES = int(os.getenv('SCHEDULING_DAY_CAPACITY_MINUTES', '480'))
+SCHEDULING_REFRESH_SECONDS = int(os.getenv('SCHEDULING_REFRESH_SECONDS', '300'))
+SCHEDULING_MAX_AGENDAS = int(os.getenv('SCHEDULING_MAX_AGENDAS', '5000'))
+
+# Geocodificação de empresas e clientes: GEOCODER é 'stub' (offline, determinístico)
+# ou 'pacote.modulo:Classe'. GEOCODE_BATCH_SIZE são as linhas lidas por vez,
+# GEOCODE_RATE_PER_SECOND as chamadas em lote por segundo ao geocodificador e
+# endereços não encontrados são consultados de novo depois de GEOCODE_NOT_FOUND_TTL_DAYS
+GEOCODER = os.getenv('GEOCODER', 'stub')
+GEOCODE_BATCH_SIZE = int(os.getenv('GEOCODE_BATCH_SIZE', '500'))
+GEOCODE_RATE_PER_SECOND = float(os.getenv('GEOCODE_RATE_PER_SECOND', '1'))
+GEOCODE_RETRIES = int(os.getenv('GEOCODE_RETRIES', '3'))
+GEOCODE_NOT_FOUND_TTL_DAYS = int(os.getenv('GEOCODE_NOT_FOUND_TTL_DAYS', '30'))
@@ -1,23 +1,4 @@
-from flask_sqlalchemy import SQLAlchemy
-from flask_migrate import Migrate
-import os
-from dotenv import load_dotenv
+# Mantido por compatibilidade: o banco é configurado em database.connection
+from database.connection import db, migrate, init_db, create_db_engine, get_pool_metrics
 
-load_dotenv()
-
-db = SQLAlchemy()
-migrate = Migrate()
-
-def init_db(app):
-    app.config['SQLALCHEMY_DATABASE_URI'] = (
-        f"mysql+mysqlconnector://"
-        f"{os.getenv('MYSQL_USER')}:{os.getenv('MYSQL_PASSWORD')}@"
-        f"{os.getenv('MYSQL_HOST')}:{os.getenv('MYSQL_PORT', '3306')}/"
-        f"{os.getenv('MYSQL_DATABASE')}"
-    )
-    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-    
-    db.init_app(app)
-    migrate.init_app(app, db)
-    
-    return db
+__all__ = ['db', 'migrate', 'init_db', 'create_db_engine', 'get_pool_metrics']
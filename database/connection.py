@@ -1,23 +1,169 @@
 from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
+from sqlalchemy import create_engine
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.engine import URL, make_url
+from sqlalchemy.pool import QueuePool
 import os
+import threading
+import time
 from dotenv import load_dotenv
+from database.routing import (
+    RoutingSession, ReplicaRouter, REPLICA_BIND_PREFIX, instrumentar_replicas
+)
 
 load_dotenv()
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 migrate = Migrate()
 
-def init_db(app):
-    app.config['SQLALCHEMY_DATABASE_URI'] = (
-        f"mysql+mysqlconnector://"
-        f"{os.getenv('MYSQL_USER')}:{os.getenv('MYSQL_PASSWORD')}@"
-        f"{os.getenv('MYSQL_HOST')}:{os.getenv('MYSQL_PORT', '3306')}/"
-        f"{os.getenv('MYSQL_DATABASE')}"
-    )
+# Drivers MySQL suportados (MYSQL_DRIVER)
+MYSQL_DRIVERS = ('mysqlconnector', 'pymysql')
+
+
+class InstrumentedQueuePool(QueuePool):
+    """
+    QueuePool que mede a espera por uma conexão livre
+
+    O tempo de checkout só é relevante quando o pool está cheio; as métricas
+    (get_pool_metrics) mostram quantas esperas houve, o tempo total/máximo e
+    quantas terminaram em timeout.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._metricas_lock = threading.Lock()
+        self.wait_stats = {'checkouts': 0, 'waits': 0, 'wait_total_ms': 0.0, 'wait_max_ms': 0.0, 'timeouts': 0}
+
+    def _do_get(self):
+        inicio = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            with self._metricas_lock:
+                self.wait_stats['timeouts'] += 1
+            raise
+        finally:
+            espera_ms = (time.perf_counter() - inicio) * 1000
+            with self._metricas_lock:
+                self.wait_stats['checkouts'] += 1
+                # Abaixo de 1 ms é o custo do próprio checkout, não espera
+                if espera_ms >= 1:
+                    self.wait_stats['waits'] += 1
+                    self.wait_stats['wait_total_ms'] += espera_ms
+                    self.wait_stats['wait_max_ms'] = max(self.wait_stats['wait_max_ms'], espera_ms)
+
+
+def _env_bool(nome, padrao):
+    return os.getenv(nome, padrao).lower() in ('1', 'true', 'yes', 'sim')
+
+
+def database_url():
+    """
+    URL do banco: DATABASE_URL, se definida, ou MySQL a partir das variáveis MYSQL_*
+    """
+    if os.getenv('DATABASE_URL'):
+        return os.getenv('DATABASE_URL')
+    driver = os.getenv('MYSQL_DRIVER', 'mysqlconnector')
+    if driver not in MYSQL_DRIVERS:
+        raise ValueError(f"MYSQL_DRIVER inválido: {driver} (use {' ou '.join(MYSQL_DRIVERS)})")
+    return URL.create(
+        f"mysql+{driver}",
+        username=os.getenv('MYSQL_USER'),
+        password=os.getenv('MYSQL_PASSWORD'),
+        host=os.getenv('MYSQL_HOST'),
+        port=int(os.getenv('MYSQL_PORT', '3306')),
+        database=os.getenv('MYSQL_DATABASE')
+    ).render_as_string(hide_password=False)
+
+
+def engine_options(url=None):
+    """
+    Opções do engine a partir das variáveis DB_POOL_*
+
+    pool_pre_ping descarta conexões derrubadas pelo wait_timeout do MySQL antes
+    de entregá-las; pool_recycle renova as conexões antes desse prazo. Bancos
+    SQLite usam o pool padrão do SQLAlchemy.
+    """
+    if make_url(url or database_url()).get_backend_name() == 'sqlite':
+        return {}
+    return {
+        'poolclass': InstrumentedQueuePool,
+        'pool_size': int(os.getenv('DB_POOL_SIZE', '10')),
+        'max_overflow': int(os.getenv('DB_MAX_OVERFLOW', '20')),
+        'pool_recycle': int(os.getenv('DB_POOL_RECYCLE', '1800')),
+        'pool_pre_ping': _env_bool('DB_POOL_PRE_PING', 'true'),
+        'pool_timeout': float(os.getenv('DB_POOL_TIMEOUT', '10'))
+    }
+
+
+def create_db_engine(url=None, **overrides):
+    """
+    Cria um engine fora do Flask (scripts, migrations) com as mesmas opções de pool
+
+    Com poolclass=NullPool (migrations), só pre_ping e recycle são mantidos.
+    """
+    url = url or database_url()
+    opcoes = engine_options(url)
+    poolclass = overrides.get('poolclass')
+    if poolclass is not None and not issubclass(poolclass, QueuePool):
+        opcoes = {k: v for k, v in opcoes.items() if k in ('pool_pre_ping', 'pool_recycle')}
+    return create_engine(url, **dict(opcoes, **overrides))
+
+
+def get_pool_metrics(engine=None):
+    """
+    Estado do pool: tamanho, conexões em uso, overflow e tempos de espera
+    """
+    pool = (engine or db.engine).pool
+    metricas = {'pool': type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        metricas.update(
+            size=pool.size(),
+            checked_out=pool.checkedout(),
+            checked_in=pool.checkedin(),
+            overflow=max(0, pool.overflow()),
+            max_overflow=pool._max_overflow,
+            timeout=pool.timeout()
+        )
+    if isinstance(pool, InstrumentedQueuePool):
+        with pool._metricas_lock:
+            metricas.update(pool.wait_stats)
+        metricas['wait_total_ms'] = round(metricas['wait_total_ms'], 1)
+        metricas['wait_max_ms'] = round(metricas['wait_max_ms'], 1)
+    return metricas
+
+
+def replica_urls():
+    """URLs das réplicas de leitura (DATABASE_REPLICA_URLS, separadas por vírgula)"""
+    return [url.strip() for url in os.getenv('DATABASE_REPLICA_URLS', '').split(',') if url.strip()]
+
+
+def init_db(app, replicas=None):
+    """
+    Configura o banco do app; com réplicas (ou DATABASE_REPLICA_URLS), os SELECTs
+    fora de transações com escrita vão para elas (ver database.routing)
+    """
+    app.config.setdefault('SQLALCHEMY_DATABASE_URI', database_url())
+    app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', engine_options(app.config['SQLALCHEMY_DATABASE_URI']))
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+
+    replicas = replica_urls() if replicas is None else replicas
+    binds = app.config.setdefault('SQLALCHEMY_BINDS', {})
+    for i, url in enumerate(replicas):
+        binds[f'{REPLICA_BIND_PREFIX}{i}'] = dict(engine_options(url), url=url)
     
     db.init_app(app)
     migrate.init_app(app, db)
+
+    if replicas:
+        router = ReplicaRouter(
+            [f'{REPLICA_BIND_PREFIX}{i}' for i in range(len(replicas))],
+            pin_seconds=float(os.getenv('REPLICA_PIN_SECONDS', '5')),
+            health_interval=float(os.getenv('REPLICA_HEALTH_INTERVAL', '10'))
+        )
+        app.extensions['db_replicas'] = router
+        with app.app_context():
+            instrumentar_replicas(router, db.engines)
     
     return db
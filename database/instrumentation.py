@@ -0,0 +1,218 @@
+import collections
+import contextvars
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+from flask import current_app, request, jsonify
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from config import QUERY_STATS_ENABLED, QUERY_BUDGET, QUERY_BUDGET_STRICT, QUERY_DUPLICATE_THRESHOLD
+
+logger = logging.getLogger(__name__)
+
+_coletor = contextvars.ContextVar('query_stats', default=None)
+_eventos_lock = threading.Lock()
+_eventos_registrados = False
+
+
+class QueryBudgetExceeded(AssertionError):
+    """Requisição com mais consultas que o orçamento (modo estrito)"""
+
+
+class QueryStats:
+    """Consultas de uma requisição (ou de um bloco contar_queries())"""
+
+    def __init__(self):
+        self.count = 0
+        self.total_ms = 0.0
+        self.statements = collections.Counter()
+
+    def registrar(self, statement, duracao_ms):
+        self.count += 1
+        self.total_ms += duracao_ms
+        self.statements[statement] += 1
+
+    def duplicadas(self, minimo=QUERY_DUPLICATE_THRESHOLD):
+        """Statements repetidos pelo menos `minimo` vezes (sinal de N+1)"""
+        return [(sql, vezes) for sql, vezes in self.statements.most_common() if vezes >= minimo]
+
+    def resumo(self):
+        return {
+            'queries': self.count,
+            'db_ms': round(self.total_ms, 2),
+            'duplicates': [
+                {'statement': sql[:300], 'count': vezes} for sql, vezes in self.duplicadas()
+            ]
+        }
+
+
+def _antes(conn, cursor, statement, parameters, context, executemany):
+    if _coletor.get() is not None:
+        conn.info.setdefault('query_inicio', []).append(time.perf_counter())
+
+
+def _depois(conn, cursor, statement, parameters, context, executemany):
+    stats = _coletor.get()
+    inicios = conn.info.get('query_inicio')
+    if stats is not None and inicios:
+        stats.registrar(statement, (time.perf_counter() - inicios.pop()) * 1000)
+
+
+def _erro(contexto):
+    # Consulta que falhou não passa pelo after_cursor_execute
+    inicios = contexto.connection.info.get('query_inicio') if contexto.connection is not None else None
+    if inicios:
+        inicios.pop()
+
+
+def registrar_eventos():
+    """Liga a contagem em todos os engines (primário, réplicas e scripts)"""
+    global _eventos_registrados
+    with _eventos_lock:
+        if _eventos_registrados:
+            return
+        event.listen(Engine, 'before_cursor_execute', _antes)
+        event.listen(Engine, 'after_cursor_execute', _depois)
+        event.listen(Engine, 'handle_error', _erro)
+        _eventos_registrados = True
+
+
+@contextmanager
+def contar_queries():
+    """
+    Conta as consultas feitas no bloco, ex.:
+
+        with contar_queries() as stats:
+            ...
+        assert stats.count <= 3
+    """
+    registrar_eventos()
+    stats = QueryStats()
+    token = _coletor.set(stats)
+    try:
+        yield stats
+    finally:
+        _coletor.reset(token)
+
+
+def query_budget(maximo):
+    """Orçamento de consultas de uma rota (sobrepõe QUERY_BUDGET)"""
+    def decorator(f):
+        # Decorators com functools.wraps (token_required, require_permission) copiam o atributo
+        f.query_budget = maximo
+        return f
+    return decorator
+
+
+class QueryInstrumentation:
+    """
+    Instrumentação por requisição: contagem e tempo das consultas no header
+    Server-Timing (e X-DB-Queries), aviso de statements repetidos (N+1) e
+    orçamento de consultas por rota
+
+    Com strict=True (QUERY_BUDGET_STRICT, para testes e CI) a requisição acima
+    do orçamento levanta QueryBudgetExceeded; sem ele, só gera um aviso no log.
+    """
+
+    def __init__(self, app=None, budget=QUERY_BUDGET, strict=QUERY_BUDGET_STRICT, historico=100):
+        self.budget = budget
+        self.strict = strict
+        self.recentes = collections.deque(maxlen=historico)
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        registrar_eventos()
+        app.before_request(self._iniciar)
+        app.after_request(self._finalizar)
+        app.teardown_request(self._encerrar)
+        app.extensions['query_instrumentation'] = self
+
+    def _iniciar(self):
+        request._query_stats_token = _coletor.set(QueryStats())
+
+    def _orcamento(self):
+        view = current_app.view_functions.get(request.endpoint)
+        return getattr(view, 'query_budget', self.budget)
+
+    def _finalizar(self, response):
+        stats = _coletor.get()
+        if stats is None:
+            return response
+        response.headers.add('Server-Timing', f'db;dur={stats.total_ms:.1f};desc="{stats.count} queries"')
+        response.headers['X-DB-Queries'] = str(stats.count)
+
+        requisicao = (request.method, request.path, self._orcamento(), response.status_code)
+        if response.is_streamed:
+            # O corpo (ex.: /export com stream_with_context) ainda não rodou: os
+            # headers só têm as consultas feitas até aqui, e o N+1 e o orçamento
+            # são conferidos quando o stream termina, já com as consultas dele
+            response.call_on_close(lambda: self._conferir(stats, *requisicao))
+        else:
+            self._conferir(stats, *requisicao)
+        return response
+
+    def _conferir(self, stats, metodo, caminho, orcamento, status):
+        duplicadas = stats.duplicadas()
+        if duplicadas:
+            sql, vezes = duplicadas[0]
+            logger.warning('Consulta repetida na requisição (possível N+1)', extra={
+                'path': caminho, 'repeticoes': vezes, 'statement': sql[:300]
+            })
+        self.recentes.append(dict(stats.resumo(), method=metodo, path=caminho, status=status))
+
+        if orcamento and stats.count > orcamento:
+            mensagem = f'{metodo} {caminho}: {stats.count} consultas (orçamento {orcamento})'
+            if self.strict:
+                raise QueryBudgetExceeded(mensagem)
+            logger.warning('Orçamento de consultas excedido', extra={
+                'path': caminho, 'queries': stats.count, 'budget': orcamento
+            })
+
+    def _encerrar(self, exc):
+        token = getattr(request, '_query_stats_token', None)
+        if token is not None:
+            try:
+                _coletor.reset(token)
+            except ValueError:
+                # Resposta em streaming encerrada em outro contexto
+                _coletor.set(None)
+            request._query_stats_token = None
+
+    def debug_view(self):
+        """Últimas requisições com contagem, tempo e statements repetidos"""
+        return jsonify(list(reversed(self.recentes)))
+
+    def registrar_debug(self, app, rota='/debug/queries'):
+        """
+        Registra GET `rota` com o debug_view, só para tokens de role admin: as
+        requisições listadas são de todas as empresas
+        """
+        # Import tardio: auth importa os models, que não devem depender daqui
+        from auth.jwt_manager import token_required
+        from database.connection import db
+        from models.role import Role
+
+        @wraps(self.debug_view)
+        def somente_admin():
+            role = db.session.get(Role, request.role_id) if request.role_id else None
+            if role is None or role.name != 'admin':
+                return jsonify({'message': 'Permissão negada'}), 403
+            return self.debug_view()
+
+        app.add_url_rule(rota, 'debug_queries', token_required(somente_admin))
+
+
+def init_query_stats(app, debug_endpoint=False):
+    """
+    Liga a instrumentação no app (se QUERY_STATS_ENABLED); com debug_endpoint,
+    registra GET /debug/queries (token de admin)
+    """
+    if not QUERY_STATS_ENABLED:
+        return None
+    instrumentacao = QueryInstrumentation(app)
+    if debug_endpoint:
+        instrumentacao.registrar_debug(app)
+    return instrumentacao
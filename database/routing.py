@@ -0,0 +1,176 @@
+import itertools
+import logging
+import threading
+import time
+from flask import current_app, has_app_context, has_request_context, request
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event, text
+from sqlalchemy.sql import Select
+
+logger = logging.getLogger(__name__)
+
+# Prefixo das binds de réplica em SQLALCHEMY_BINDS
+REPLICA_BIND_PREFIX = 'replica:'
+
+
+class ReplicaRouter:
+    """
+    Escolhe a réplica de leitura (round-robin entre as saudáveis) e guarda os
+    pinos de read-your-writes
+
+    Uma réplica que falha na checagem (SELECT 1) ou em uma conexão fica fora do
+    rodízio por `health_interval` segundos. Depois de um commit com escrita, as
+    leituras do mesmo cliente vão ao primário por `pin_seconds` segundos.
+    """
+
+    def __init__(self, bind_keys, pin_seconds=5, health_interval=10):
+        self.bind_keys = list(bind_keys)
+        self.pin_seconds = pin_seconds
+        self.health_interval = health_interval
+        self._rodizio = itertools.cycle(self.bind_keys)
+        self._saude = {chave: {'ok': True, 'checado_em': None} for chave in self.bind_keys}
+        self._pinos = {}
+        self._lock = threading.Lock()
+        self.stats = {'replica': 0, 'primary': 0, 'pinned': 0, 'unhealthy': 0}
+
+    def _checar(self, chave, engine):
+        try:
+            with engine.connect() as conexao:
+                conexao.execute(text('SELECT 1'))
+            return True
+        except Exception:
+            logger.warning('Réplica indisponível', extra={'replica': chave})
+            return False
+
+    def marcar_falha(self, chave):
+        with self._lock:
+            self._saude[chave] = {'ok': False, 'checado_em': time.monotonic()}
+            self.stats['unhealthy'] += 1
+
+    def proxima(self, engines):
+        """Chave da próxima réplica saudável, ou None para usar o primário"""
+        agora = time.monotonic()
+        for _ in range(len(self.bind_keys)):
+            with self._lock:
+                chave = next(self._rodizio)
+                saude = self._saude[chave]
+                vencida = saude['checado_em'] is None or agora - saude['checado_em'] >= self.health_interval
+                if not vencida and not saude['ok']:
+                    continue
+                if vencida:
+                    # Marca antes de checar para que só uma thread faça a checagem
+                    saude['checado_em'] = agora
+            if vencida:
+                ok = self._checar(chave, engines[chave])
+                with self._lock:
+                    self._saude[chave] = {'ok': ok, 'checado_em': agora}
+                if not ok:
+                    continue
+            return chave
+        return None
+
+    def fixar(self, cliente):
+        with self._lock:
+            self._pinos[cliente] = time.monotonic() + self.pin_seconds
+            if len(self._pinos) > 10000:
+                agora = time.monotonic()
+                self._pinos = {c: ate for c, ate in self._pinos.items() if ate > agora}
+
+    def fixado(self, cliente):
+        ate = self._pinos.get(cliente)
+        return ate is not None and ate > time.monotonic()
+
+    def get_metrics(self):
+        with self._lock:
+            return dict(
+                self.stats,
+                replicas={chave: saude['ok'] for chave, saude in self._saude.items()},
+                pinned_clients=sum(1 for ate in self._pinos.values() if ate > time.monotonic())
+            )
+
+
+def cliente_atual():
+    """Chave do read-your-writes: usuário do token, IP do cliente ou o próprio processo"""
+    if has_request_context():
+        return getattr(request, 'user_id', None) or request.remote_addr
+    return None
+
+
+def instrumentar_replicas(router, engines):
+    """Tira do rodízio a réplica cuja conexão cai durante uma consulta"""
+    for chave in router.bind_keys:
+        def ao_falhar(contexto, chave=chave):
+            if contexto.is_disconnect or contexto.connection is None:
+                router.marcar_falha(chave)
+        event.listen(engines[chave], 'handle_error', ao_falhar)
+
+
+def get_replica_router():
+    if not has_app_context():
+        return None
+    return current_app.extensions.get('db_replicas')
+
+
+class RoutingSession(Session):
+    """
+    Sessão que manda SELECTs para as réplicas
+
+    Vão sempre ao primário: flush, INSERT/UPDATE/DELETE, SELECT ... FOR UPDATE,
+    SQL textual, session.connection() sem statement, models com bind_key própria,
+    qualquer leitura depois de uma escrita na mesma transação e as leituras de
+    um cliente fixado (read-your-writes) após um commit com escrita. SQL textual
+    e session.connection() contam como escrita.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        primario = super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+        if bind is not None or self._flushing:
+            return primario
+
+        router = get_replica_router()
+        if router is None or not router.bind_keys:
+            return primario
+
+        engines = self._db.engines
+        if primario is not engines.get(None):
+            return primario
+        if not isinstance(clause, Select) or clause._for_update_arg is not None:
+            # session.connection() chega aqui sem statement: o Core executado
+            # nessa conexão (upserts, resumos) não passa pela sessão, então conta
+            # como escrita para as leituras seguintes e o read-your-writes
+            if not isinstance(clause, Select):
+                self.info['escreveu'] = True
+            return primario
+        if self.info.get('escreveu') or self.info.get('fixada'):
+            router.stats['primary'] += 1
+            return primario
+        if router.fixado(cliente_atual()):
+            router.stats['pinned'] += 1
+            return primario
+
+        chave = router.proxima(engines)
+        if chave is None:
+            router.stats['primary'] += 1
+            return primario
+        router.stats['replica'] += 1
+        return engines[chave]
+
+
+@event.listens_for(RoutingSession, 'after_flush')
+def _marcar_escrita(session, flush_context):
+    session.info['escreveu'] = True
+
+
+@event.listens_for(RoutingSession, 'after_commit')
+def _fixar_no_primario(session):
+    if session.info.pop('escreveu', False):
+        router = get_replica_router()
+        if router is not None and router.bind_keys:
+            router.fixar(cliente_atual())
+            # A própria sessão também lê do primário até o fim da requisição
+            session.info['fixada'] = True
+
+
+@event.listens_for(RoutingSession, 'after_rollback')
+def _limpar_escrita(session):
+    session.info.pop('escreveu', None)
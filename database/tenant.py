@@ -0,0 +1,104 @@
+import contextvars
+from contextlib import contextmanager
+from flask import has_request_context, request
+from sqlalchemy import Column, ForeignKey, String, event, false
+from sqlalchemy.orm import Session, with_loader_criteria
+
+# Sem override: o tenant vem do token da requisição
+_DA_REQUISICAO = object()
+# Requisição sem empresa (rota pública ou token sem company_id): nenhuma linha passa
+NENHUMA_EMPRESA = object()
+_tenant = contextvars.ContextVar('tenant', default=_DA_REQUISICAO)
+
+
+class TenantInvalido(PermissionError):
+    """Gravação de registro de outra empresa que não a do token"""
+
+
+class TenantScoped:
+    """
+    Mixin de models com company_id: toda consulta do ORM feita com um tenant
+    ativo ganha WHERE company_id = <tenant> (inclusive joins, relacionamentos
+    e UPDATE/DELETE em massa), e registros novos recebem o company_id do tenant
+    """
+
+    # Coluna padrão; os models costumam declarar a sua (com nullable/índices próprios)
+    company_id = Column(String(36), ForeignKey('companies.id'))
+
+
+def tenant_atual():
+    """
+    Empresa usada para filtrar as consultas: a de com_tenant(), se houver, ou a
+    do token da requisição. None desliga o filtro e só vem de sem_tenant() ou de
+    fora de requisição (scripts, jobs); numa requisição sem empresa no token, ou
+    sem token, o resultado é NENHUMA_EMPRESA e nenhuma linha passa.
+    """
+    tenant = _tenant.get()
+    if tenant is not _DA_REQUISICAO:
+        return tenant
+    if has_request_context():
+        return getattr(request, 'company_id', None) or NENHUMA_EMPRESA
+    return None
+
+
+@contextmanager
+def com_tenant(company_id):
+    """Executa o bloco como a empresa `company_id` (jobs e scripts)"""
+    token = _tenant.set(company_id)
+    try:
+        yield
+    finally:
+        _tenant.reset(token)
+
+
+@contextmanager
+def sem_tenant():
+    """
+    Executa o bloco sem filtro de empresa; para uma consulta só, use
+    .execution_options(sem_tenant=True)
+    """
+    with com_tenant(None):
+        yield
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def _filtrar_por_tenant(estado):
+    if not (estado.is_select or estado.is_update or estado.is_delete):
+        return
+    # Carregamentos de colunas e relacionamentos herdam o critério da consulta original
+    if estado.is_column_load or estado.is_relationship_load:
+        return
+    if estado.execution_options.get('sem_tenant'):
+        return
+    company_id = tenant_atual()
+    if company_id is None:
+        return
+
+    from models.company import Company
+    if company_id is NENHUMA_EMPRESA:
+        estado.statement = estado.statement.options(
+            with_loader_criteria(TenantScoped, lambda cls: false(), include_aliases=True),
+            with_loader_criteria(Company, lambda cls: false(), include_aliases=True)
+        )
+        return
+    estado.statement = estado.statement.options(
+        with_loader_criteria(TenantScoped, lambda cls: cls.company_id == company_id, include_aliases=True),
+        with_loader_criteria(Company, lambda cls: cls.id == company_id, include_aliases=True)
+    )
+
+
+@event.listens_for(Session, 'before_flush')
+def _preencher_tenant(session, flush_context, instances):
+    company_id = tenant_atual()
+    if company_id is None:
+        return
+    for obj in session.new:
+        if isinstance(obj, TenantScoped):
+            if obj.company_id is None and company_id is not NENHUMA_EMPRESA:
+                obj.company_id = company_id
+            elif obj.company_id != company_id:
+                raise TenantInvalido(f'{type(obj).__name__} de outra empresa')
+    # Alterar o company_id de um registro existente também é gravar em outra empresa
+    for obj in (*session.dirty, *session.deleted):
+        if isinstance(obj, TenantScoped) and obj.company_id != company_id:
+            raise TenantInvalido(f'{type(obj).__name__} de outra empresa')
@@ -0,0 +1,57 @@
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+
+
+def upsert_statement(conn, table, chave, atualizar):
+    """
+    Monta um INSERT ... ON DUPLICATE KEY UPDATE (MySQL) ou ON CONFLICT DO UPDATE
+    (SQLite/PostgreSQL) para o dialeto da conexão
+
+    `chave` são as colunas do conflito (usadas fora do MySQL) e `atualizar`
+    as colunas sobrescritas quando o registro já existe.
+    """
+    dialeto = conn.dialect.name
+    if dialeto == 'mysql':
+        stmt = mysql.insert(table)
+        return stmt.on_duplicate_key_update({coluna: stmt.inserted[coluna] for coluna in atualizar})
+    if dialeto in ('sqlite', 'postgresql'):
+        insert = sqlite.insert if dialeto == 'sqlite' else postgresql.insert
+        stmt = insert(table)
+        return stmt.on_conflict_do_update(
+            index_elements=list(chave),
+            set_={coluna: stmt.excluded[coluna] for coluna in atualizar}
+        )
+    raise NotImplementedError(f'Upsert não suportado para o dialeto {dialeto}')
+
+
+def upsert(conn, table, rows, chave, atualizar):
+    """
+    Insere ou atualiza `rows` (lista de dicts) em lote com um único executemany
+    """
+    if not rows:
+        return 0
+    conn.execute(upsert_statement(conn, table, chave, atualizar), rows)
+    return len(rows)
+
+
+def upsert_incremento(conn, table, rows, chave, somar):
+    """
+    Insere `rows` ou, se a chave já existe, soma os valores das colunas `somar`
+    aos atuais (contadores e totais de tabelas de resumo)
+    """
+    if not rows:
+        return 0
+    dialeto = conn.dialect.name
+    if dialeto == 'mysql':
+        stmt = mysql.insert(table)
+        stmt = stmt.on_duplicate_key_update({coluna: table.c[coluna] + stmt.inserted[coluna] for coluna in somar})
+    elif dialeto in ('sqlite', 'postgresql'):
+        insert = sqlite.insert if dialeto == 'sqlite' else postgresql.insert
+        stmt = insert(table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=list(chave),
+            set_={coluna: table.c[coluna] + stmt.excluded[coluna] for coluna in somar}
+        )
+    else:
+        raise NotImplementedError(f'Upsert não suportado para o dialeto {dialeto}')
+    conn.execute(stmt, rows)
+    return len(rows)
@@ -0,0 +1,32 @@
+import dataclasses
+import json
+
+try:
+    import orjson
+except ImportError:  # orjson é opcional; sem ele usa o json da biblioteca padrão
+    orjson = None
+
+
+def _default(obj):
+    if dataclasses.is_dataclass(obj):
+        return dataclasses.asdict(obj)
+    if hasattr(obj, 'isoformat'):
+        return obj.isoformat()
+    raise TypeError(f'Objeto do tipo {type(obj).__name__} não é serializável em JSON')
+
+
+def dumps(obj, default=None):
+    """
+    Serializa para JSON compacto em bytes (UTF-8), usando orjson quando instalado
+    """
+    if orjson is not None:
+        return orjson.dumps(obj, default=default or _default)
+    return json.dumps(
+        obj, ensure_ascii=False, separators=(',', ':'), default=default or _default
+    ).encode('utf-8')
+
+
+def loads(data):
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
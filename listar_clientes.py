@@ -1,4 +1,5 @@
-from omie_api import OmieAPI
+from omie_api import get_omie_client, OmieAPIError
+from fast_json import dumps
 import json
 import os
 from datetime import datetime
@@ -10,8 +11,8 @@ def salvar_cache(dados, nome_arquivo):
         os.makedirs(cache_dir)
     
     caminho_arquivo = os.path.join(cache_dir, nome_arquivo)
-    with open(caminho_arquivo, 'w', encoding='utf-8') as f:
-        json.dump(dados, f, ensure_ascii=False, indent=2)
+    with open(caminho_arquivo, 'wb') as f:
+        f.write(dumps(dados))
     return caminho_arquivo
 
 def carregar_cache(nome_arquivo):
@@ -22,7 +23,7 @@ def carregar_cache(nome_arquivo):
             return json.load(f)
     return None
 
-def mostrar_clientes(quantidade=5, usar_cache=True):
+def mostrar_clientes(quantidade=5, usar_cache=True, todos=False):
     cache_file = "clientes_cache.json"
     
     # Tenta carregar do cache primeiro
@@ -35,7 +36,24 @@ def mostrar_clientes(quantidade=5, usar_cache=True):
     
     # Se não tem cache ou não deve usar, busca da API
     print("Buscando dados da API...")
-    omie = OmieAPI()
+    omie = get_omie_client()
+    if todos:
+        # Busca o cadastro completo, com as páginas em paralelo
+        try:
+            clientes = omie.fetch_all_clientes()
+        except OmieAPIError as e:
+            print(f"Erro ao buscar clientes: {e}")
+            return False
+        response = {
+            'success': True,
+            'data': {
+                'total_de_registros': len(clientes),
+                'clientes_cadastro': clientes
+            }
+        }
+        salvar_cache(response, cache_file)
+        return exibir_clientes(response['data'], quantidade)
+
     response = omie.listar_clientes(pagina=1, registros_por_pagina=quantidade)
     
     if response['success']:
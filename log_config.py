@@ -0,0 +1,117 @@
+import atexit
+import json
+import logging
+import queue
+import random
+import re
+import sys
+import time
+from logging.handlers import QueueHandler, QueueListener
+from config import LOG_LEVEL, LOG_FORMAT, OMIE_LOG_SAMPLE_RATE
+
+# Chaves cujo valor nunca vai para o log
+CHAVES_SENSIVEIS = {
+    'app_key', 'app_secret', 'password', 'senha', 'token', 'authorization',
+    'access_token', 'refresh_token', 'jwt', 'secret'
+}
+_VALOR_SENSIVEL = re.compile(
+    r'("?(?:' + '|'.join(sorted(CHAVES_SENSIVEIS)) + r')"?\s*[:=]\s*)("[^"]*"|\'[^\']*\'|[^\s,}]+)',
+    re.IGNORECASE
+)
+_ATRIBUTOS_PADRAO = set(vars(logging.makeLogRecord({}))) | {'message', 'asctime', 'taskName'}
+
+_listener = None
+
+
+def mascarar(valor):
+    """Substitui valores de chaves sensíveis (recursivamente) por '***'"""
+    if isinstance(valor, dict):
+        return {
+            k: '***' if str(k).lower() in CHAVES_SENSIVEIS else mascarar(v)
+            for k, v in valor.items()
+        }
+    if isinstance(valor, (list, tuple)):
+        return [mascarar(v) for v in valor]
+    if isinstance(valor, str):
+        return _VALOR_SENSIVEL.sub(r'\1"***"', valor)
+    return valor
+
+
+def _campos_extras(record):
+    return {k: v for k, v in vars(record).items() if k not in _ATRIBUTOS_PADRAO}
+
+
+class JsonFormatter(logging.Formatter):
+    """Uma linha JSON por evento, com os campos passados em `extra`"""
+
+    def format(self, record):
+        evento = {
+            'ts': time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(record.created)) + f'.{int(record.msecs):03d}Z',
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': mascarar(record.getMessage())
+        }
+        evento.update(mascarar(_campos_extras(record)))
+        if record.exc_info:
+            evento['exc'] = self.formatException(record.exc_info)
+        return json.dumps(evento, ensure_ascii=False, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """Formato legível para desenvolvimento: mensagem seguida de chave=valor"""
+
+    def __init__(self):
+        super().__init__('%(asctime)s %(levelname)s %(name)s: %(message)s')
+
+    def format(self, record):
+        linha = mascarar(super().format(record))
+        extras = mascarar(_campos_extras(record))
+        if extras:
+            linha += ' ' + ' '.join(f'{k}={v}' for k, v in extras.items())
+        return linha
+
+
+class _QueueHandlerSemFormatar(QueueHandler):
+    """
+    Enfileira o registro sem formatá-lo: a formatação e a máscara de segredos
+    acontecem na thread do listener, fora do caminho da requisição
+    """
+
+    def prepare(self, record):
+        return record
+
+
+def setup_logging(level=LOG_LEVEL, formato=LOG_FORMAT, stream=None):
+    """
+    Configura o logging da aplicação com escrita assíncrona (QueueHandler)
+
+    Pode ser chamada mais de uma vez; só a primeira chamada tem efeito.
+    """
+    global _listener
+    if _listener is not None:
+        return
+
+    saida = logging.StreamHandler(stream or sys.stdout)
+    saida.setFormatter(JsonFormatter() if formato == 'json' else TextFormatter())
+
+    fila = queue.SimpleQueue()
+    _listener = QueueListener(fila, saida, respect_handler_level=False)
+    _listener.start()
+    atexit.register(parar_logging)
+
+    raiz = logging.getLogger()
+    raiz.handlers = [_QueueHandlerSemFormatar(fila)]
+    raiz.setLevel(level)
+
+
+def parar_logging():
+    """Esvazia a fila e encerra a thread de escrita (chamada no atexit)"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def amostrar(taxa=OMIE_LOG_SAMPLE_RATE):
+    """Decide, por chamada, se o evento de sucesso vai para o log"""
+    return taxa >= 1 or random.random() < taxa
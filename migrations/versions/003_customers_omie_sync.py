@@ -0,0 +1,62 @@
+"""customers omie sync
+
+Revision ID: 003
+Revises: 002
+Create Date: 2026-10-18 09:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '003'
+down_revision = '002'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+
+    # A tabela customers não era criada pelas migrations anteriores
+    if not inspector.has_table('customers'):
+        op.create_table('customers',
+            sa.Column('id', sa.String(36), primary_key=True),
+            sa.Column('company_id', sa.String(36), sa.ForeignKey('companies.id'), nullable=False),
+            sa.Column('name', sa.String(255), nullable=False),
+            sa.Column('email', sa.String(255)),
+            sa.Column('phone', sa.String(20)),
+            sa.Column('address', sa.String(255)),
+            sa.Column('city', sa.String(100)),
+            sa.Column('state', sa.String(2)),
+            sa.Column('created_at', sa.DateTime, server_default=sa.text('CURRENT_TIMESTAMP')),
+            sa.Column('updated_at', sa.DateTime, server_default=sa.text('CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP'))
+        )
+
+    op.add_column('customers', sa.Column('document', sa.String(20)))
+    op.add_column('customers', sa.Column('omie_codigo', sa.BigInteger))
+    op.add_column('customers', sa.Column('omie_integracao', sa.String(60)))
+    op.add_column('customers', sa.Column('omie_updated_at', sa.DateTime))
+    op.create_unique_constraint('uq_customers_company_omie', 'customers', ['company_id', 'omie_codigo'])
+
+    op.create_table('omie_sync_state',
+        sa.Column('company_id', sa.String(36), sa.ForeignKey('companies.id'), primary_key=True),
+        sa.Column('entity', sa.String(50), primary_key=True),
+        sa.Column('watermark', sa.DateTime),
+        sa.Column('full_load_done', sa.Boolean, nullable=False, server_default=sa.false()),
+        sa.Column('next_page', sa.Integer, nullable=False, server_default='1'),
+        sa.Column('last_run_at', sa.DateTime),
+        sa.Column('last_error', sa.Text),
+        sa.Column('created_at', sa.DateTime, server_default=sa.text('CURRENT_TIMESTAMP')),
+        sa.Column('updated_at', sa.DateTime, server_default=sa.text('CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP'))
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('omie_sync_state')
+    op.drop_constraint('uq_customers_company_omie', 'customers', type_='unique')
+    op.drop_column('customers', 'omie_updated_at')
+    op.drop_column('customers', 'omie_integracao')
+    op.drop_column('customers', 'omie_codigo')
+    op.drop_column('customers', 'document')
@@ -0,0 +1,34 @@
+"""token revocations
+
+Revision ID: 004
+Revises: 003
+Create Date: 2026-10-18 14:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '004'
+down_revision = '003'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('token_revocations',
+        sa.Column('id', sa.Integer, primary_key=True, autoincrement=True),
+        sa.Column('jti', sa.String(36)),
+        sa.Column('user_id', sa.String(36), sa.ForeignKey('users.id')),
+        sa.Column('not_before', sa.Float),
+        sa.Column('expires_at', sa.DateTime, nullable=False),
+        sa.Column('created_at', sa.DateTime, server_default=sa.text('CURRENT_TIMESTAMP')),
+        sa.Column('updated_at', sa.DateTime, server_default=sa.text('CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP'))
+    )
+    op.create_index('ix_token_revocations_expires_at', 'token_revocations', ['expires_at'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_token_revocations_expires_at', table_name='token_revocations')
+    op.drop_table('token_revocations')
@@ -0,0 +1,50 @@
+"""permission matrix
+
+Revision ID: 005
+Revises: 004
+Create Date: 2026-10-18 16:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '005'
+down_revision = '004'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+
+    # Tabelas dos models de permissão que nenhuma migration criava
+    if not inspector.has_table('permission_modules'):
+        op.create_table('permission_modules',
+            sa.Column('name', sa.String(50), primary_key=True),
+            sa.Column('description', sa.String(255)),
+            sa.Column('created_at', sa.DateTime, server_default=sa.text('CURRENT_TIMESTAMP')),
+            sa.Column('updated_at', sa.DateTime, server_default=sa.text('CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP'))
+        )
+
+    if not inspector.has_table('role_permissions'):
+        op.create_table('role_permissions',
+            sa.Column('role_id', sa.String(36), sa.ForeignKey('roles.id'), primary_key=True),
+            sa.Column('module_name', sa.String(50), sa.ForeignKey('permission_modules.name'), primary_key=True),
+            sa.Column('can_read', sa.Boolean, server_default=sa.false()),
+            sa.Column('can_write', sa.Boolean, server_default=sa.false()),
+            sa.Column('can_delete', sa.Boolean, server_default=sa.false()),
+            sa.Column('created_at', sa.DateTime, server_default=sa.text('CURRENT_TIMESTAMP')),
+            sa.Column('updated_at', sa.DateTime, server_default=sa.text('CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP'))
+        )
+
+    versao = op.create_table('permission_matrix_version',
+        sa.Column('id', sa.Integer, primary_key=True),
+        sa.Column('version', sa.BigInteger, nullable=False, server_default='0')
+    )
+    op.bulk_insert(versao, [{'id': 1, 'version': 0}])
+
+
+def downgrade() -> None:
+    op.drop_table('permission_matrix_version')
@@ -0,0 +1,49 @@
+"""products and services
+
+Revision ID: 006
+Revises: 005
+Create Date: 2026-10-18 18:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '006'
+down_revision = '005'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('products',
+        sa.Column('id', sa.String(36), primary_key=True),
+        sa.Column('company_id', sa.String(36), sa.ForeignKey('companies.id'), nullable=False),
+        sa.Column('sku', sa.String(60)),
+        sa.Column('name', sa.String(255), nullable=False),
+        sa.Column('description', sa.Text),
+        sa.Column('price', sa.Numeric(10, 2)),
+        sa.Column('stock_quantity', sa.Integer, server_default='0'),
+        sa.Column('category', sa.String(100)),
+        sa.Column('created_at', sa.DateTime, server_default=sa.text('CURRENT_TIMESTAMP')),
+        sa.Column('updated_at', sa.DateTime, server_default=sa.text('CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP')),
+        sa.UniqueConstraint('company_id', 'sku', name='uq_products_company_sku')
+    )
+
+    op.create_table('services',
+        sa.Column('id', sa.String(36), primary_key=True),
+        sa.Column('company_id', sa.String(36), sa.ForeignKey('companies.id'), nullable=False),
+        sa.Column('code', sa.String(60)),
+        sa.Column('name', sa.String(255), nullable=False),
+        sa.Column('description', sa.Text),
+        sa.Column('price', sa.Numeric(10, 2)),
+        sa.Column('created_at', sa.DateTime, server_default=sa.text('CURRENT_TIMESTAMP')),
+        sa.Column('updated_at', sa.DateTime, server_default=sa.text('CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP')),
+        sa.UniqueConstraint('company_id', 'code', name='uq_services_company_code')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('services')
+    op.drop_table('products')
@@ -0,0 +1,75 @@
+"""keyset pagination indexes and list modules
+
+Revision ID: 007
+Revises: 006
+Create Date: 2026-10-18 19:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '007'
+down_revision = '006'
+branch_labels = None
+depends_on = None
+
+INDICES = {
+    'companies': 'ix_companies_created_at_id',
+    'customers': 'ix_customers_created_at_id',
+    'users': 'ix_users_created_at_id',
+}
+
+MODULOS = {
+    'empresas': 'Listagem e exportação de empresas',
+    'clientes': 'Listagem e exportação de clientes',
+    'usuarios': 'Listagem e exportação de usuários',
+}
+
+
+def upgrade() -> None:
+    # Paginação por cursor em (created_at, id): sem o índice cada página vira filesort
+    for tabela, indice in INDICES.items():
+        op.create_index(indice, tabela, ['created_at', 'id'])
+
+    # Os módulos podem já existir (cadastrados pela aplicação ou numa execução
+    # anterior desta migration): só insere o que falta
+    conexao = op.get_bind()
+    existentes = set(conexao.execute(
+        sa.text("SELECT name FROM permission_modules WHERE name IN ('empresas', 'clientes', 'usuarios')")
+    ).scalars())
+    for nome, descricao in MODULOS.items():
+        if nome not in existentes:
+            conexao.execute(
+                sa.text("INSERT INTO permission_modules (name, description) VALUES (:nome, :descricao)"),
+                {'nome': nome, 'descricao': descricao}
+            )
+    # Leitura liberada para o admin; as demais roles são configuradas pela aplicação
+    conexao.execute(sa.text("""
+        INSERT INTO role_permissions (role_id, module_name, can_read, can_write, can_delete)
+        SELECT r.id, m.name, 1, 0, 0
+        FROM roles r, permission_modules m
+        WHERE r.name = 'admin' AND m.name IN ('empresas', 'clientes', 'usuarios')
+          AND NOT EXISTS (
+              SELECT 1 FROM role_permissions rp WHERE rp.role_id = r.id AND rp.module_name = m.name
+          )
+    """))
+    conexao.execute(sa.text(
+        "UPDATE permission_matrix_version SET version = version + 1 WHERE id = 1"
+    ))
+
+
+def downgrade() -> None:
+    conexao = op.get_bind()
+    conexao.execute(sa.text(
+        "DELETE FROM role_permissions WHERE module_name IN ('empresas', 'clientes', 'usuarios')"
+    ))
+    conexao.execute(sa.text(
+        "DELETE FROM permission_modules WHERE name IN ('empresas', 'clientes', 'usuarios')"
+    ))
+    conexao.execute(sa.text(
+        "UPDATE permission_matrix_version SET version = version + 1 WHERE id = 1"
+    ))
+    for tabela, indice in INDICES.items():
+        op.drop_index(indice, table_name=tabela)
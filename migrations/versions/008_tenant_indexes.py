@@ -0,0 +1,31 @@
+"""tenant composite indexes
+
+Revision ID: 008
+Revises: 007
+Create Date: 2026-10-18 20:00:00
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '008'
+down_revision = '007'
+branch_labels = None
+depends_on = None
+
+TABELAS = ('customers', 'products', 'services', 'users')
+
+
+def upgrade() -> None:
+    # Consultas com o filtro de tenant (database.tenant): listagem por cursor em
+    # (created_at, id) e busca/ordenação por nome dentro da empresa
+    for tabela in TABELAS:
+        op.create_index(f'ix_{tabela}_company_created', tabela, ['company_id', 'created_at', 'id'])
+        op.create_index(f'ix_{tabela}_company_name', tabela, ['company_id', 'name'])
+
+
+def downgrade() -> None:
+    for tabela in TABELAS:
+        op.drop_index(f'ix_{tabela}_company_name', table_name=tabela)
+        op.drop_index(f'ix_{tabela}_company_created', table_name=tabela)
@@ -0,0 +1,74 @@
+"""sales and sale items
+
+Revision ID: 009
+Revises: 008
+Create Date: 2026-10-18 21:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '009'
+down_revision = '008'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('sales',
+        sa.Column('id', sa.String(36), primary_key=True),
+        sa.Column('company_id', sa.String(36), sa.ForeignKey('companies.id'), nullable=False),
+        sa.Column('customer_id', sa.String(36), sa.ForeignKey('customers.id')),
+        sa.Column('total', sa.Numeric(10, 2), nullable=False),
+        sa.Column('status', sa.String(20), nullable=False, server_default='confirmed'),
+        sa.Column('payment_method', sa.String(30)),
+        sa.Column('payment_status', sa.String(20), nullable=False, server_default='pending'),
+        sa.Column('created_at', sa.DateTime, server_default=sa.text('CURRENT_TIMESTAMP')),
+        sa.Column('updated_at', sa.DateTime, server_default=sa.text('CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP'))
+    )
+    op.create_index('ix_sales_company_created', 'sales', ['company_id', 'created_at', 'id'])
+
+    op.create_table('sale_items',
+        sa.Column('id', sa.String(36), primary_key=True),
+        sa.Column('sale_id', sa.String(36), sa.ForeignKey('sales.id'), nullable=False),
+        sa.Column('product_id', sa.String(36), sa.ForeignKey('products.id'), nullable=False),
+        sa.Column('quantity', sa.Integer, nullable=False),
+        sa.Column('unit_price', sa.Numeric(10, 2), nullable=False),
+        sa.Column('total', sa.Numeric(10, 2), nullable=False),
+        sa.Column('created_at', sa.DateTime, server_default=sa.text('CURRENT_TIMESTAMP')),
+        sa.Column('updated_at', sa.DateTime, server_default=sa.text('CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP'))
+    )
+    op.create_index('ix_sale_items_sale_id', 'sale_items', ['sale_id'])
+    op.create_index('ix_sale_items_product_id', 'sale_items', ['product_id'])
+
+    conexao = op.get_bind()
+    # Só insere o que ainda não existe (módulo cadastrado pela aplicação ou
+    # numa execução anterior desta migration)
+    existe = conexao.execute(sa.text("SELECT 1 FROM permission_modules WHERE name = 'vendas'")).first()
+    if existe is None:
+        conexao.execute(sa.text(
+            "INSERT INTO permission_modules (name, description) VALUES ('vendas', 'Registro de vendas')"
+        ))
+    conexao.execute(sa.text("""
+        INSERT INTO role_permissions (role_id, module_name, can_read, can_write, can_delete)
+        SELECT r.id, 'vendas', 1, 1, 0 FROM roles r
+        WHERE r.name = 'admin' AND NOT EXISTS (
+            SELECT 1 FROM role_permissions rp WHERE rp.role_id = r.id AND rp.module_name = 'vendas'
+        )
+    """))
+    conexao.execute(sa.text(
+        "UPDATE permission_matrix_version SET version = version + 1 WHERE id = 1"
+    ))
+
+
+def downgrade() -> None:
+    conexao = op.get_bind()
+    conexao.execute(sa.text("DELETE FROM role_permissions WHERE module_name = 'vendas'"))
+    conexao.execute(sa.text("DELETE FROM permission_modules WHERE name = 'vendas'"))
+    conexao.execute(sa.text(
+        "UPDATE permission_matrix_version SET version = version + 1 WHERE id = 1"
+    ))
+    op.drop_table('sale_items')
+    op.drop_table('sales')
@@ -0,0 +1,51 @@
+"""sales rollups for dashboards
+
+Revision ID: 010
+Revises: 009
+Create Date: 2026-10-18 22:00:00
+
+As tabelas nascem vazias: depois do upgrade, preencha com
+python scripts/backfill_rollups.py
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '010'
+down_revision = '009'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('sales_daily_rollups',
+        sa.Column('company_id', sa.String(36), sa.ForeignKey('companies.id'), primary_key=True),
+        sa.Column('day', sa.Date, primary_key=True),
+        sa.Column('sales_count', sa.Integer, nullable=False, server_default='0'),
+        sa.Column('items_quantity', sa.Integer, nullable=False, server_default='0'),
+        sa.Column('revenue', sa.Numeric(14, 2), nullable=False, server_default='0')
+    )
+
+    op.create_table('product_monthly_rollups',
+        sa.Column('company_id', sa.String(36), sa.ForeignKey('companies.id'), primary_key=True),
+        sa.Column('month', sa.Date, primary_key=True),
+        sa.Column('product_id', sa.String(36), sa.ForeignKey('products.id'), primary_key=True),
+        sa.Column('quantity', sa.Integer, nullable=False, server_default='0'),
+        sa.Column('revenue', sa.Numeric(14, 2), nullable=False, server_default='0')
+    )
+
+    op.create_table('customer_monthly_rollups',
+        sa.Column('company_id', sa.String(36), sa.ForeignKey('companies.id'), primary_key=True),
+        sa.Column('month', sa.Date, primary_key=True),
+        sa.Column('customer_id', sa.String(36), sa.ForeignKey('customers.id'), primary_key=True),
+        sa.Column('sales_count', sa.Integer, nullable=False, server_default='0'),
+        sa.Column('revenue', sa.Numeric(14, 2), nullable=False, server_default='0')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('customer_monthly_rollups')
+    op.drop_table('product_monthly_rollups')
+    op.drop_table('sales_daily_rollups')
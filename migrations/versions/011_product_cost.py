@@ -0,0 +1,24 @@
+"""product cost price
+
+Revision ID: 011
+Revises: 010
+Create Date: 2026-10-18 23:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '011'
+down_revision = '010'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('products', sa.Column('cost_price', sa.Numeric(10, 2)))
+
+
+def downgrade() -> None:
+    op.drop_column('products', 'cost_price')
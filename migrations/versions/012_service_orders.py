@@ -0,0 +1,65 @@
+"""service orders with technician schedule
+
+Revision ID: 012
+Revises: 011
+Create Date: 2026-10-19 00:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '012'
+down_revision = '011'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('service_orders',
+        sa.Column('id', sa.String(36), primary_key=True),
+        sa.Column('company_id', sa.String(36), sa.ForeignKey('companies.id'), nullable=False),
+        sa.Column('customer_id', sa.String(36), sa.ForeignKey('customers.id'), nullable=False),
+        sa.Column('service_id', sa.String(36), sa.ForeignKey('services.id'), nullable=False),
+        sa.Column('technician_id', sa.String(36), sa.ForeignKey('users.id')),
+        sa.Column('status', sa.String(20), nullable=False, server_default='pending'),
+        sa.Column('notes', sa.Text),
+        sa.Column('scheduled_date', sa.DateTime, nullable=False),
+        sa.Column('scheduled_end', sa.DateTime, nullable=False),
+        sa.Column('completed_date', sa.DateTime),
+        sa.Column('created_at', sa.DateTime, server_default=sa.text('CURRENT_TIMESTAMP')),
+        sa.Column('updated_at', sa.DateTime, server_default=sa.text('CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP'))
+    )
+    op.create_index('ix_service_orders_company_created', 'service_orders', ['company_id', 'created_at', 'id'])
+    op.create_index('ix_service_orders_technician_schedule', 'service_orders',
+                    ['company_id', 'technician_id', 'scheduled_date'])
+
+    conexao = op.get_bind()
+    # Só insere o que ainda não existe (módulo cadastrado pela aplicação ou
+    # numa execução anterior desta migration)
+    existe = conexao.execute(sa.text("SELECT 1 FROM permission_modules WHERE name = 'ordens_servico'")).first()
+    if existe is None:
+        conexao.execute(sa.text(
+            "INSERT INTO permission_modules (name, description) VALUES ('ordens_servico', 'Ordens de serviço e agenda')"
+        ))
+    conexao.execute(sa.text("""
+        INSERT INTO role_permissions (role_id, module_name, can_read, can_write, can_delete)
+        SELECT r.id, 'ordens_servico', 1, 1, 0 FROM roles r
+        WHERE r.name = 'admin' AND NOT EXISTS (
+            SELECT 1 FROM role_permissions rp WHERE rp.role_id = r.id AND rp.module_name = 'ordens_servico'
+        )
+    """))
+    conexao.execute(sa.text(
+        "UPDATE permission_matrix_version SET version = version + 1 WHERE id = 1"
+    ))
+
+
+def downgrade() -> None:
+    conexao = op.get_bind()
+    conexao.execute(sa.text("DELETE FROM role_permissions WHERE module_name = 'ordens_servico'"))
+    conexao.execute(sa.text("DELETE FROM permission_modules WHERE name = 'ordens_servico'"))
+    conexao.execute(sa.text(
+        "UPDATE permission_matrix_version SET version = version + 1 WHERE id = 1"
+    ))
+    op.drop_table('service_orders')
@@ -0,0 +1,44 @@
+"""customer coordinates and geocode cache
+
+Revision ID: 013
+Revises: 012
+Create Date: 2026-10-19 01:00:00
+
+As coordenadas são preenchidas em segundo plano por
+python scripts/geocode.py
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '013'
+down_revision = '012'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('customers', sa.Column('postal_code', sa.String(10)))
+    op.add_column('customers', sa.Column('latitude', sa.Numeric(10, 8)))
+    op.add_column('customers', sa.Column('longitude', sa.Numeric(11, 8)))
+
+    op.create_table('geocode_cache',
+        sa.Column('address_key', sa.String(40), primary_key=True),
+        sa.Column('address', sa.String(255), nullable=False),
+        sa.Column('postal_code', sa.String(8)),
+        sa.Column('latitude', sa.Numeric(10, 8)),
+        sa.Column('longitude', sa.Numeric(11, 8)),
+        sa.Column('status', sa.String(20), nullable=False),
+        sa.Column('provider', sa.String(30), nullable=False),
+        sa.Column('created_at', sa.DateTime),
+        sa.Column('updated_at', sa.DateTime)
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('geocode_cache')
+    op.drop_column('customers', 'longitude')
+    op.drop_column('customers', 'latitude')
+    op.drop_column('customers', 'postal_code')
@@ -0,0 +1,25 @@
+"""customers company/document index
+
+Revision ID: 014
+Revises: 013
+Create Date: 2026-10-19 02:00:00
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '014'
+down_revision = '013'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # A importação de planilhas e a sincronização com o Omie procuram o cliente
+    # existente pelo documento dentro da empresa antes de criar outro
+    op.create_index('ix_customers_company_document', 'customers', ['company_id', 'document'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_customers_company_document', table_name='customers')
@@ -1,5 +1,18 @@
 from .company import Company
 from .role import Role
 from .user import User
+from .permission import PermissionModule, RolePermission, PermissionMatrixVersion
+from .customer import Customer
+from .product import Product
+from .service import Service
+from .sale import Sale, SaleItem
+from .rollup import SalesDailyRollup, ProductMonthlyRollup, CustomerMonthlyRollup
+from .service_order import ServiceOrder
+from .geocode_cache import GeocodeCache
 
-__all__ = ['Company', 'Role', 'User']
+__all__ = [
+    'Company', 'Role', 'User', 'PermissionModule', 'RolePermission', 'PermissionMatrixVersion',
+    'Customer', 'Product', 'Service', 'Sale', 'SaleItem',
+    'SalesDailyRollup', 'ProductMonthlyRollup', 'CustomerMonthlyRollup', 'ServiceOrder',
+    'GeocodeCache'
+]
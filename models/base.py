@@ -1,5 +1,5 @@
 from datetime import datetime
-from config.database import db
+from database.connection import db
 
 class BaseModel(db.Model):
     __abstract__ = True
@@ -1,8 +1,13 @@
 from uuid import uuid4
 from database.connection import db
+from .serializer import Serializavel
 
-class Company(db.Model):
+class Company(Serializavel, db.Model):
     __tablename__ = 'companies'
+    __serializer_exclude__ = ('owner_id',)
+    __table_args__ = (
+        db.Index('ix_companies_created_at_id', 'created_at', 'id'),
+    )
     
     id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid4()))
     name = db.Column(db.String(255), nullable=False)
@@ -22,23 +27,3 @@ class Company(db.Model):
     created_at = db.Column(db.DateTime, server_default=db.func.current_timestamp())
     updated_at = db.Column(db.DateTime, server_default=db.func.current_timestamp(), 
                           onupdate=db.func.current_timestamp())
-
-    def to_dict(self):
-        return {
-            'id': self.id,
-            'name': self.name,
-            'document': self.document,
-            'email': self.email,
-            'phone': self.phone,
-            'address': self.address,
-            'city': self.city,
-            'postal_code': self.postal_code,
-            'state_id': self.state_id,
-            'latitude': float(self.latitude) if self.latitude else None,
-            'longitude': float(self.longitude) if self.longitude else None,
-            'address_number': self.address_number,
-            'address_complement': self.address_complement,
-            'neighborhood': self.neighborhood,
-            'created_at': self.created_at.isoformat() if self.created_at else None,
-            'updated_at': self.updated_at.isoformat() if self.updated_at else None
-        }
@@ -1,8 +1,16 @@
 from uuid import uuid4
+from database.tenant import TenantScoped
 from .base import BaseModel, db
 
-class Customer(BaseModel):
+class Customer(TenantScoped, BaseModel):
     __tablename__ = 'customers'
+    __table_args__ = (
+        db.UniqueConstraint('company_id', 'omie_codigo', name='uq_customers_company_omie'),
+        db.Index('ix_customers_created_at_id', 'created_at', 'id'),
+        db.Index('ix_customers_company_created', 'company_id', 'created_at', 'id'),
+        db.Index('ix_customers_company_name', 'company_id', 'name'),
+        db.Index('ix_customers_company_document', 'company_id', 'document'),
+    )
     
     id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid4()))
     company_id = db.Column(db.String(36), db.ForeignKey('companies.id'), nullable=False)
@@ -12,3 +20,13 @@ class Customer(BaseModel):
     address = db.Column(db.String(255))
     city = db.Column(db.String(100))
     state = db.Column(db.String(2))
+    postal_code = db.Column(db.String(10))
+    document = db.Column(db.String(20))
+    # Preenchidas pelo pipeline de geocodificação (services.geocoding)
+    latitude = db.Column(db.Numeric(10, 8))
+    longitude = db.Column(db.Numeric(11, 8))
+
+    # Vínculo com o cadastro de clientes do Omie (sincronização)
+    omie_codigo = db.Column(db.BigInteger)
+    omie_integracao = db.Column(db.String(60))
+    omie_updated_at = db.Column(db.DateTime)
@@ -0,0 +1,17 @@
+from .base import BaseModel, db
+
+# Cache persistente de geocodificação mantido por services.geocoding. Compartilhado
+# entre empresas: a chave é o endereço normalizado, não o cadastro de origem.
+
+class GeocodeCache(BaseModel):
+    __tablename__ = 'geocode_cache'
+
+    # sha1 do endereço normalizado (services.geocoding.normalizar_endereco)
+    address_key = db.Column(db.String(40), primary_key=True)
+    address = db.Column(db.String(255), nullable=False)
+    postal_code = db.Column(db.String(8))
+    latitude = db.Column(db.Numeric(10, 8))
+    longitude = db.Column(db.Numeric(11, 8))
+    # found ou not_found; not_found é consultado de novo depois de GEOCODE_NOT_FOUND_TTL_DAYS
+    status = db.Column(db.String(20), nullable=False)
+    provider = db.Column(db.String(30), nullable=False)
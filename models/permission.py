@@ -6,18 +6,6 @@ class PermissionModule(BaseModel):
     name = db.Column(db.String(50), primary_key=True)
     description = db.Column(db.String(255))
 
-class Role(BaseModel):
-    __tablename__ = 'roles'
-    
-    id = db.Column(db.String(36), primary_key=True)
-    name = db.Column(db.String(50), nullable=False)
-    description = db.Column(db.String(255))
-    company_id = db.Column(db.String(36), db.ForeignKey('companies.id'))
-    
-    # Relacionamentos
-    company = db.relationship('Company', backref='roles')
-    permissions = db.relationship('RolePermission', backref='role', lazy='dynamic')
-
 class RolePermission(BaseModel):
     __tablename__ = 'role_permissions'
     
@@ -29,3 +17,10 @@ class RolePermission(BaseModel):
     
     # Relacionamento
     module = db.relationship('PermissionModule')
+
+class PermissionMatrixVersion(db.Model):
+    __tablename__ = 'permission_matrix_version'
+
+    # Linha única; version é incrementada a cada alteração de permissões
+    id = db.Column(db.Integer, primary_key=True)
+    version = db.Column(db.BigInteger, nullable=False, default=0)
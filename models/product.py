@@ -0,0 +1,22 @@
+from uuid import uuid4
+from database.tenant import TenantScoped
+from .base import BaseModel, db
+
+class Product(TenantScoped, BaseModel):
+    __tablename__ = 'products'
+    __table_args__ = (
+        db.UniqueConstraint('company_id', 'sku', name='uq_products_company_sku'),
+        db.Index('ix_products_company_created', 'company_id', 'created_at', 'id'),
+        db.Index('ix_products_company_name', 'company_id', 'name'),
+    )
+
+    id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid4()))
+    company_id = db.Column(db.String(36), db.ForeignKey('companies.id'), nullable=False)
+    sku = db.Column(db.String(60))
+    name = db.Column(db.String(255), nullable=False)
+    description = db.Column(db.Text)
+    price = db.Column(db.Numeric(10, 2))
+    # Custo unitário atual (margem nos relatórios analíticos)
+    cost_price = db.Column(db.Numeric(10, 2))
+    stock_quantity = db.Column(db.Integer, default=0)
+    category = db.Column(db.String(100))
@@ -1,7 +1,8 @@
 from uuid import uuid4
 from database.connection import db
+from .serializer import Serializavel
 
-class Role(db.Model):
+class Role(Serializavel, db.Model):
     __tablename__ = 'roles'
     
     id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid4()))
@@ -11,11 +12,5 @@ class Role(db.Model):
     updated_at = db.Column(db.DateTime, server_default=db.func.current_timestamp(), 
                           onupdate=db.func.current_timestamp())
 
-    def to_dict(self):
-        return {
-            'id': self.id,
-            'name': self.name,
-            'description': self.description,
-            'created_at': self.created_at.isoformat() if self.created_at else None,
-            'updated_at': self.updated_at.isoformat() if self.updated_at else None
-        }
+    # Relacionamentos
+    permissions = db.relationship('RolePermission', backref='role', lazy='dynamic')
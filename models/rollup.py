@@ -0,0 +1,35 @@
+from database.tenant import TenantScoped
+from database.connection import db
+
+# Resumos de vendas mantidos por services.rollups (incremental) e pelo backfill.
+# Só vendas com status confirmed entram; valores em R$ com os itens já somados.
+
+class SalesDailyRollup(TenantScoped, db.Model):
+    __tablename__ = 'sales_daily_rollups'
+
+    company_id = db.Column(db.String(36), db.ForeignKey('companies.id'), primary_key=True)
+    day = db.Column(db.Date, primary_key=True)
+    sales_count = db.Column(db.Integer, nullable=False, default=0)
+    items_quantity = db.Column(db.Integer, nullable=False, default=0)
+    revenue = db.Column(db.Numeric(14, 2), nullable=False, default=0)
+
+
+class ProductMonthlyRollup(TenantScoped, db.Model):
+    __tablename__ = 'product_monthly_rollups'
+
+    company_id = db.Column(db.String(36), db.ForeignKey('companies.id'), primary_key=True)
+    # Primeiro dia do mês
+    month = db.Column(db.Date, primary_key=True)
+    product_id = db.Column(db.String(36), db.ForeignKey('products.id'), primary_key=True)
+    quantity = db.Column(db.Integer, nullable=False, default=0)
+    revenue = db.Column(db.Numeric(14, 2), nullable=False, default=0)
+
+
+class CustomerMonthlyRollup(TenantScoped, db.Model):
+    __tablename__ = 'customer_monthly_rollups'
+
+    company_id = db.Column(db.String(36), db.ForeignKey('companies.id'), primary_key=True)
+    month = db.Column(db.Date, primary_key=True)
+    customer_id = db.Column(db.String(36), db.ForeignKey('customers.id'), primary_key=True)
+    sales_count = db.Column(db.Integer, nullable=False, default=0)
+    revenue = db.Column(db.Numeric(14, 2), nullable=False, default=0)
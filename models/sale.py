@@ -0,0 +1,31 @@
+from uuid import uuid4
+from database.tenant import TenantScoped
+from .base import BaseModel, db
+
+class Sale(TenantScoped, BaseModel):
+    __tablename__ = 'sales'
+    __table_args__ = (
+        db.Index('ix_sales_company_created', 'company_id', 'created_at', 'id'),
+    )
+
+    id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid4()))
+    company_id = db.Column(db.String(36), db.ForeignKey('companies.id'), nullable=False)
+    customer_id = db.Column(db.String(36), db.ForeignKey('customers.id'))
+    total = db.Column(db.Numeric(10, 2), nullable=False)
+    status = db.Column(db.String(20), nullable=False, default='confirmed')
+    payment_method = db.Column(db.String(30))
+    payment_status = db.Column(db.String(20), nullable=False, default='pending')
+
+    # Relacionamentos
+    items = db.relationship('SaleItem', backref='sale', lazy='selectin')
+
+
+class SaleItem(BaseModel):
+    __tablename__ = 'sale_items'
+
+    id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid4()))
+    sale_id = db.Column(db.String(36), db.ForeignKey('sales.id'), nullable=False, index=True)
+    product_id = db.Column(db.String(36), db.ForeignKey('products.id'), nullable=False, index=True)
+    quantity = db.Column(db.Integer, nullable=False)
+    unit_price = db.Column(db.Numeric(10, 2), nullable=False)
+    total = db.Column(db.Numeric(10, 2), nullable=False)
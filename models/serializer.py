@@ -0,0 +1,117 @@
+import threading
+from sqlalchemy import types
+import fast_json
+
+_cache = {}
+_cache_lock = threading.Lock()
+# Limite de serializadores gerados (cada combinação de ?fields= gera um)
+_CACHE_MAXIMO = 256
+
+# Tipos que o orjson serializa sozinho (datetime sem fuso sai igual ao isoformat())
+_NATIVOS_ORJSON = (types.DateTime, types.Date, types.Time, types.Uuid)
+
+
+def _conversor(tipo, para_json):
+    """
+    Expressão (sobre a variável v) que converte o valor da coluna para JSON,
+    ou None se o valor já sai como está
+    """
+    if para_json and fast_json.orjson is not None and isinstance(tipo, _NATIVOS_ORJSON):
+        return None
+    if isinstance(tipo, (types.DateTime, types.Date, types.Time)):
+        return 'v.isoformat()'
+    if isinstance(tipo, types.Numeric) and not isinstance(tipo, (types.Integer, types.Float)):
+        return 'float(v)'
+    if isinstance(tipo, types.Uuid):
+        return 'str(v)'
+    return None
+
+
+def _gerar(nome, campos, tipos, para_json, origem):
+    """
+    Compila uma função que monta o dict de uma linha: um literal de dict com
+    as conversões escritas inline, sem laço nem dispatch por campo
+
+    origem 'linha' lê por posição (Row/tupla, na ordem de `campos`); 'objeto'
+    lê atributos de uma instância do model.
+    """
+    itens = []
+    for posicao, (campo, tipo) in enumerate(zip(campos, tipos)):
+        leitura = f'r[{posicao}]' if origem == 'linha' else f'r.{campo}'
+        conversao = _conversor(tipo, para_json)
+        if conversao is None:
+            itens.append(f'{campo!r}: {leitura}')
+        else:
+            itens.append(f'{campo!r}: None if (v := {leitura}) is None else {conversao}')
+    codigo = f'def {nome}(r):\n    return {{{", ".join(itens)}}}\n'
+    escopo = {}
+    exec(compile(codigo, f'<serializer {nome}>', 'exec'), {}, escopo)
+    return escopo[nome]
+
+
+class Serializer:
+    """
+    Serializador de um model gerado a partir das colunas da tabela
+
+    Decimal vira float, datetime/date vira ISO 8601 e UUID vira str. Trabalha
+    sobre instâncias (de_objeto) ou sobre Rows de select(*serializer.colunas)
+    (de_linha), sem criar objetos do ORM; dumps escreve direto em bytes JSON.
+    """
+
+    def __init__(self, model, campos=None, excluir=()):
+        colunas = {coluna.key: coluna for coluna in model.__table__.columns}
+        if campos is None:
+            campos = [campo for campo in colunas if campo not in excluir]
+        desconhecidos = [campo for campo in campos if campo not in colunas]
+        if desconhecidos:
+            raise ValueError(f"Campos inexistentes em {model.__name__}: {', '.join(desconhecidos)}")
+
+        self.model = model
+        self.campos = tuple(campos)
+        self.colunas = [getattr(model, campo) for campo in self.campos]
+        tipos = [colunas[campo].type for campo in self.campos]
+        self.de_linha = _gerar('de_linha', self.campos, tipos, False, 'linha')
+        self.de_objeto = _gerar('de_objeto', self.campos, tipos, False, 'objeto')
+        # Variantes para fast_json.dumps: com orjson, datas e UUID ficam nativos
+        self.json_linha = _gerar('json_linha', self.campos, tipos, True, 'linha')
+        self.json_objeto = _gerar('json_objeto', self.campos, tipos, True, 'objeto')
+
+    def dumps(self, linhas):
+        """Lista JSON (bytes) a partir de Rows/tuplas na ordem de `campos`"""
+        return fast_json.dumps(list(map(self.json_linha, linhas)))
+
+    def dumps_objetos(self, objetos):
+        return fast_json.dumps(list(map(self.json_objeto, objetos)))
+
+
+def get_serializer(model, campos=None):
+    """
+    Serializador do model (com todos os campos de `__serializer_exclude__` fora)
+    ou de um subconjunto de campos; gerado uma vez e reaproveitado
+    """
+    chave = (model, tuple(campos) if campos is not None else None)
+    serializer = _cache.get(chave)
+    if serializer is None:
+        with _cache_lock:
+            serializer = _cache.get(chave)
+            if serializer is None:
+                excluir = getattr(model, '__serializer_exclude__', ())
+                if campos is not None and any(campo in excluir for campo in campos):
+                    raise ValueError(f'Campo não serializável em {model.__name__}')
+                if len(_cache) >= _CACHE_MAXIMO:
+                    _cache.clear()
+                serializer = _cache[chave] = Serializer(model, campos, excluir)
+    return serializer
+
+
+class Serializavel:
+    """
+    Mixin de models: to_dict() gerado a partir das colunas
+
+    Colunas listadas em `__serializer_exclude__` (ex.: password_hash) ficam fora.
+    """
+
+    __serializer_exclude__ = ()
+
+    def to_dict(self, campos=None):
+        return get_serializer(type(self), campos).de_objeto(self)
@@ -0,0 +1,18 @@
+from uuid import uuid4
+from database.tenant import TenantScoped
+from .base import BaseModel, db
+
+class Service(TenantScoped, BaseModel):
+    __tablename__ = 'services'
+    __table_args__ = (
+        db.UniqueConstraint('company_id', 'code', name='uq_services_company_code'),
+        db.Index('ix_services_company_created', 'company_id', 'created_at', 'id'),
+        db.Index('ix_services_company_name', 'company_id', 'name'),
+    )
+
+    id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid4()))
+    company_id = db.Column(db.String(36), db.ForeignKey('companies.id'), nullable=False)
+    code = db.Column(db.String(60))
+    name = db.Column(db.String(255), nullable=False)
+    description = db.Column(db.Text)
+    price = db.Column(db.Numeric(10, 2))
@@ -0,0 +1,24 @@
+from uuid import uuid4
+from database.tenant import TenantScoped
+from .base import BaseModel, db
+
+class ServiceOrder(TenantScoped, BaseModel):
+    __tablename__ = 'service_orders'
+    __table_args__ = (
+        db.Index('ix_service_orders_company_created', 'company_id', 'created_at', 'id'),
+        # Checagem de conflito e carga da agenda de um técnico
+        db.Index('ix_service_orders_technician_schedule', 'company_id', 'technician_id', 'scheduled_date'),
+    )
+
+    id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid4()))
+    company_id = db.Column(db.String(36), db.ForeignKey('companies.id'), nullable=False)
+    customer_id = db.Column(db.String(36), db.ForeignKey('customers.id'), nullable=False)
+    service_id = db.Column(db.String(36), db.ForeignKey('services.id'), nullable=False)
+    # Técnico responsável (usuário da empresa); ordens sem técnico não ocupam agenda
+    technician_id = db.Column(db.String(36), db.ForeignKey('users.id'))
+    status = db.Column(db.String(20), nullable=False, default='pending')
+    notes = db.Column(db.Text)
+    # Período reservado [scheduled_date, scheduled_end)
+    scheduled_date = db.Column(db.DateTime, nullable=False)
+    scheduled_end = db.Column(db.DateTime, nullable=False)
+    completed_date = db.Column(db.DateTime)
@@ -0,0 +1,14 @@
+from .base import BaseModel, db
+
+class OmieSyncState(BaseModel):
+    __tablename__ = 'omie_sync_state'
+
+    company_id = db.Column(db.String(36), db.ForeignKey('companies.id'), primary_key=True)
+    entity = db.Column(db.String(50), primary_key=True)
+    # Maior data de alteração (dAlt/hAlt) já gravada localmente
+    watermark = db.Column(db.DateTime)
+    full_load_done = db.Column(db.Boolean, default=False, nullable=False)
+    # Próxima página da carga inicial (retomada após falha)
+    next_page = db.Column(db.Integer, default=1, nullable=False)
+    last_run_at = db.Column(db.DateTime)
+    last_error = db.Column(db.Text)
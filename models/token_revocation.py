@@ -0,0 +1,12 @@
+from .base import BaseModel, db
+
+class TokenRevocation(BaseModel):
+    __tablename__ = 'token_revocations'
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    # Um token específico (jti) ou todos os tokens do usuário emitidos antes de not_before
+    jti = db.Column(db.String(36))
+    user_id = db.Column(db.String(36), db.ForeignKey('users.id'))
+    not_before = db.Column(db.Float)
+    # Depois disso os tokens afetados já expiraram e a linha pode ser apagada
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
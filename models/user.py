@@ -1,9 +1,17 @@
 import uuid
 from database.connection import db
-from werkzeug.security import generate_password_hash, check_password_hash
+from auth.password_pool import get_password_pool
+from database.tenant import TenantScoped
+from .serializer import Serializavel
 
-class User(db.Model):
+class User(TenantScoped, Serializavel, db.Model):
     __tablename__ = 'users'
+    __serializer_exclude__ = ('password_hash',)
+    __table_args__ = (
+        db.Index('ix_users_created_at_id', 'created_at', 'id'),
+        db.Index('ix_users_company_created', 'company_id', 'created_at', 'id'),
+        db.Index('ix_users_company_name', 'company_id', 'name'),
+    )
     
     id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     email = db.Column(db.String(255), unique=True, nullable=False)
@@ -21,19 +29,17 @@ class User(db.Model):
     role = db.relationship('Role', backref='users')
 
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = get_password_pool().hash(password)
 
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
-
-    def to_dict(self):
-        return {
-            'id': self.id,
-            'email': self.email,
-            'name': self.name,
-            'company_id': self.company_id,
-            'role_id': self.role_id,
-            'is_active': self.is_active,
-            'created_at': self.created_at.isoformat() if self.created_at else None,
-            'updated_at': self.updated_at.isoformat() if self.updated_at else None
-        }
+        """
+        Verifica a senha pelo pool de hash. Se estiver correta e o hash usar um custo
+        diferente do configurado, gera o novo hash (quem chamou faz o commit).
+        Levanta PoolSaturado quando o pool está cheio.
+        """
+        pool = get_password_pool()
+        if not pool.verificar(self.password_hash, password):
+            return False
+        if pool.precisa_rehash(self.password_hash):
+            self.password_hash = pool.hash(password)
+        return True
@@ -1,19 +1,132 @@
 import requests
 import json
-from config import OMIE_APP_KEY, OMIE_APP_SECRET, OMIE_API_URL
+import logging
+import threading
+import time
+from datetime import datetime
+from zoneinfo import ZoneInfo
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from config import (
+    OMIE_APP_KEY, OMIE_APP_SECRET, OMIE_API_URL,
+    OMIE_POOL_SIZE, OMIE_CONNECT_TIMEOUT, OMIE_READ_TIMEOUT,
+    OMIE_MAX_RETRIES, OMIE_BACKOFF_FACTOR, OMIE_PAGE_SIZE, OMIE_PAGE_WORKERS,
+    OMIE_LOTE_SIZE, OMIE_LOTE_WORKERS,
+    OMIE_CACHE_TTLS, OMIE_CACHE_MAX_ENTRIES, OMIE_CACHE_STALE_TTL, OMIE_TIMEZONE
+)
+from omie_cache import OmieCache
+from omie_ratelimit import get_rate_limiter, retry_after_segundos
+from omie_stream import iter_clientes_cadastro
+from log_config import amostrar
+
+logger = logging.getLogger('omie')
+
+_client = None
+_client_lock = threading.Lock()
+
+JSON_HEADERS = {'Content-Type': 'application/json'}
+
+
+# Respostas de throttle do Omie: reduzem a taxa do limitador e a chamada é refeita
+THROTTLE_STATUS = (425, 429)
+
+# faultcode devolvido pelo Omie quando a página/filtro não tem registros
+OMIE_FAULT_SEM_REGISTROS = 'SOAP-ENV:Client-5113'
+
+# Máximo de registros por lote aceito pelas chamadas ...PorLote do Omie
+OMIE_LOTE_MAXIMO = 50
+
+# Chamada unitária usada quando o Omie recusa um lote inteiro
+CHAMADA_UNITARIA = {
+    'IncluirClientesPorLote': 'IncluirCliente',
+    'UpsertClientesPorLote': 'UpsertCliente'
+}
+
+
+def _sem_reenvio(call):
+    """Inclusões não são idempotentes: repetir uma que o Omie processou duplica o registro"""
+    return call.startswith('Incluir')
+
+
+def agora_omie():
+    """Hora atual no fuso do Omie, comparável com dAlt/hAlt"""
+    return datetime.now(ZoneInfo(OMIE_TIMEZONE)).replace(tzinfo=None)
+
+
+class OmieAPIError(Exception):
+    """Erro retornado pela API do Omie em operações que não devolvem o dict de resposta"""
+
+
+def criar_sessao(pool_size=OMIE_POOL_SIZE, max_retries=OMIE_MAX_RETRIES,
+                 backoff_factor=OMIE_BACKOFF_FACTOR, reenviar=True):
+    """
+    Cria uma sessão HTTP com pool de conexões keep-alive e retentativas com backoff
+
+    Com reenviar=False só as falhas de conexão são repetidas (a requisição não
+    chegou ao Omie); timeouts de leitura e 502/503/504 não, porque a chamada
+    pode ter sido processada.
+    """
+    retry = Retry(
+        total=max_retries,
+        connect=max_retries,
+        read=max_retries if reenviar else 0,
+        backoff_factor=backoff_factor,
+        status_forcelist=(502, 503, 504) if reenviar else (),
+        # A API do Omie usa apenas POST; as chamadas de listagem são idempotentes
+        allowed_methods=frozenset(['POST']),
+        raise_on_status=False
+    )
+    adapter = HTTPAdapter(
+        pool_connections=pool_size,
+        pool_maxsize=pool_size,
+        max_retries=retry
+    )
+    session = requests.Session()
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
 
 class OmieAPI:
-    def __init__(self):
+    def __init__(self, session=None, base_url=None,
+                 connect_timeout=OMIE_CONNECT_TIMEOUT, read_timeout=OMIE_READ_TIMEOUT,
+                 cache=None, cache_ttls=None, limiter=None, max_retries=OMIE_MAX_RETRIES,
+                 session_inclusao=None):
         self.app_key = OMIE_APP_KEY
         self.app_secret = OMIE_APP_SECRET
-        self.base_url = OMIE_API_URL
+        self.base_url = base_url or OMIE_API_URL
+        self.session = session or criar_sessao()
+        # Chamadas Incluir* usam uma sessão que não reenvia a requisição
+        self.session_inclusao = session_inclusao or criar_sessao(reenviar=False)
+        self.timeout = (connect_timeout, read_timeout)
+        self.cache = cache if cache is not None else OmieCache(
+            max_entries=OMIE_CACHE_MAX_ENTRIES, stale_ttl=OMIE_CACHE_STALE_TTL
+        )
+        self.cache_ttls = OMIE_CACHE_TTLS if cache_ttls is None else cache_ttls
+        self.limiter = limiter or get_rate_limiter()
+        self.max_retries = max_retries
 
     def _make_request(self, endpoint, call, params):
         """
         Método base para fazer requisições à API do Omie
+
+        Chamadas com TTL em cache_ttls passam pelo cache. A resposta em cache é
+        compartilhada entre as requisições e não deve ser alterada.
+        """
+        ttl = self.cache_ttls.get(call)
+        if not ttl:
+            return self._executar(endpoint, call, params)
+
+        chave = f"{endpoint}|{call}|{json.dumps(params, sort_keys=True)}"
+        return self.cache.get_or_load(chave, ttl, lambda: self._executar(endpoint, call, params))
+
+    def _executar(self, endpoint, call, params):
+        """
+        Faz a requisição HTTP à API do Omie
         """
         url = f"{self.base_url}/{endpoint}"
-        
+
         data = {
             "app_key": self.app_key,
             "app_secret": self.app_secret,
@@ -21,36 +134,80 @@ class OmieAPI:
             "param": [params]
         }
 
+        corpo = json.dumps(data).encode('utf-8')
+        session = self.session_inclusao if _sem_reenvio(call) else self.session
+        inicio = time.perf_counter()
+        tentativas = 0
+        evento = {'omie_call': call, 'endpoint': endpoint, 'payload_bytes': len(corpo)}
+
         try:
-            print(f"Fazendo requisição para: {url}")
-            print(f"Dados enviados: {json.dumps(data, indent=2)}")
-            
-            response = requests.post(url, json=data, timeout=30)
-            print(f"Status code: {response.status_code}")
-            
+            for tentativas in range(self.max_retries + 1):
+                self.limiter.acquire()
+                # 425/429 são recusas do Omie, então refazer é seguro mesmo nas inclusões
+                response = session.post(url, data=corpo, headers=JSON_HEADERS, timeout=self.timeout)
+                if response.status_code not in THROTTLE_STATUS:
+                    break
+                self.limiter.on_throttle(retry_after_segundos(response.headers.get('Retry-After')))
+
+            historico = getattr(getattr(response.raw, 'retries', None), 'history', None) or ()
+            evento.update(
+                status=response.status_code,
+                response_bytes=len(response.content),
+                retries=tentativas + len(historico),
+                duration_ms=round((time.perf_counter() - inicio) * 1000, 1)
+            )
+
             if response.status_code == 200:
+                self.limiter.on_success()
                 result = response.json()
+                if amostrar():
+                    logger.info('Requisição ao Omie concluída', extra=evento)
                 return {
                     'success': True,
                     'data': result
                 }
             else:
-                print(f"Erro na resposta: {response.text}")
-                return {
+                erro = {
                     'success': False,
                     'error': f'Erro HTTP {response.status_code}'
                 }
-                
+                # Erros de negócio do Omie vêm como JSON com faultcode/faultstring
+                try:
+                    fault = response.json()
+                    erro['faultcode'] = fault.get('faultcode')
+                    erro['faultstring'] = fault.get('faultstring')
+                except (ValueError, AttributeError):
+                    pass
+                if erro.get('faultcode') == OMIE_FAULT_SEM_REGISTROS:
+                    logger.debug('Omie sem registros', extra=evento)
+                else:
+                    logger.warning(
+                        'Erro na resposta do Omie',
+                        extra=dict(evento, faultcode=erro.get('faultcode'), faultstring=erro.get('faultstring'))
+                    )
+                return erro
+
         except Exception as e:
-            print(f"Erro na requisição: {str(e)}")
+            evento.update(retries=tentativas, duration_ms=round((time.perf_counter() - inicio) * 1000, 1))
+            logger.warning('Falha na requisição ao Omie', extra=dict(evento, error=str(e)))
             return {
                 'success': False,
                 'error': str(e)
             }
 
-    def listar_clientes(self, pagina=1, registros_por_pagina=50):
+    def close(self):
+        """
+        Fecha as conexões abertas nos pools
+        """
+        self.session.close()
+        self.session_inclusao.close()
+
+    def listar_clientes(self, pagina=1, registros_por_pagina=50, apenas_importado_api="N", **filtros):
         """
         Lista os clientes cadastrados
+
+        `filtros` são repassados para ListarClientes (ex.: filtrar_por_data_de,
+        filtrar_por_hora_de, filtrar_apenas_alteracao).
         """
         return self._make_request(
             "geral/clientes/",
@@ -58,13 +215,237 @@ class OmieAPI:
             {
                 "pagina": pagina,
                 "registros_por_pagina": registros_por_pagina,
-                "apenas_importado_api": "N"
+                "apenas_importado_api": apenas_importado_api,
+                **filtros
             }
         )
 
+    def listar_clientes_stream(self, pagina=1, registros_por_pagina=OMIE_PAGE_SIZE, meta=None,
+                               apenas_importado_api="N", **filtros):
+        """
+        Lista uma página de clientes decodificando clientes_cadastro aos poucos
+
+        Gera ClienteResumo (só os campos usados) conforme o corpo chega, sem montar
+        o dict completo da resposta. Os campos de paginação vão para `meta`. Não
+        passa pelo cache.
+        """
+        data = {
+            "app_key": self.app_key,
+            "app_secret": self.app_secret,
+            "call": "ListarClientes",
+            "param": [{
+                "pagina": pagina,
+                "registros_por_pagina": registros_por_pagina,
+                "apenas_importado_api": apenas_importado_api,
+                **filtros
+            }]
+        }
+        self.limiter.acquire()
+        with self.session.post(f"{self.base_url}/geral/clientes/", json=data,
+                               timeout=self.timeout, stream=True) as response:
+            if response.status_code in THROTTLE_STATUS:
+                self.limiter.on_throttle(retry_after_segundos(response.headers.get('Retry-After')))
+            if response.status_code != 200:
+                try:
+                    fault = response.json()
+                except ValueError:
+                    fault = {}
+                if fault.get('faultcode') == OMIE_FAULT_SEM_REGISTROS:
+                    return
+                raise OmieAPIError(
+                    f"Erro ao buscar a página {pagina}: {fault.get('faultstring') or response.status_code}"
+                )
+            self.limiter.on_success()
+            yield from iter_clientes_cadastro(response.iter_content(chunk_size=65536), meta)
+
+    def _pagina_clientes(self, pagina, registros_por_pagina, **filtros):
+        """
+        Busca uma página de clientes, levantando OmieAPIError em caso de falha
+        """
+        response = self.listar_clientes(pagina=pagina, registros_por_pagina=registros_por_pagina, **filtros)
+        if not response['success']:
+            if response.get('faultcode') == OMIE_FAULT_SEM_REGISTROS:
+                return {'pagina': pagina, 'total_de_paginas': 0, 'registros': 0, 'clientes_cadastro': []}
+            raise OmieAPIError(
+                f"Erro ao buscar a página {pagina}: {response.get('faultstring') or response.get('error')}"
+            )
+        return response['data']
+
+    def iter_paginas_clientes(self, registros_por_pagina=OMIE_PAGE_SIZE, max_workers=OMIE_PAGE_WORKERS,
+                              ordered=True, pagina_inicial=1, **filtros):
+        """
+        Percorre as páginas de ListarClientes a partir de `pagina_inicial`
+
+        Lê total_de_paginas da primeira página buscada e busca as demais em paralelo,
+        com no máximo `max_workers` requisições simultâneas. Com ordered=False as
+        páginas saem na ordem em que chegam.
+        """
+        primeira = self._pagina_clientes(pagina_inicial, registros_por_pagina, **filtros)
+        yield primeira
+
+        total_paginas = primeira.get('total_de_paginas', 1)
+        if total_paginas <= pagina_inicial:
+            return
+
+        paginas = iter(range(pagina_inicial + 1, total_paginas + 1))
+        # Janela limitada de páginas em memória enquanto o consumidor processa
+        janela = max_workers * 2
+        pendentes = []
+        executor = ThreadPoolExecutor(max_workers=max_workers)
+
+        def preencher():
+            while len(pendentes) < janela:
+                pagina = next(paginas, None)
+                if pagina is None:
+                    break
+                pendentes.append(executor.submit(
+                    self._pagina_clientes, pagina, registros_por_pagina, **filtros
+                ))
+
+        try:
+            preencher()
+            while pendentes:
+                if ordered:
+                    pronto = pendentes.pop(0)
+                else:
+                    pronto = next(iter(wait(pendentes, return_when=FIRST_COMPLETED).done))
+                    pendentes.remove(pronto)
+                dados = pronto.result()
+                preencher()
+                yield dados
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def iter_all_clientes(self, registros_por_pagina=OMIE_PAGE_SIZE,
+                          max_workers=OMIE_PAGE_WORKERS, ordered=True, **filtros):
+        """
+        Percorre todo o cadastro de clientes, gerando um registro por vez
+
+        As páginas são buscadas em paralelo (ver iter_paginas_clientes).
+        """
+        for dados in self.iter_paginas_clientes(registros_por_pagina, max_workers, ordered, **filtros):
+            yield from dados.get('clientes_cadastro', [])
+
+    def fetch_all_clientes(self, **kwargs):
+        """
+        Retorna a lista completa de clientes (ver iter_all_clientes)
+        """
+        return list(self.iter_all_clientes(**kwargs))
+
+    def _enviar_cliente(self, call, lote, cliente):
+        """Envia um único cliente e devolve o resultado do registro"""
+        response = self._executar("geral/clientes/", call, cliente)
+        resultado = {
+            'codigo_cliente_integracao': cliente['codigo_cliente_integracao'],
+            'lote': lote,
+            'success': response['success']
+        }
+        if response['success']:
+            resultado['codigo_cliente_omie'] = response['data'].get('codigo_cliente_omie')
+        else:
+            resultado['error'] = response.get('faultstring') or response.get('error')
+        return resultado
+
+    def _enviar_lote(self, call, lote, clientes):
+        """
+        Envia um lote e devolve o resultado de cada registro
+
+        Se o Omie recusar o lote (faultcode), os registros são reenviados um a um
+        para isolar os inválidos. Falhas de rede ou HTTP marcam o lote inteiro
+        como falho: o reenvio é seguro pelo codigo_cliente_integracao.
+        """
+        response = self._executar("geral/clientes/", call, {"lote": lote, "clientes_cadastro": clientes})
+        if response['success']:
+            return [
+                {'codigo_cliente_integracao': cliente['codigo_cliente_integracao'], 'lote': lote, 'success': True}
+                for cliente in clientes
+            ]
+        if not response.get('faultcode'):
+            return [
+                {'codigo_cliente_integracao': cliente['codigo_cliente_integracao'], 'lote': lote,
+                 'success': False, 'error': response.get('error')}
+                for cliente in clientes
+            ]
+        logger.warning(
+            'Lote recusado pelo Omie; reenviando registro a registro',
+            extra={'omie_call': call, 'lote': lote, 'registros': len(clientes),
+                   'faultstring': response.get('faultstring')}
+        )
+        return [self._enviar_cliente(CHAMADA_UNITARIA[call], lote, cliente) for cliente in clientes]
+
+    def _enviar_lotes(self, call, clientes, tamanho_lote, max_workers):
+        tamanho_lote = max(1, min(tamanho_lote, OMIE_LOTE_MAXIMO))
+        resultados = []
+        validos = []
+        for cliente in clientes:
+            if cliente.get('codigo_cliente_integracao'):
+                validos.append(cliente)
+            else:
+                resultados.append({
+                    'codigo_cliente_integracao': None,
+                    'lote': None,
+                    'success': False,
+                    'error': 'codigo_cliente_integracao é obrigatório no envio em lote'
+                })
+
+        lotes = [validos[i:i + tamanho_lote] for i in range(0, len(validos), tamanho_lote)]
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            for resultado in executor.map(
+                lambda numero_lote: self._enviar_lote(call, *numero_lote), enumerate(lotes, start=1)
+            ):
+                resultados.extend(resultado)
+
+        enviados = sum(1 for resultado in resultados if resultado['success'])
+        if enviados:
+            # As listagens em cache não refletem mais o cadastro
+            self.cache.invalidate("geral/clientes/|")
+        return {
+            'success': enviados == len(resultados),
+            'data': {
+                'lotes': len(lotes),
+                'total': len(resultados),
+                'enviados': enviados,
+                'falhas': len(resultados) - enviados,
+                'resultados': resultados
+            }
+        }
+
+    def upsert_clientes_por_lote(self, clientes, tamanho_lote=OMIE_LOTE_SIZE, max_workers=OMIE_LOTE_WORKERS):
+        """
+        Inclui ou altera clientes em lotes (UpsertClientesPorLote)
+
+        Cada cliente precisa de codigo_cliente_integracao, que o Omie usa como chave:
+        reenviar o mesmo registro altera o cadastro em vez de duplicá-lo. Os lotes
+        são enviados em paralelo (no máximo `max_workers` simultâneos), respeitando
+        o rate limit. Retorna o resultado de cada registro em data['resultados'].
+        """
+        return self._enviar_lotes('UpsertClientesPorLote', clientes, tamanho_lote, max_workers)
+
+    def incluir_clientes_por_lote(self, clientes, tamanho_lote=OMIE_LOTE_SIZE, max_workers=OMIE_LOTE_WORKERS):
+        """
+        Inclui clientes em lotes (IncluirClientesPorLote)
+
+        Igual a upsert_clientes_por_lote, mas o Omie recusa registros cujo
+        codigo_cliente_integracao já exista. Para reprocessar um envio, use o upsert.
+        """
+        return self._enviar_lotes('IncluirClientesPorLote', clientes, tamanho_lote, max_workers)
+
+
+def get_omie_client():
+    """
+    Retorna o cliente Omie compartilhado pelo processo (um único pool de conexões)
+    """
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = OmieAPI()
+    return _client
+
+
 if __name__ == "__main__":
     # Teste direto da API
-    omie = OmieAPI()
+    omie = get_omie_client()
     response = omie.listar_clientes(pagina=1, registros_por_pagina=5)
     print("\nResposta do teste:")
     print(json.dumps(response, indent=2))
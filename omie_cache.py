@@ -0,0 +1,150 @@
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+
+class _Voo:
+    """Requisição em andamento para uma chave (single-flight)"""
+
+    def __init__(self):
+        self.evento = threading.Event()
+        self.resultado = None
+        self.erro = None
+
+
+class OmieCache:
+    """
+    Cache LRU com TTL por entrada para as respostas da API do Omie
+
+    - Entradas vencidas há menos de `stale_ttl` segundos são servidas na hora
+      e recarregadas em segundo plano (stale-while-revalidate).
+    - Requisições simultâneas para a mesma chave fazem uma única chamada
+      (single-flight); as demais esperam o resultado.
+    - Só respostas com success=True são guardadas.
+    """
+
+    def __init__(self, max_entries=1024, stale_ttl=300, refresh_workers=2):
+        self.max_entries = max_entries
+        self.stale_ttl = stale_ttl
+        self._entradas = OrderedDict()
+        self._voos = {}
+        self._atualizando = set()
+        self._lock = threading.Lock()
+        self._refresh_workers = refresh_workers
+        self._executor = None
+        self.stats = {
+            'hits': 0,
+            'stale_hits': 0,
+            'misses': 0,
+            'collapsed': 0,
+            'evictions': 0,
+            'refreshes': 0,
+            'errors': 0
+        }
+
+    def __len__(self):
+        return len(self._entradas)
+
+    def _guardar(self, chave, valor, ttl):
+        # Chamado com o lock adquirido
+        self._entradas[chave] = (valor, time.monotonic() + ttl)
+        self._entradas.move_to_end(chave)
+        while len(self._entradas) > self.max_entries:
+            self._entradas.popitem(last=False)
+            self.stats['evictions'] += 1
+
+    def _carregar(self, chave, ttl, loader):
+        """Executa o loader como líder do voo e acorda quem estiver esperando"""
+        voo = self._voos[chave]
+        try:
+            voo.resultado = loader()
+            if voo.resultado.get('success'):
+                with self._lock:
+                    self._guardar(chave, voo.resultado, ttl)
+        except Exception as e:
+            voo.erro = e
+            with self._lock:
+                self.stats['errors'] += 1
+        finally:
+            with self._lock:
+                del self._voos[chave]
+            voo.evento.set()
+        if voo.erro is not None:
+            raise voo.erro
+        return voo.resultado
+
+    def _atualizar_em_segundo_plano(self, chave, ttl, loader):
+        # Chamado com o lock adquirido
+        if chave in self._atualizando or chave in self._voos:
+            return
+        self._atualizando.add(chave)
+        self._voos[chave] = _Voo()
+        self.stats['refreshes'] += 1
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self._refresh_workers, thread_name_prefix='omie-cache'
+            )
+
+        def atualizar():
+            try:
+                self._carregar(chave, ttl, loader)
+            except Exception:
+                pass
+            finally:
+                with self._lock:
+                    self._atualizando.discard(chave)
+
+        self._executor.submit(atualizar)
+
+    def get_or_load(self, chave, ttl, loader):
+        """
+        Retorna a resposta em cache ou chama `loader()` para obtê-la
+        """
+        with self._lock:
+            entrada = self._entradas.get(chave)
+            if entrada is not None:
+                valor, expira_em = entrada
+                agora = time.monotonic()
+                if agora < expira_em:
+                    self._entradas.move_to_end(chave)
+                    self.stats['hits'] += 1
+                    return valor
+                if agora < expira_em + self.stale_ttl:
+                    self._entradas.move_to_end(chave)
+                    self.stats['stale_hits'] += 1
+                    self._atualizar_em_segundo_plano(chave, ttl, loader)
+                    return valor
+                del self._entradas[chave]
+
+            voo = self._voos.get(chave)
+            if voo is None:
+                self._voos[chave] = _Voo()
+                self.stats['misses'] += 1
+                lider = True
+            else:
+                self.stats['collapsed'] += 1
+                lider = False
+
+        if lider:
+            return self._carregar(chave, ttl, loader)
+
+        voo.evento.wait()
+        if voo.erro is not None:
+            raise voo.erro
+        return voo.resultado
+
+    def invalidate(self, prefixo=None):
+        """
+        Remove as entradas cuja chave começa com `prefixo` (ou todas)
+        """
+        with self._lock:
+            if prefixo is None:
+                self._entradas.clear()
+                return
+            for chave in [c for c in self._entradas if c.startswith(prefixo)]:
+                del self._entradas[chave]
+
+    def get_stats(self):
+        with self._lock:
+            return dict(self.stats, entries=len(self._entradas), max_entries=self.max_entries)
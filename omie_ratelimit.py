@@ -0,0 +1,175 @@
+import asyncio
+import json
+import threading
+import time
+from contextlib import contextmanager
+from config import (
+    OMIE_RATE_LIMIT, OMIE_RATE_BURST, OMIE_RATE_MIN, OMIE_RATE_MAX, OMIE_RATE_STATE_FILE
+)
+
+try:
+    import fcntl
+except ImportError:  # Windows: só o modo em memória fica disponível
+    fcntl = None
+
+_limiter = None
+_limiter_lock = threading.Lock()
+
+
+class TokenBucket:
+    """
+    Token bucket com ajuste AIMD da taxa (requisições por segundo)
+
+    Cada sucesso aumenta a taxa aditivamente (+`increase` req/s a cada ~`rate`
+    sucessos) até `max_rate`; cada resposta de throttle (425/429) multiplica a
+    taxa por `decrease`, no mínimo `min_rate`. Com `state_file`, o estado do
+    bucket fica em um arquivo protegido por flock e é compartilhado entre
+    processos (workers do Flask/FastAPI e execuções em lote na mesma máquina).
+    """
+
+    def __init__(self, rate=OMIE_RATE_LIMIT, capacity=OMIE_RATE_BURST, min_rate=OMIE_RATE_MIN,
+                 max_rate=OMIE_RATE_MAX, increase=1.0, decrease=0.5, state_file=OMIE_RATE_STATE_FILE):
+        if state_file and fcntl is None:
+            raise RuntimeError('Rate limit entre processos exige fcntl (Linux/macOS)')
+        self.capacity = capacity
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase = increase
+        self.decrease = decrease
+        self.state_file = state_file
+        self._lock = threading.Lock()
+        self._estado_local = {'rate': rate, 'tokens': capacity, 'updated': time.time(), 'throttled_at': 0}
+        self._queue_depth = 0
+        self.stats = {'acquired': 0, 'waited': 0, 'throttled': 0}
+
+    @contextmanager
+    def _estado(self):
+        """Estado do bucket (em memória ou no arquivo compartilhado), sob lock"""
+        with self._lock:
+            if not self.state_file:
+                yield self._estado_local
+                return
+            with open(self.state_file, 'a+') as f:
+                fcntl.flock(f, fcntl.LOCK_EX)
+                try:
+                    f.seek(0)
+                    conteudo = f.read()
+                    estado = json.loads(conteudo) if conteudo else dict(self._estado_local)
+                    yield estado
+                    f.seek(0)
+                    f.truncate()
+                    f.write(json.dumps(estado))
+                    f.flush()
+                finally:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _repor(self, estado, agora):
+        decorrido = max(0.0, agora - estado['updated'])
+        estado['tokens'] = min(self.capacity, estado['tokens'] + decorrido * estado['rate'])
+        estado['updated'] = agora
+
+    def reserve(self):
+        """
+        Reserva um token e retorna quantos segundos esperar antes de usá-lo
+
+        O saldo pode ficar negativo: cada chamada entra na fila atrás das anteriores.
+        """
+        with self._estado() as estado:
+            self._repor(estado, time.time())
+            estado['tokens'] -= 1
+            self.stats['acquired'] += 1
+            if estado['tokens'] >= 0:
+                return 0.0
+            self.stats['waited'] += 1
+            return -estado['tokens'] / estado['rate']
+
+    def _entrar_fila(self, delta):
+        with self._lock:
+            self._queue_depth += delta
+
+    def acquire(self):
+        """Bloqueia a thread até haver token disponível"""
+        espera = self.reserve()
+        if espera > 0:
+            self._entrar_fila(1)
+            try:
+                time.sleep(espera)
+            finally:
+                self._entrar_fila(-1)
+
+    async def _fora_do_loop(self, funcao, *args):
+        # Com state_file, o flock pode esperar outro processo: roda numa thread
+        if self.state_file:
+            return await asyncio.to_thread(funcao, *args)
+        return funcao(*args)
+
+    async def acquire_async(self):
+        """Versão assíncrona de acquire (não bloqueia o event loop)"""
+        espera = await self._fora_do_loop(self.reserve)
+        if espera > 0:
+            self._entrar_fila(1)
+            try:
+                await asyncio.sleep(espera)
+            finally:
+                self._entrar_fila(-1)
+
+    async def on_success_async(self):
+        await self._fora_do_loop(self.on_success)
+
+    async def on_throttle_async(self, retry_after=None):
+        await self._fora_do_loop(self.on_throttle, retry_after)
+
+    def on_success(self):
+        """Aumento aditivo da taxa"""
+        with self._estado() as estado:
+            estado['rate'] = min(self.max_rate, estado['rate'] + self.increase / max(estado['rate'], 1.0))
+
+    def on_throttle(self, retry_after=None):
+        """
+        Redução multiplicativa da taxa após uma resposta 425/429
+
+        Várias respostas de throttle na mesma rajada contam como uma só redução.
+        """
+        with self._estado() as estado:
+            agora = time.time()
+            self.stats['throttled'] += 1
+            self._repor(estado, agora)
+            if agora - estado.get('throttled_at', 0) >= 1.0 / estado['rate']:
+                estado['rate'] = max(self.min_rate, estado['rate'] * self.decrease)
+                estado['throttled_at'] = agora
+            # Esvazia o bucket; com Retry-After, segura todos pelo tempo pedido
+            estado['tokens'] = min(estado['tokens'], 0.0)
+            if retry_after:
+                estado['tokens'] = min(estado['tokens'], -retry_after * estado['rate'])
+
+    def get_metrics(self):
+        with self._estado() as estado:
+            self._repor(estado, time.time())
+            return dict(
+                self.stats,
+                rate=round(estado['rate'], 3),
+                tokens=round(estado['tokens'], 3),
+                capacity=self.capacity,
+                queue_depth=self._queue_depth,
+                shared=bool(self.state_file)
+            )
+
+
+def retry_after_segundos(valor):
+    """Converte o header Retry-After (em segundos) em float"""
+    try:
+        return float(valor) if valor else None
+    except ValueError:
+        return None
+
+
+def get_rate_limiter():
+    """
+    Retorna o limitador compartilhado por todos os clientes Omie do processo
+    """
+    global _limiter
+    if _limiter is None:
+        with _limiter_lock:
+            if _limiter is None:
+                _limiter = TokenBucket()
+    return _limiter
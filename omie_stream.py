@@ -0,0 +1,108 @@
+import codecs
+import json
+import re
+from dataclasses import dataclass
+from fast_json import dumps
+
+_decoder = json.JSONDecoder()
+_CAMPO_NUMERICO = re.compile(r'"(\w+)"\s*:\s*(-?\d+)')
+_SEPARADORES = re.compile(r'[\s,]*')
+
+
+@dataclass(slots=True)
+class ClienteResumo:
+    """Registro compacto de cliente com só os campos usados pelo sistema"""
+    codigo_cliente_omie: int
+    razao_social: str
+    cnpj_cpf: str
+    cidade: str
+    estado: str
+    email: str
+    telefone1_ddd: str
+    telefone1_numero: str
+    telefone2_ddd: str
+    telefone2_numero: str
+
+    @classmethod
+    def from_dict(cls, cliente):
+        get = cliente.get
+        return cls(get('codigo_cliente_omie'), *[get(campo, '') for campo in _CAMPOS_TEXTO])
+
+
+_CAMPOS_TEXTO = tuple(ClienteResumo.__slots__[1:])
+
+
+def iter_array_json(chunks, chave, meta=None):
+    """
+    Percorre os objetos do array `chave` de um JSON recebido em pedaços (bytes)
+
+    Cada objeto é decodificado e entregue assim que termina de chegar; o texto
+    já processado é descartado, então só um objeto por vez fica em memória.
+    Campos numéricos que aparecem antes do array (pagina, total_de_paginas...)
+    são copiados para `meta`.
+    """
+    utf8 = codecs.getincrementaldecoder('utf-8')()
+    marcador = f'"{chave}"'
+    buffer = ''
+    pos = 0
+    dentro = False
+    chunks = iter(chunks)
+
+    def ler():
+        nonlocal buffer, pos
+        for chunk in chunks:
+            texto = utf8.decode(chunk)
+            if texto:
+                buffer = buffer[pos:] + texto
+                pos = 0
+                return True
+        return False
+
+    # Localiza o início do array, guardando os campos de cabeçalho
+    while not dentro:
+        inicio = buffer.find(marcador)
+        if inicio >= 0:
+            abre = buffer.find('[', inicio + len(marcador))
+            if abre >= 0:
+                if meta is not None:
+                    meta.update((k, int(v)) for k, v in _CAMPO_NUMERICO.findall(buffer, 0, inicio))
+                pos = abre + 1
+                dentro = True
+                break
+        if not ler():
+            return
+
+    while True:
+        pos = _SEPARADORES.match(buffer, pos).end()
+        if pos >= len(buffer):
+            if not ler():
+                return
+            continue
+        if buffer[pos] == ']':
+            return
+        try:
+            obj, fim = _decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError:
+            # Objeto incompleto: espera o próximo pedaço
+            if not ler():
+                raise
+            continue
+        pos = fim
+        yield obj
+
+
+def iter_clientes_cadastro(chunks, meta=None):
+    """Gera ClienteResumo a partir do corpo (em pedaços) de ListarClientes"""
+    for cliente in iter_array_json(chunks, 'clientes_cadastro', meta):
+        yield ClienteResumo.from_dict(cliente)
+
+
+def dumps_clientes(clientes, meta=None):
+    """
+    Serializa uma página de ClienteResumo no formato de ListarClientes, em bytes
+    """
+    clientes = list(clientes)
+    pagina = dict(meta or {})
+    pagina['registros'] = len(clientes)
+    pagina['clientes_cadastro'] = clientes
+    return dumps({'success': True, 'data': pagina})
@@ -0,0 +1,312 @@
+import re
+import uuid
+from datetime import datetime, timedelta
+from sqlalchemy import bindparam, func, select, update
+from database.connection import db
+from database.upsert import upsert
+from models.customer import Customer
+from models.sync_state import OmieSyncState
+from omie_api import OmieAPI, agora_omie, get_omie_client
+from cliente_search import somente_digitos, get_cliente_index
+from config import OMIE_PAGE_SIZE, OMIE_PAGE_WORKERS, OMIE_LOTE_SIZE, OMIE_LOTE_WORKERS
+
+ENTIDADE_CLIENTES = 'clientes'
+
+# Colunas sobrescritas quando o cliente já existe localmente
+COLUNAS_ATUALIZADAS = (
+    'name', 'email', 'phone', 'address', 'city', 'state', 'postal_code', 'document',
+    'omie_codigo', 'omie_integracao', 'omie_updated_at', 'updated_at'
+)
+
+_TELEFONE = re.compile(r'^\s*\((\d{2})\)\s*(.+)$')
+
+
+def data_alteracao(cliente):
+    """Converte info.dAlt/hAlt (ou dInc/hInc) do Omie em datetime"""
+    info = cliente.get('info') or {}
+    data = info.get('dAlt') or info.get('dInc')
+    if not data:
+        return None
+    hora = info.get('hAlt') or info.get('hInc') or '00:00:00'
+    try:
+        return datetime.strptime(f"{data} {hora}", "%d/%m/%Y %H:%M:%S")
+    except ValueError:
+        return None
+
+
+def customer_id(company_id, codigo_cliente_omie):
+    """Id determinístico do cliente local, para o upsert pela chave primária"""
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, f"omie:{company_id}:{codigo_cliente_omie}"))
+
+
+def cliente_para_customer(company_id, cliente, agora=None):
+    """Mapeia um registro de clientes_cadastro para uma linha de customers"""
+    telefone = ' '.join(filter(None, (
+        f"({cliente['telefone1_ddd']})" if cliente.get('telefone1_ddd') else None,
+        cliente.get('telefone1_numero')
+    )))
+    endereco = ', '.join(filter(None, (cliente.get('endereco'), cliente.get('endereco_numero'))))
+    # O Omie devolve a cidade como "SAO PAULO (SP)"
+    cidade = (cliente.get('cidade') or '').split(' (')[0]
+    agora = agora or datetime.utcnow()
+    return {
+        'id': customer_id(company_id, cliente['codigo_cliente_omie']),
+        'company_id': company_id,
+        'name': (cliente.get('razao_social') or cliente.get('nome_fantasia') or '')[:255],
+        'email': (cliente.get('email') or None) and cliente['email'][:255],
+        'phone': telefone[:20] or None,
+        'address': endereco[:255] or None,
+        'city': cidade[:100] or None,
+        'state': (cliente.get('estado') or None) and cliente['estado'][:2],
+        'postal_code': (cliente.get('cep') or None) and cliente['cep'][:10],
+        'document': somente_digitos(cliente.get('cnpj_cpf'))[:20] or None,
+        'omie_codigo': cliente['codigo_cliente_omie'],
+        'omie_integracao': cliente.get('codigo_cliente_integracao') or None,
+        'omie_updated_at': data_alteracao(cliente),
+        'created_at': agora,
+        'updated_at': agora
+    }
+
+
+def customer_para_cliente(customer):
+    """
+    Mapeia um Customer para o formato de clientes_cadastro do Omie
+
+    O codigo_cliente_integracao é o id local (ou o código já vinculado), o que
+    torna o envio idempotente e permite reconhecer o registro na volta.
+    """
+    telefone = _TELEFONE.match(customer.phone or '')
+    cliente = {
+        'codigo_cliente_integracao': customer.omie_integracao or customer.id,
+        'razao_social': customer.name,
+        'nome_fantasia': customer.name,
+        'cnpj_cpf': customer.document,
+        'email': customer.email,
+        'telefone1_ddd': telefone.group(1) if telefone else None,
+        'telefone1_numero': telefone.group(2) if telefone else customer.phone,
+        'endereco': customer.address,
+        'cidade': customer.city,
+        'estado': customer.state,
+        'cep': customer.postal_code
+    }
+    return {campo: valor for campo, valor in cliente.items() if valor}
+
+
+class ClienteSync:
+    """
+    Sincroniza o cadastro de clientes do Omie com a tabela customers
+
+    A primeira execução faz a carga completa, gravando a página seguinte em
+    omie_sync_state a cada página (uma falha retoma de onde parou). As
+    seguintes buscam só os clientes alterados desde a marca d'água, com uma
+    margem de segurança. A marca é o maior dAlt/hAlt gravado, mas nunca passa
+    do início da execução: um cliente alterado durante a carga numa página já
+    lida tem dAlt posterior ao início e entra no próximo delta. O upsert é
+    idempotente, então reprocessar registros não causa duplicidade.
+    """
+
+    def __init__(self, company_id, omie=None, session=None, registros_por_pagina=OMIE_PAGE_SIZE,
+                 max_workers=OMIE_PAGE_WORKERS, apenas_importado_api="N",
+                 margem=timedelta(minutes=5)):
+        self.company_id = company_id
+        # Sem cache: a sincronização precisa sempre do dado atual do Omie
+        self.omie = omie or OmieAPI(session=get_omie_client().session, cache_ttls={})
+        self.session = session or db.session
+        self.registros_por_pagina = registros_por_pagina
+        self.max_workers = max_workers
+        self.apenas_importado_api = apenas_importado_api
+        self.margem = margem
+
+    def _estado(self):
+        estado = self.session.get(OmieSyncState, (self.company_id, ENTIDADE_CLIENTES))
+        if estado is None:
+            estado = OmieSyncState(
+                company_id=self.company_id,
+                entity=ENTIDADE_CLIENTES,
+                full_load_done=False,
+                next_page=1
+            )
+            self.session.add(estado)
+            self.session.commit()
+        return estado
+
+    def _gravar(self, clientes):
+        """Faz o upsert em lote de uma página; retorna a maior data de alteração"""
+        agora = datetime.utcnow()
+        linhas = [
+            cliente_para_customer(self.company_id, cliente, agora)
+            for cliente in clientes if cliente.get('codigo_cliente_omie')
+        ]
+        self._vincular_existentes(linhas)
+        upsert(self.session.connection(), Customer.__table__, linhas, ('id',), COLUNAS_ATUALIZADAS)
+        # O índice de busca (se já carregado neste processo) recebe as mesmas páginas
+        indice = get_cliente_index()
+        if indice.atualizado_em is not None:
+            indice.upsert_many(clientes)
+        datas = [linha['omie_updated_at'] for linha in linhas if linha['omie_updated_at']]
+        return len(linhas), max(datas) if datas else None
+
+    def _vincular_existentes(self, linhas):
+        """
+        Reaproveita o id de clientes que já existem localmente com outro id, em
+        vez de criar outra linha: os criados aqui e enviados ao Omie (voltam com
+        o id local no codigo_cliente_integracao), os já vinculados ao mesmo
+        código do Omie e os importados de planilha com o mesmo documento e ainda
+        sem código do Omie
+        """
+        integracoes = {linha['omie_integracao'] for linha in linhas if linha['omie_integracao']}
+        locais = set(self.session.execute(
+            select(Customer.id).where(Customer.company_id == self.company_id, Customer.id.in_(integracoes))
+        ).scalars()) if integracoes else set()
+        vinculados = dict(self.session.execute(
+            select(Customer.omie_codigo, Customer.id).where(
+                Customer.company_id == self.company_id,
+                Customer.omie_codigo.in_([linha['omie_codigo'] for linha in linhas])
+            )
+        ).all()) if linhas else {}
+        pendentes = []
+        for linha in linhas:
+            if linha['omie_integracao'] in locais:
+                linha['id'] = linha['omie_integracao']
+            elif linha['omie_codigo'] in vinculados:
+                linha['id'] = vinculados[linha['omie_codigo']]
+            elif linha['document']:
+                pendentes.append(linha)
+        if not pendentes:
+            return
+        por_documento = dict(self.session.execute(
+            select(Customer.document, func.min(Customer.id))
+            .where(
+                Customer.company_id == self.company_id,
+                Customer.omie_codigo.is_(None),
+                Customer.document.in_({linha['document'] for linha in pendentes})
+            )
+            .group_by(Customer.document)
+        ).all())
+        usados = {linha['id'] for linha in linhas}
+        for linha in pendentes:
+            # Dois clientes do Omie com o mesmo documento: só o primeiro assume a linha importada
+            id_local = por_documento.pop(linha['document'], None)
+            if id_local is not None and id_local not in usados:
+                linha['id'] = id_local
+                usados.add(id_local)
+
+    def _paginas(self, pagina_inicial=1, **filtros):
+        return self.omie.iter_paginas_clientes(
+            registros_por_pagina=self.registros_por_pagina,
+            max_workers=self.max_workers,
+            pagina_inicial=pagina_inicial,
+            apenas_importado_api=self.apenas_importado_api,
+            **filtros
+        )
+
+    def _carga_inicial(self, estado, resumo):
+        # Durante a carga a marca d'água guarda o início dela, gravado antes da
+        # página 1 para valer também quando a carga é retomada em outra execução
+        if estado.next_page == 1 or estado.watermark is None:
+            estado.watermark = agora_omie()
+            self.session.commit()
+        inicio = estado.watermark
+        maior = None
+        for dados in self._paginas(pagina_inicial=estado.next_page):
+            gravados, maior_data = self._gravar(dados.get('clientes_cadastro', []))
+            if maior_data and (maior is None or maior_data > maior):
+                maior = maior_data
+            estado.next_page = dados.get('pagina', estado.next_page) + 1
+            # Página gravada na mesma transação dos clientes
+            self.session.commit()
+            resumo['paginas'] += 1
+            resumo['registros'] += gravados
+
+        estado.watermark = min(inicio, maior) if maior else inicio
+        estado.full_load_done = True
+        estado.next_page = 1
+
+    def _delta(self, estado, resumo):
+        desde = estado.watermark - self.margem
+        filtros = {
+            'filtrar_por_data_de': desde.strftime('%d/%m/%Y'),
+            'filtrar_por_hora_de': desde.strftime('%H:%M:%S')
+        }
+        inicio = agora_omie()
+        maior = estado.watermark
+        for dados in self._paginas(**filtros):
+            gravados, maior_data = self._gravar(dados.get('clientes_cadastro', []))
+            if maior_data and maior_data > maior:
+                maior = maior_data
+            self.session.commit()
+            resumo['paginas'] += 1
+            resumo['registros'] += gravados
+
+        # As páginas do delta não vêm ordenadas por data: só avança no final, e
+        # não além do início (alterações durante o delta entram no próximo)
+        estado.watermark = max(estado.watermark, min(inicio, maior))
+
+    def executar(self, completo=False):
+        """
+        Executa a sincronização e retorna um resumo (modo, páginas, registros)
+        """
+        estado = self._estado()
+        if completo and estado.full_load_done:
+            estado.full_load_done = False
+            estado.next_page = 1
+
+        modo = 'delta' if estado.full_load_done and estado.watermark else 'completo'
+        resumo = {'modo': modo, 'paginas': 0, 'registros': 0}
+        try:
+            if modo == 'completo':
+                self._carga_inicial(estado, resumo)
+            else:
+                self._delta(estado, resumo)
+            estado.last_run_at = datetime.utcnow()
+            estado.last_error = None
+            self.session.commit()
+        except Exception as e:
+            self.session.rollback()
+            estado = self._estado()
+            estado.last_error = str(e)
+            self.session.commit()
+            raise
+
+        resumo['watermark'] = estado.watermark.isoformat() if estado.watermark else None
+        return resumo
+
+    def enviar(self, customers=None, tamanho_lote=OMIE_LOTE_SIZE, max_workers=OMIE_LOTE_WORKERS):
+        """
+        Envia clientes locais ao Omie com UpsertClientesPorLote
+
+        Sem `customers`, envia os clientes da empresa que ainda não têm
+        omie_codigo. Os enviados com sucesso ficam vinculados pelo
+        omie_integracao; o omie_codigo chega na próxima sincronização.
+        Retorna o resumo de upsert_clientes_por_lote (sem a lista de resultados).
+        """
+        if customers is None:
+            customers = self.session.execute(
+                select(Customer).where(Customer.company_id == self.company_id, Customer.omie_codigo.is_(None))
+            ).scalars().all()
+
+        por_integracao = {}
+        clientes = []
+        for customer in customers:
+            cliente = customer_para_cliente(customer)
+            por_integracao[cliente['codigo_cliente_integracao']] = customer.id
+            clientes.append(cliente)
+
+        response = self.omie.upsert_clientes_por_lote(clientes, tamanho_lote=tamanho_lote, max_workers=max_workers)
+        resumo = dict(response['data'])
+        resultados = resumo.pop('resultados')
+
+        vinculados = [
+            {'b_id': por_integracao[resultado['codigo_cliente_integracao']],
+             'b_integracao': resultado['codigo_cliente_integracao']}
+            for resultado in resultados if resultado['success']
+        ]
+        if vinculados:
+            tabela = Customer.__table__
+            self.session.connection().execute(
+                update(tabela).where(tabela.c.id == bindparam('b_id')).values(omie_integracao=bindparam('b_integracao')),
+                vinculados
+            )
+            self.session.commit()
+        resumo['erros'] = [resultado for resultado in resultados if not resultado['success']][:100]
+        return resumo
@@ -1,5 +1,15 @@
 from .auth import auth_bp
+from .resources import resources_bp
+from .sales import sales_bp
+from .dashboard import dashboard_bp
+from .reports import reports_bp
+from .service_orders import service_orders_bp
 
 def register_routes(app):
     """Registra todas as blueprints da aplicação"""
     app.register_blueprint(auth_bp, url_prefix='/auth')
+    app.register_blueprint(resources_bp, url_prefix='/api')
+    app.register_blueprint(sales_bp, url_prefix='/api')
+    app.register_blueprint(dashboard_bp, url_prefix='/api')
+    app.register_blueprint(reports_bp, url_prefix='/api')
+    app.register_blueprint(service_orders_bp, url_prefix='/api')
@@ -1,54 +1,77 @@
 from flask import Blueprint, request, jsonify
 from models.user import User
 from database.connection import db
-from auth.jwt_manager import generate_token
+from auth.jwt_manager import generate_token, token_required, revoke_token, revoke_user_tokens
+from auth.password_pool import PoolSaturado
+from auth.permissions import get_permission_matrix
+from database.tenant import sem_tenant
 import uuid
 import logging
 
+logger = logging.getLogger(__name__)
+
 auth_bp = Blueprint('auth', __name__)
 
+
+@auth_bp.errorhandler(PoolSaturado)
+def pool_saturado(e):
+    logger.warning('Pool de senhas saturado; requisição recusada')
+    response = jsonify({'message': 'Servidor ocupado, tente novamente em instantes'})
+    response.headers['Retry-After'] = str(e.retry_after)
+    return response, 503
+
+
 @auth_bp.route('/login', methods=['POST'])
 def login():
     try:
         data = request.get_json()
-        print("Dados recebidos:", data)  # Log dos dados recebidos
         
         if not data:
-            print("Sem dados no request")
+            logger.info('Login sem dados no request')
             return jsonify({'message': 'Dados não fornecidos'}), 400
         
         if not data.get('email') or not data.get('password'):
-            print("Email ou senha não fornecidos")
+            logger.info('Login sem email ou senha')
             return jsonify({'message': 'Email e senha são obrigatórios'}), 400
         
-        user = User.query.filter_by(email=data['email']).first()
-        print("Usuário encontrado:", user.email if user else None)  # Log do usuário encontrado
+        # Login ainda não tem empresa: a busca pelo email é entre todas
+        with sem_tenant():
+            user = User.query.filter_by(email=data['email']).first()
         
         if not user:
-            print("Usuário não encontrado")
+            logger.info('Login recusado: usuário não encontrado')
             return jsonify({'message': 'Email ou senha inválidos'}), 401
         
         if not user.check_password(data['password']):
-            print("Senha incorreta")
+            logger.info('Login recusado: senha incorreta', extra={'user_id': user.id})
             return jsonify({'message': 'Email ou senha inválidos'}), 401
         
         if not user.is_active:
-            print("Usuário inativo")
+            logger.info('Login recusado: usuário inativo', extra={'user_id': user.id})
             return jsonify({'message': 'Usuário inativo'}), 401
         
-        token = generate_token(user.id, user.role_id)
-        print("Token gerado com sucesso")  # Log do token gerado
+        if db.session.is_modified(user):
+            # Hash refeito com o custo atual
+            with sem_tenant():
+                db.session.commit()
+        
+        matrix = get_permission_matrix()
+        matrix.sincronizar()
+        token = generate_token(user.id, user.role_id, permissions_version=matrix.versao,
+                               company_id=user.company_id)
+        logger.info('Login realizado', extra={'user_id': user.id})
         
         response_data = {
             'token': token,
             'user': user.to_dict()
         }
-        print("Resposta:", response_data)  # Log da resposta
         
         return jsonify(response_data)
         
+    except PoolSaturado:
+        raise
     except Exception as e:
-        print("Erro no login:", str(e))  # Log do erro
+        logger.exception('Erro no login')
         return jsonify({
             'message': 'Erro interno no servidor',
             'error': str(e)
@@ -63,23 +86,30 @@ def register():
         if not data.get(field):
             return jsonify({'message': f'Campo {field} é obrigatório'}), 400
     
-    if User.query.filter_by(email=data['email']).first():
+    with sem_tenant():
+        email_em_uso = User.query.filter_by(email=data['email']).first()
+    if email_em_uso:
         return jsonify({'message': 'Email já cadastrado'}), 400
     
+    # O cadastro é público: empresa e role do corpo seriam escolhidos por quem se
+    # cadastra. O usuário nasce sem os dois (o token não acessa nenhuma empresa)
+    # até um administrador vinculá-lo.
+    if data.get('company_id') or data.get('role_id'):
+        return jsonify({'message': 'Empresa e perfil são definidos por um administrador'}), 400
     user = User(
         id=str(uuid.uuid4()),
         email=data['email'],
-        name=data['name'],
-        company_id=data.get('company_id'),
-        role_id=data.get('role_id')
+        name=data['name']
     )
     user.set_password(data['password'])
     
     try:
         db.session.add(user)
-        db.session.commit()
+        with sem_tenant():
+            db.session.commit()
         
-        token = generate_token(user.id, user.role_id)
+        token = generate_token(user.id, user.role_id, permissions_version=get_permission_matrix().versao,
+                               company_id=user.company_id)
         
         return jsonify({
             'message': 'Usuário criado com sucesso',
@@ -89,3 +119,21 @@ def register():
     except Exception as e:
         db.session.rollback()
         return jsonify({'message': 'Erro ao criar usuário', 'error': str(e)}), 500
+
+@auth_bp.route('/logout', methods=['POST'])
+@token_required
+def logout():
+    """Revoga o token usado na requisição"""
+    if not request.token_payload.get('jti'):
+        return jsonify({'message': 'Token sem identificador; use /auth/logout-all'}), 400
+    revoke_token(request.token_payload)
+    logger.info('Logout', extra={'user_id': request.user_id})
+    return jsonify({'message': 'Logout realizado'})
+
+@auth_bp.route('/logout-all', methods=['POST'])
+@token_required
+def logout_all():
+    """Revoga todos os tokens do usuário (todas as sessões)"""
+    revoke_user_tokens(request.user_id)
+    logger.info('Logout de todas as sessões', extra={'user_id': request.user_id})
+    return jsonify({'message': 'Todas as sessões foram encerradas'})
@@ -0,0 +1,97 @@
+import logging
+from datetime import date, datetime, timedelta
+from flask import Blueprint, request, jsonify
+from database.connection import db
+from database.instrumentation import query_budget
+from auth.permissions import require_permission
+from routes.resources import ParametroInvalido
+from services.rollups import receita_diaria, top_produtos, top_clientes, inicio_do_mes
+from config import DASHBOARD_MAX_DAYS
+
+logger = logging.getLogger(__name__)
+
+dashboard_bp = Blueprint('dashboard', __name__)
+
+# Todas as consultas daqui leem só as tabelas de resumo (services.rollups)
+
+
+@dashboard_bp.errorhandler(ParametroInvalido)
+def parametro_invalido(e):
+    return jsonify({'message': str(e)}), 400
+
+
+def parametro_data(nome, padrao):
+    valor = request.args.get(nome)
+    if not valor:
+        return padrao
+    try:
+        return date.fromisoformat(valor)
+    except ValueError:
+        raise ParametroInvalido(f'{nome} deve estar no formato AAAA-MM-DD')
+
+
+def _mes():
+    valor = request.args.get('month')
+    if not valor:
+        return inicio_do_mes(datetime.utcnow().date())
+    try:
+        return datetime.strptime(valor, '%Y-%m').date()
+    except ValueError:
+        raise ParametroInvalido('month deve estar no formato AAAA-MM')
+
+
+def _limite():
+    try:
+        limite = int(request.args.get('limit', 10))
+    except ValueError:
+        raise ParametroInvalido('limit deve ser um número')
+    if not 1 <= limite <= 100:
+        raise ParametroInvalido('limit deve estar entre 1 e 100')
+    return limite
+
+
+def _empresa():
+    if not request.company_id:
+        raise ParametroInvalido('Usuário sem empresa')
+    return request.company_id
+
+
+@dashboard_bp.route('/dashboard/revenue', methods=['GET'])
+@require_permission('vendas', 'read')
+@query_budget(5)
+def receita():
+    """Série diária de vendas/receita de ?from= a ?to= (padrão: últimos 30 dias)"""
+    fim = parametro_data('to', datetime.utcnow().date())
+    inicio = parametro_data('from', fim - timedelta(days=29))
+    if inicio > fim:
+        raise ParametroInvalido('from deve ser anterior a to')
+    if (fim - inicio).days + 1 > DASHBOARD_MAX_DAYS:
+        raise ParametroInvalido(f'Período máximo de {DASHBOARD_MAX_DAYS} dias')
+
+    serie = receita_diaria(db.session, _empresa(), inicio, fim)
+    return jsonify({
+        'from': inicio.isoformat(),
+        'to': fim.isoformat(),
+        'sales_count': sum(dia['sales_count'] for dia in serie),
+        'items_quantity': sum(dia['items_quantity'] for dia in serie),
+        'revenue': round(sum(dia['revenue'] for dia in serie), 2),
+        'days': serie
+    })
+
+
+@dashboard_bp.route('/dashboard/top-products', methods=['GET'])
+@require_permission('vendas', 'read')
+@query_budget(5)
+def produtos_mais_vendidos():
+    """Produtos com maior receita no mês ?month=AAAA-MM (padrão: mês atual)"""
+    mes = _mes()
+    return jsonify({'month': mes.strftime('%Y-%m'), 'items': top_produtos(db.session, _empresa(), mes, _limite())})
+
+
+@dashboard_bp.route('/dashboard/top-customers', methods=['GET'])
+@require_permission('vendas', 'read')
+@query_budget(5)
+def melhores_clientes():
+    """Clientes com maior receita no mês ?month=AAAA-MM (padrão: mês atual)"""
+    mes = _mes()
+    return jsonify({'month': mes.strftime('%Y-%m'), 'items': top_clientes(db.session, _empresa(), mes, _limite())})
@@ -0,0 +1,41 @@
+import logging
+from flask import Blueprint, request, jsonify
+from database.instrumentation import query_budget
+from auth.permissions import require_permission
+from routes.dashboard import parametro_data
+from routes.resources import ParametroInvalido
+from services.reports import RELATORIOS, RelatorioIndisponivel, gerar_relatorio
+
+logger = logging.getLogger(__name__)
+
+reports_bp = Blueprint('reports', __name__)
+
+
+@reports_bp.errorhandler(ParametroInvalido)
+def parametro_invalido(e):
+    return jsonify({'message': str(e)}), 400
+
+
+@reports_bp.errorhandler(RelatorioIndisponivel)
+def relatorio_indisponivel(e):
+    return jsonify({'message': str(e)}), 404
+
+
+@reports_bp.route('/reports/<nome>', methods=['GET'])
+@require_permission('vendas', 'read')
+@query_budget(3)
+def relatorio(nome):
+    """
+    Relatório analítico ?from=AAAA-MM-DD&to=AAAA-MM-DD (padrão: todo o histórico),
+    calculado no último snapshot exportado da empresa, sem consultar o banco
+    """
+    if nome not in RELATORIOS:
+        return jsonify({'message': 'Relatório não encontrado', 'reports': sorted(RELATORIOS)}), 404
+    if not request.company_id:
+        raise ParametroInvalido('Usuário sem empresa')
+    inicio, fim = parametro_data('from', None), parametro_data('to', None)
+    if inicio and fim and inicio > fim:
+        raise ParametroInvalido('from deve ser anterior a to')
+
+    snapshot, linhas = gerar_relatorio(request.company_id, nome, inicio, fim)
+    return jsonify({'report': nome, 'snapshot': snapshot, 'rows': linhas})
@@ -0,0 +1,227 @@
+import base64
+import binascii
+import csv
+import io
+import logging
+from datetime import datetime
+from flask import Blueprint, Response, request, jsonify, stream_with_context
+from sqlalchemy import or_, select
+from database.connection import db
+from models import Company, Customer, User
+from models.serializer import get_serializer
+from auth.permissions import require_permission
+from database.instrumentation import query_budget
+from fast_json import dumps, loads
+from config import LIST_PAGE_SIZE, LIST_MAX_PAGE_SIZE, EXPORT_CHUNK_SIZE
+
+logger = logging.getLogger(__name__)
+
+resources_bp = Blueprint('resources', __name__)
+
+
+class Recurso:
+    """
+    Entidade exposta na API de listagem
+
+    `campos` são as colunas que podem ser pedidas em ?fields= (e as devolvidas
+    por padrão); `modulo` é o módulo de permissão exigido para leitura.
+    """
+
+    def __init__(self, model, modulo, campos):
+        self.model = model
+        self.modulo = modulo
+        self.campos = campos
+
+
+RECURSOS = {
+    'companies': Recurso(Company, 'empresas', (
+        'id', 'name', 'document', 'email', 'phone', 'address', 'address_number',
+        'address_complement', 'neighborhood', 'city', 'postal_code', 'state_id',
+        'latitude', 'longitude', 'created_at', 'updated_at'
+    )),
+    'customers': Recurso(Customer, 'clientes', (
+        'id', 'company_id', 'name', 'email', 'phone', 'address', 'city', 'state',
+        'document', 'omie_codigo', 'created_at', 'updated_at'
+    )),
+    # password_hash nunca sai pela API
+    'users': Recurso(User, 'usuarios', (
+        'id', 'email', 'name', 'company_id', 'role_id', 'is_active', 'created_at', 'updated_at'
+    )),
+}
+
+
+class ParametroInvalido(ValueError):
+    pass
+
+
+@resources_bp.errorhandler(ParametroInvalido)
+def parametro_invalido(e):
+    return jsonify({'message': str(e)}), 400
+
+
+def codificar_cursor(created_at, id):
+    """Cursor opaco com a posição (created_at, id) do último registro da página"""
+    return base64.urlsafe_b64encode(dumps([created_at.isoformat(), id])).decode('ascii').rstrip('=')
+
+
+def decodificar_cursor(cursor):
+    try:
+        created_at, id = loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+        return datetime.fromisoformat(created_at), id
+    except (binascii.Error, ValueError, TypeError):
+        raise ParametroInvalido('Cursor inválido')
+
+
+def _serializer_pedido(recurso):
+    """Serializador das colunas de ?fields= (ou de todas as do recurso)"""
+    fields = request.args.get('fields')
+    if not fields:
+        return get_serializer(recurso.model, recurso.campos)
+    campos = tuple(dict.fromkeys(campo.strip() for campo in fields.split(',') if campo.strip()))
+    desconhecidos = [campo for campo in campos if campo not in recurso.campos]
+    if desconhecidos:
+        raise ParametroInvalido(f"Campos inválidos: {', '.join(desconhecidos)}")
+    return get_serializer(recurso.model, campos)
+
+
+def _consulta(recurso, serializer):
+    """
+    SELECT só das colunas pedidas (mais created_at e id, usados na ordenação e
+    no cursor), em ordem (created_at, id)
+    """
+    model = recurso.model
+    extras = [coluna for coluna in (model.created_at, model.id) if coluna.key not in serializer.campos]
+    return (
+        select(*serializer.colunas, *extras)
+        .where(model.created_at.isnot(None))
+        .order_by(model.created_at, model.id)
+    )
+
+
+def _recurso(nome):
+    recurso = RECURSOS.get(nome)
+    if recurso is None:
+        raise ParametroInvalido(f'Recurso desconhecido: {nome}')
+    return recurso
+
+
+def listar(nome):
+    """
+    Página de registros com paginação por cursor (keyset)
+
+    Parâmetros: limit (até LIST_MAX_PAGE_SIZE), cursor (next_cursor da página
+    anterior) e fields (colunas separadas por vírgula). O custo de cada página
+    não depende de quantas já foram lidas, ao contrário de OFFSET.
+    """
+    recurso = _recurso(nome)
+    serializer = _serializer_pedido(recurso)
+    try:
+        limite = int(request.args.get('limit', LIST_PAGE_SIZE))
+    except ValueError:
+        raise ParametroInvalido('limit deve ser um número')
+    limite = max(1, min(limite, LIST_MAX_PAGE_SIZE))
+
+    model = recurso.model
+    consulta = _consulta(recurso, serializer)
+    cursor = request.args.get('cursor')
+    if cursor:
+        created_at, id = decodificar_cursor(cursor)
+        # Equivale a (created_at, id) > (x, y); o created_at >= x separado dá ao
+        # MySQL e ao SQLite o início do range no índice (created_at, id)
+        consulta = consulta.where(
+            model.created_at >= created_at,
+            or_(model.created_at > created_at, model.id > id)
+        )
+
+    linhas = db.session.execute(consulta.limit(limite + 1)).all()
+    proximo = None
+    if len(linhas) > limite:
+        linhas = linhas[:limite]
+        ultima = linhas[-1]
+        proximo = codificar_cursor(ultima.created_at, ultima.id)
+
+    registros = list(map(serializer.json_linha, linhas))
+    return Response(
+        dumps({'data': registros, 'next_cursor': proximo, 'registros': len(registros)}),
+        mimetype='application/json'
+    )
+
+
+def _exportar_ndjson(linhas, serializer):
+    json_linha = serializer.json_linha
+    buffer = bytearray()
+    for linha in linhas:
+        buffer += dumps(json_linha(linha))
+        buffer += b'\n'
+        if len(buffer) >= 65536:
+            yield bytes(buffer)
+            buffer.clear()
+    if buffer:
+        yield bytes(buffer)
+
+
+def _exportar_csv(linhas, serializer):
+    de_linha = serializer.de_linha
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer)
+    escritor.writerow(serializer.campos)
+    for linha in linhas:
+        escritor.writerow(de_linha(linha).values())
+        if buffer.tell() >= 65536:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def exportar(nome):
+    """
+    Exportação completa em NDJSON (padrão) ou CSV (?format=csv)
+
+    As linhas vêm do banco em blocos de EXPORT_CHUNK_SIZE (yield_per, com cursor
+    no servidor) e são escritas na resposta à medida que chegam; o resultado
+    inteiro nunca fica em memória.
+    """
+    recurso = _recurso(nome)
+    serializer = _serializer_pedido(recurso)
+    formato = request.args.get('format', 'ndjson')
+    if formato not in ('ndjson', 'csv'):
+        raise ParametroInvalido('format deve ser ndjson ou csv')
+
+    consulta = _consulta(recurso, serializer).execution_options(yield_per=EXPORT_CHUNK_SIZE)
+
+    def gerar():
+        resultado = db.session.execute(consulta)
+        try:
+            if formato == 'csv':
+                yield from _exportar_csv(resultado, serializer)
+            else:
+                yield from _exportar_ndjson(resultado, serializer)
+        finally:
+            resultado.close()
+
+    if formato == 'csv':
+        mimetype = 'text/csv'
+        nome_arquivo = f'{nome}.csv'
+    else:
+        mimetype = 'application/x-ndjson'
+        nome_arquivo = f'{nome}.ndjson'
+    response = Response(stream_with_context(gerar()), mimetype=mimetype)
+    response.headers['Content-Disposition'] = f'attachment; filename={nome_arquivo}'
+    return response
+
+
+# Consultas por requisição: denylist e matriz de permissões (quando vencem) + a listagem
+ORCAMENTO_CONSULTAS = 6
+
+
+def _registrar(nome, recurso):
+    """Rotas de listagem e exportação do recurso, com a permissão de leitura do módulo"""
+    leitura = require_permission(recurso.modulo, 'read')
+    orcamento = query_budget(ORCAMENTO_CONSULTAS)
+    resources_bp.add_url_rule(f'/{nome}', f'listar_{nome}', leitura(orcamento(lambda: listar(nome))))
+    resources_bp.add_url_rule(f'/{nome}/export', f'exportar_{nome}', leitura(orcamento(lambda: exportar(nome))))
+
+
+for nome, recurso in RECURSOS.items():
+    _registrar(nome, recurso)
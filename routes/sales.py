@@ -0,0 +1,80 @@
+import logging
+from flask import Blueprint, request, jsonify
+from database.connection import db
+from database.instrumentation import query_budget
+from auth.permissions import require_permission
+from models.customer import Customer
+from services.sales import registrar_venda, cancelar_venda, VendaInvalida, EstoqueInsuficiente
+
+logger = logging.getLogger(__name__)
+
+sales_bp = Blueprint('sales', __name__)
+
+
+@sales_bp.errorhandler(VendaInvalida)
+def venda_invalida(e):
+    return jsonify({'message': str(e)}), 400
+
+
+@sales_bp.errorhandler(EstoqueInsuficiente)
+def estoque_insuficiente(e):
+    return jsonify({'message': str(e), 'product_id': e.product_id}), 409
+
+
+@sales_bp.route('/sales', methods=['POST'])
+@require_permission('vendas', 'write')
+@query_budget(15)
+def criar_venda():
+    """
+    Registra uma venda da empresa do token
+
+    Corpo: {"items": [{"product_id": ..., "quantity": 2}], "customer_id": ...,
+    "payment_method": ...}. Responde 400 para pedido malformado ou produto
+    inexistente e 409 se algum produto não tiver estoque.
+    """
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        raise VendaInvalida('Corpo da requisição deve ser um objeto JSON')
+    company_id = request.company_id
+    if not company_id:
+        return jsonify({'message': 'Usuário sem empresa'}), 400
+
+    customer_id = data.get('customer_id')
+    if customer_id is not None and not isinstance(customer_id, str):
+        raise VendaInvalida('customer_id inválido')
+    if customer_id and db.session.get(Customer, customer_id) is None:
+        raise VendaInvalida('Cliente não encontrado')
+    payment_method = data.get('payment_method')
+    if payment_method is not None and (not isinstance(payment_method, str) or len(payment_method) > 30):
+        raise VendaInvalida('payment_method inválido')
+
+    venda = registrar_venda(
+        db.session, company_id, data.get('items'),
+        customer_id=customer_id, payment_method=payment_method
+    )
+    logger.info('Venda registrada', extra={'sale_id': venda['id'], 'itens': len(venda['items'])})
+    return jsonify({
+        'id': venda['id'],
+        'total': float(venda['total']),
+        'items': [
+            {
+                'product_id': item['product_id'], 'quantity': item['quantity'],
+                'unit_price': float(item['unit_price']), 'total': float(item['total'])
+            }
+            for item in venda['items']
+        ]
+    }), 201
+
+
+@sales_bp.route('/sales/<sale_id>/cancel', methods=['POST'])
+@require_permission('vendas', 'write')
+@query_budget(15)
+def cancelar(sale_id):
+    """Cancela uma venda confirmada da empresa do token, devolvendo o estoque"""
+    company_id = request.company_id
+    if not company_id:
+        return jsonify({'message': 'Usuário sem empresa'}), 400
+
+    venda = cancelar_venda(db.session, company_id, sale_id)
+    logger.info('Venda cancelada', extra={'sale_id': sale_id, 'itens': len(venda['items'])})
+    return jsonify({'id': venda['id'], 'status': venda['status']})
@@ -0,0 +1,137 @@
+import logging
+from datetime import datetime, timedelta, timezone
+from flask import Blueprint, request, jsonify
+from database.connection import db
+from database.instrumentation import query_budget
+from auth.permissions import require_permission
+from models.customer import Customer
+from models.service import Service
+from routes.dashboard import parametro_data
+from routes.resources import ParametroInvalido
+from services.scheduling import (
+    agendar, cancelar_ordem, conflitos, proximo_horario, utilizacao, AgendamentoInvalido, ConflitoAgenda
+)
+from config import SCHEDULING_DEFAULT_MINUTES, DASHBOARD_MAX_DAYS
+
+logger = logging.getLogger(__name__)
+
+service_orders_bp = Blueprint('service_orders', __name__)
+
+
+@service_orders_bp.errorhandler(ParametroInvalido)
+@service_orders_bp.errorhandler(AgendamentoInvalido)
+def parametro_invalido(e):
+    return jsonify({'message': str(e)}), 400
+
+
+@service_orders_bp.errorhandler(ConflitoAgenda)
+def conflito_agenda(e):
+    return jsonify({'message': str(e), 'conflicts': e.conflitos}), 409
+
+
+def _momento(valor, nome):
+    """Data/hora ISO 8601; com fuso, convertida para UTC sem fuso (como no banco)"""
+    try:
+        momento = datetime.fromisoformat(valor)
+    except (TypeError, ValueError):
+        raise ParametroInvalido(f'{nome} deve ser uma data/hora ISO 8601')
+    if momento.tzinfo is not None:
+        momento = momento.astimezone(timezone.utc).replace(tzinfo=None)
+    return momento
+
+
+def _duracao(valor):
+    try:
+        minutos = int(valor if valor is not None else SCHEDULING_DEFAULT_MINUTES)
+    except (TypeError, ValueError):
+        raise ParametroInvalido('duration_minutes deve ser um número')
+    if minutos <= 0:
+        raise ParametroInvalido('duration_minutes deve ser positivo')
+    return timedelta(minutes=minutos)
+
+
+def _empresa():
+    if not request.company_id:
+        raise ParametroInvalido('Usuário sem empresa')
+    return request.company_id
+
+
+@service_orders_bp.route('/service-orders', methods=['POST'])
+@require_permission('ordens_servico', 'write')
+@query_budget(15)
+def criar_ordem():
+    """
+    Agenda uma ordem de serviço para um técnico
+
+    Corpo: {"technician_id", "customer_id", "service_id", "scheduled_date",
+    "scheduled_end" ou "duration_minutes", "notes"}. Responde 409 com as ordens
+    em conflito se o horário já estiver reservado.
+    """
+    data = request.get_json(silent=True) or {}
+    company_id = _empresa()
+    for campo in ('technician_id', 'customer_id', 'service_id', 'scheduled_date'):
+        if not data.get(campo):
+            raise ParametroInvalido(f'{campo} é obrigatório')
+    if db.session.get(Customer, data['customer_id']) is None:
+        raise ParametroInvalido('Cliente não encontrado')
+    if db.session.get(Service, data['service_id']) is None:
+        raise ParametroInvalido('Serviço não encontrado')
+
+    inicio = _momento(data['scheduled_date'], 'scheduled_date')
+    if data.get('scheduled_end'):
+        fim = _momento(data['scheduled_end'], 'scheduled_end')
+    else:
+        fim = inicio + _duracao(data.get('duration_minutes'))
+
+    ordem = agendar(
+        db.session, company_id, data['technician_id'], inicio, fim,
+        customer_id=data['customer_id'], service_id=data['service_id'], notes=data.get('notes')
+    )
+    return jsonify(ordem), 201
+
+
+@service_orders_bp.route('/service-orders/<order_id>/cancel', methods=['POST'])
+@require_permission('ordens_servico', 'write')
+@query_budget(10)
+def cancelar(order_id):
+    """Cancela a ordem e libera o horário do técnico"""
+    return jsonify(cancelar_ordem(db.session, _empresa(), order_id))
+
+
+@service_orders_bp.route('/schedule/<technician_id>/conflicts', methods=['GET'])
+@require_permission('ordens_servico', 'read')
+@query_budget(5)
+def listar_conflitos(technician_id):
+    """Ordens do técnico que cruzam ?start=&end= (ISO 8601)"""
+    inicio = _momento(request.args.get('start'), 'start')
+    fim = _momento(request.args.get('end'), 'end')
+    return jsonify({'conflicts': conflitos(db.session, _empresa(), technician_id, inicio, fim)})
+
+
+@service_orders_bp.route('/schedule/<technician_id>/next-slot', methods=['GET'])
+@require_permission('ordens_servico', 'read')
+@query_budget(5)
+def proximo_livre(technician_id):
+    """Primeiro horário livre a partir de ?after= (padrão: agora) para ?duration_minutes="""
+    apos = _momento(request.args['after'], 'after') if request.args.get('after') else datetime.utcnow()
+    limite = _momento(request.args['before'], 'before') if request.args.get('before') else None
+    duracao = _duracao(request.args.get('duration_minutes'))
+    inicio = proximo_horario(db.session, _empresa(), technician_id, apos, duracao, limite)
+    return jsonify({
+        'scheduled_date': inicio.isoformat() if inicio else None,
+        'scheduled_end': (inicio + duracao).isoformat() if inicio else None
+    })
+
+
+@service_orders_bp.route('/schedule/<technician_id>/utilization', methods=['GET'])
+@require_permission('ordens_servico', 'read')
+@query_budget(5)
+def utilizacao_por_dia(technician_id):
+    """Minutos reservados e utilização da capacidade diária de ?from= a ?to= (padrão: próximos 7 dias)"""
+    inicio = parametro_data('from', datetime.utcnow().date())
+    fim = parametro_data('to', inicio + timedelta(days=6))
+    if inicio > fim:
+        raise ParametroInvalido('from deve ser anterior a to')
+    if (fim - inicio).days + 1 > DASHBOARD_MAX_DAYS:
+        raise ParametroInvalido(f'Período máximo de {DASHBOARD_MAX_DAYS} dias')
+    return jsonify({'days': utilizacao(db.session, _empresa(), technician_id, inicio, fim)})
@@ -0,0 +1,45 @@
+"""
+Reconstrói os resumos de vendas (dashboards) a partir de sales/sale_items
+
+Divide o histórico em pedaços de (empresa, mês) e recalcula cada um numa
+transação, com --workers pedaços em paralelo. Pode ser rodado com o sistema no
+ar e repetido quantas vezes for preciso (cada pedaço é apagado e regravado).
+Uso: python scripts/backfill_rollups.py [--empresa <company_id>] [--de 2024-01-01]
+     [--ate 2024-12-31] [--workers 4]
+"""
+import argparse
+import json
+import os
+import sys
+from datetime import date
+
+# Adiciona o diretório raiz ao PYTHONPATH
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database.connection import create_db_engine
+from services.rollups import reconstruir
+from config import ROLLUP_BACKFILL_WORKERS
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--empresa', help='Só esta empresa (padrão: todas)')
+    parser.add_argument('--de', type=date.fromisoformat, help='Primeiro dia (AAAA-MM-DD)')
+    parser.add_argument('--ate', type=date.fromisoformat, help='Último dia (AAAA-MM-DD)')
+    parser.add_argument('--workers', type=int, default=ROLLUP_BACKFILL_WORKERS)
+    args = parser.parse_args()
+
+    def progresso(concluidos, total):
+        print(f'\r{concluidos}/{total} meses', end='', flush=True)
+
+    engine = create_db_engine()
+    try:
+        resumo = reconstruir(engine, args.empresa, args.de, args.ate, workers=args.workers, progresso=progresso)
+    finally:
+        engine.dispose()
+    print()
+    print(json.dumps(resumo, indent=2))
+
+
+if __name__ == '__main__':
+    main()
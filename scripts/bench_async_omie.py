@@ -0,0 +1,116 @@
+"""
+Benchmark: cliente síncrono chamado dentro do event loop x AsyncOmieAPI
+
+Sobe o stub local do Omie e mede requisições/s com 100 clientes simultâneos.
+Confere também que o rate limit com estado em arquivo não prende o event loop
+enquanto outro processo segura o flock (sai com código 1 se prender).
+Uso: python scripts/bench_async_omie.py [--clientes 100] [--requisicoes 1000] [--latencia 0.05]
+"""
+import argparse
+import asyncio
+import fcntl
+import os
+import sys
+import tempfile
+import threading
+import time
+
+# Adiciona o diretório raiz ao PYTHONPATH
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from omie_api import OmieAPI
+from async_omie_api import AsyncOmieAPI
+from omie_ratelimit import TokenBucket
+from scripts.omie_stub_server import iniciar_stub
+
+
+async def rodar(chamada, clientes, requisicoes):
+    """Dispara `requisicoes` chamadas com no máximo `clientes` em andamento"""
+    fila = asyncio.Queue()
+    for _ in range(requisicoes):
+        fila.put_nowait(None)
+
+    async def worker():
+        while not fila.empty():
+            fila.get_nowait()
+            response = await chamada()
+            assert response['success'], response
+
+    inicio = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(clientes)))
+    return requisicoes / (time.perf_counter() - inicio)
+
+
+async def conferir_flock():
+    """acquire_async com o arquivo de estado travado por outro: o loop segue rodando"""
+    with tempfile.NamedTemporaryFile(suffix='.json') as arquivo:
+        limitador = TokenBucket(state_file=arquivo.name)
+        travado = threading.Event()
+
+        def travar():
+            with open(arquivo.name, 'a+') as outro:
+                fcntl.flock(outro, fcntl.LOCK_EX)
+                travado.set()
+                time.sleep(0.5)
+                fcntl.flock(outro, fcntl.LOCK_UN)
+
+        thread = threading.Thread(target=travar)
+        thread.start()
+        travado.wait()
+        ticks = 0
+
+        async def contar():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        contador = asyncio.create_task(contar())
+        await limitador.acquire_async()
+        await limitador.on_success_async()
+        contador.cancel()
+        thread.join()
+    # ~50 ticks em 0,5 s; com o loop preso, nenhum
+    print(f'Event loop durante o flock de outro processo: {ticks} ticks em 0,5 s')
+    return ticks >= 10
+
+
+async def main(args):
+    if not await conferir_flock():
+        print('FALHOU acquire_async prendeu o event loop')
+        sys.exit(1)
+    servidor, base_url = iniciar_stub(latencia=args.latencia)
+    try:
+        # O benchmark mede o cliente HTTP, não o rate limit do Omie
+        sem_limite = TokenBucket(rate=1e9, capacity=1e9, max_rate=1e9, state_file=None)
+        sync_client = OmieAPI(base_url=base_url, limiter=sem_limite, cache_ttls={})
+
+        async def chamada_bloqueante():
+            # Comportamento antigo das rotas FastAPI: chamada síncrona no event loop
+            return sync_client.listar_clientes(pagina=1, registros_por_pagina=5)
+
+        async_client = AsyncOmieAPI(base_url=base_url, max_concurrency=args.clientes, limiter=sem_limite)
+
+        async def chamada_assincrona():
+            return await async_client.listar_clientes(pagina=1, registros_por_pagina=5)
+
+        # O caminho bloqueante é serializado; usa menos requisições para não demorar
+        bloqueante = await rodar(chamada_bloqueante, args.clientes, max(1, args.requisicoes // 10))
+        assincrono = await rodar(chamada_assincrona, args.clientes, args.requisicoes)
+        await async_client.close()
+        sync_client.close()
+    finally:
+        servidor.shutdown()
+
+    print(f"Clientes simultâneos: {args.clientes} | latência do stub: {args.latencia * 1000:.0f} ms")
+    print(f"OmieAPI (bloqueante no event loop): {bloqueante:8.1f} req/s")
+    print(f"AsyncOmieAPI:                       {assincrono:8.1f} req/s")
+    print(f"Ganho: {assincrono / bloqueante:.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--clientes", type=int, default=100)
+    parser.add_argument("--requisicoes", type=int, default=1000)
+    parser.add_argument("--latencia", type=float, default=0.05)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,234 @@
+"""
+Conferência e benchmark do pipeline de geocodificação
+
+Popula empresas e clientes em SQLite (arquivo temporário) com endereços repetidos
+em grafias diferentes, incompletos e de UF inexistente, e roda o pipeline com o
+geocodificador local. Confere que cada endereço distinto foi ao geocodificador
+uma única vez, que todos os cadastros com o mesmo endereço receberam o mesmo
+ponto, que o limitador segurou o ritmo (inclusive após um 429 simulado) e que
+execuções seguintes saem inteiras do cache. Sai com código 1 se algo divergir.
+Uso: python scripts/bench_geocoding.py [--empresas 200] [--clientes 20000]
+     [--enderecos 2000] [--taxa 20]
+"""
+import argparse
+import logging
+import math
+import os
+import random
+import sys
+import tempfile
+import time
+import warnings
+
+# Adiciona o diretório raiz ao PYTHONPATH
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+from sqlalchemy import func, insert, select
+from database.connection import db
+from models import Company, Customer, GeocodeCache
+from models.state import State
+from services.geocoding import (
+    LimiteGeocoder, StubGeocoder, criar_limitador, geocodificar, normalizar_endereco
+)
+
+EMPRESA = 'empresa-bench'
+RUAS = ('Avenida Presidente Vargas', 'Rua São João', 'Travessa Dom Romualdo', 'Rua Doutor Moraes',
+        'Alameda Santos', 'Rodovia Augusto Montenegro', 'Praça da República', 'Rua Oliveira Belo')
+CIDADES = (('Belém', 'PA'), ('São Paulo', 'SP'), ('Curitiba', 'PR'), ('Fortaleza', 'CE'), ('Goiânia', 'GO'))
+ABREVIADAS = {'Avenida': 'Av.', 'Rua': 'R.', 'Travessa': 'Tv.', 'Alameda': 'Al.', 'Rodovia': 'Rod.',
+              'Praça': 'Pç', 'Doutor': 'Dr.', 'Presidente': 'Pres.', 'São': 'S.'}
+
+
+class GeocoderComLimite(StubGeocoder):
+    """Stub que responde 429 a cada `a_cada` chamadas, como um provedor real no limite"""
+
+    def __init__(self, a_cada=20):
+        super().__init__()
+        self.a_cada = a_cada
+        self.recusadas = 0
+        self.instantes = []
+        self.geocodificados = []
+
+    def geocodificar(self, enderecos):
+        self.instantes.append(time.perf_counter())
+        if len(self.instantes) % self.a_cada == 0:
+            self.recusadas += 1
+            raise LimiteGeocoder(retry_after=0.1)
+        self.geocodificados.extend(endereco.chave for endereco in enderecos)
+        return super().geocodificar(enderecos)
+
+
+def grafia(aleatorio, rua):
+    """A mesma rua escrita de outro jeito (abreviada, sem acento, em maiúsculas)"""
+    for extenso, abreviado in ABREVIADAS.items():
+        if aleatorio.random() < 0.5:
+            rua = rua.replace(extenso, abreviado)
+    if aleatorio.random() < 0.3:
+        rua = rua.replace('ã', 'a').replace('ç', 'c').replace('é', 'e')
+    return rua.upper() if aleatorio.random() < 0.3 else rua
+
+
+def endereco_aleatorio(aleatorio, enderecos):
+    """(logradouro, número, cidade, uf): ~5% sem cidade/UF e ~3% em UF inexistente"""
+    rua, numero, cidade, uf = enderecos[aleatorio.randrange(len(enderecos))]
+    sorteio = aleatorio.random()
+    if sorteio < 0.05:
+        return grafia(aleatorio, rua), numero, None, None
+    if sorteio < 0.08:
+        return grafia(aleatorio, rua), numero, cidade, 'XX'
+    return grafia(aleatorio, rua), numero, cidade, uf
+
+
+def popular(aleatorio, empresas, clientes, distintos):
+    enderecos = [
+        (aleatorio.choice(RUAS), str(aleatorio.randint(1, 3000)), *aleatorio.choice(CIDADES))
+        for _ in range(distintos)
+    ]
+    ufs = sorted({uf for _, uf in CIDADES})
+    db.session.add_all([State(id=i + 1, name=uf, uf=uf) for i, uf in enumerate(ufs)])
+    id_uf = {uf: i + 1 for i, uf in enumerate(ufs)}
+
+    linhas = []
+    for i in range(empresas):
+        rua, numero, cidade, uf = endereco_aleatorio(aleatorio, enderecos)
+        linhas.append({'id': f'empresa-{i:05d}', 'name': f'Empresa {i}', 'document': f'{i:014d}',
+                       'address': rua, 'address_number': numero, 'address_complement': 'Sala 2',
+                       'neighborhood': 'Centro', 'city': cidade, 'state_id': id_uf.get(uf)})
+    linhas.append({'id': EMPRESA, 'name': 'Empresa', 'document': '99999999999999'})
+    db.session.execute(insert(Company), linhas)
+    db.session.execute(insert(Customer), [novo_cliente(aleatorio, enderecos, i) for i in range(clientes)])
+    db.session.commit()
+    return enderecos
+
+
+def novo_cliente(aleatorio, enderecos, i):
+    rua, numero, cidade, uf = endereco_aleatorio(aleatorio, enderecos)
+    # Clientes (Omie/importação) trazem o número junto do logradouro
+    return {'id': f'cliente-{i:06d}', 'company_id': EMPRESA, 'name': f'Cliente {i}', 'document': f'{i:011d}',
+            'address': f'{rua}, {numero}' if aleatorio.random() < 0.5 else f'{rua}, nº {numero}',
+            'city': cidade, 'state': uf}
+
+
+def esperado():
+    """Chave de cada cadastro calculada linha a linha, direto das tabelas"""
+    chaves = {}
+    for linha in db.session.execute(
+        select(Company.id, Company.address, Company.address_number, Company.city, State.uf)
+        .outerjoin(State, State.id == Company.state_id)
+    ):
+        endereco = normalizar_endereco(linha.address, linha.address_number, None, linha.city, linha.uf)
+        chaves[('companies', linha.id)] = endereco
+    for linha in db.session.execute(select(Customer.id, Customer.address, Customer.city, Customer.state)):
+        chaves[('customers', linha.id)] = normalizar_endereco(linha.address, None, None, linha.city, linha.state)
+    return chaves
+
+
+def coordenadas():
+    pontos = {}
+    for model, fonte in ((Company, 'companies'), (Customer, 'customers')):
+        for linha in db.session.execute(select(model.id, model.latitude, model.longitude)):
+            pontos[(fonte, linha.id)] = None if linha.latitude is None else (linha.latitude, linha.longitude)
+    return pontos
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--empresas', type=int, default=200)
+    parser.add_argument('--clientes', type=int, default=20000)
+    parser.add_argument('--enderecos', type=int, default=2000, help='Endereços distintos sorteados')
+    parser.add_argument('--taxa', type=float, default=20, help='Chamadas por segundo ao geocodificador')
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+    warnings.filterwarnings('ignore', message='.*Decimal objects natively.*')
+
+    arquivo = tempfile.NamedTemporaryFile(suffix='.db', delete=False).name
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{arquivo}'
+    db.init_app(app)
+    aleatorio = random.Random(42)
+    divergencias = []
+
+    try:
+        with app.app_context():
+            db.create_all()
+            enderecos = popular(aleatorio, args.empresas, args.clientes, args.enderecos)
+            chaves = esperado()
+            distintas = {e.chave for e in chaves.values() if e}
+            encontraveis = {e.chave for e in chaves.values() if e and e.uf != 'XX'}
+            cadastros = len(chaves)
+            print(f'{cadastros} cadastros, {len(distintas)} endereços distintos após normalização '
+                  f'({sum(1 for e in chaves.values() if e is None)} incompletos)')
+
+            geocoder = GeocoderComLimite()
+            resumo = geocodificar(db.engine, geocoder=geocoder, limitador=criar_limitador(args.taxa))
+            print(f"1ª execução: {resumo['chamadas']} chamadas ({resumo.get('limitadas', 0)} com 429), "
+                  f"{resumo['atualizados']} cadastros atualizados em {resumo['segundos']:.2f} s")
+            ingenuo = cadastros - resumo.get('incompletos', 0)
+            print(f'  um a um, sem cache nem deduplicação: {ingenuo} chamadas '
+                  f'({ingenuo / args.taxa:.0f} s a {args.taxa:g}/s) contra '
+                  f"{resumo['chamadas']} ({resumo['chamadas'] / args.taxa:.1f} s)")
+
+            if sorted(geocoder.geocodificados) != sorted(distintas):
+                divergencias.append(('endereços geocodificados', len(geocoder.geocodificados), len(distintas)))
+            if not geocoder.recusadas:
+                divergencias.append(('429 simulado não ocorreu',))
+            intervalos = [b - a for a, b in zip(geocoder.instantes, geocoder.instantes[1:])]
+            if intervalos and min(intervalos) < 0.9 / args.taxa:
+                divergencias.append(('limitador', min(intervalos)))
+            lotes = math.ceil(len(distintas) / StubGeocoder.tamanho_lote)
+            if resumo['chamadas'] - geocoder.recusadas < lotes:
+                divergencias.append(('chamadas', resumo['chamadas'], lotes))
+
+            stub = StubGeocoder()
+            pontos = coordenadas()
+            for chave, endereco in chaves.items():
+                ponto = pontos[chave]
+                if endereco is None or endereco.chave not in encontraveis:
+                    if ponto is not None:
+                        divergencias.append(('sem endereço geocodificado', chave))
+                    continue
+                lat, lng = stub.geocodificar([endereco])[0]
+                if ponto is None or abs(float(ponto[0]) - lat) > 1e-7 or abs(float(ponto[1]) - lng) > 1e-7:
+                    divergencias.append(('ponto', chave, ponto, (lat, lng)))
+            status = dict(db.session.execute(
+                select(GeocodeCache.status, func.count()).group_by(GeocodeCache.status)
+            ).all())
+            if status.get('found') != len(encontraveis) or status.get('not_found') != len(distintas - encontraveis):
+                divergencias.append(('cache', status))
+
+            # Novos clientes em endereços já conhecidos: tudo pelo cache
+            db.session.execute(insert(Customer), [
+                novo_cliente(aleatorio, enderecos, args.clientes + i) for i in range(1000)
+            ])
+            db.session.commit()
+            geocoder = GeocoderComLimite(a_cada=10 ** 9)
+            resumo = geocodificar(db.engine, geocoder=geocoder, limitador=criar_limitador(args.taxa))
+            novos = {e.chave for e in esperado().values() if e} - distintas
+            print(f"2ª execução (1000 clientes novos, {len(novos)} endereços inéditos): "
+                  f"{resumo['chamadas']} chamadas, {resumo.get('atualizados', 0)} atualizados "
+                  f"em {resumo['segundos']:.2f} s")
+            if sorted(geocoder.geocodificados) != sorted(novos):
+                divergencias.append(('segunda execução', len(geocoder.geocodificados), len(novos)))
+
+            # Refazer tudo: nenhum endereço volta ao geocodificador
+            geocoder = StubGeocoder()
+            resumo = geocodificar(db.engine, refazer=True, geocoder=geocoder, limitador=criar_limitador(args.taxa))
+            print(f"Refazendo todos os cadastros: {geocoder.chamadas} chamadas, "
+                  f"{resumo['linhas']} cadastros em {resumo['segundos']:.2f} s "
+                  f"({resumo['linhas'] / max(resumo['segundos'], 0.001):,.0f} cadastros/s)")
+            if geocoder.chamadas:
+                divergencias.append(('refazer chamou o geocodificador', geocoder.chamadas))
+    finally:
+        os.unlink(arquivo)
+
+    if divergencias:
+        print(f'\n{len(divergencias)} divergências:')
+        for divergencia in divergencias[:20]:
+            print(' ', divergencia)
+        sys.exit(1)
+    print('\nOK: cada endereço distinto geocodificado uma vez, pontos e cache conferem')
+
+
+if __name__ == '__main__':
+    main()
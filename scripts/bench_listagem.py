@@ -0,0 +1,146 @@
+"""
+Benchmark: listagem de clientes com OFFSET x paginação por cursor (keyset)
+
+Popula customers em SQLite (arquivo temporário) e mede, pela API /api/customers,
+o tempo de uma página no início e no fim da tabela com LIMIT/OFFSET e com
+cursor, e a memória de pico da exportação NDJSON em streaming comparada a
+montar a lista inteira em memória.
+Uso: python scripts/bench_listagem.py [--clientes 200000] [--pagina 100]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+import uuid
+from datetime import datetime, timedelta
+
+# Adiciona o diretório raiz ao PYTHONPATH
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import logging
+from flask import Flask
+from sqlalchemy import insert, select
+from database.connection import db
+from models import Company, Customer, Role, PermissionModule, RolePermission, PermissionMatrixVersion
+from auth.jwt_manager import generate_token
+from routes.resources import resources_bp, RECURSOS, _consulta, codificar_cursor
+from models.serializer import get_serializer
+from fast_json import dumps
+
+
+def popular(clientes):
+    empresa = Company(id=str(uuid.uuid4()), name='Empresa', document='00000000000191')
+    role = Role(id='admin', name='admin')
+    db.session.add_all([empresa, role, PermissionMatrixVersion(id=1, version=0), PermissionModule(name='clientes')])
+    db.session.add(RolePermission(role_id='admin', module_name='clientes', can_read=True))
+    db.session.commit()
+
+    inicio = datetime(2024, 1, 1)
+    lote = []
+    for i in range(clientes):
+        lote.append({
+            'id': str(uuid.uuid4()), 'company_id': empresa.id, 'name': f'Cliente {i}',
+            'email': f'cliente{i}@exemplo.com', 'city': 'Fortaleza', 'state': 'CE',
+            'document': f'{i:014d}',
+            # Vários clientes no mesmo segundo, como numa importação
+            'created_at': inicio + timedelta(seconds=i // 5), 'updated_at': inicio
+        })
+        if len(lote) == 10000:
+            db.session.execute(insert(Customer), lote)
+            lote = []
+    if lote:
+        db.session.execute(insert(Customer), lote)
+    db.session.commit()
+    return empresa.id
+
+
+def pagina_offset(offset, limite):
+    serializer = get_serializer(Customer, RECURSOS['customers'].campos)
+    linhas = db.session.execute(_consulta(RECURSOS['customers'], serializer).limit(limite).offset(offset)).all()
+    return serializer.dumps(linhas)
+
+
+def cronometrar(funcao, repeticoes=5):
+    melhor = float('inf')
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        melhor = min(melhor, time.perf_counter() - inicio)
+    return melhor * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--clientes', type=int, default=200000)
+    parser.add_argument('--pagina', type=int, default=100)
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    arquivo = tempfile.NamedTemporaryFile(suffix='.db', delete=False).name
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{arquivo}'
+    db.init_app(app)
+    app.register_blueprint(resources_bp, url_prefix='/api')
+    cliente_http = app.test_client()
+
+    try:
+        with app.app_context():
+            db.create_all()
+            company_id = popular(args.clientes)
+            headers = {'Authorization': f'Bearer {generate_token("bench", "admin", company_id=company_id)}'}
+
+            # Cursor que aponta para a última página (posição de um cliente que percorreu tudo)
+            ultima = db.session.execute(
+                select(Customer.created_at, Customer.id)
+                .order_by(Customer.created_at, Customer.id)
+                .offset(args.clientes - args.pagina - 1).limit(1)
+            ).one()
+            cursor_fim = codificar_cursor(ultima.created_at, ultima.id)
+
+            def keyset(cursor=None):
+                url = f'/api/customers?limit={args.pagina}' + (f'&cursor={cursor}' if cursor else '')
+                resposta = cliente_http.get(url, headers=headers)
+                assert resposta.status_code == 200, resposta.get_data(as_text=True)
+                return resposta
+
+            print(f'{args.clientes} clientes, páginas de {args.pagina}')
+            print(f"{'':>22} {'início':>10} {'fim':>10}")
+            print(f"{'OFFSET':>22} {cronometrar(lambda: pagina_offset(0, args.pagina)):>7.1f} ms "
+                  f"{cronometrar(lambda: pagina_offset(args.clientes - args.pagina, args.pagina)):>7.1f} ms")
+            print(f"{'cursor (API)':>22} {cronometrar(keyset):>7.1f} ms "
+                  f"{cronometrar(lambda: keyset(cursor_fim)):>7.1f} ms")
+
+            projecao = cronometrar(lambda: cliente_http.get(
+                f'/api/customers?limit={args.pagina}&cursor={cursor_fim}&fields=id,name', headers=headers))
+            print(f"{'cursor + fields=id,name':>22} {'':>10} {projecao:>7.1f} ms")
+
+            db.session.remove()
+            tracemalloc.start()
+            inicio = time.perf_counter()
+            resposta = cliente_http.get('/api/customers/export', headers=headers, buffered=False)
+            tamanho = sum(len(pedaco) for pedaco in resposta.response)
+            resposta.close()
+            tempo = time.perf_counter() - inicio
+            _, pico_stream = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+            db.session.remove()
+            tracemalloc.start()
+            serializer = get_serializer(Customer, RECURSOS['customers'].campos)
+            linhas = db.session.execute(_consulta(RECURSOS['customers'], serializer)).all()
+            corpo = b'\n'.join(map(dumps, map(serializer.json_linha, linhas)))
+            _, pico_lista = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            del linhas, corpo
+
+            print(f'Exportação NDJSON: {tamanho / 1e6:.1f} MB em {tempo:.1f} s '
+                  f'({args.clientes / tempo:,.0f} linhas/s)')
+            print(f'Memória de pico: streaming {pico_stream / 1e6:.1f} MB, lista completa {pico_lista / 1e6:.1f} MB')
+    finally:
+        os.unlink(arquivo)
+
+
+if __name__ == '__main__':
+    main()
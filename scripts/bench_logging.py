@@ -0,0 +1,77 @@
+"""
+Benchmark: custo por requisição do log do Omie, antes (print) e depois (logging)
+
+Antes: três print por chamada, um deles com o payload inteiro em json indentado.
+Depois: evento estruturado amostrado, enfileirado para a thread do QueueListener.
+A saída vai para um arquivo temporário nos dois casos.
+Uso: python scripts/bench_logging.py [--chamadas 20000] [--amostragem 0.1]
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+
+# Adiciona o diretório raiz ao PYTHONPATH
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from log_config import setup_logging, parar_logging, amostrar
+
+DATA = {
+    "app_key": "1234567890",
+    "app_secret": "segredo",
+    "call": "ListarClientes",
+    "param": [{"pagina": 1, "registros_por_pagina": 500, "apenas_importado_api": "N"}]
+}
+URL = "https://app.omie.com.br/api/v1/geral/clientes/"
+
+
+def antes(saida, chamadas):
+    inicio = time.perf_counter()
+    for _ in range(chamadas):
+        print(f"Fazendo requisição para: {URL}", file=saida)
+        print(f"Dados enviados: {json.dumps(DATA, indent=2)}", file=saida)
+        print("Status code: 200", file=saida)
+        saida.flush()
+    return (time.perf_counter() - inicio) / chamadas
+
+
+def depois(chamadas, taxa):
+    logger = logging.getLogger('omie')
+    inicio = time.perf_counter()
+    for _ in range(chamadas):
+        corpo = json.dumps(DATA).encode('utf-8')
+        if amostrar(taxa):
+            logger.info('Requisição ao Omie concluída', extra={
+                'omie_call': 'ListarClientes', 'endpoint': 'geral/clientes/',
+                'payload_bytes': len(corpo), 'status': 200, 'response_bytes': 291000,
+                'retries': 0, 'duration_ms': 850.0
+            })
+    return (time.perf_counter() - inicio) / chamadas
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--chamadas', type=int, default=20000)
+    parser.add_argument('--amostragem', type=float, default=0.1)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryFile('w+', encoding='utf-8') as arquivo_antes, \
+            tempfile.TemporaryFile('w+', encoding='utf-8') as arquivo_depois:
+        custo_antes = antes(arquivo_antes, args.chamadas)
+        setup_logging(stream=arquivo_depois)
+        custo_depois = depois(args.chamadas, args.amostragem)
+        inicio = time.perf_counter()
+        parar_logging()
+        drenagem = time.perf_counter() - inicio
+
+    print(f"print + json indentado:          {custo_antes * 1e6:7.1f} µs/requisição")
+    print(f"logging (amostragem {args.amostragem:.0%}, fila): {custo_depois * 1e6:7.1f} µs/requisição")
+    print(f"Esvaziamento da fila ao final:   {drenagem * 1e3:7.1f} ms (fora do caminho da requisição)")
+    print(f"Redução: {custo_antes / custo_depois:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+"""
+Benchmark: resposta completa (response.json + jsonify) x decodificação em streaming
+
+Usa uma página sintética de 500 clientes no formato de ListarClientes e mede o
+pico de memória (tracemalloc) e o tempo de CPU por página.
+Uso: python scripts/bench_omie_stream.py [--registros 500] [--repeticoes 50]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+# Adiciona o diretório raiz ao PYTHONPATH
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from omie_stream import iter_clientes_cadastro, dumps_clientes
+from scripts.omie_stub_server import gerar_cliente
+
+CHUNK = 65536
+
+
+def montar_fixture(registros):
+    pagina = {
+        "pagina": 1,
+        "total_de_paginas": 40,
+        "registros": registros,
+        "total_de_registros": registros * 40,
+        "clientes_cadastro": [gerar_cliente(codigo) for codigo in range(1, registros + 1)]
+    }
+    return json.dumps(pagina).encode('utf-8')
+
+
+def em_pedacos(corpo):
+    for inicio in range(0, len(corpo), CHUNK):
+        yield corpo[inicio:inicio + CHUNK]
+
+
+def caminho_completo(corpo):
+    # Equivalente a _make_request (response.json) + jsonify na rota, que usa
+    # as opções padrão do provedor JSON do Flask (sort_keys, ensure_ascii)
+    dados = json.loads(b''.join(em_pedacos(corpo)))
+    return json.dumps({'success': True, 'data': dados}, sort_keys=True, separators=(',', ':')).encode('utf-8')
+
+
+def caminho_streaming(corpo):
+    meta = {}
+    clientes = list(iter_clientes_cadastro(em_pedacos(corpo), meta))
+    return dumps_clientes(clientes, meta)
+
+
+def medir(funcao, corpo, repeticoes):
+    tracemalloc.start()
+    funcao(corpo)
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    inicio = time.process_time()
+    for _ in range(repeticoes):
+        saida = funcao(corpo)
+    cpu = (time.process_time() - inicio) / repeticoes
+    return pico, cpu, len(saida)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--registros', type=int, default=500)
+    parser.add_argument('--repeticoes', type=int, default=50)
+    args = parser.parse_args()
+
+    corpo = montar_fixture(args.registros)
+    print(f"Página sintética: {args.registros} clientes, {len(corpo) / 1024:.0f} KB")
+    resultados = {
+        'completo': medir(caminho_completo, corpo, args.repeticoes),
+        'streaming': medir(caminho_streaming, corpo, args.repeticoes)
+    }
+    for nome, (pico, cpu, tamanho) in resultados.items():
+        print(f"{nome:10s} pico de memória: {pico / 1024:8.0f} KB | CPU: {cpu * 1000:6.2f} ms | resposta: {tamanho / 1024:6.0f} KB")
+
+    pico_c, cpu_c, _ = resultados['completo']
+    pico_s, cpu_s, _ = resultados['streaming']
+    print(f"Memória: {pico_c / pico_s:.1f}x menor | CPU: {cpu_c / cpu_s:.1f}x mais rápido")
+
+
+if __name__ == '__main__':
+    main()
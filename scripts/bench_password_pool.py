@@ -0,0 +1,192 @@
+"""
+Benchmark: rajada de logins com hashes sem limite x limitados pelo pool
+
+Sobe o app de autenticação com SQLite (servidor werkzeug com threads) e dispara
+logins simultâneos enquanto mede a latência de uma rota leve (/ping), que
+representa as requisições autenticadas por token. Nos dois cenários o hash
+roda na thread da requisição: "sem limite" deixa todos os clientes calcularem
+ao mesmo tempo; "pool" usa a configuração de PASSWORD_POOL_*. Antes confere
+que o pool não cria threads e recusa com PoolSaturado quando está cheio (sai
+com código 1 se não).
+Uso: python scripts/bench_password_pool.py [--clientes 64] [--segundos 10] [--usuarios 50]
+"""
+import argparse
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+import requests
+
+# Adiciona o diretório raiz ao PYTHONPATH
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask, jsonify
+from werkzeug.serving import make_server
+from database.connection import db
+from models import User, Role, Company
+from routes.auth import auth_bp
+import auth.password_pool as password_pool
+from auth.password_pool import PasswordPool, PoolSaturado
+from config import PASSWORD_POOL_WORKERS, PASSWORD_POOL_QUEUE
+
+
+# Sem o log de acesso do servidor de desenvolvimento nem os avisos de 503
+logging.getLogger('werkzeug').setLevel(logging.ERROR)
+logging.getLogger('routes.auth').setLevel(logging.ERROR)
+
+
+def criar_app(caminho_db):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{caminho_db}'
+    db.init_app(app)
+    app.register_blueprint(auth_bp, url_prefix='/auth')
+
+    @app.route('/ping')
+    def ping():
+        return jsonify({'ok': True})
+
+    return app
+
+
+def criar_usuarios(app, quantidade, method_antigo):
+    with app.app_context():
+        db.create_all()
+        antigo = PasswordPool(method=method_antigo)
+        for i in range(quantidade):
+            user = User(email=f'user{i}@exemplo.com', name=f'Usuário {i}')
+            user.password_hash = antigo.hash('senha123')
+            db.session.add(user)
+        db.session.commit()
+
+
+def rodada(base_url, clientes, segundos, usuarios):
+    fim = time.monotonic() + segundos
+    contagem = {'ok': 0, '503': 0, 'outros': 0}
+    latencias_ping = []
+    lock = threading.Lock()
+
+    def logar(n):
+        sessao = requests.Session()
+        i = n
+        while time.monotonic() < fim:
+            r = sessao.post(f'{base_url}/auth/login',
+                            json={'email': f'user{i % usuarios}@exemplo.com', 'password': 'senha123'})
+            chave = 'ok' if r.status_code == 200 else '503' if r.status_code == 503 else 'outros'
+            with lock:
+                contagem[chave] += 1
+            if r.status_code == 503:
+                time.sleep(float(r.headers.get('Retry-After', 1)))
+            i += clientes
+
+    def pingar():
+        sessao = requests.Session()
+        while time.monotonic() < fim:
+            inicio = time.perf_counter()
+            sessao.get(f'{base_url}/ping')
+            latencias_ping.append((time.perf_counter() - inicio) * 1000)
+            time.sleep(0.02)
+
+    threads = [threading.Thread(target=logar, args=(n,)) for n in range(clientes)]
+    threads.append(threading.Thread(target=pingar))
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    latencias_ping.sort()
+    return {
+        'logins_por_segundo': contagem['ok'] / segundos,
+        'recusados_503': contagem['503'],
+        'erros': contagem['outros'],
+        'ping_p50_ms': statistics.median(latencias_ping),
+        'ping_p99_ms': latencias_ping[int(len(latencias_ping) * 0.99) - 1]
+    }
+
+
+def conferir_pool():
+    """Hash na thread de quem chama, fila limitada e recusa imediata acima dela"""
+    falhas = []
+    pool = PasswordPool(workers=1, max_pendentes=1, method='pbkdf2:sha256:1000')
+    if pool._executar(threading.current_thread) is not threading.current_thread():
+        falhas.append('hash fora da thread de quem chama')
+
+    liberar = threading.Event()
+    ocupando = threading.Event()
+
+    def ocupar():
+        ocupando.set()
+        liberar.wait()
+
+    threads = [threading.Thread(target=pool._executar, args=(ocupar,)),
+               threading.Thread(target=pool.hash, args=('senha123',))]
+    threads[0].start()
+    ocupando.wait()
+    threads[1].start()
+    time.sleep(0.1)
+    inicio = time.perf_counter()
+    try:
+        pool.hash('senha123')
+        falhas.append('pool cheio não recusou')
+    except PoolSaturado:
+        if time.perf_counter() - inicio > 0.05:
+            falhas.append('recusa esperou por uma vaga')
+    liberar.set()
+    for t in threads:
+        t.join()
+    if not pool.verificar(pool.hash('senha123'), 'senha123'):
+        falhas.append('hash gerado não confere')
+    for falha in falhas:
+        print('FALHOU', falha)
+    return not falhas
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--clientes', type=int, default=64)
+    parser.add_argument('--segundos', type=float, default=10)
+    parser.add_argument('--usuarios', type=int, default=50)
+    args = parser.parse_args()
+    if not conferir_pool():
+        sys.exit(1)
+
+    with tempfile.TemporaryDirectory() as pasta:
+        app = criar_app(os.path.join(pasta, 'auth.db'))
+        # Hashes criados com custo menor: o primeiro login de cada usuário os atualiza
+        criar_usuarios(app, args.usuarios, 'pbkdf2:sha256:1000')
+
+        servidor = make_server('127.0.0.1', 0, app, threaded=True)
+        threading.Thread(target=servidor.serve_forever, daemon=True).start()
+        base_url = f'http://127.0.0.1:{servidor.server_port}'
+
+        # Primeiro login de cada usuário: verifica o hash antigo e grava o novo
+        password_pool._pool = PasswordPool()
+        for i in range(args.usuarios):
+            requests.post(f'{base_url}/auth/login', json={'email': f'user{i}@exemplo.com', 'password': 'senha123'})
+        with app.app_context():
+            atualizados = sum(
+                1 for (h,) in db.session.query(User.password_hash)
+                if not password_pool._pool.precisa_rehash(h)
+            )
+        print(f"Hashes atualizados para {password_pool._pool.method}: {atualizados}/{args.usuarios}")
+
+        cenarios = (
+            ('sem limite (inline)', PasswordPool(workers=args.clientes, max_pendentes=0)),
+            (f'pool {PASSWORD_POOL_WORKERS}+{PASSWORD_POOL_QUEUE}',
+             PasswordPool(workers=PASSWORD_POOL_WORKERS, max_pendentes=PASSWORD_POOL_QUEUE))
+        )
+        for nome, pool in cenarios:
+            password_pool._pool = pool
+            resultado = rodada(base_url, args.clientes, args.segundos, args.usuarios)
+            print(f"{nome:22s} " + '  '.join(
+                f"{chave}={valor:.1f}" if isinstance(valor, float) else f"{chave}={valor}"
+                for chave, valor in resultado.items()
+            ))
+        servidor.shutdown()
+
+
+if __name__ == '__main__':
+    main()
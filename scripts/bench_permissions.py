@@ -0,0 +1,88 @@
+"""
+Benchmark: checagem de permissão por consulta ao banco x matriz compilada
+
+Cria roles x módulos em SQLite em memória e mede o custo de uma checagem
+consultando role_permissions (como em role.permissions.filter_by) e pela
+PermissionMatrix.
+Uso: python scripts/bench_permissions.py [--roles 50] [--modulos 30] [--checagens 200000]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+# Adiciona o diretório raiz ao PYTHONPATH
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+from database.connection import db
+from models import Role, PermissionModule, RolePermission, PermissionMatrixVersion
+from auth.permissions import PermissionMatrix, ACOES
+
+
+def popular(roles, modulos):
+    db.session.add(PermissionMatrixVersion(id=1, version=0))
+    for m in range(modulos):
+        db.session.add(PermissionModule(name=f'modulo{m}'))
+    for r in range(roles):
+        role = Role(id=f'role{r}', name=f'Role {r}')
+        db.session.add(role)
+        for m in range(modulos):
+            db.session.add(RolePermission(
+                role_id=role.id, module_name=f'modulo{m}',
+                can_read=True, can_write=(r + m) % 2 == 0, can_delete=(r + m) % 5 == 0
+            ))
+    db.session.commit()
+
+
+def pode_consultando(role_id, modulo, acao):
+    permissao = db.session.get(Role, role_id).permissions.filter_by(module_name=modulo).first()
+    return bool(permissao and getattr(permissao, f'can_{acao}'))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--roles', type=int, default=50)
+    parser.add_argument('--modulos', type=int, default=30)
+    parser.add_argument('--checagens', type=int, default=200000)
+    args = parser.parse_args()
+
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+    db.init_app(app)
+
+    with app.app_context():
+        db.create_all()
+        popular(args.roles, args.modulos)
+
+        random.seed(1)
+        consultas = [
+            (f'role{random.randrange(args.roles)}', f'modulo{random.randrange(args.modulos)}', random.choice(ACOES))
+            for _ in range(1000)
+        ]
+
+        matrix = PermissionMatrix()
+        inicio = time.perf_counter()
+        matrix.sincronizar()
+        compilacao = time.perf_counter() - inicio
+
+        n = args.checagens // 100
+        inicio = time.perf_counter()
+        esperado = [pode_consultando(*consultas[i % 1000]) for i in range(n)]
+        banco = (time.perf_counter() - inicio) / n
+
+        inicio = time.perf_counter()
+        for i in range(args.checagens):
+            matrix.pode(*consultas[i % 1000])
+        memoria = (time.perf_counter() - inicio) / args.checagens
+
+        iguais = all(matrix.pode(*consultas[i % 1000]) == esperado[i] for i in range(n))
+        print(f"Compilação de {args.roles * args.modulos} linhas: {compilacao * 1000:.1f} ms")
+        print(f"Consulta ao banco: {banco * 1e6:10.1f} µs/checagem")
+        print(f"Matriz compilada:  {memoria * 1e9:10.0f} ns/checagem ({banco / memoria:.0f}x)")
+        print(f"Resultados iguais: {iguais}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,281 @@
+"""
+Benchmark do motor de relatórios sobre o snapshot analítico (Arrow + NumPy)
+
+Popula vendas em SQLite (arquivo temporário), exporta o snapshot e compara,
+para margem por categoria e vendas por UF/cidade, o relatório linha a linha
+pelo ORM (no último mês), o GROUP BY no banco e o motor vetorizado. Confere
+que o motor dá exatamente o mesmo resultado que o GROUP BY e que a rota
+/api/reports responde sem consultar as tabelas de vendas. Sai com código 1 se
+houver divergência.
+Uso: python scripts/bench_reports.py [--vendas 400000] [--produtos 2000] [--clientes 20000]
+"""
+import argparse
+import logging
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+# Adiciona o diretório raiz ao PYTHONPATH
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+from sqlalchemy import case, func, insert, select
+from database.connection import db
+from database.instrumentation import QueryInstrumentation
+from models import Company, Customer, Product, Sale, SaleItem, Role, PermissionModule, RolePermission
+from models import PermissionMatrixVersion
+from models.state import State
+from auth.jwt_manager import generate_token
+from routes.reports import reports_bp
+import services.analytics
+from services.analytics import exportar_snapshot, carregar_snapshot, SEM_CATEGORIA, SEM_CIDADE
+from services.reports import margem_por_categoria, vendas_por_localidade
+
+EMPRESA = 'empresa-bench'
+UFS = ['AC', 'AL', 'AM', 'AP', 'BA', 'CE', 'DF', 'ES', 'GO', 'MA', 'MG', 'MS', 'MT', 'PA', 'PB', 'PE',
+       'PI', 'PR', 'RJ', 'RN', 'RO', 'RR', 'RS', 'SC', 'SE', 'SP', 'TO']
+
+
+def popular(vendas, produtos, clientes):
+    aleatorio = random.Random(42)
+    db.session.add_all([
+        Company(id=EMPRESA, name='Empresa', document='00000000000191'),
+        Role(id='admin', name='admin'), PermissionMatrixVersion(id=1, version=0), PermissionModule(name='vendas')
+    ])
+    db.session.flush()
+    db.session.add(RolePermission(role_id='admin', module_name='vendas', can_read=True))
+    db.session.execute(insert(State), [{'id': i, 'uf': uf, 'name': f'Estado {uf}'} for i, uf in enumerate(UFS, 1)])
+
+    precos = {}
+    linhas = []
+    for i in range(produtos):
+        product_id = f'produto-{i:05d}'
+        precos[product_id] = Decimal(aleatorio.randint(100, 50000)) / 100
+        custo = (precos[product_id] * Decimal(aleatorio.uniform(0.4, 0.9))).quantize(Decimal('0.01'))
+        linhas.append({
+            'id': product_id, 'company_id': EMPRESA, 'sku': product_id, 'name': f'Produto {i}',
+            'price': precos[product_id], 'stock_quantity': 0,
+            # Uma em cada 10 sem custo cadastrado; uma em cada 20 sem categoria
+            'cost_price': custo if aleatorio.random() > 0.1 else None,
+            'category': f'Categoria {aleatorio.randrange(30)}' if aleatorio.random() > 0.05 else None
+        })
+    db.session.execute(insert(Product), linhas)
+    db.session.execute(insert(Customer), [
+        {'id': f'cliente-{i:06d}', 'company_id': EMPRESA, 'name': f'Cliente {i}',
+         'state': aleatorio.choice(UFS), 'city': f'Cidade {aleatorio.randrange(300)}' if i % 50 else None}
+        for i in range(clientes)
+    ])
+
+    fim = datetime.utcnow()
+    inicio = fim - timedelta(days=730)
+    ids = list(precos)
+    vendas_lote, itens_lote = [], []
+    for n in range(vendas):
+        sale_id = str(uuid.uuid4())
+        total = Decimal('0')
+        for product_id in aleatorio.sample(ids, aleatorio.randint(1, 4)):
+            quantidade = aleatorio.randint(1, 5)
+            subtotal = precos[product_id] * quantidade
+            total += subtotal
+            itens_lote.append({'id': str(uuid.uuid4()), 'sale_id': sale_id, 'product_id': product_id,
+                               'quantity': quantidade, 'unit_price': precos[product_id], 'total': subtotal})
+        vendas_lote.append({
+            'id': sale_id, 'company_id': EMPRESA, 'total': total,
+            'customer_id': f'cliente-{aleatorio.randrange(clientes):06d}' if aleatorio.random() < 0.85 else None,
+            'status': 'cancelled' if aleatorio.random() < 0.05 else 'confirmed',
+            'created_at': inicio + timedelta(seconds=aleatorio.randrange(730 * 86400))
+        })
+        if len(vendas_lote) == 10000:
+            db.session.execute(insert(Sale), vendas_lote)
+            db.session.execute(insert(SaleItem), itens_lote)
+            vendas_lote, itens_lote = [], []
+    if vendas_lote:
+        db.session.execute(insert(Sale), vendas_lote)
+        db.session.execute(insert(SaleItem), itens_lote)
+    db.session.commit()
+
+
+def _periodo(inicio, fim):
+    filtros = [Sale.company_id == EMPRESA, Sale.status == 'confirmed']
+    if inicio:
+        filtros.append(Sale.created_at >= inicio)
+    if fim:
+        filtros.append(Sale.created_at < fim + timedelta(days=1))
+    return filtros
+
+
+def margem_orm(inicio, fim):
+    """Versão linha a linha: cada venda, cada item, produto pelo identity map"""
+    grupos = {}
+    for venda in Sale.query.filter(*_periodo(inicio, fim)):
+        for item in venda.items:
+            produto = db.session.get(Product, item.product_id)
+            grupo = grupos.setdefault(produto.category or SEM_CATEGORIA, [0, Decimal('0'), Decimal('0')])
+            grupo[0] += item.quantity
+            grupo[1] += item.total
+            if produto.cost_price is not None:
+                grupo[2] += produto.cost_price * item.quantity
+    return grupos
+
+
+def margem_sql(inicio, fim):
+    categoria = func.coalesce(Product.category, SEM_CATEGORIA)
+    custeado = Product.cost_price.isnot(None)
+    return {
+        linha[0]: linha[1:]
+        for linha in db.session.execute(
+            select(
+                categoria, func.sum(SaleItem.quantity), func.sum(SaleItem.total),
+                func.sum(case((custeado, Product.cost_price * SaleItem.quantity), else_=0)),
+                func.sum(case((custeado, 0), else_=SaleItem.total))
+            )
+            .join(Sale, Sale.id == SaleItem.sale_id).join(Product, Product.id == SaleItem.product_id)
+            .where(*_periodo(inicio, fim)).group_by(categoria)
+        )
+    }
+
+
+def localidade_sql(inicio, fim):
+    uf = func.upper(Customer.state)
+    # Venda sem cliente: UF e cidade None, como no motor
+    cidade = case((Customer.id.is_(None), None), else_=func.coalesce(Customer.city, SEM_CIDADE))
+    vendas = {
+        (linha[0], linha[1]): [linha[2], linha[3]]
+        for linha in db.session.execute(
+            select(uf, cidade, func.count(), func.sum(Sale.total))
+            .outerjoin(Customer, Customer.id == Sale.customer_id)
+            .where(*_periodo(inicio, fim)).group_by(uf, cidade)
+        )
+    }
+    for linha in db.session.execute(
+        select(uf, cidade, func.sum(SaleItem.quantity))
+        .select_from(SaleItem).join(Sale, Sale.id == SaleItem.sale_id)
+        .outerjoin(Customer, Customer.id == Sale.customer_id)
+        .where(*_periodo(inicio, fim)).group_by(uf, cidade)
+    ):
+        vendas[(linha[0], linha[1])].append(linha[2])
+    return vendas
+
+
+def cronometrar(funcao, repeticoes=5):
+    melhor = float('inf')
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        melhor = min(melhor, time.perf_counter() - inicio)
+    return melhor * 1000
+
+
+def _centavos(valor):
+    return int(round(Decimal(valor) * 100))
+
+
+def comparar(snapshot, inicio, fim):
+    """Diferenças entre o motor e o GROUP BY no banco"""
+    diferencas = []
+    esperado = margem_sql(inicio, fim)
+    obtido = {linha['category']: linha for linha in margem_por_categoria(snapshot, inicio, fim)}
+    for categoria in set(esperado) | set(obtido):
+        quantidade, receita, custo, sem_custo = esperado.get(categoria, (0, 0, 0, 0))
+        linha = obtido.get(categoria, {})
+        if (int(quantidade), _centavos(receita), _centavos(custo), _centavos(sem_custo)) != (
+                linha.get('quantity'), _centavos(linha.get('revenue', 0)), _centavos(linha.get('cost', 0)),
+                _centavos(linha.get('uncosted_revenue', 0))):
+            diferencas.append(('margem', categoria, esperado.get(categoria), linha))
+
+    esperado = localidade_sql(inicio, fim)
+    obtido = {(linha['state'], linha['city']): linha for linha in vendas_por_localidade(snapshot, inicio, fim)}
+    for chave in set(esperado) | set(obtido):
+        vendas, receita, itens = esperado.get(chave, (0, 0, 0))
+        linha = obtido.get(chave, {})
+        if (vendas, _centavos(receita), int(itens)) != (
+                linha.get('sales_count'), _centavos(linha.get('revenue', 0)), linha.get('items_quantity')):
+            diferencas.append(('localidade', chave, esperado.get(chave), linha))
+    return diferencas
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--vendas', type=int, default=400000)
+    parser.add_argument('--produtos', type=int, default=2000)
+    parser.add_argument('--clientes', type=int, default=20000)
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    arquivo = tempfile.NamedTemporaryFile(suffix='.db', delete=False).name
+    pasta = tempfile.mkdtemp(prefix='analytics-')
+    # A rota usa a pasta padrão; aqui ela aponta para a temporária
+    services.analytics.ANALYTICS_DIR = pasta
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{arquivo}'
+    db.init_app(app)
+    QueryInstrumentation(app, budget=0)
+    app.register_blueprint(reports_bp, url_prefix='/api')
+    cliente_http = app.test_client()
+    divergencias = []
+
+    try:
+        with app.app_context():
+            db.create_all()
+            inicio = time.perf_counter()
+            popular(args.vendas, args.produtos, args.clientes)
+            itens = db.session.execute(select(func.count()).select_from(SaleItem)).scalar()
+            print(f'{args.vendas} vendas, {itens} itens, populado em {time.perf_counter() - inicio:.1f} s')
+
+            resumo = exportar_snapshot(EMPRESA, engine=db.engine)
+            tamanho = sum(
+                os.path.getsize(os.path.join(raiz, nome)) for raiz, _, nomes in os.walk(pasta) for nome in nomes
+            )
+            print(f"Exportação: {resumo['segundos']:.1f} s, {tamanho / 1e6:.1f} MB em Arrow IPC")
+
+            inicio = time.perf_counter()
+            snapshot = carregar_snapshot(EMPRESA)
+            margem_por_categoria(snapshot)
+            vendas_por_localidade(snapshot)
+            print(f'Carga do snapshot + primeira execução: {(time.perf_counter() - inicio) * 1000:.0f} ms')
+
+            hoje = datetime.utcnow().date()
+            mes = hoje - timedelta(days=29)
+            print(f"\n{'':>30} {'ORM':>10} {'GROUP BY':>10} {'motor':>10}")
+            orm = cronometrar(lambda: margem_orm(mes, hoje), repeticoes=1)
+            print(f"{'margem/categoria, 30 dias':>30} {orm:>7.0f} ms "
+                  f"{cronometrar(lambda: margem_sql(mes, hoje)):>7.0f} ms "
+                  f"{cronometrar(lambda: margem_por_categoria(snapshot, mes, hoje)):>7.1f} ms")
+            print(f"{'margem/categoria, tudo':>30} {'':>10} "
+                  f"{cronometrar(lambda: margem_sql(None, None), repeticoes=2):>7.0f} ms "
+                  f"{cronometrar(lambda: margem_por_categoria(snapshot)):>7.1f} ms")
+            print(f"{'vendas/UF e cidade, tudo':>30} {'':>10} "
+                  f"{cronometrar(lambda: localidade_sql(None, None), repeticoes=2):>7.0f} ms "
+                  f"{cronometrar(lambda: vendas_por_localidade(snapshot)):>7.1f} ms")
+
+            for de, ate in ((None, None), (mes, hoje)):
+                divergencias.extend(comparar(snapshot, de, ate))
+            print(f'\nMotor x GROUP BY: {len(divergencias)} divergências')
+
+            headers = {'Authorization': f'Bearer {generate_token("bench", "admin", company_id=EMPRESA)}'}
+            resposta = cliente_http.get(f'/api/reports/margin-by-category?from={mes}', headers=headers)
+            print(f'GET /api/reports/margin-by-category: {resposta.status_code}, '
+                  f"{resposta.headers.get('X-DB-Queries')} consultas")
+            if resposta.status_code != 200 or resposta.get_json()['snapshot'] != snapshot.nome:
+                divergencias.append(('rota', resposta.status_code, resposta.get_data(as_text=True)[:200]))
+            if cliente_http.get('/api/reports/nao-existe', headers=headers).status_code != 404:
+                divergencias.append(('relatório inexistente deveria dar 404',))
+    finally:
+        os.unlink(arquivo)
+        shutil.rmtree(pasta, ignore_errors=True)
+
+    if divergencias:
+        for divergencia in divergencias[:20]:
+            print('DIVERGÊNCIA', divergencia)
+        sys.exit(1)
+    print('\nRelatórios consistentes')
+
+
+if __name__ == '__main__':
+    main()
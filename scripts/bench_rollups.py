@@ -0,0 +1,256 @@
+"""
+Benchmark e conferência dos resumos de vendas (dashboards)
+
+Popula um histórico de vendas em SQLite (arquivo temporário), mede o backfill
+e compara o tempo das consultas do dashboard direto em sales/sale_items com as
+mesmas consultas nas tabelas de resumo. Depois registra e cancela vendas pelo
+serviço (incremental, inclusive vendas antigas) e confere que os resumos batem
+com um backfill completo. Sai com código 1 se houver divergência.
+Uso: python scripts/bench_rollups.py [--vendas 200000] [--meses 24] [--produtos 500]
+     [--clientes 5000] [--novas 300] [--cancelar 100]
+"""
+import argparse
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+# Adiciona o diretório raiz ao PYTHONPATH
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+from sqlalchemy import func, insert, select
+from database.connection import db
+from database.instrumentation import QueryInstrumentation
+from models import (
+    Company, Customer, Product, Sale, SaleItem, Role, PermissionModule, RolePermission,
+    PermissionMatrixVersion, SalesDailyRollup, ProductMonthlyRollup, CustomerMonthlyRollup
+)
+from auth.jwt_manager import generate_token
+from routes.dashboard import dashboard_bp
+from routes.sales import sales_bp
+from services.rollups import reconstruir, receita_diaria, top_produtos, top_clientes, inicio_do_mes
+from services.sales import registrar_venda, cancelar_venda
+
+EMPRESA = 'empresa-bench'
+
+
+def popular(vendas, meses, produtos, clientes):
+    aleatorio = random.Random(42)
+    db.session.add_all([
+        Company(id=EMPRESA, name='Empresa', document='00000000000191'),
+        Company(id='outra-empresa', name='Outra', document='00000000000272'),
+        Role(id='admin', name='admin'), PermissionMatrixVersion(id=1, version=0), PermissionModule(name='vendas')
+    ])
+    db.session.flush()
+    db.session.add(RolePermission(role_id='admin', module_name='vendas', can_read=True, can_write=True))
+    db.session.commit()
+
+    precos = {f'produto-{i:04d}': Decimal(aleatorio.randint(100, 50000)) / 100 for i in range(produtos)}
+    db.session.execute(insert(Product), [
+        {'id': product_id, 'company_id': EMPRESA, 'sku': product_id, 'name': f'Produto {product_id}',
+         'price': preco, 'stock_quantity': 10 ** 9}
+        for product_id, preco in precos.items()
+    ])
+    db.session.execute(insert(Customer), [
+        {'id': f'cliente-{i:05d}', 'company_id': EMPRESA, 'name': f'Cliente {i}', 'document': f'{i:014d}'}
+        for i in range(clientes)
+    ])
+
+    fim = datetime.utcnow()
+    inicio = fim - timedelta(days=30 * meses)
+    segundos = int((fim - inicio).total_seconds())
+    ids = list(precos)
+    vendas_lote, itens_lote = [], []
+    for n in range(vendas):
+        sale_id = str(uuid.uuid4())
+        total = Decimal('0')
+        for product_id in aleatorio.sample(ids, aleatorio.randint(1, 4)):
+            quantidade = aleatorio.randint(1, 5)
+            subtotal = precos[product_id] * quantidade
+            total += subtotal
+            itens_lote.append({'id': str(uuid.uuid4()), 'sale_id': sale_id, 'product_id': product_id,
+                               'quantity': quantidade, 'unit_price': precos[product_id], 'total': subtotal})
+        vendas_lote.append({
+            'id': sale_id, 'company_id': EMPRESA, 'total': total,
+            'customer_id': f'cliente-{aleatorio.randrange(clientes):05d}' if aleatorio.random() < 0.8 else None,
+            # Uma em cada 20 vendas do histórico está cancelada
+            'status': 'cancelled' if aleatorio.random() < 0.05 else 'confirmed',
+            'created_at': inicio + timedelta(seconds=aleatorio.randrange(segundos))
+        })
+        if len(vendas_lote) == 10000:
+            db.session.execute(insert(Sale), vendas_lote)
+            db.session.execute(insert(SaleItem), itens_lote)
+            vendas_lote, itens_lote = [], []
+    if vendas_lote:
+        db.session.execute(insert(Sale), vendas_lote)
+        db.session.execute(insert(SaleItem), itens_lote)
+    db.session.commit()
+    return ids
+
+
+# Versões das consultas do dashboard direto nas tabelas de vendas
+
+def receita_bruta(inicio, fim):
+    dia = func.date(Sale.created_at)
+    return db.session.execute(
+        select(dia, func.count(func.distinct(Sale.id)), func.sum(SaleItem.quantity), func.sum(SaleItem.total))
+        .join(SaleItem, SaleItem.sale_id == Sale.id)
+        .where(Sale.company_id == EMPRESA, Sale.status == 'confirmed',
+               Sale.created_at >= inicio, Sale.created_at < fim + timedelta(days=1))
+        .group_by(dia)
+    ).all()
+
+
+def top_produtos_bruto(mes, limite=10):
+    fim = (mes.replace(day=28) + timedelta(days=4)).replace(day=1)
+    receita = func.sum(SaleItem.total)
+    return db.session.execute(
+        select(SaleItem.product_id, Product.name, func.sum(SaleItem.quantity), receita)
+        .join(Sale, Sale.id == SaleItem.sale_id).join(Product, Product.id == SaleItem.product_id)
+        .where(Sale.company_id == EMPRESA, Sale.status == 'confirmed', Sale.created_at >= mes, Sale.created_at < fim)
+        .group_by(SaleItem.product_id, Product.name).order_by(receita.desc()).limit(limite)
+    ).all()
+
+
+def cronometrar(funcao, repeticoes=5):
+    melhor = float('inf')
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        melhor = min(melhor, time.perf_counter() - inicio)
+    return melhor * 1000
+
+
+def resumos():
+    """Conteúdo das três tabelas de resumo, sem as linhas zeradas por cancelamentos"""
+    conteudo = {}
+    for model, chave in ((SalesDailyRollup, ('company_id', 'day')),
+                         (ProductMonthlyRollup, ('company_id', 'month', 'product_id')),
+                         (CustomerMonthlyRollup, ('company_id', 'month', 'customer_id'))):
+        colunas = [c.name for c in model.__table__.columns if c.name not in chave]
+        for linha in db.session.execute(select(model.__table__)).mappings():
+            valores = tuple(Decimal(linha[c]) for c in colunas)
+            if any(valores):
+                conteudo[(model.__tablename__,) + tuple(str(linha[c]) for c in chave)] = valores
+    return conteudo
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--vendas', type=int, default=200000)
+    parser.add_argument('--meses', type=int, default=24)
+    parser.add_argument('--produtos', type=int, default=500)
+    parser.add_argument('--clientes', type=int, default=5000)
+    parser.add_argument('--novas', type=int, default=300, help='Vendas registradas pelo serviço')
+    parser.add_argument('--cancelar', type=int, default=100, help='Vendas canceladas pelo serviço')
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    arquivo = tempfile.NamedTemporaryFile(suffix='.db', delete=False).name
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{arquivo}'
+    db.init_app(app)
+    QueryInstrumentation(app, budget=0)
+    app.register_blueprint(sales_bp, url_prefix='/api')
+    app.register_blueprint(dashboard_bp, url_prefix='/api')
+    cliente_http = app.test_client()
+    divergencias = []
+
+    try:
+        with app.app_context():
+            db.create_all()
+            inicio = time.perf_counter()
+            ids = popular(args.vendas, args.meses, args.produtos, args.clientes)
+            itens = db.session.execute(select(func.count()).select_from(SaleItem)).scalar()
+            print(f'{args.vendas} vendas ({itens} itens) em {args.meses} meses, '
+                  f'populado em {time.perf_counter() - inicio:.1f} s')
+
+            resumo = reconstruir(db.engine, workers=4)
+            print(f"Backfill: {resumo['pedacos']} pedaços (empresa, mês) em {resumo['segundos']:.1f} s "
+                  f"({args.vendas / max(resumo['segundos'], 0.001):,.0f} vendas/s)")
+
+            hoje = datetime.utcnow().date()
+            mes = inicio_do_mes(hoje - timedelta(days=40))
+            periodos = (('30 dias', hoje - timedelta(days=29)), ('365 dias', hoje - timedelta(days=364)))
+            print(f"\n{'':>26} {'sales':>10} {'resumos':>10}")
+            for nome, de in periodos:
+                bruto = cronometrar(lambda: receita_bruta(de, hoje))
+                resumido = cronometrar(lambda: receita_diaria(db.session, EMPRESA, de, hoje))
+                print(f"{'receita diária ' + nome:>26} {bruto:>7.1f} ms {resumido:>7.1f} ms")
+            bruto = cronometrar(lambda: top_produtos_bruto(mes))
+            resumido = cronometrar(lambda: top_produtos(db.session, EMPRESA, mes))
+            print(f"{'top 10 produtos do mês':>26} {bruto:>7.1f} ms {resumido:>7.1f} ms")
+            resumido = cronometrar(lambda: top_clientes(db.session, EMPRESA, mes))
+            print(f"{'top 10 clientes do mês':>26} {'':>10} {resumido:>7.1f} ms")
+
+            serie = {linha[0]: linha for linha in receita_bruta(hoje - timedelta(days=364), hoje)}
+            for dia in receita_diaria(db.session, EMPRESA, hoje - timedelta(days=364), hoje):
+                linha = serie.get(dia['day'])
+                esperado = (linha[1], linha[2], float(linha[3])) if linha else (0, 0, 0.0)
+                if (dia['sales_count'], dia['items_quantity'], round(dia['revenue'], 2)) != \
+                        (esperado[0], esperado[1], round(esperado[2], 2)):
+                    divergencias.append(('backfill', dia['day'], dia, esperado))
+            if [l.product_id for l in top_produtos_bruto(mes)] != \
+                    [p['product_id'] for p in top_produtos(db.session, EMPRESA, mes)]:
+                divergencias.append(('top produtos', mes))
+
+            # Incremental: vendas novas e cancelamentos (de vendas novas e antigas)
+            aleatorio = random.Random(7)
+            novas = []
+            inicio = time.perf_counter()
+            for _ in range(args.novas):
+                venda = registrar_venda(db.session, EMPRESA, [
+                    {'product_id': product_id, 'quantity': aleatorio.randint(1, 3)}
+                    for product_id in aleatorio.sample(ids, aleatorio.randint(1, 4))
+                ], customer_id=f'cliente-{aleatorio.randrange(args.clientes):05d}')
+                novas.append(venda['id'])
+            tempo = time.perf_counter() - inicio
+            print(f'\nregistrar_venda com resumos: {args.novas / tempo:,.0f} vendas/s')
+
+            antigas = db.session.execute(
+                select(Sale.id).where(Sale.status == 'confirmed', Sale.id.notin_(novas))
+                .order_by(Sale.id).limit(args.cancelar // 2)
+            ).scalars().all()
+            for sale_id in aleatorio.sample(novas, args.cancelar - len(antigas)) + antigas:
+                cancelar_venda(db.session, EMPRESA, sale_id)
+
+            incremental = resumos()
+            reconstruir(db.engine)
+            completo = resumos()
+            diferentes = [chave for chave in set(incremental) | set(completo)
+                          if incremental.get(chave) != completo.get(chave)]
+            print(f'{args.novas} vendas registradas e {args.cancelar} canceladas: '
+                  f'{len(completo)} linhas de resumo, {len(diferentes)} diferentes do backfill')
+            divergencias.extend(('incremental', chave) for chave in diferentes[:10])
+
+            headers = {'Authorization': f'Bearer {generate_token("bench", "admin", company_id=EMPRESA)}'}
+            for url in ('/api/dashboard/revenue?from=' + (hoje - timedelta(days=364)).isoformat(),
+                        f'/api/dashboard/top-products?month={mes:%Y-%m}',
+                        f'/api/dashboard/top-customers?month={mes:%Y-%m}'):
+                resposta = cliente_http.get(url, headers=headers)
+                print(f"GET {url.split('?')[0]}: {resposta.status_code}, "
+                      f"{resposta.headers.get('X-DB-Queries')} consultas")
+                if resposta.status_code != 200:
+                    divergencias.append((url, resposta.status_code, resposta.get_data(as_text=True)))
+            resposta = cliente_http.post(f'/api/sales/{novas[0]}/cancel', headers=headers)
+            resposta = cliente_http.post(f'/api/sales/{novas[0]}/cancel', headers=headers)
+            if resposta.status_code != 400:
+                divergencias.append(('cancelamento repetido', resposta.status_code))
+    finally:
+        os.unlink(arquivo)
+
+    if divergencias:
+        for divergencia in divergencias:
+            print('DIVERGÊNCIA', divergencia)
+        sys.exit(1)
+    print('\nResumos consistentes')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,386 @@
+"""
+Benchmark e conferência da agenda de ordens de serviço (árvore de intervalos)
+
+1. Confere a árvore contra uma lista (força bruta) com inserções e remoções
+   aleatórias.
+2. Popula --ordens ordens de serviço em SQLite (arquivo temporário) para
+   --tecnicos técnicos e mede a carga das agendas e as consultas de conflito,
+   próximo horário livre e utilização, comparando com a mesma consulta no banco
+   e com uma varredura linear das ordens.
+3. Dispara reservas concorrentes (threads) para poucos técnicos e confere no
+   banco que nenhuma ordem se sobrepõe a outra do mesmo técnico.
+4. Confere as rotas /api/service-orders e /api/schedule.
+Sai com código 1 se algo falhar.
+Uso: python scripts/bench_scheduling.py [--ordens 100000] [--tecnicos 20] [--workers 8] [--reservas 2000]
+"""
+import argparse
+import itertools
+import logging
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+
+# Adiciona o diretório raiz ao PYTHONPATH
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+from sqlalchemy import insert, select, update
+from sqlalchemy.orm import Session
+from database.connection import db
+from models import (
+    Company, Customer, Service, ServiceOrder, User, Role, PermissionModule, RolePermission, PermissionMatrixVersion
+)
+from auth.jwt_manager import generate_token
+from routes.service_orders import service_orders_bp
+import services.scheduling as scheduling
+from services.scheduling import ArvoreIntervalos, ConflitoAgenda, agendar, cancelar_ordem
+
+EMPRESA = 'empresa-agenda'
+INICIO = datetime(2026, 1, 5, 8)
+falhas = []
+
+
+def conferir(descricao, ok, detalhe=''):
+    print(f"{'OK  ' if ok else 'FALHOU'} {descricao}{': ' + str(detalhe) if detalhe != '' else ''}")
+    if not ok:
+        falhas.append(descricao)
+
+
+def primeiro_livre_bruto(lista, apos, duracao):
+    candidato = apos
+    while True:
+        ocupados = [i for i in lista if i[0] < candidato + duracao and i[1] > candidato]
+        if not ocupados:
+            return candidato
+        candidato = max(fim for _, fim, _ in ocupados)
+
+
+def livre_caminhando(arvore, apos, duracao):
+    """Horário livre pulando de conflito em conflito (O(log n) por reserva no caminho)"""
+    candidato = apos
+    while True:
+        ocupados = arvore.sobrepostos(candidato, candidato + duracao)
+        if not ocupados:
+            return candidato
+        candidato = max(fim for _, fim, _ in ocupados)
+
+
+def conferir_arvore(operacoes=20000):
+    aleatorio = random.Random(1)
+    arvore = ArvoreIntervalos()
+    lista = []
+    for n in range(operacoes):
+        if lista and aleatorio.random() < 0.3:
+            intervalo = lista.pop(aleatorio.randrange(len(lista)))
+            arvore.remover(*intervalo)
+        else:
+            inicio = aleatorio.randrange(100000)
+            intervalo = (inicio, inicio + aleatorio.randint(1, 500), n)
+            arvore.inserir(*intervalo)
+            lista.append(intervalo)
+        if n % 50 == 0:
+            a = aleatorio.randrange(100000)
+            b = a + aleatorio.randint(1, 2000)
+            esperado = sorted(i for i in lista if i[0] < b and i[1] > a)
+            if sorted(arvore.sobrepostos(a, b)) != esperado:
+                return False, n
+            duracao = aleatorio.randint(1, 300)
+            if arvore.primeiro_livre(a, duracao) != primeiro_livre_bruto(lista, a, duracao):
+                return False, n
+    altura = arvore.raiz.altura if arvore.raiz else 0
+    return arvore.tamanho == len(lista), f'{len(lista)} intervalos, altura {altura}'
+
+
+def popular(sessao, ordens, tecnicos):
+    """Ordens de 30 min a 3 h em dias úteis, sem sobreposição, distribuídas entre os técnicos"""
+    aleatorio = random.Random(42)
+    sessao.add_all([
+        Company(id=EMPRESA, name='Empresa', document='00000000000191'),
+        Role(id='admin', name='admin'), PermissionMatrixVersion(id=1, version=0),
+        PermissionModule(name='ordens_servico')
+    ])
+    sessao.flush()
+    sessao.add(RolePermission(role_id='admin', module_name='ordens_servico', can_read=True, can_write=True))
+    sessao.add(Customer(id='cliente', company_id=EMPRESA, name='Cliente'))
+    sessao.add(Service(id='servico', company_id=EMPRESA, name='Instalação'))
+    ids = [f'tecnico-{i:03d}' for i in range(tecnicos)]
+    sessao.add_all([
+        User(id=tecnico, email=f'{tecnico}@exemplo.com', name=tecnico, password_hash='x',
+             company_id=EMPRESA, role_id='admin')
+        for tecnico in ids
+    ])
+    sessao.flush()
+
+    lote = []
+    cursores = {tecnico: INICIO for tecnico in ids}
+    for n in range(ordens):
+        tecnico = ids[n % tecnicos]
+        inicio = cursores[tecnico] + timedelta(minutes=aleatorio.choice((0, 0, 30, 60, 120)))
+        if inicio.hour >= 17:
+            inicio = (inicio + timedelta(days=1 if inicio.weekday() < 4 else 3)).replace(hour=8, minute=0)
+        fim = inicio + timedelta(minutes=aleatorio.choice((30, 60, 90, 120, 180)))
+        cursores[tecnico] = fim
+        lote.append({
+            'id': f'ordem-{n:07d}', 'company_id': EMPRESA, 'customer_id': 'cliente', 'service_id': 'servico',
+            'technician_id': tecnico, 'status': 'cancelled' if aleatorio.random() < 0.03 else 'pending',
+            'scheduled_date': inicio, 'scheduled_end': fim
+        })
+        if len(lote) == 20000:
+            sessao.execute(insert(ServiceOrder), lote)
+            lote = []
+    if lote:
+        sessao.execute(insert(ServiceOrder), lote)
+    sessao.commit()
+    return ids, max(cursores.values())
+
+
+def cronometrar_media(funcao, argumentos):
+    inicio = time.perf_counter()
+    for argumento in argumentos:
+        funcao(*argumento)
+    return (time.perf_counter() - inicio) / len(argumentos) * 1e6
+
+
+def sobreposicoes_no_banco(engine):
+    """Pares de ordens ativas do mesmo técnico que se sobrepõem"""
+    with engine.connect() as conexao:
+        linhas = conexao.execute(
+            select(ServiceOrder.technician_id, ServiceOrder.scheduled_date, ServiceOrder.scheduled_end)
+            .where(ServiceOrder.status != 'cancelled')
+            .order_by(ServiceOrder.technician_id, ServiceOrder.scheduled_date)
+        ).all()
+    problemas = 0
+    for tecnico, grupo in itertools.groupby(linhas, key=lambda linha: linha[0]):
+        fim_anterior = None
+        for _, inicio, fim in grupo:
+            if fim_anterior is not None and inicio < fim_anterior:
+                problemas += 1
+            fim_anterior = max(fim, fim_anterior) if fim_anterior else fim
+    return problemas
+
+
+def reservas_concorrentes(engine, tecnicos, reservas, workers, ultimo):
+    contador = itertools.count()
+    resultado = Counter()
+    lock = threading.Lock()
+
+    def worker(semente):
+        aleatorio = random.Random(semente)
+        parcial = Counter()
+        with Session(engine) as sessao:
+            while next(contador) < reservas:
+                inicio = ultimo + timedelta(minutes=30 * aleatorio.randrange(200))
+                try:
+                    agendar(sessao, EMPRESA, aleatorio.choice(tecnicos), inicio,
+                            inicio + timedelta(minutes=aleatorio.choice((30, 60, 90))), 'cliente', 'servico')
+                    parcial['ok'] += 1
+                except ConflitoAgenda:
+                    parcial['conflito'] += 1
+                except Exception as e:
+                    sessao.rollback()
+                    parcial[f'erro: {type(e).__name__}: {e}'[:120]] += 1
+        with lock:
+            resultado.update(parcial)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(workers)]
+    inicio = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return resultado, time.perf_counter() - inicio
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--ordens', type=int, default=100000)
+    parser.add_argument('--tecnicos', type=int, default=20)
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--reservas', type=int, default=2000)
+    args = parser.parse_args()
+    if args.tecnicos < 1:
+        parser.error('--tecnicos deve ser ao menos 1')
+    logging.disable(logging.WARNING)
+
+    ok, detalhe = conferir_arvore()
+    conferir('árvore de intervalos = força bruta (inserções, remoções, conflitos, horário livre)', ok, detalhe)
+
+    arquivo = tempfile.NamedTemporaryFile(suffix='.db', delete=False).name
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{arquivo}'
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {'connect_args': {'timeout': 30, 'check_same_thread': False}}
+    db.init_app(app)
+    app.register_blueprint(service_orders_bp, url_prefix='/api')
+
+    try:
+        with app.app_context():
+            db.create_all()
+            engine = db.engine
+            with Session(engine) as sessao:
+                inicio = time.perf_counter()
+                tecnicos, ultimo = popular(sessao, args.ordens, args.tecnicos)
+                print(f'\n{args.ordens} ordens para {args.tecnicos} técnicos, '
+                      f'populado em {time.perf_counter() - inicio:.1f} s')
+
+                agendador = scheduling.get_agendador()
+                inicio = time.perf_counter()
+                agendas = {t: agendador.agenda(sessao, EMPRESA, t) for t in tecnicos}
+                print(f'Carga das agendas: {(time.perf_counter() - inicio) * 1000:.0f} ms '
+                      f'({sum(len(a.ordens) for a in agendas.values())} ordens ativas)')
+
+            # Uma agenda com todas as ordens ativas, para ver o custo com n = 100k num técnico só
+            ordens = [(inicio, fim, id) for a in agendas.values() for id, (inicio, fim) in a.ordens.items()]
+            aleatorio = random.Random(3)
+            deslocamento = 0
+            sequenciais = []
+            for inicio_o, fim_o, id in sorted(ordens):
+                sequenciais.append((deslocamento, deslocamento + (fim_o - inicio_o), id))
+                deslocamento += (fim_o - inicio_o) + aleatorio.choice((0, 0, 300, 600, 1800))
+            inicio = time.perf_counter()
+            unica = scheduling.Agenda(sequenciais)
+            carga = (time.perf_counter() - inicio) * 1000
+
+            consultas = [(x, x + 3600) for x in (aleatorio.randrange(deslocamento) for _ in range(2000))]
+            arvore = cronometrar_media(unica.conflitos, consultas)
+            linear = cronometrar_media(
+                lambda a, b: [o for o in sequenciais if o[0] < b and o[1] > a], consultas[:50]
+            )
+            livre = cronometrar_media(lambda a, b: unica.proximo_livre(a, 1200), consultas)
+            caminhada = cronometrar_media(lambda a, b: livre_caminhando(unica.arvore, a, 1200), consultas[:200])
+            print(f'\nAgenda única com {len(sequenciais)} ordens (construída em {carga:.0f} ms, '
+                  f'altura {unica.arvore.raiz.altura}):')
+            print(f'  conflitos: árvore {arvore:.1f} µs, varredura linear {linear:,.0f} µs')
+            print(f'  próximo horário livre de 20 min: vãos na árvore {livre:.1f} µs, '
+                  f'pulando de conflito em conflito {caminhada:.1f} µs')
+            # Nenhum vão de 2 h: pulando de conflito em conflito percorre a agenda até o fim
+            livre = cronometrar_media(lambda a, b: unica.proximo_livre(a, 7200), consultas)
+            caminhada = cronometrar_media(lambda a, b: livre_caminhando(unica.arvore, a, 7200), consultas[:5])
+            print(f'  próximo horário livre de 2 h (agenda cheia): vãos na árvore {livre:.1f} µs, '
+                  f'pulando de conflito em conflito {caminhada:,.0f} µs')
+            inicio = time.perf_counter()
+            unica.utilizacao(0, deslocamento // 86400)
+            print(f'  utilização dia a dia ({deslocamento // 86400} dias): '
+                  f'{(time.perf_counter() - inicio) * 1000:.1f} ms')
+
+            with Session(engine) as sessao:
+                tecnico = tecnicos[0]
+                agenda = agendas[tecnico]
+                consultas = [
+                    (scheduling._momento(a), scheduling._momento(b))
+                    for a, b in ((x, x + 3600) for x in (
+                        aleatorio.randrange(scheduling._segundos(INICIO), scheduling._segundos(ultimo))
+                        for _ in range(500)
+                    ))
+                ]
+                memoria = cronometrar_media(
+                    lambda a, b: scheduling.conflitos(sessao, EMPRESA, tecnico, a, b), consultas
+                )
+                banco = cronometrar_media(
+                    lambda a, b: scheduling._conflitos_no_banco(sessao, EMPRESA, tecnico, a, b), consultas
+                )
+                print(f'\nConflitos de um técnico ({len(agenda.ordens)} ordens): '
+                      f'agenda {memoria:.1f} µs, consulta no banco {banco:.0f} µs')
+                divergentes = sum(
+                    sorted(o['id'] for o in scheduling.conflitos(sessao, EMPRESA, tecnico, a, b))
+                    != sorted(o[2] for o in scheduling._conflitos_no_banco(sessao, EMPRESA, tecnico, a, b))
+                    for a, b in consultas
+                )
+                conferir('agenda em memória = consulta no banco', divergentes == 0, f'{divergentes} divergentes')
+
+                # Utilização conferida contra a soma direta das ordens
+                dia = INICIO.date() + timedelta(days=14)
+                a = scheduling._segundos(datetime.combine(dia, datetime.min.time()))
+                esperado = sum(max(0, min(fim, a + 86400) - max(inicio, a)) for inicio, fim in agenda.ordens.values()) / 60
+                obtido = scheduling.utilizacao(sessao, EMPRESA, tecnico, dia, dia)[0]['booked_minutes']
+                conferir('utilização por dia', abs(obtido - esperado) < 0.1, f'{obtido} min')
+
+            resultado, tempo = reservas_concorrentes(engine, tecnicos[:3], args.reservas, args.workers, ultimo)
+            print(f'\nReservas concorrentes: {args.reservas} tentativas, {args.workers} threads, {len(tecnicos[:3])} técnicos, '
+                  f'{tempo:.1f} s ({args.reservas / tempo:,.0f}/s)')
+            print(f"  aceitas: {resultado['ok']}, recusadas por conflito: {resultado['conflito']}")
+            for chave, valor in resultado.items():
+                if chave.startswith('erro'):
+                    print(f'  {chave}: {valor}')
+            conferir('nenhuma ordem sobreposta no banco', sobreposicoes_no_banco(engine) == 0)
+            conferir('reservas sem erro', not any(c.startswith('erro') for c in resultado))
+
+            # Reserva feita "por outro processo": direto no banco, sem passar pela agenda
+            with Session(engine) as sessao:
+                tecnico = tecnicos[-1]
+                livre = scheduling.proximo_horario(sessao, EMPRESA, tecnico, ultimo, timedelta(hours=1))
+                sessao.execute(insert(ServiceOrder), [{
+                    'id': 'ordem-externa', 'company_id': EMPRESA, 'customer_id': 'cliente', 'service_id': 'servico',
+                    'technician_id': tecnico, 'status': 'pending',
+                    'scheduled_date': livre, 'scheduled_end': livre + timedelta(hours=1)
+                }])
+                sessao.commit()
+                try:
+                    agendar(sessao, EMPRESA, tecnico, livre, livre + timedelta(minutes=30), 'cliente', 'servico')
+                    conferir('conflito com reserva de outro processo recusado', False)
+                except ConflitoAgenda as e:
+                    conferir('conflito com reserva de outro processo recusado',
+                             e.conflitos[0]['id'] == 'ordem-externa')
+                conferir('agenda relida depois do conflito no banco',
+                         'ordem-externa' in scheduling.get_agendador().agenda(sessao, EMPRESA, tecnico).ordens)
+                cancelar_ordem(sessao, EMPRESA, 'ordem-externa')
+                conferir('cancelamento libera o horário',
+                         scheduling.proximo_horario(sessao, EMPRESA, tecnico, livre, timedelta(hours=1)) == livre)
+
+                # Cancelamento "por outro processo": a agenda ainda acusa a ordem, o banco não
+                reservada = agendar(sessao, EMPRESA, tecnico, livre, livre + timedelta(hours=1), 'cliente', 'servico')
+                sessao.execute(update(ServiceOrder).where(ServiceOrder.id == reservada['id'])
+                               .values(status='cancelled'))
+                sessao.commit()
+                try:
+                    agendar(sessao, EMPRESA, tecnico, livre, livre + timedelta(minutes=30), 'cliente', 'servico')
+                    conferir('conflito só na agenda em memória não recusa a reserva', True)
+                except ConflitoAgenda:
+                    conferir('conflito só na agenda em memória não recusa a reserva', False)
+                conferir('agenda relida depois da divergência com o banco',
+                         reservada['id'] not in scheduling.get_agendador().agenda(sessao, EMPRESA, tecnico).ordens)
+
+            cliente_http = app.test_client()
+            headers = {'Authorization': f'Bearer {generate_token("bench", "admin", company_id=EMPRESA)}'}
+            tecnico = tecnicos[-1]
+            resposta = cliente_http.get(f'/api/schedule/{tecnico}/next-slot?after={ultimo.isoformat()}'
+                                        f'&duration_minutes=90', headers=headers)
+            horario = resposta.get_json()
+            conferir('GET next-slot', resposta.status_code == 200, horario)
+            corpo = {'technician_id': tecnico, 'customer_id': 'cliente', 'service_id': 'servico',
+                     'scheduled_date': horario['scheduled_date'], 'duration_minutes': 90}
+            resposta = cliente_http.post('/api/service-orders', json=corpo, headers=headers)
+            conferir('POST service-orders', resposta.status_code == 201, resposta.status_code)
+            resposta = cliente_http.post('/api/service-orders', json=corpo, headers=headers)
+            conferir('POST no mesmo horário responde 409', resposta.status_code == 409, resposta.status_code)
+            resposta = cliente_http.get(f'/api/schedule/{tecnico}/utilization?from={INICIO.date()}'
+                                        f'&to={INICIO.date() + timedelta(days=6)}', headers=headers)
+            conferir('GET utilization', resposta.status_code == 200 and len(resposta.get_json()['days']) == 7)
+            resposta = cliente_http.get('/api/schedule/tecnico-inexistente/next-slot', headers=headers)
+            conferir('GET next-slot de técnico inexistente responde 400', resposta.status_code == 400,
+                     resposta.status_code)
+            conferir('técnico inexistente não ganha agenda em memória',
+                     (EMPRESA, 'tecnico-inexistente') not in scheduling.get_agendador().agendas)
+
+            # Agendas limitadas: as usadas há mais tempo saem da memória
+            with Session(engine) as sessao:
+                limitado = scheduling.Agendador(max_agendas=2)
+                for t in tecnicos[:3]:
+                    limitado.agenda(sessao, EMPRESA, t)
+                conferir('no máximo max_agendas em memória',
+                         list(limitado.agendas) == [(EMPRESA, t) for t in tecnicos[:3][-2:]])
+    finally:
+        os.unlink(arquivo)
+
+    if falhas:
+        print(f'\n{len(falhas)} verificação(ões) falharam')
+        sys.exit(1)
+    print('\nTodas as verificações passaram')
+
+
+if __name__ == '__main__':
+    main()
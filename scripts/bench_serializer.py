@@ -0,0 +1,128 @@
+"""
+Benchmark: to_dict escrito à mão + jsonify x serializador gerado das colunas
+
+Popula companies em SQLite em memória e mede uma resposta de listagem com
+todas as empresas: objetos do ORM + to_dict + jsonify (como era), objetos do
+ORM + Serializer.dumps_objetos e Rows de select(*colunas) + Serializer.dumps.
+Mede também só a serialização, sobre dados já carregados.
+Uso: python scripts/bench_serializer.py [--empresas 20000] [--repeticoes 5]
+"""
+import argparse
+import os
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+# Adiciona o diretório raiz ao PYTHONPATH
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask, jsonify
+from sqlalchemy import insert, select
+from database.connection import db
+from models import Company
+from models.serializer import get_serializer
+import fast_json
+
+
+def to_dict_manual(self):
+    """Company.to_dict antes do serializador"""
+    return {
+        'id': self.id,
+        'name': self.name,
+        'document': self.document,
+        'email': self.email,
+        'phone': self.phone,
+        'address': self.address,
+        'city': self.city,
+        'postal_code': self.postal_code,
+        'state_id': self.state_id,
+        'latitude': float(self.latitude) if self.latitude else None,
+        'longitude': float(self.longitude) if self.longitude else None,
+        'address_number': self.address_number,
+        'address_complement': self.address_complement,
+        'neighborhood': self.neighborhood,
+        'created_at': self.created_at.isoformat() if self.created_at else None,
+        'updated_at': self.updated_at.isoformat() if self.updated_at else None
+    }
+
+
+def popular(empresas):
+    inicio = datetime(2024, 1, 1)
+    db.session.execute(insert(Company), [{
+        'id': str(uuid.uuid4()), 'name': f'Empresa {i}', 'document': f'{i:014d}',
+        'email': f'contato{i}@exemplo.com', 'phone': '85999990000', 'address': 'Rua das Flores',
+        'address_number': str(i % 1000), 'neighborhood': 'Centro', 'city': 'Fortaleza',
+        'postal_code': '60000000', 'state_id': 6,
+        'latitude': Decimal('-3.71722200'), 'longitude': Decimal('-38.54337000'),
+        'created_at': inicio + timedelta(minutes=i), 'updated_at': inicio + timedelta(minutes=i)
+    } for i in range(empresas)])
+    db.session.commit()
+
+
+def medir(funcao, repeticoes):
+    melhor = float('inf')
+    for _ in range(repeticoes):
+        db.session.expunge_all()
+        inicio = time.perf_counter()
+        corpo = funcao()
+        melhor = min(melhor, time.perf_counter() - inicio)
+    return melhor * 1000, len(corpo)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--empresas', type=int, default=20000)
+    parser.add_argument('--repeticoes', type=int, default=5)
+    args = parser.parse_args()
+
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+    db.init_app(app)
+
+    with app.app_context(), app.test_request_context():
+        db.create_all()
+        popular(args.empresas)
+        serializer = get_serializer(Company)
+
+        def manual():
+            return jsonify([to_dict_manual(e) for e in Company.query.all()]).get_data()
+
+        def objetos():
+            return serializer.dumps_objetos(Company.query.all())
+
+        def linhas():
+            return serializer.dumps(db.session.execute(select(*serializer.colunas)).all())
+
+        # Mesmo conteúdo nas três saídas
+        assert fast_json.loads(manual()) == fast_json.loads(linhas()) == fast_json.loads(objetos())
+
+        print(f'{args.empresas} empresas (orjson: {"sim" if fast_json.orjson else "não"})')
+        print(f"{'consulta + serialização':<42} {'tempo':>10} {'bytes':>12}")
+        for nome, funcao in (
+            ('ORM + to_dict + jsonify', manual),
+            ('ORM + Serializer.dumps_objetos', objetos),
+            ('select(*colunas) + Serializer.dumps', linhas),
+        ):
+            tempo, tamanho = medir(funcao, args.repeticoes)
+            print(f'{nome:<42} {tempo:>7.1f} ms {tamanho:>12,}')
+
+        carregados = Company.query.all()
+        rows = db.session.execute(select(*serializer.colunas)).all()
+        print(f"\n{'só serialização':<42} {'tempo':>10}")
+        for nome, funcao in (
+            ('to_dict + jsonify', lambda: jsonify([to_dict_manual(e) for e in carregados]).get_data()),
+            ('Serializer.dumps_objetos', lambda: serializer.dumps_objetos(carregados)),
+            ('Serializer.dumps (Rows)', lambda: serializer.dumps(rows)),
+        ):
+            melhor = float('inf')
+            for _ in range(args.repeticoes):
+                inicio = time.perf_counter()
+                funcao()
+                melhor = min(melhor, time.perf_counter() - inicio)
+            print(f'{nome:<42} {melhor * 1000:>7.1f} ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,111 @@
+"""
+Benchmark: custo de autenticação por requisição (jwt.decode x cache de tokens)
+
+Mede verify_token com 1, 10 e 1000 tokens distintos em rodízio, com o cache de
+tokens e sem ele (jwt.decode a cada chamada), e o custo de carregar o usuário
+3 vezes na mesma requisição com e sem o cache da requisição (flask.g). No fim
+confere que uma revogação confirmada fora de ordem (id menor que o último lido)
+derruba um token já em cache; sai com código 1 se não derrubar.
+Usa SQLite em memória.
+Uso: python scripts/bench_token_auth.py [--requisicoes 20000]
+"""
+import argparse
+import os
+import sys
+import time
+
+import jwt
+
+# Adiciona o diretório raiz ao PYTHONPATH
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask, request
+from database.connection import db
+from datetime import datetime, timedelta
+from models import User
+from models.token_revocation import TokenRevocation
+from auth.jwt_manager import generate_token, verify_token, get_current_user, JWT_SECRET, JWT_ALGORITHM
+from auth.token_cache import get_token_cache, get_denylist
+from database.tenant import sem_tenant
+
+
+def decode_sem_cache(token):
+    return jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
+
+
+def medir(funcao, tokens, requisicoes):
+    inicio = time.perf_counter()
+    for i in range(requisicoes):
+        funcao(tokens[i % len(tokens)])
+    return (time.perf_counter() - inicio) / requisicoes * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--requisicoes', type=int, default=20000)
+    args = parser.parse_args()
+
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+    db.init_app(app)
+
+    with app.app_context():
+        db.create_all()
+        usuarios = [User(email=f'user{i}@exemplo.com', name=f'Usuário {i}', password_hash='x') for i in range(1000)]
+        db.session.add_all(usuarios)
+        db.session.commit()
+        todos_tokens = [generate_token(usuario.id) for usuario in usuarios]
+
+        print(f"{'tokens distintos':>16} {'jwt.decode':>12} {'cache':>12}")
+        for distintos in (1, 10, 1000):
+            tokens = todos_tokens[:distintos]
+            get_token_cache().invalidate()
+            sem_cache = medir(decode_sem_cache, tokens, args.requisicoes)
+            com_cache = medir(verify_token, tokens, args.requisicoes)
+            print(f"{distintos:>16} {sem_cache:>9.1f} µs {com_cache:>9.1f} µs")
+
+        # Usuários de teste sem empresa: a leitura roda sem o filtro de tenant
+        requisicoes = args.requisicoes // 10
+        user_id = usuarios[0].id
+        inicio = time.perf_counter()
+        for _ in range(requisicoes):
+            with app.app_context(), app.test_request_context(), sem_tenant():
+                for _ in range(3):
+                    db.session.expunge_all()
+                    db.session.get(User, user_id)
+        sem_g = (time.perf_counter() - inicio) / requisicoes * 1e6
+
+        inicio = time.perf_counter()
+        for _ in range(requisicoes):
+            with app.app_context(), app.test_request_context(), sem_tenant():
+                request.user_id = user_id
+                for _ in range(3):
+                    get_current_user()
+        com_g = (time.perf_counter() - inicio) / requisicoes * 1e6
+        print(f"Usuário lido 3x por requisição: {sem_g:.1f} µs sem cache, {com_g:.1f} µs com flask.g")
+        print(f"Cache de tokens: {get_token_cache().get_stats()}")
+
+        # Revogação de outro processo com id menor que o último já lido
+        denylist = get_denylist()
+        expira = datetime.utcnow() + timedelta(hours=1)
+        db.session.add_all([TokenRevocation(id=10, jti='outro', expires_at=expira),
+                            TokenRevocation(id=20, jti='mais-outro', expires_at=expira)])
+        db.session.commit()
+        token = todos_tokens[0]
+        verify_token(token)
+        denylist.sincronizar(forcar=True)
+        verify_token(token)
+        db.session.add(TokenRevocation(id=15, user_id=usuarios[0].id, not_before=time.time() + 1, expires_at=expira))
+        db.session.commit()
+        denylist.sincronizar(forcar=True)
+        try:
+            verify_token(token)
+        except Exception:
+            print('Revogação fora de ordem derrubou o token em cache')
+        else:
+            print('FALHOU: token em cache continuou valendo após revogação fora de ordem')
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
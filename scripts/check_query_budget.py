@@ -0,0 +1,194 @@
+"""
+Verifica a instrumentação de consultas: Server-Timing, detecção de N+1 e
+orçamento de consultas em modo estrito
+
+Monta uma listagem de usuários que lê user.company e user.role (lazy, 1 + 2N
+consultas) e a mesma listagem com selectinload, confere os headers, o aviso
+de consulta repetida, o /debug/queries (só para admin) e que o modo estrito
+derruba a rota que passa do orçamento, inclusive quando as consultas são feitas
+no corpo de uma resposta em streaming. Também confere o orçamento das rotas de
+/api. Sai com código 1 se algo falhar.
+Uso: python scripts/check_query_budget.py [--usuarios 50]
+"""
+import argparse
+import logging
+import os
+import sys
+
+# Adiciona o diretório raiz ao PYTHONPATH
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask, Response, jsonify, stream_with_context
+from sqlalchemy.orm import selectinload
+from database.connection import db
+from database.instrumentation import QueryInstrumentation, QueryBudgetExceeded, query_budget, contar_queries
+from database.tenant import sem_tenant
+from models import Company, Role, User, PermissionModule, RolePermission, PermissionMatrixVersion
+from auth.jwt_manager import generate_token
+from routes.resources import resources_bp
+
+falhas = []
+
+
+class _Avisos(logging.Handler):
+    def __init__(self):
+        super().__init__(logging.WARNING)
+        self.mensagens = []
+
+    def emit(self, record):
+        self.mensagens.append(record.getMessage())
+
+
+def conferir(descricao, ok, detalhe=''):
+    print(f"{'OK  ' if ok else 'FALHOU'} {descricao}{': ' + str(detalhe) if detalhe != '' else ''}")
+    if not ok:
+        falhas.append(descricao)
+
+
+def popular(usuarios):
+    db.session.add_all([PermissionMatrixVersion(id=1, version=0), PermissionModule(name='usuarios')])
+    for n in range(usuarios):
+        db.session.add(Company(id=f'empresa{n}', name=f'Empresa {n}', document=f'{n:014d}'))
+        db.session.add(Role(id=f'role{n}', name=f'Role {n}'))
+    db.session.add(Role(id='role-admin', name='admin'))
+    db.session.flush()
+    db.session.add(RolePermission(role_id='role0', module_name='usuarios', can_read=True))
+    db.session.add_all([
+        User(id=f'user{n}', email=f'u{n}@exemplo.com', name=f'Usuário {n}', password_hash='x',
+             company_id=f'empresa{n}', role_id=f'role{n}')
+        for n in range(usuarios)
+    ])
+    db.session.commit()
+
+
+def serializar(usuarios):
+    return [dict(u.to_dict(), company=u.company.name, role=u.role.name) for u in usuarios]
+
+
+def criar_app(strict):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+    app.config['TESTING'] = True
+    db.init_app(app)
+    instrumentacao = QueryInstrumentation(app, budget=0, strict=strict)
+    instrumentacao.registrar_debug(app)
+    app.register_blueprint(resources_bp, url_prefix='/api')
+
+    # Rotas sem token: listam os usuários de todas as empresas com sem_tenant()
+    @app.route('/usuarios-lazy')
+    @query_budget(5)
+    def usuarios_lazy():
+        with sem_tenant():
+            return jsonify(serializar(User.query.order_by(User.id).all()))
+
+    @app.route('/usuarios-selectin')
+    @query_budget(5)
+    def usuarios_selectin():
+        consulta = User.query.options(selectinload(User.company), selectinload(User.role))
+        with sem_tenant():
+            return jsonify(serializar(consulta.order_by(User.id).all()))
+
+    # Uma consulta por usuário feita no corpo da resposta, depois do after_request
+    @app.route('/usuarios-stream')
+    @query_budget(5)
+    def usuarios_stream():
+        def gerar():
+            with sem_tenant():
+                for n in range(len(User.query.all())):
+                    yield f"{db.session.get(User, f'user{n}', populate_existing=True).email}\n"
+        return Response(stream_with_context(gerar()), mimetype='text/plain')
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--usuarios', type=int, default=50)
+    args = parser.parse_args()
+    avisos = _Avisos()
+    logging.getLogger('database.instrumentation').addHandler(avisos)
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+
+    app = criar_app(strict=False)
+    with app.app_context():
+        db.create_all()
+        popular(args.usuarios)
+        cliente = app.test_client()
+
+        resposta = cliente.get('/usuarios-lazy')
+        consultas = int(resposta.headers['X-DB-Queries'])
+        conferir('listagem lazy: 1 + 2N consultas', consultas == 1 + 2 * args.usuarios, consultas)
+        conferir('header Server-Timing', resposta.headers.get('Server-Timing', '').startswith('db;dur='),
+                 resposta.headers.get('Server-Timing'))
+        conferir('aviso de N+1 no log', any('N+1' in m for m in avisos.mensagens))
+        conferir('aviso de orçamento excedido no log', any('Orçamento' in m for m in avisos.mensagens))
+
+        avisos.mensagens.clear()
+        resposta = cliente.get('/usuarios-selectin')
+        consultas = int(resposta.headers['X-DB-Queries'])
+        conferir('listagem com selectinload: 3 consultas', consultas == 3, consultas)
+        conferir('sem aviso de N+1', not avisos.mensagens, avisos.mensagens)
+
+        conferir('/debug/queries sem token responde 401', cliente.get('/debug/queries').status_code == 401)
+        comum = {'Authorization': f'Bearer {generate_token("user0", "role0")}'}
+        conferir('/debug/queries sem role admin responde 403',
+                 cliente.get('/debug/queries', headers=comum).status_code == 403)
+        admin = {'Authorization': f'Bearer {generate_token("user0", "role-admin")}'}
+        resposta = cliente.get('/debug/queries', headers=admin)
+        conferir('/debug/queries com role admin', resposta.status_code == 200, resposta.status_code)
+        recentes = resposta.get_json()
+        lazy = next(r for r in recentes if r['path'] == '/usuarios-lazy')
+        conferir('/debug/queries mostra o statement repetido',
+                 lazy['duplicates'] and lazy['duplicates'][0]['count'] == args.usuarios, lazy['duplicates'][:1])
+
+        avisos.mensagens.clear()
+        resposta = cliente.get('/usuarios-stream')
+        antes = int(resposta.headers['X-DB-Queries'])
+        resposta.get_data()
+        resposta.close()
+        stream = next(r for r in cliente.get('/debug/queries', headers=admin).get_json()
+                      if r['path'] == '/usuarios-stream')
+        conferir('consultas do corpo em streaming contadas ao fim do stream',
+                 antes == 0 and stream['queries'] == 1 + args.usuarios, (antes, stream['queries']))
+        conferir('orçamento da resposta em streaming conferido',
+                 any('Orçamento' in m for m in avisos.mensagens))
+
+        with contar_queries() as stats:
+            serializar(User.query.options(selectinload(User.company), selectinload(User.role)).all())
+        conferir('contar_queries fora de requisição', stats.count == 3, stats.count)
+
+        headers = {'Authorization': f'Bearer {generate_token("user0", "role0")}'}
+        resposta = cliente.get('/api/users?limit=10', headers=headers)
+        conferir('/api/users dentro do orçamento', resposta.status_code == 200, resposta.headers.get('X-DB-Queries'))
+
+    app = criar_app(strict=True)
+    with app.app_context():
+        db.create_all()
+        popular(args.usuarios)
+        cliente = app.test_client()
+        try:
+            cliente.get('/usuarios-lazy')
+            conferir('modo estrito derruba a rota acima do orçamento', False)
+        except QueryBudgetExceeded as e:
+            conferir('modo estrito derruba a rota acima do orçamento', True, e)
+        try:
+            resposta = cliente.get('/usuarios-stream')
+            resposta.get_data()
+            resposta.close()
+            conferir('modo estrito derruba o streaming acima do orçamento', False)
+        except QueryBudgetExceeded as e:
+            conferir('modo estrito derruba o streaming acima do orçamento', True, e)
+        conferir('modo estrito aceita a rota dentro do orçamento',
+                 cliente.get('/usuarios-selectin').status_code == 200)
+        headers = {'Authorization': f'Bearer {generate_token("user0", "role0")}'}
+        conferir('modo estrito aceita /api/users',
+                 cliente.get('/api/users?limit=10', headers=headers).status_code == 200)
+
+    if falhas:
+        print(f'\n{len(falhas)} verificação(ões) falharam')
+        sys.exit(1)
+    print('\nTodas as verificações passaram')
+
+
+if __name__ == '__main__':
+    main()
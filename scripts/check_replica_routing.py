@@ -0,0 +1,128 @@
+"""
+Verifica o roteamento de leituras para réplicas com dois arquivos SQLite
+
+O "primário" e a "réplica" são bancos separados, sem replicação: cada consulta
+mostra de onde veio pela linha de marcação (origem). Confere leitura na réplica,
+leitura após escrita na mesma transação (inclusive Core em session.connection()),
+read-your-writes após o commit, round-robin, queda de réplica e recuperação.
+Uso: python scripts/check_replica_routing.py
+"""
+import os
+import sys
+import tempfile
+import time
+
+# Adiciona o diretório raiz ao PYTHONPATH
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask, request
+from sqlalchemy import create_engine, select, text
+from database.connection import init_db, db
+from models import Company
+from database.tenant import sem_tenant
+
+falhas = []
+
+
+def conferir(descricao, obtido, esperado):
+    ok = obtido == esperado
+    print(f"{'OK  ' if ok else 'FALHOU'} {descricao}: {obtido}")
+    if not ok:
+        falhas.append(descricao)
+
+
+def preparar(caminho, origem):
+    engine = create_engine(f'sqlite:///{caminho}')
+    with engine.begin() as conexao:
+        Company.__table__.create(conexao, checkfirst=True)
+        conexao.execute(Company.__table__.insert().values(id='origem', name=origem, document=origem))
+    engine.dispose()
+
+
+def origem():
+    # Requisições de teste sem token: a leitura de companies passa por fora do filtro de empresa
+    with sem_tenant():
+        return db.session.execute(select(Company.name).where(Company.id == 'origem')).scalar()
+
+
+def main():
+    pasta = tempfile.mkdtemp()
+    primario = os.path.join(pasta, 'primario.db')
+    replicas = [os.path.join(pasta, f'replica{i}.db') for i in range(2)]
+    preparar(primario, 'primario')
+    for i, caminho in enumerate(replicas):
+        preparar(caminho, f'replica{i}')
+
+    os.environ['REPLICA_PIN_SECONDS'] = '0.5'
+    os.environ['REPLICA_HEALTH_INTERVAL'] = '0.5'
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{primario}'
+    init_db(app, replicas=[f'sqlite:///{caminho}' for caminho in replicas])
+    router = app.extensions['db_replicas']
+
+    with app.test_request_context(environ_base={'REMOTE_ADDR': '10.0.0.1'}):
+        conferir('leituras alternam entre as réplicas', {origem(), origem()}, {'replica0', 'replica1'})
+
+    with app.test_request_context(environ_base={'REMOTE_ADDR': '10.0.0.1'}):
+        db.session.add(Company(id='nova', name='Nova', document='123'))
+        db.session.flush()
+        conferir('leitura após escrita na transação vai ao primário', origem(), 'primario')
+        db.session.commit()
+        conferir('leitura após commit na mesma requisição', origem(), 'primario')
+
+    with app.test_request_context(environ_base={'REMOTE_ADDR': '10.0.0.1'}):
+        conferir('read-your-writes: mesmo cliente, logo após o commit', origem(), 'primario')
+        with sem_tenant():
+            conferir('registro recém-gravado visível', db.session.get(Company, 'nova') is not None, True)
+    with app.test_request_context(environ_base={'REMOTE_ADDR': '10.0.0.2'}):
+        conferir('outro cliente continua na réplica', origem().startswith('replica'), True)
+
+    time.sleep(0.6)
+    with app.test_request_context(environ_base={'REMOTE_ADDR': '10.0.0.1'}):
+        conferir('pino expirado: volta para a réplica', origem().startswith('replica'), True)
+
+    with app.test_request_context():
+        request.user_id = 'usuario-1'
+        db.session.execute(text("UPDATE companies SET email = 'x@y' WHERE id = 'origem'"))
+        db.session.commit()
+    with app.test_request_context(environ_base={'REMOTE_ADDR': '10.0.0.9'}):
+        request.user_id = 'usuario-1'
+        conferir('pino por usuário do token (SQL textual conta como escrita)', origem(), 'primario')
+
+    # Core direto na conexão da sessão (upserts do omie_sync, resumos de vendas)
+    with app.test_request_context(environ_base={'REMOTE_ADDR': '10.0.0.5'}):
+        db.session.connection().execute(
+            Company.__table__.update().where(Company.id == 'origem').values(phone='1')
+        )
+        conferir('escrita pelo Core em session.connection() leva a leitura ao primário', origem(), 'primario')
+        db.session.commit()
+    with app.test_request_context(environ_base={'REMOTE_ADDR': '10.0.0.5'}):
+        conferir('read-your-writes após escrita pelo Core', origem(), 'primario')
+
+    # Derruba a réplica 1: a checagem de saúde a tira do rodízio
+    os.rename(replicas[1], replicas[1] + '.fora')
+    os.makedirs(replicas[1])
+    with app.app_context():
+        db.engines['replica:1'].dispose()
+    time.sleep(0.6)
+    with app.test_request_context(environ_base={'REMOTE_ADDR': '10.0.0.3'}):
+        conferir('réplica fora do ar sai do rodízio', {origem() for _ in range(4)}, {'replica0'})
+
+    os.rmdir(replicas[1])
+    os.rename(replicas[1] + '.fora', replicas[1])
+    time.sleep(0.6)
+    with app.test_request_context(environ_base={'REMOTE_ADDR': '10.0.0.3'}):
+        conferir('réplica volta após a checagem', {origem() for _ in range(4)}, {'replica0', 'replica1'})
+
+    with app.test_request_context(environ_base={'REMOTE_ADDR': '10.0.0.4'}), sem_tenant():
+        conferir('SELECT ... FOR UPDATE vai ao primário',
+                 db.session.execute(select(Company.name).where(Company.id == 'origem').with_for_update()).scalar(),
+                 'primario')
+
+    print(router.get_metrics())
+    if falhas:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
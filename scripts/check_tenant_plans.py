@@ -0,0 +1,237 @@
+"""
+Verifica o filtro de tenant e os planos das consultas por empresa
+
+Popula duas empresas e, como a empresa A (token JWT pela API e com_tenant()
+direto no ORM), confere que só voltam registros dela, que UPDATE em massa e
+inserts respeitam o tenant e que nenhuma consulta filtrada por company_id faz
+varredura completa da tabela ou ordenação em memória (EXPLAIN). Sai com
+código 1 se algo falhar, para rodar no CI depois de mudar índices ou consultas.
+Uso: python scripts/check_tenant_plans.py [--url mysql+mysqlconnector://...]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import uuid
+from datetime import datetime, timedelta
+
+# Adiciona o diretório raiz ao PYTHONPATH
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import logging
+from flask import Flask
+from sqlalchemy import event, func, insert, select, text, update
+from database.connection import db
+from database.tenant import com_tenant, sem_tenant, TenantInvalido
+from models import (
+    Company, Customer, Product, Service, User, Role,
+    PermissionModule, RolePermission, PermissionMatrixVersion
+)
+from auth.jwt_manager import generate_token
+from routes.auth import auth_bp
+from routes.resources import resources_bp
+
+falhas = []
+
+
+def conferir(descricao, ok, detalhe=''):
+    print(f"{'OK  ' if ok else 'FALHOU'} {descricao}{': ' + str(detalhe) if detalhe != '' else ''}")
+    if not ok:
+        falhas.append(descricao)
+
+
+def popular(empresas, por_empresa):
+    inicio = datetime(2024, 1, 1)
+    db.session.add_all([PermissionMatrixVersion(id=1, version=0), Role(id='admin', name='admin')])
+    db.session.add_all([PermissionModule(name=m) for m in ('empresas', 'clientes', 'usuarios')])
+    db.session.flush()
+    db.session.add_all([
+        RolePermission(role_id='admin', module_name=m, can_read=True) for m in ('empresas', 'clientes', 'usuarios')
+    ])
+    for n, empresa in enumerate(empresas):
+        db.session.add(Company(id=empresa, name=f'Empresa {n}', document=f'{n:014d}'))
+        for model, extras in ((Customer, ()), (Product, ('sku',)), (Service, ('code',))):
+            linhas = []
+            for i in range(por_empresa):
+                linha = {
+                    'id': str(uuid.uuid4()), 'company_id': empresa, 'name': f'{model.__name__} {i:06d}',
+                    'created_at': inicio + timedelta(seconds=i), 'updated_at': inicio
+                }
+                for coluna in extras:
+                    linha[coluna] = f'{coluna.upper()}-{i}'
+                linhas.append(linha)
+            db.session.execute(insert(model), linhas)
+        db.session.execute(insert(User), [{
+            'id': str(uuid.uuid4()), 'company_id': empresa, 'email': f'u{i}@empresa{n}.com',
+            'name': f'Usuário {i:05d}', 'password_hash': 'x', 'role_id': 'admin',
+            'created_at': inicio + timedelta(seconds=i)
+        } for i in range(por_empresa // 10)])
+    db.session.commit()
+
+
+def planos_com_varredura(conexao, consultas):
+    """
+    Consultas com company_id cujo plano varre a tabela (ou um índice) inteira
+    ou ordena em memória
+    """
+    problemas = []
+    mysql = conexao.dialect.name == 'mysql'
+    for sql, parametros in consultas:
+        if 'company_id' not in sql:
+            continue
+        if mysql:
+            plano = conexao.exec_driver_sql('EXPLAIN ' + sql, parametros).mappings().all()
+            ruins = [
+                f"{linha['table']}: type={linha['type']} {linha['Extra'] or ''}" for linha in plano
+                if linha['type'] in ('ALL', 'index') or 'filesort' in (linha['Extra'] or '')
+            ]
+        else:
+            plano = [linha[-1] for linha in conexao.exec_driver_sql('EXPLAIN QUERY PLAN ' + sql, parametros)]
+            # SCAN é varredura completa, mesmo USING INDEX; SEARCH é busca por faixa
+            ruins = [detalhe for detalhe in plano if detalhe.startswith('SCAN ') or 'TEMP B-TREE' in detalhe]
+        if ruins:
+            problemas.append((' '.join(sql.split())[:120], ruins))
+    return problemas
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--url', help='Banco de teste (padrão: SQLite temporário)')
+    parser.add_argument('--por-empresa', type=int, default=5000)
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    arquivo = None
+    if args.url is None:
+        arquivo = tempfile.NamedTemporaryFile(suffix='.db', delete=False).name
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = args.url or f'sqlite:///{arquivo}'
+    db.init_app(app)
+    app.register_blueprint(auth_bp, url_prefix='/auth')
+    app.register_blueprint(resources_bp, url_prefix='/api')
+
+    empresa_a, empresa_b = str(uuid.uuid4()), str(uuid.uuid4())
+    consultas = []
+
+    try:
+        with app.app_context():
+            db.drop_all()
+            db.create_all()
+            popular([empresa_a, empresa_b], args.por_empresa)
+            with db.engine.connect() as conexao:
+                if conexao.dialect.name == 'sqlite':
+                    conexao.execute(text('ANALYZE'))
+                else:
+                    conexao.execute(text('ANALYZE TABLE customers, products, services, users'))
+
+            @event.listens_for(db.engine, 'before_cursor_execute')
+            def capturar(conexao, cursor, sql, parametros, contexto, executemany):
+                if not executemany:
+                    consultas.append((sql, parametros))
+
+            # Pela API, com o tenant vindo do token
+            cliente_http = app.test_client()
+            headers = {'Authorization': f'Bearer {generate_token("u", "admin", company_id=empresa_a)}'}
+            for recurso, total in (('customers', args.por_empresa), ('users', args.por_empresa // 10), ('companies', 1)):
+                vistos, cursor = set(), None
+                while True:
+                    url = f'/api/{recurso}?limit=500&fields=id' + (f'&cursor={cursor}' if cursor else '')
+                    resposta = cliente_http.get(url, headers=headers).get_json()
+                    vistos.update(registro['id'] for registro in resposta['data'])
+                    cursor = resposta['next_cursor']
+                    if not cursor:
+                        break
+                conferir(f'/api/{recurso} lista só a empresa do token', len(vistos) == total, f'{len(vistos)} de {total}')
+
+            with app.test_request_context(), com_tenant(empresa_a):
+                clientes = Customer.query.order_by(Customer.created_at, Customer.id).limit(50).all()
+                conferir('ORM: página de clientes', {c.company_id for c in clientes} == {empresa_a})
+                conferir('ORM: busca por nome', len(Customer.query.filter_by(name='Customer 000010').all()) == 1)
+                produtos = Product.query.order_by(Product.name).limit(50).all()
+                conferir('ORM: produtos por nome', {p.company_id for p in produtos} == {empresa_a})
+                contagem = db.session.execute(select(func.count()).select_from(Service)).scalar()
+                conferir('ORM: contagem de serviços', contagem == args.por_empresa, contagem)
+                conferir('ORM: empresa de outro tenant invisível', db.session.get(Company, empresa_b) is None)
+
+                alterados = db.session.execute(update(Customer).values(city='Teste')).rowcount
+                conferir('UPDATE em massa só na empresa', alterados == args.por_empresa, alterados)
+                db.session.rollback()
+
+                novo = Customer(name='Novo')
+                db.session.add(novo)
+                db.session.flush()
+                conferir('insert recebe o company_id do tenant', novo.company_id == empresa_a)
+                db.session.rollback()
+                try:
+                    db.session.add(Customer(name='Intruso', company_id=empresa_b))
+                    db.session.flush()
+                    conferir('insert em outra empresa recusado', False)
+                except TenantInvalido:
+                    conferir('insert em outra empresa recusado', True)
+                db.session.rollback()
+                try:
+                    Customer.query.first().company_id = empresa_b
+                    db.session.flush()
+                    conferir('mover registro para outra empresa recusado', False)
+                except TenantInvalido:
+                    conferir('mover registro para outra empresa recusado', True)
+                db.session.rollback()
+
+            event.remove(db.engine, 'before_cursor_execute', capturar)
+
+            # O cadastro público não escolhe empresa nem role
+            for campo, valor in (('company_id', empresa_a), ('role_id', 'admin')):
+                resposta = cliente_http.post('/auth/register', json={
+                    'email': 'intruso@teste.com', 'password': 'segredo123', 'name': 'Intruso', campo: valor
+                })
+                conferir(f'cadastro com {campo} no corpo recusado', resposta.status_code == 400, resposta.status_code)
+
+            # Token sem empresa (cadastro público) não enxerga nenhuma empresa
+            cadastro = cliente_http.post('/auth/register', json={
+                'email': 'sem-empresa@teste.com', 'password': 'segredo123', 'name': 'Sem empresa'
+            })
+            conferir('cadastro sem empresa', cadastro.status_code == 201, cadastro.status_code)
+            usuario = cadastro.get_json()['user']
+            conferir('cadastro cria usuário sem empresa e sem role',
+                     (usuario.get('company_id'), usuario.get('role_id')) == (None, None), usuario)
+            login = cliente_http.post('/auth/login', json={'email': 'sem-empresa@teste.com', 'password': 'segredo123'})
+            conferir('login sem empresa', login.status_code == 200, login.status_code)
+            for token in (cadastro.get_json()['token'], generate_token('u', 'admin', company_id=None)):
+                for recurso in ('customers', 'users', 'companies'):
+                    resposta = cliente_http.get(f'/api/{recurso}', headers={'Authorization': f'Bearer {token}'})
+                    conferir(f'/api/{recurso} recusado sem empresa no token', resposta.status_code == 403,
+                             resposta.status_code)
+            with app.test_request_context():
+                conferir('ORM na requisição sem empresa não vê clientes', Customer.query.count() == 0)
+                conferir('ORM na requisição sem empresa não vê empresas', Company.query.count() == 0)
+                try:
+                    db.session.add(Customer(name='Sem empresa', company_id=empresa_a))
+                    db.session.flush()
+                    conferir('insert na requisição sem empresa recusado', False)
+                except TenantInvalido:
+                    conferir('insert na requisição sem empresa recusado', True)
+                db.session.rollback()
+                with sem_tenant():
+                    conferir('sem_tenant() vê todas as empresas', Company.query.count() == 2)
+
+            filtradas = sum(1 for sql, _ in consultas if 'company_id' in sql)
+            conferir('consultas com filtro de tenant capturadas', filtradas > 0, filtradas)
+            with db.engine.connect() as conexao:
+                problemas = planos_com_varredura(conexao, consultas)
+            for sql, ruins in problemas:
+                print(f'       {sql}\n         -> {"; ".join(ruins)}')
+            conferir('nenhuma consulta por tenant com varredura completa ou sort', not problemas,
+                     f'{len(problemas)} com problema')
+            db.drop_all()
+    finally:
+        if arquivo:
+            os.unlink(arquivo)
+
+    if falhas:
+        print(f'\n{len(falhas)} verificação(ões) falharam')
+        sys.exit(1)
+    print('\nTodas as verificações passaram')
+
+
+if __name__ == '__main__':
+    main()
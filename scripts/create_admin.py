@@ -1,5 +1,5 @@
 from flask import Flask
-from config.database import init_db, db
+from database.connection import init_db, db
 from models import User, Role, Company
 import uuid
 from dotenv import load_dotenv
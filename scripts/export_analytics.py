@@ -0,0 +1,47 @@
+"""
+Exporta o snapshot analítico (Arrow IPC) usado pelos relatórios de /api/reports
+
+Lê da primeira réplica (DATABASE_REPLICA_URLS), se houver. Sem --empresa,
+exporta todas as empresas, uma por vez. Pensado para rodar no cron (ex.: de
+hora em hora); o snapshot novo só substitui o vigente depois de completo.
+Uso: python scripts/export_analytics.py [--empresa <company_id>] [--pasta data/analytics]
+"""
+import argparse
+import json
+import os
+import sys
+
+# Adiciona o diretório raiz ao PYTHONPATH
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import select
+from database.connection import create_db_engine, replica_urls
+from models.company import Company
+from services.analytics import exportar_snapshot
+from config import ANALYTICS_DIR, ANALYTICS_EXPORT_BATCH
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--empresa', help='Só esta empresa (padrão: todas)')
+    parser.add_argument('--pasta', default=ANALYTICS_DIR)
+    parser.add_argument('--lote', type=int, default=ANALYTICS_EXPORT_BATCH)
+    args = parser.parse_args()
+
+    replicas = replica_urls()
+    engine = create_db_engine(replicas[0] if replicas else None)
+    try:
+        if args.empresa:
+            empresas = [args.empresa]
+        else:
+            with engine.connect() as conexao:
+                empresas = conexao.execute(select(Company.id).order_by(Company.id)).scalars().all()
+        for company_id in empresas:
+            resumo = exportar_snapshot(company_id, engine=engine, raiz=args.pasta, lote=args.lote)
+            print(json.dumps(resumo))
+    finally:
+        engine.dispose()
+
+
+if __name__ == '__main__':
+    main()
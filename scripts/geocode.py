@@ -0,0 +1,56 @@
+"""
+Preenche latitude/longitude de empresas e clientes (pipeline de geocodificação)
+
+Lê os cadastros sem coordenadas em lotes, resolve os endereços pelo cache
+geocode_cache e chama o geocodificador (GEOCODER) só para os que faltam,
+respeitando GEOCODE_RATE_PER_SECOND. Pode ser agendado no cron ou ficar rodando
+com --intervalo (segundos entre execuções).
+Uso: python scripts/geocode.py [--empresa <company_id>] [--fonte companies|customers]
+     [--refazer] [--geocoder stub] [--intervalo 600]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+# Adiciona o diretório raiz ao PYTHONPATH
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database.connection import create_db_engine
+from services.geocoding import FONTES, criar_geocoder, geocodificar
+from config import GEOCODER, GEOCODE_BATCH_SIZE
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--empresa', help='Só esta empresa (padrão: todas)')
+    parser.add_argument('--fonte', choices=list(FONTES), action='append', help='Padrão: empresas e clientes')
+    parser.add_argument('--refazer', action='store_true', help='Inclui cadastros que já têm coordenadas')
+    parser.add_argument('--geocoder', default=GEOCODER)
+    parser.add_argument('--lote', type=int, default=GEOCODE_BATCH_SIZE)
+    parser.add_argument('--intervalo', type=int, help='Repete a cada N segundos')
+    args = parser.parse_args()
+
+    def progresso(fonte, linhas):
+        print(f'\r{fonte}: {linhas} cadastros', end='', flush=True)
+
+    engine = create_db_engine()
+    geocoder = criar_geocoder(args.geocoder)
+    try:
+        while True:
+            resumo = geocodificar(engine, tuple(args.fonte or FONTES), company_id=args.empresa,
+                                  refazer=args.refazer, geocoder=geocoder, lote=args.lote, progresso=progresso)
+            print()
+            print(json.dumps(resumo, indent=2))
+            if not args.intervalo:
+                break
+            time.sleep(args.intervalo)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        engine.dispose()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,47 @@
+"""
+Importa clientes, produtos ou serviços de um arquivo CSV/XLSX
+
+Uso: python scripts/import_data.py <customers|products|services> <company_id> <arquivo>
+     [--lote 1000] [--workers 4] [--rejeitados rejeitados.csv] [--encoding utf-8-sig]
+"""
+import argparse
+import json
+import os
+import sys
+
+# Adiciona o diretório raiz ao PYTHONPATH
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database.connection import create_db_engine
+from services.importer import Importador, ENTIDADES
+from config import IMPORT_BATCH_SIZE, IMPORT_WORKERS
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('entidade', choices=sorted(ENTIDADES))
+    parser.add_argument('company_id')
+    parser.add_argument('arquivo')
+    parser.add_argument('--lote', type=int, default=IMPORT_BATCH_SIZE)
+    parser.add_argument('--workers', type=int, default=IMPORT_WORKERS)
+    parser.add_argument('--rejeitados', help='CSV para as linhas rejeitadas')
+    parser.add_argument('--encoding', default='utf-8-sig', help='Encoding do CSV (ex.: latin-1)')
+    args = parser.parse_args()
+
+    def progresso(resumo):
+        print(f"\r{resumo['gravadas']} gravadas, {resumo['rejeitadas']} rejeitadas "
+              f"({resumo['linhas_por_segundo']:.0f} linhas/s)", end='', flush=True)
+
+    importador = Importador(
+        create_db_engine(), args.entidade, args.company_id,
+        tamanho_lote=args.lote, workers=args.workers,
+        rejeitados=args.rejeitados, progresso=progresso
+    )
+    kwargs = {} if args.arquivo.lower().endswith(('.xlsx', '.xlsm')) else {'encoding': args.encoding}
+    resumo = importador.importar_arquivo(args.arquivo, **kwargs)
+    print()
+    print(json.dumps(resumo, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,220 @@
+"""
+Teste de carga do registro de vendas: workers em paralelo disputando o mesmo
+estoque
+
+Cria produtos com pouco estoque e dispara vendas de vários itens a partir de
+N threads. No fim confere, produto a produto, que estoque inicial - vendido
+== estoque atual e que nenhum estoque ficou negativo (zero oversell), e mostra
+vendas/s. Com --ingenuo roda antes a versão ler-checar-gravar do estoque, para
+comparação. Também confere que pedidos malformados, produto inexistente e
+valores acima do que cabe na tabela são recusados com VendaInvalida, sem baixa
+de estoque. Sai com código 1 se houver oversell ou validação falhando.
+Uso: python scripts/load_test_sales.py [--url mysql+mysqlconnector://...] [--workers 8]
+     [--vendas 3000] [--produtos 20] [--estoque 150] [--ingenuo]
+"""
+import argparse
+import itertools
+import logging
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from collections import Counter
+from decimal import Decimal
+
+# Adiciona o diretório raiz ao PYTHONPATH
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import func, insert, select, update
+from sqlalchemy.orm import Session
+from database.connection import db, create_db_engine
+from models import (
+    Company, Customer, Product, Sale, SaleItem, SalesDailyRollup, ProductMonthlyRollup, CustomerMonthlyRollup
+)
+from services.sales import registrar_venda, EstoqueInsuficiente, VendaInvalida
+
+EMPRESA = 'empresa-carga'
+TABELAS = [
+    Company.__table__, Customer.__table__, Product.__table__, Sale.__table__, SaleItem.__table__,
+    SalesDailyRollup.__table__, ProductMonthlyRollup.__table__, CustomerMonthlyRollup.__table__
+]
+
+
+def preparar(engine, produtos, estoque):
+    db.metadata.drop_all(engine, tables=list(reversed(TABELAS)))
+    db.metadata.create_all(engine, tables=TABELAS)
+    ids = [f'produto-{i:03d}' for i in range(produtos)]
+    with engine.begin() as conexao:
+        conexao.execute(insert(Company.__table__).values(id=EMPRESA, name='Carga', document='00000000000100'))
+        conexao.execute(insert(Product.__table__), [
+            {'id': product_id, 'company_id': EMPRESA, 'sku': product_id, 'name': product_id,
+             'price': Decimal('9.90'), 'stock_quantity': estoque}
+            for product_id in ids
+        ])
+    return ids
+
+
+def vender_ingenuo(session, company_id, itens):
+    """Lê o estoque, confere em Python e grava o valor calculado (perde baixas concorrentes)"""
+    for item in itens:
+        atual = session.execute(
+            select(Product.stock_quantity).where(Product.id == item['product_id'])
+        ).scalar()
+        if atual < item['quantity']:
+            session.rollback()
+            raise EstoqueInsuficiente(item['product_id'], item['quantity'])
+        session.execute(
+            update(Product).where(Product.id == item['product_id'])
+            .values(stock_quantity=atual - item['quantity'])
+            .execution_options(synchronize_session=False)
+        )
+    sale_id = str(uuid.uuid4())
+    session.execute(insert(Sale), [{'id': sale_id, 'company_id': company_id, 'total': 0}])
+    session.execute(insert(SaleItem), [
+        {'id': str(uuid.uuid4()), 'sale_id': sale_id, 'product_id': item['product_id'],
+         'quantity': item['quantity'], 'unit_price': 0, 'total': 0}
+        for item in itens
+    ])
+    session.commit()
+
+
+def carga(engine, ids, vendas, workers, vender):
+    contador = itertools.count()
+    resultado = Counter()
+    lock = threading.Lock()
+
+    def worker(semente):
+        aleatorio = random.Random(semente)
+        parcial = Counter()
+        with Session(engine) as session:
+            while next(contador) < vendas:
+                itens = [
+                    {'product_id': product_id, 'quantity': aleatorio.randint(1, 3)}
+                    for product_id in aleatorio.sample(ids, aleatorio.randint(1, 4))
+                ]
+                try:
+                    vender(session, EMPRESA, itens)
+                    parcial['ok'] += 1
+                except EstoqueInsuficiente:
+                    parcial['sem_estoque'] += 1
+                except Exception as e:
+                    session.rollback()
+                    parcial[f'erro: {type(e).__name__}'] += 1
+        with lock:
+            resultado.update(parcial)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(workers)]
+    inicio = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return resultado, time.perf_counter() - inicio
+
+
+def conferir_estoque(engine, ids, estoque):
+    """Produtos em que estoque inicial - vendido != estoque atual, ou estoque negativo"""
+    with engine.connect() as conexao:
+        vendido = dict(conexao.execute(
+            select(SaleItem.product_id, func.sum(SaleItem.quantity)).group_by(SaleItem.product_id)
+        ).all())
+        atual = dict(conexao.execute(select(Product.id, Product.stock_quantity)).all())
+    problemas = []
+    for product_id in ids:
+        vendidos = int(vendido.get(product_id) or 0)
+        if atual[product_id] < 0 or estoque - vendidos != atual[product_id]:
+            problemas.append((product_id, estoque, vendidos, atual[product_id]))
+    return problemas, sum(int(v or 0) for v in vendido.values())
+
+
+def rodar(nome, engine, args, vender):
+    ids = preparar(engine, args.produtos, args.estoque)
+    resultado, tempo = carga(engine, ids, args.vendas, args.workers, vender)
+    problemas, unidades = conferir_estoque(engine, ids, args.estoque)
+    # Unidades vendidas que não saíram do estoque (baixas perdidas ou estoque negativo)
+    oversell = sum(vendidos - (estoque - atual) for _, estoque, vendidos, atual in problemas)
+    print(f'\n{nome}: {args.vendas} tentativas em {tempo:.1f} s ({resultado["ok"] / tempo:,.0f} vendas/s)')
+    print(f'  vendas: {resultado["ok"]}, sem estoque: {resultado["sem_estoque"]}, '
+          f'unidades vendidas: {unidades} de {args.produtos * args.estoque}')
+    for chave, valor in resultado.items():
+        if chave.startswith('erro'):
+            print(f'  {chave}: {valor}')
+    print(f'  produtos inconsistentes: {len(problemas)}, unidades vendidas a mais: {oversell}')
+    return problemas
+
+
+def conferir_validacao(engine):
+    """Pedidos que têm de ser recusados com VendaInvalida; devolve os que passaram"""
+    ids = preparar(engine, 2, 10)
+    with engine.begin() as conexao:
+        conexao.execute(update(Product.__table__).where(Product.id == ids[1]).values(price=Decimal('20000000.00')))
+    invalidos = {
+        'itens não lista': {'a': 1},
+        'item não objeto': ['x'],
+        'product_id numérico': [{'product_id': 1, 'quantity': 1}, {'product_id': ids[0], 'quantity': 1}],
+        'product_id vazio': [{'product_id': '', 'quantity': 1}],
+        'quantidade zero': [{'product_id': ids[0], 'quantity': 0}],
+        'quantidade enorme': [{'product_id': ids[0], 'quantity': 10 ** 12}],
+        'produto inexistente': [{'product_id': 'nao-existe', 'quantity': 1}],
+        'total acima do máximo': [{'product_id': ids[1], 'quantity': 10}],
+    }
+    aceitos = []
+    with Session(engine) as session:
+        for nome, itens in invalidos.items():
+            try:
+                registrar_venda(session, EMPRESA, itens)
+                aceitos.append(nome)
+            except VendaInvalida:
+                pass
+    with engine.connect() as conexao:
+        estoques = conexao.execute(select(Product.stock_quantity)).scalars().all()
+    if estoques != [10, 10]:
+        aceitos.append(f'estoque alterado: {estoques}')
+    print(f'Validação: {len(invalidos) - len(aceitos)} de {len(invalidos)} pedidos inválidos recusados')
+    return aceitos
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--url', help='Banco de teste (padrão: SQLite temporário)')
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--vendas', type=int, default=3000)
+    parser.add_argument('--produtos', type=int, default=20)
+    parser.add_argument('--estoque', type=int, default=150)
+    parser.add_argument('--ingenuo', action='store_true', help='Roda também a versão ler-checar-gravar')
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    arquivo = None
+    if args.url is None:
+        arquivo = tempfile.NamedTemporaryFile(suffix='.db', delete=False).name
+        engine = create_db_engine(f'sqlite:///{arquivo}', connect_args={'timeout': 30})
+    else:
+        engine = create_db_engine(args.url, pool_size=args.workers, max_overflow=0)
+    print(f'{engine.dialect.name}: {args.workers} workers, {args.produtos} produtos com {args.estoque} unidades')
+
+    try:
+        if args.ingenuo:
+            rodar('ler-checar-gravar', engine, args, vender_ingenuo)
+        problemas = rodar('registrar_venda (UPDATE ... WHERE estoque >= n)', engine, args, registrar_venda)
+        aceitos = conferir_validacao(engine)
+        db.metadata.drop_all(engine, tables=list(reversed(TABELAS)))
+    finally:
+        engine.dispose()
+        if arquivo:
+            os.unlink(arquivo)
+
+    if aceitos:
+        print(f'\nPedidos inválidos aceitos: {aceitos}')
+    if problemas:
+        print('\nOversell detectado no registrar_venda')
+    if problemas or aceitos:
+        sys.exit(1)
+    print('\nZero oversell')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,207 @@
+"""
+Servidor HTTP local que imita a API do Omie, usado pelos benchmarks
+"""
+import json
+import threading
+import time
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def data_alteracao(codigo):
+    """Data de alteração sintética, espalhada ao longo de 2024"""
+    return datetime(2024, 1, 1, 9, 30) + timedelta(days=codigo % 365, minutes=codigo % 600)
+
+
+def gerar_cliente(codigo):
+    """Gera um cliente sintético no formato de clientes_cadastro"""
+    alteracao = data_alteracao(codigo)
+    return {
+        "codigo_cliente_omie": codigo,
+        "codigo_cliente_integracao": f"CLI{codigo:08d}",
+        "razao_social": f"Cliente Exemplo {codigo} Ltda",
+        "nome_fantasia": f"Exemplo {codigo}",
+        "cnpj_cpf": f"{codigo % 100:02d}.{codigo % 1000:03d}.{codigo % 997:03d}/0001-{codigo % 100:02d}",
+        "cidade": "SAO PAULO (SP)",
+        "estado": "SP",
+        "email": f"contato{codigo}@exemplo.com.br",
+        "telefone1_ddd": "11",
+        "telefone1_numero": f"9{codigo % 10000:04d}-{codigo % 9999:04d}",
+        "endereco": "Rua Exemplo",
+        "endereco_numero": str(codigo % 1000),
+        "bairro": "Centro",
+        "cep": "01001000",
+        "inativo": "N",
+        "tags": [],
+        "info": {
+            "dInc": "01/01/2024",
+            "hInc": "08:00:00",
+            "dAlt": alteracao.strftime("%d/%m/%Y"),
+            "hAlt": alteracao.strftime("%H:%M:%S"),
+            "uInc": "WEBSERVICE",
+            "uAlt": "WEBSERVICE",
+            "cImpAPI": "S"
+        }
+    }
+
+
+SEM_REGISTROS = {
+    "faultstring": "ERROR: Não existem registros para a página [1]!",
+    "faultcode": "SOAP-ENV:Client-5113"
+}
+
+
+def listar_clientes(param, total_clientes):
+    """Monta uma página de ListarClientes (filtra por data de alteração, se pedido)"""
+    pagina = int(param.get("pagina", 1))
+    por_pagina = int(param.get("registros_por_pagina", 50))
+    codigos = range(1, total_clientes + 1)
+    if param.get("filtrar_por_data_de"):
+        desde = datetime.strptime(
+            f"{param['filtrar_por_data_de']} {param.get('filtrar_por_hora_de', '00:00:00')}",
+            "%d/%m/%Y %H:%M:%S"
+        )
+        codigos = [codigo for codigo in codigos if data_alteracao(codigo) >= desde]
+    if not codigos:
+        return 500, SEM_REGISTROS
+
+    total = len(codigos)
+    inicio = (pagina - 1) * por_pagina
+    clientes = [gerar_cliente(codigo) for codigo in codigos[inicio:inicio + por_pagina]]
+    return 200, {
+        "pagina": pagina,
+        "total_de_paginas": -(-total // por_pagina),
+        "registros": len(clientes),
+        "total_de_registros": total,
+        "clientes_cadastro": clientes
+    }
+
+
+class CadastroStub:
+    """Clientes gravados pelas chamadas de escrita, por codigo_cliente_integracao"""
+
+    def __init__(self, primeiro_codigo):
+        self.clientes = {}
+        self.proximo_codigo = primeiro_codigo
+        self.lock = threading.Lock()
+
+    def _validar(self, cliente):
+        if not cliente.get("codigo_cliente_integracao"):
+            return "Tag [codigo_cliente_integracao] não informada!"
+        if not cliente.get("razao_social") or not cliente.get("cnpj_cpf"):
+            return f"Cliente [{cliente['codigo_cliente_integracao']}] sem razão social ou CNPJ/CPF!"
+        return None
+
+    def _gravar(self, cliente, incluir):
+        # Chamado com o lock adquirido
+        integracao = cliente["codigo_cliente_integracao"]
+        existente = self.clientes.get(integracao)
+        if existente and incluir:
+            return None
+        codigo = existente["codigo_cliente_omie"] if existente else self.proximo_codigo
+        if not existente:
+            self.proximo_codigo += 1
+        self.clientes[integracao] = dict(cliente, codigo_cliente_omie=codigo)
+        return codigo
+
+    def cliente(self, cliente, incluir):
+        erro = self._validar(cliente)
+        if erro:
+            return 500, {"faultstring": f"ERROR: {erro}", "faultcode": "SOAP-ENV:Client-101"}
+        with self.lock:
+            codigo = self._gravar(cliente, incluir)
+        if codigo is None:
+            return 500, {
+                "faultstring": f"ERROR: Cliente já cadastrado para o Código de Integração [{cliente['codigo_cliente_integracao']}]!",
+                "faultcode": "SOAP-ENV:Client-102"
+            }
+        return 200, {
+            "codigo_cliente_omie": codigo,
+            "codigo_cliente_integracao": cliente["codigo_cliente_integracao"],
+            "codigo_status": "0",
+            "descricao_status": "Cliente cadastrado com sucesso!"
+        }
+
+    def lote(self, param, incluir):
+        clientes = param.get("clientes_cadastro") or []
+        if len(clientes) > 50:
+            return 500, {"faultstring": "ERROR: O lote deve ter no máximo 50 registros!", "faultcode": "SOAP-ENV:Client-103"}
+        for cliente in clientes:
+            erro = self._validar(cliente)
+            if erro:
+                return 500, {"faultstring": f"ERROR: {erro}", "faultcode": "SOAP-ENV:Client-101"}
+        with self.lock:
+            if incluir and any(c["codigo_cliente_integracao"] in self.clientes for c in clientes):
+                return 500, {"faultstring": "ERROR: Lote com cliente já cadastrado!", "faultcode": "SOAP-ENV:Client-102"}
+            for cliente in clientes:
+                self._gravar(cliente, incluir)
+        return 200, {
+            "lote": param.get("lote"),
+            "codigo_status": "0",
+            "descricao_status": f"Lote [{param.get('lote')}] processado com sucesso!"
+        }
+
+
+def criar_handler(latencia, total_clientes, cadastro):
+    class OmieStubHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True
+
+        def do_POST(self):
+            tamanho = int(self.headers.get("Content-Length", 0))
+            data = json.loads(self.rfile.read(tamanho) or b"{}")
+            if latencia:
+                time.sleep(latencia)
+
+            call = data.get("call")
+            param = (data.get("param") or [{}])[0]
+            if call == "ListarClientes":
+                status, body = listar_clientes(param, total_clientes)
+            elif call in ("IncluirCliente", "UpsertCliente"):
+                status, body = cadastro.cliente(param, incluir=call == "IncluirCliente")
+            elif call in ("IncluirClientesPorLote", "UpsertClientesPorLote"):
+                status, body = cadastro.lote(param, incluir=call == "IncluirClientesPorLote")
+            else:
+                status, body = 500, {"faultstring": f"Método {call} não suportado pelo stub"}
+
+            payload = json.dumps(body).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, format, *args):
+            pass
+
+    return OmieStubHandler
+
+
+class OmieStubServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # Backlog padrão (5) derruba conexões quando há muitos clientes simultâneos
+    request_queue_size = 1024
+
+
+def iniciar_stub(latencia=0.05, total_clientes=1000, porta=0):
+    """
+    Sobe o stub em uma thread e retorna (servidor, base_url)
+
+    Os clientes gravados pelas chamadas de escrita ficam em servidor.cadastro.
+    """
+    cadastro = CadastroStub(primeiro_codigo=total_clientes + 1)
+    servidor = OmieStubServer(("127.0.0.1", porta), criar_handler(latencia, total_clientes, cadastro))
+    servidor.cadastro = cadastro
+    thread = threading.Thread(target=servidor.serve_forever, daemon=True)
+    thread.start()
+    host, porta = servidor.server_address
+    return servidor, f"http://{host}:{porta}/api/v1"
+
+
+if __name__ == "__main__":
+    servidor, base_url = iniciar_stub(porta=8765)
+    print(f"Stub do Omie rodando em {base_url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        servidor.shutdown()
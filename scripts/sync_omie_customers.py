@@ -0,0 +1,40 @@
+"""
+Sincroniza os clientes do Omie com a tabela customers
+
+Uso: python scripts/sync_omie_customers.py <company_id> [--completo] [--enviar]
+
+--enviar manda antes ao Omie (em lotes) os clientes locais ainda sem vínculo.
+"""
+import argparse
+import json
+import os
+import sys
+
+# Adiciona o diretório raiz ao PYTHONPATH
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+from database.connection import init_db
+from omie_sync import ClienteSync
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('company_id', help='Empresa dona do cadastro do Omie')
+    parser.add_argument('--completo', action='store_true', help='Refaz a carga completa')
+    parser.add_argument('--enviar', action='store_true', help='Envia ao Omie os clientes locais sem vínculo')
+    args = parser.parse_args()
+
+    app = Flask(__name__)
+    init_db(app)
+    with app.app_context():
+        sync = ClienteSync(args.company_id)
+        resumo = {}
+        if args.enviar:
+            resumo['envio'] = sync.enviar()
+        resumo['sincronizacao'] = sync.executar(completo=args.completo)
+    print(json.dumps(resumo, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,289 @@
+import logging
+import os
+import shutil
+import threading
+import time
+from datetime import datetime
+from sqlalchemy import select
+from database.connection import create_db_engine, replica_urls
+from models.customer import Customer
+from models.product import Product
+from models.sale import Sale, SaleItem
+from models.state import State
+from config import ANALYTICS_DIR, ANALYTICS_KEEP_SNAPSHOTS, ANALYTICS_EXPORT_BATCH
+
+try:
+    import numpy as np
+    import pyarrow as pa
+except ImportError:  # Opcional: só o snapshot analítico e os relatórios dependem deles
+    np = pa = None
+
+logger = logging.getLogger(__name__)
+
+# Status gravado como código int8 em sales.arrow (o índice na tupla)
+STATUS = ('confirmed', 'cancelled')
+SEM_CATEGORIA = 'Sem categoria'
+SEM_CIDADE = 'Sem cidade'
+SEM_UF = '--'
+
+# Snapshot de uma empresa: <ANALYTICS_DIR>/<company_id>/<AAAAmmddTHHMMSS>/<tabela>.arrow
+# (Arrow IPC sem compressão, lido com memory map) e o arquivo CURRENT com o nome
+# do snapshot vigente. As chaves entre tabelas são posições (customer_key,
+# product_key, sale_key), então os joins do motor de relatórios são um take().
+TABELAS = ('states', 'customers', 'products', 'sales', 'sale_items')
+
+
+def _exigir():
+    if pa is None or np is None:
+        raise ImportError('Snapshot analítico exige os pacotes numpy e pyarrow (pip install numpy pyarrow)')
+
+
+def _centavos(valor):
+    return -1 if valor is None else int(valor * 100)
+
+
+def _dicionario(valores, vazio):
+    """Coluna de texto repetitivo (categoria, cidade, UF) como dictionary<int32, string>"""
+    return pa.array([valor or vazio for valor in valores], pa.string()).dictionary_encode()
+
+
+def _gravar(caminho, tabela):
+    with pa.OSFile(caminho, 'wb') as arquivo, pa.ipc.new_file(arquivo, tabela.schema) as writer:
+        writer.write_table(tabela)
+
+
+class _Exportacao:
+    """Um snapshot de uma empresa em andamento (pasta temporária até publicar)"""
+
+    def __init__(self, conexao, company_id, pasta, lote):
+        self.conexao = conexao
+        self.company_id = company_id
+        self.pasta = pasta
+        self.lote = lote
+        self.linhas = {}
+
+    def _consulta(self, consulta):
+        return self.conexao.execution_options(yield_per=self.lote).execute(consulta).partitions()
+
+    def dimensoes(self):
+        estados = self.conexao.execute(select(State.uf, State.name)).all()
+        nomes_uf = dict(estados)
+        _gravar(os.path.join(self.pasta, 'states.arrow'), pa.table({
+            'uf': pa.array([uf for uf, _ in estados], pa.string()),
+            'name': pa.array([nome for _, nome in estados], pa.string())
+        }))
+
+        clientes = self.conexao.execute(
+            select(Customer.id, Customer.name, Customer.city, Customer.state)
+            .where(Customer.company_id == self.company_id).order_by(Customer.id)
+        ).all()
+        self.clientes = {linha.id: chave for chave, linha in enumerate(clientes)}
+        ufs = [(linha.state or '').upper() for linha in clientes]
+        _gravar(os.path.join(self.pasta, 'customers.arrow'), pa.table({
+            'id': pa.array([linha.id for linha in clientes], pa.string()),
+            'name': pa.array([linha.name for linha in clientes], pa.string()),
+            'city': _dicionario((linha.city for linha in clientes), SEM_CIDADE),
+            'state': _dicionario(ufs, SEM_UF),
+            # Sem a UF em states, o nome fica a própria sigla
+            'state_name': _dicionario((nomes_uf.get(uf) or uf for uf in ufs), SEM_UF)
+        }))
+
+        produtos = self.conexao.execute(
+            select(Product.id, Product.sku, Product.name, Product.category, Product.price, Product.cost_price)
+            .where(Product.company_id == self.company_id).order_by(Product.id)
+        ).all()
+        self.produtos = {linha.id: chave for chave, linha in enumerate(produtos)}
+        _gravar(os.path.join(self.pasta, 'products.arrow'), pa.table({
+            'id': pa.array([linha.id for linha in produtos], pa.string()),
+            'sku': pa.array([linha.sku for linha in produtos], pa.string()),
+            'name': pa.array([linha.name for linha in produtos], pa.string()),
+            'category': _dicionario((linha.category for linha in produtos), SEM_CATEGORIA),
+            'price_cents': pa.array([_centavos(linha.price) for linha in produtos], pa.int64()),
+            # -1 = produto sem custo cadastrado
+            'cost_cents': pa.array([_centavos(linha.cost_price) for linha in produtos], pa.int64())
+        }))
+        self.linhas.update(states=len(estados), customers=len(clientes), products=len(produtos))
+
+    def vendas(self):
+        """sales e sale_items em lotes (sem carregar o histórico inteiro)"""
+        self.vendas_chaves = {}
+        schema = pa.schema([
+            ('customer_key', pa.int32()), ('status', pa.int8()),
+            ('created_at', pa.timestamp('ms')), ('total_cents', pa.int64())
+        ])
+        total = 0
+        with pa.OSFile(os.path.join(self.pasta, 'sales.arrow'), 'wb') as arquivo, \
+                pa.ipc.new_file(arquivo, schema) as writer:
+            for linhas in self._consulta(
+                select(Sale.id, Sale.customer_id, Sale.status, Sale.created_at, Sale.total)
+                .where(Sale.company_id == self.company_id)
+            ):
+                for linha in linhas:
+                    self.vendas_chaves[linha.id] = total
+                    total += 1
+                writer.write_batch(pa.record_batch([
+                    pa.array([self.clientes.get(linha.customer_id, -1) for linha in linhas], pa.int32()),
+                    pa.array([STATUS.index(linha.status) if linha.status in STATUS else len(STATUS)
+                              for linha in linhas], pa.int8()),
+                    pa.array([linha.created_at for linha in linhas], pa.timestamp('ms')),
+                    pa.array([_centavos(linha.total) for linha in linhas], pa.int64())
+                ], schema=schema))
+        self.linhas['sales'] = total
+
+        schema = pa.schema([
+            ('sale_key', pa.int32()), ('product_key', pa.int32()),
+            ('quantity', pa.int32()), ('total_cents', pa.int64())
+        ])
+        total = 0
+        with pa.OSFile(os.path.join(self.pasta, 'sale_items.arrow'), 'wb') as arquivo, \
+                pa.ipc.new_file(arquivo, schema) as writer:
+            for linhas in self._consulta(
+                select(SaleItem.sale_id, SaleItem.product_id, SaleItem.quantity, SaleItem.total)
+                .join(Sale, Sale.id == SaleItem.sale_id).where(Sale.company_id == self.company_id)
+            ):
+                # Vendas (e produtos) gravados durante a exportação ficam para o próximo snapshot
+                linhas = [
+                    linha for linha in linhas
+                    if linha.sale_id in self.vendas_chaves and linha.product_id in self.produtos
+                ]
+                writer.write_batch(pa.record_batch([
+                    pa.array([self.vendas_chaves[linha.sale_id] for linha in linhas], pa.int32()),
+                    pa.array([self.produtos[linha.product_id] for linha in linhas], pa.int32()),
+                    pa.array([linha.quantity for linha in linhas], pa.int32()),
+                    pa.array([_centavos(linha.total) for linha in linhas], pa.int64())
+                ], schema=schema))
+                total += len(linhas)
+        self.linhas['sale_items'] = total
+
+
+def pasta_empresa(company_id, raiz=None):
+    return os.path.join(raiz or ANALYTICS_DIR, company_id)
+
+
+def snapshot_atual(company_id, raiz=None):
+    """Pasta do snapshot vigente da empresa, ou None se ainda não houver"""
+    try:
+        with open(os.path.join(pasta_empresa(company_id, raiz), 'CURRENT'), encoding='utf-8') as arquivo:
+            nome = arquivo.read().strip()
+    except FileNotFoundError:
+        return None
+    return os.path.join(pasta_empresa(company_id, raiz), nome) if nome else None
+
+
+def _publicar(base, nome, manter):
+    # os.replace é atômico: quem lê CURRENT vê o snapshot antigo ou o novo, nunca um pela metade
+    temporario = os.path.join(base, 'CURRENT.tmp')
+    with open(temporario, 'w', encoding='utf-8') as arquivo:
+        arquivo.write(nome)
+    os.replace(temporario, os.path.join(base, 'CURRENT'))
+
+    snapshots = sorted(p for p in os.listdir(base) if os.path.isdir(os.path.join(base, p)) and not p.startswith('.'))
+    for antigo in snapshots[:-max(1, manter)]:
+        shutil.rmtree(os.path.join(base, antigo), ignore_errors=True)
+
+
+def exportar_snapshot(company_id, engine=None, raiz=None, lote=ANALYTICS_EXPORT_BATCH, manter=ANALYTICS_KEEP_SNAPSHOTS):
+    """
+    Exporta sales, sale_items, products, customers e states da empresa para um
+    snapshot colunar e o publica como vigente
+
+    Sem `engine`, lê da primeira réplica (DATABASE_REPLICA_URLS) ou, sem
+    réplicas, do banco principal. No MySQL a leitura roda numa transação só
+    (REPEATABLE READ), então o snapshot é consistente entre as tabelas.
+    """
+    _exigir()
+    proprio = engine is None
+    if proprio:
+        replicas = replica_urls()
+        engine = create_db_engine(replicas[0] if replicas else None)
+
+    base = pasta_empresa(company_id, raiz)
+    os.makedirs(base, exist_ok=True)
+    nome = datetime.utcnow().strftime('%Y%m%dT%H%M%S%f')
+    temporaria = os.path.join(base, f'.{nome}')
+    os.makedirs(temporaria)
+    inicio = time.perf_counter()
+    try:
+        with engine.connect() as conexao:
+            exportacao = _Exportacao(conexao, company_id, temporaria, lote)
+            exportacao.dimensoes()
+            exportacao.vendas()
+        os.rename(temporaria, os.path.join(base, nome))
+    except BaseException:
+        shutil.rmtree(temporaria, ignore_errors=True)
+        raise
+    finally:
+        if proprio:
+            engine.dispose()
+    _publicar(base, nome, manter)
+
+    resumo = dict(exportacao.linhas, company_id=company_id, snapshot=nome,
+                  segundos=round(time.perf_counter() - inicio, 2))
+    logger.info('Snapshot analítico exportado', extra=resumo)
+    return resumo
+
+
+class Snapshot:
+    """
+    Snapshot carregado: tabelas Arrow lidas por memory map e colunas como
+    arrays NumPy (as de várias partes são concatenadas uma vez, na carga)
+    """
+
+    def __init__(self, pasta):
+        _exigir()
+        self.pasta = pasta
+        self.nome = os.path.basename(pasta)
+        self.tabelas = {}
+        for tabela in TABELAS:
+            with pa.memory_map(os.path.join(pasta, f'{tabela}.arrow'), 'r') as arquivo:
+                self.tabelas[tabela] = pa.ipc.open_file(arquivo).read_all()
+        self._colunas = {}
+
+    def coluna(self, tabela, nome):
+        """Array NumPy da coluna; colunas dicionário viram os códigos int32"""
+        chave = (tabela, nome)
+        if chave not in self._colunas:
+            coluna = self.tabelas[tabela].column(nome)
+            if pa.types.is_dictionary(coluna.type):
+                coluna = coluna.unify_dictionaries().combine_chunks().indices
+            else:
+                coluna = coluna.combine_chunks()
+            self._colunas[chave] = coluna.to_numpy(zero_copy_only=False)
+        return self._colunas[chave]
+
+    def derivada(self, nome, calcular):
+        """Array calculado uma vez por snapshot (ex.: categoria de cada item)"""
+        if nome not in self._colunas:
+            self._colunas[nome] = calcular()
+        return self._colunas[nome]
+
+    def dicionario(self, tabela, nome):
+        """Valores dos códigos de uma coluna dicionário (categoria, cidade, UF)"""
+        coluna = self.tabelas[tabela].column(nome).unify_dictionaries()
+        if coluna.num_chunks == 0:
+            return []
+        return coluna.chunk(0).dictionary.to_pylist()
+
+
+_carregados = {}
+_carregados_lock = threading.Lock()
+
+
+def carregar_snapshot(company_id, raiz=None):
+    """
+    Snapshot vigente da empresa, mantido em memória até um novo ser publicado
+    (None se a empresa ainda não foi exportada)
+    """
+    _exigir()
+    pasta = snapshot_atual(company_id, raiz)
+    if pasta is None:
+        return None
+    atual = _carregados.get(company_id)
+    if atual is not None and atual.pasta == pasta:
+        return atual
+    with _carregados_lock:
+        atual = _carregados.get(company_id)
+        if atual is None or atual.pasta != pasta:
+            atual = Snapshot(pasta)
+            _carregados[company_id] = atual
+    return atual
@@ -0,0 +1,368 @@
+import hashlib
+import importlib
+import logging
+import re
+import time
+import unicodedata
+from collections import defaultdict, namedtuple
+from datetime import datetime, timedelta
+from decimal import Decimal
+from sqlalchemy import bindparam, literal, select, update
+from database.upsert import upsert
+from models.company import Company
+from models.customer import Customer
+from models.geocode_cache import GeocodeCache
+from models.state import State
+from omie_ratelimit import TokenBucket
+from config import (
+    GEOCODER, GEOCODE_BATCH_SIZE, GEOCODE_RATE_PER_SECOND, GEOCODE_RETRIES, GEOCODE_NOT_FOUND_TTL_DAYS
+)
+
+# Pipeline de geocodificação: lê empresas e clientes sem coordenadas em lotes
+# (keyset por id), normaliza e deduplica os endereços, resolve o que der pelo
+# cache persistente (geocode_cache) e manda só o resto ao geocodificador, em
+# chamadas em lote limitadas por um token bucket.
+
+logger = logging.getLogger(__name__)
+
+Endereco = namedtuple('Endereco', 'chave texto cep consulta uf')
+
+_NAO_ALFANUMERICO = re.compile(r'[^A-Z0-9]+')
+_NAO_DIGITO = re.compile(r'\D')
+
+# Tipos de logradouro e palavras comuns nas duas formas (por extenso e abreviada)
+_ABREVIACOES = {
+    'AVENIDA': 'AV', 'RUA': 'R', 'TRAVESSA': 'TV', 'ALAMEDA': 'AL', 'RODOVIA': 'ROD',
+    'ESTRADA': 'EST', 'PRACA': 'PC', 'LARGO': 'LGO', 'VILA': 'VL', 'CONJUNTO': 'CJ',
+    'QUADRA': 'QD', 'LOTE': 'LT', 'PASSAGEM': 'PSG', 'DOUTOR': 'DR', 'PROFESSOR': 'PROF',
+    'PRESIDENTE': 'PRES', 'GOVERNADOR': 'GOV', 'SENADOR': 'SEN', 'SANTA': 'STA', 'SANTO': 'STO',
+    'SAO': 'S', 'NOSSA': 'NS', 'SENHORA': 'SRA'
+}
+# Marcadores de número ("n", "nº", "nro") e de sem número ("s/n"), que não mudam o local
+_IGNORADAS = {'N', 'NO', 'NUMERO', 'NRO'}
+_SEM_NUMERO = re.compile(r' (SN|S N)$')
+
+
+class LimiteGeocoder(Exception):
+    """O provedor pediu para diminuir o ritmo (HTTP 429); retry_after em segundos"""
+
+    def __init__(self, retry_after=None):
+        super().__init__('Limite de requisições do geocodificador')
+        self.retry_after = retry_after
+
+
+class Geocoder:
+    """
+    Interface dos geocodificadores plugáveis
+
+    `geocodificar` recebe uma lista de Endereco e devolve, na mesma ordem,
+    (latitude, longitude) ou None para os não encontrados. Cada chamada conta
+    como uma requisição no limitador, então `tamanho_lote` é o maior lote que o
+    provedor aceita numa requisição. Falha de rede deve levantar exceção (o lote
+    fica fora do cache e é tentado de novo na próxima execução); limite de taxa
+    deve levantar LimiteGeocoder.
+    """
+    nome = None
+    tamanho_lote = 1
+
+    def geocodificar(self, enderecos):
+        raise NotImplementedError
+
+
+# Coordenadas aproximadas das capitais, base do geocodificador local
+_CAPITAIS = {
+    'AC': (-9.97, -67.81), 'AL': (-9.67, -35.74), 'AP': (0.03, -51.07), 'AM': (-3.12, -60.02),
+    'BA': (-12.97, -38.50), 'CE': (-3.73, -38.52), 'DF': (-15.79, -47.88), 'ES': (-20.32, -40.34),
+    'GO': (-16.69, -49.26), 'MA': (-2.53, -44.30), 'MT': (-15.60, -56.10), 'MS': (-20.47, -54.62),
+    'MG': (-19.92, -43.94), 'PA': (-1.46, -48.49), 'PB': (-7.12, -34.86), 'PR': (-25.43, -49.27),
+    'PE': (-8.05, -34.88), 'PI': (-5.09, -42.80), 'RJ': (-22.91, -43.17), 'RN': (-5.79, -35.21),
+    'RS': (-30.03, -51.23), 'RO': (-8.76, -63.90), 'RR': (2.82, -60.67), 'SC': (-27.60, -48.55),
+    'SP': (-23.55, -46.63), 'SE': (-10.91, -37.07), 'TO': (-10.18, -48.33)
+}
+
+
+class StubGeocoder(Geocoder):
+    """
+    Geocodificador local para desenvolvimento e testes, sem rede
+
+    Devolve um ponto determinístico (derivado da chave do endereço) a até ~25 km
+    da capital da UF; endereços sem UF conhecida não são encontrados.
+    `latencia` simula o tempo de resposta de cada chamada.
+    """
+    nome = 'stub'
+    tamanho_lote = 100
+
+    def __init__(self, latencia=0.0):
+        self.latencia = latencia
+        self.chamadas = 0
+
+    def geocodificar(self, enderecos):
+        self.chamadas += 1
+        if self.latencia:
+            time.sleep(self.latencia)
+        resultado = []
+        for endereco in enderecos:
+            capital = _CAPITAIS.get(endereco.uf)
+            if capital is None:
+                resultado.append(None)
+                continue
+            semente = int(endereco.chave[:8], 16)
+            deslocamento_lat = (semente & 0xFFFF) / 0xFFFF - 0.5
+            deslocamento_lng = (semente >> 16) / 0xFFFF - 0.5
+            resultado.append((capital[0] + deslocamento_lat * 0.45, capital[1] + deslocamento_lng * 0.45))
+        return resultado
+
+
+GEOCODERS = {
+    'stub': StubGeocoder,
+}
+
+
+def criar_geocoder(nome=GEOCODER):
+    """Instancia o geocodificador `nome` (registrado em GEOCODERS ou 'pacote.modulo:Classe')"""
+    if nome in GEOCODERS:
+        return GEOCODERS[nome]()
+    modulo, _, classe = nome.partition(':')
+    if not classe:
+        raise ValueError(f'Geocodificador desconhecido: {nome}')
+    return getattr(importlib.import_module(modulo), classe)()
+
+
+def criar_limitador(taxa=GEOCODE_RATE_PER_SECOND):
+    """
+    Token bucket em memória, sem rajada: no máximo `taxa` chamadas por segundo
+
+    Um 429 do provedor reduz a taxa pela metade (até `taxa` / 10), que volta a
+    subir aos poucos com as chamadas bem-sucedidas.
+    """
+    return TokenBucket(rate=taxa, capacity=1, min_rate=taxa / 10, max_rate=taxa, state_file=None)
+
+
+def _normalizar(texto):
+    """Maiúsculas sem acento e pontuação, com abreviações padronizadas"""
+    texto = unicodedata.normalize('NFKD', texto or '').encode('ascii', 'ignore').decode().upper()
+    palavras = _NAO_ALFANUMERICO.sub(' ', texto).split()
+    return ' '.join(_ABREVIACOES.get(palavra, palavra) for palavra in palavras)
+
+
+def normalizar_cep(valor):
+    """CEP só com os 8 dígitos, ou None se inválido"""
+    digitos = _NAO_DIGITO.sub('', valor or '')
+    return digitos if len(digitos) == 8 and digitos != '00000000' else None
+
+
+def normalizar_endereco(logradouro, numero=None, bairro=None, cidade=None, uf=None, cep=None):
+    """
+    Endereco normalizado e deduplicável, ou None se não der para localizar
+
+    A chave usa logradouro + número + cidade/UF (ou o CEP, sem cidade), então
+    "Av. São João, 439" e "AVENIDA SAO JOAO" / "439" caem no mesmo registro do
+    cache; complemento e bairro não mudam o ponto e ficam de fora da chave.
+    Sem logradouro, só o CEP localiza o endereço.
+    """
+    cep = normalizar_cep(cep)
+    uf = _normalizar(uf)[:2] or None
+    municipio = _normalizar(cidade)
+    rua = _SEM_NUMERO.sub('', f'{_normalizar(logradouro)} {_normalizar(numero)}'.strip())
+    rua = ' '.join(palavra for palavra in rua.split() if palavra not in _IGNORADAS)
+    localidade = f'{municipio} {uf}' if municipio and uf else cep
+    if not localidade:
+        return None
+    if rua:
+        texto = f'{rua}, {localidade}'
+    elif cep:
+        texto = cep
+    else:
+        return None
+    # Consulta enviada ao provedor: o endereço como cadastrado, não a forma normalizada
+    consulta = ', '.join(filter(None, (
+        ', '.join(filter(None, (logradouro, numero))), bairro, municipio and uf and f'{cidade.strip()} - {uf}',
+        cep and f'{cep[:5]}-{cep[5:]}', 'Brasil'
+    )))
+    chave = hashlib.sha1(texto.encode()).hexdigest()
+    return Endereco(chave, texto[:255], cep, consulta, uf)
+
+
+def _consulta_empresas(company_id):
+    consulta = select(
+        Company.id, Company.address.label('logradouro'), Company.address_number.label('numero'),
+        Company.neighborhood.label('bairro'), Company.city.label('cidade'), State.uf.label('uf'),
+        Company.postal_code.label('cep')
+    ).outerjoin(State, State.id == Company.state_id)
+    if company_id:
+        consulta = consulta.where(Company.id == company_id)
+    return Company.__table__, consulta
+
+
+def _consulta_clientes(company_id):
+    consulta = select(
+        Customer.id, Customer.address.label('logradouro'), literal(None).label('numero'),
+        literal(None).label('bairro'), Customer.city.label('cidade'), Customer.state.label('uf'),
+        Customer.postal_code.label('cep')
+    )
+    if company_id:
+        consulta = consulta.where(Customer.company_id == company_id)
+    return Customer.__table__, consulta
+
+
+FONTES = {
+    'companies': _consulta_empresas,
+    'customers': _consulta_clientes,
+}
+
+
+def _coordenada(valor):
+    return Decimal(f'{valor:.8f}')
+
+
+class PipelineGeocodificacao:
+    """
+    Preenche latitude/longitude de empresas e clientes
+
+    Não segura transação durante as chamadas ao geocodificador: cada lote lê
+    o cache, geocodifica o que falta e só então grava cache e coordenadas numa
+    transação curta. Pode ser interrompido e rodado de novo a qualquer momento;
+    o que já foi geocodificado sai do cache sem nova chamada.
+    """
+
+    def __init__(self, engine, geocoder=None, limitador=None, lote=GEOCODE_BATCH_SIZE,
+                 tentativas=GEOCODE_RETRIES, validade_nao_encontrado=GEOCODE_NOT_FOUND_TTL_DAYS):
+        self.engine = engine
+        self.geocoder = geocoder or criar_geocoder()
+        self.limitador = limitador or criar_limitador()
+        self.lote = lote
+        self.tentativas = tentativas
+        self.validade_nao_encontrado = timedelta(days=validade_nao_encontrado)
+        self.resumo = defaultdict(int)
+
+    def _cache(self, conexao, chaves):
+        """Cache dos endereços: chave -> (lat, lng) ou None (não encontrado recentemente)"""
+        cache = GeocodeCache.__table__
+        limite = datetime.utcnow() - self.validade_nao_encontrado
+        conhecidos = {}
+        for linha in conexao.execute(
+            select(cache.c.address_key, cache.c.status, cache.c.latitude, cache.c.longitude, cache.c.updated_at)
+            .where(cache.c.address_key.in_(chaves))
+        ):
+            if linha.status == 'found':
+                conhecidos[linha.address_key] = (linha.latitude, linha.longitude)
+            elif linha.updated_at and linha.updated_at >= limite:
+                conhecidos[linha.address_key] = None
+        return conhecidos
+
+    def _chamar(self, enderecos):
+        """Uma chamada ao geocodificador respeitando o limitador (e os pedidos de espera)"""
+        for tentativa in range(self.tentativas + 1):
+            self.limitador.acquire()
+            self.resumo['chamadas'] += 1
+            try:
+                resultado = self.geocoder.geocodificar(enderecos)
+            except LimiteGeocoder as e:
+                self.resumo['limitadas'] += 1
+                self.limitador.on_throttle(e.retry_after)
+                if tentativa == self.tentativas:
+                    raise
+                continue
+            self.limitador.on_success()
+            return resultado
+
+    def _geocodificar(self, enderecos):
+        """Geocodifica os endereços em lotes do provedor; devolve as linhas do cache"""
+        agora = datetime.utcnow()
+        linhas = []
+        tamanho = max(1, self.geocoder.tamanho_lote)
+        for inicio in range(0, len(enderecos), tamanho):
+            pedaco = enderecos[inicio:inicio + tamanho]
+            try:
+                resultado = self._chamar(pedaco)
+            except Exception:
+                logger.exception('Falha ao geocodificar lote', extra={'enderecos': len(pedaco)})
+                self.resumo['falhas'] += len(pedaco)
+                continue
+            for endereco, coordenadas in zip(pedaco, resultado):
+                encontrado = coordenadas is not None
+                self.resumo['geocodificados' if encontrado else 'nao_encontrados'] += 1
+                linhas.append({
+                    'address_key': endereco.chave, 'address': endereco.texto, 'postal_code': endereco.cep,
+                    'latitude': _coordenada(coordenadas[0]) if encontrado else None,
+                    'longitude': _coordenada(coordenadas[1]) if encontrado else None,
+                    'status': 'found' if encontrado else 'not_found',
+                    'provider': self.geocoder.nome, 'created_at': agora, 'updated_at': agora
+                })
+        return linhas
+
+    def _processar_lote(self, tabela, linhas):
+        enderecos = {}
+        ids_por_chave = defaultdict(list)
+        for linha in linhas:
+            endereco = normalizar_endereco(linha.logradouro, linha.numero, linha.bairro, linha.cidade, linha.uf, linha.cep)
+            if endereco is None:
+                self.resumo['incompletos'] += 1
+                continue
+            enderecos.setdefault(endereco.chave, endereco)
+            ids_por_chave[endereco.chave].append(linha.id)
+        if not enderecos:
+            return
+        self.resumo['enderecos'] += len(enderecos)
+
+        with self.engine.connect() as conexao:
+            coordenadas = self._cache(conexao, list(enderecos))
+        self.resumo['cache'] += len(coordenadas)
+        novos = self._geocodificar([e for chave, e in enderecos.items() if chave not in coordenadas])
+        for linha in novos:
+            if linha['status'] == 'found':
+                coordenadas[linha['address_key']] = (linha['latitude'], linha['longitude'])
+
+        atualizacoes = [
+            {'_id': id, '_lat': valor[0], '_lng': valor[1]}
+            for chave, valor in coordenadas.items() if valor is not None
+            for id in ids_por_chave[chave]
+        ]
+        with self.engine.begin() as conexao:
+            upsert(conexao, GeocodeCache.__table__, novos, ('address_key',),
+                   ('address', 'postal_code', 'latitude', 'longitude', 'status', 'provider', 'updated_at'))
+            if atualizacoes:
+                conexao.execute(
+                    update(tabela).where(tabela.c.id == bindparam('_id'))
+                    .values(latitude=bindparam('_lat'), longitude=bindparam('_lng')),
+                    atualizacoes
+                )
+        self.resumo['atualizados'] += len(atualizacoes)
+
+    def executar(self, fontes=tuple(FONTES), company_id=None, refazer=False, progresso=None):
+        """
+        Geocodifica as `fontes` (companies, customers) sem coordenadas
+
+        Com `refazer`, passa também pelas linhas que já têm coordenadas (após
+        mudança de endereço em massa, por exemplo); o cache evita chamadas
+        repetidas. `progresso(fonte, linhas)` é chamado a cada lote.
+        """
+        inicio = time.perf_counter()
+        for fonte in fontes:
+            tabela, consulta = FONTES[fonte](company_id)
+            if not refazer:
+                consulta = consulta.where(tabela.c.latitude.is_(None))
+            ultimo = None
+            while True:
+                pagina = consulta.order_by(tabela.c.id).limit(self.lote)
+                if ultimo is not None:
+                    pagina = pagina.where(tabela.c.id > ultimo)
+                with self.engine.connect() as conexao:
+                    linhas = conexao.execute(pagina).all()
+                if not linhas:
+                    break
+                ultimo = linhas[-1].id
+                self.resumo['linhas'] += len(linhas)
+                self._processar_lote(tabela, linhas)
+                if progresso:
+                    progresso(fonte, self.resumo['linhas'])
+        resumo = dict(self.resumo, segundos=round(time.perf_counter() - inicio, 3))
+        logger.info('Geocodificação concluída', extra=resumo)
+        return resumo
+
+
+def geocodificar(engine, fontes=tuple(FONTES), company_id=None, refazer=False, geocoder=None,
+                 limitador=None, lote=GEOCODE_BATCH_SIZE, progresso=None):
+    """Roda o pipeline uma vez e devolve o resumo (contadores e segundos)"""
+    pipeline = PipelineGeocodificacao(engine, geocoder=geocoder, limitador=limitador, lote=lote)
+    return pipeline.executar(fontes, company_id=company_id, refazer=refazer, progresso=progresso)
@@ -0,0 +1,368 @@
+import csv
+import itertools
+import logging
+import re
+import time
+import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+from sqlalchemy import func, select
+from database.upsert import upsert
+from models.customer import Customer
+from models.product import Product
+from models.service import Service
+from cliente_search import normalizar, somente_digitos
+from config import IMPORT_BATCH_SIZE, IMPORT_WORKERS
+
+try:
+    import openpyxl
+except ImportError:  # Opcional: só a importação de .xlsx depende dele
+    openpyxl = None
+
+logger = logging.getLogger(__name__)
+
+_EMAIL = re.compile(r'^[^@\s]+@[^@\s]+\.[^@\s]+$')
+
+
+class LinhaInvalida(ValueError):
+    """Linha rejeitada na validação; a mensagem vai para o arquivo de rejeitados"""
+
+
+# Conversores: recebem o texto da célula (já sem espaços nas pontas) e devolvem o valor
+
+def texto(tamanho):
+    def converter(valor):
+        if len(valor) > tamanho:
+            raise LinhaInvalida(f'mais de {tamanho} caracteres')
+        return valor
+    return converter
+
+
+def decimal_br(valor):
+    """Aceita 1234.56, 1.234,56 e R$ 1.234,56"""
+    limpo = valor.replace('R$', '').replace(' ', '')
+    if ',' in limpo:
+        limpo = limpo.replace('.', '').replace(',', '.')
+    try:
+        numero = Decimal(limpo).quantize(Decimal('0.01'))
+    except InvalidOperation:
+        raise LinhaInvalida(f'valor inválido: {valor}')
+    if numero < 0 or numero >= Decimal('100000000'):
+        raise LinhaInvalida(f'valor fora do intervalo: {valor}')
+    return numero
+
+
+def inteiro(valor):
+    try:
+        return int(Decimal(valor.replace(',', '.')))
+    except InvalidOperation:
+        raise LinhaInvalida(f'número inválido: {valor}')
+
+
+def documento(valor):
+    digitos = somente_digitos(valor)
+    if len(digitos) not in (11, 14):
+        raise LinhaInvalida(f'CPF/CNPJ inválido: {valor}')
+    return digitos
+
+
+def email(valor):
+    if not _EMAIL.match(valor) or len(valor) > 255:
+        raise LinhaInvalida(f'email inválido: {valor}')
+    return valor.lower()
+
+
+def uf(valor):
+    if len(valor) != 2 or not valor.isalpha():
+        raise LinhaInvalida(f'UF inválida: {valor}')
+    return valor.upper()
+
+
+def cep(valor):
+    digitos = somente_digitos(valor)
+    if len(digitos) != 8:
+        raise LinhaInvalida(f'CEP inválido: {valor}')
+    return f'{digitos[:5]}-{digitos[5:]}'
+
+
+class Campo:
+    def __init__(self, coluna, nomes, converter, obrigatorio=False):
+        self.coluna = coluna
+        # Cabeçalhos aceitos no arquivo (comparados sem acento/maiúsculas)
+        self.nomes = nomes
+        self.converter = converter
+        self.obrigatorio = obrigatorio
+
+
+class Entidade:
+    """
+    Tabela de destino da importação: campos aceitos e chave de deduplicação
+
+    `chave` são as colunas do conflito no upsert. O id das linhas é derivado
+    (uuid5) da empresa e da coluna `natural`, então reimportar o mesmo arquivo
+    atualiza os registros em vez de duplicá-los (e não gasta uuid4 por linha).
+    Sem chave única além do id, a linha que já existe na empresa com o mesmo
+    valor `natural` (vinda do Omie ou do cadastro) mantém o seu id.
+    """
+
+    def gerar_id(self, company_id, linha):
+        return str(uuid.uuid5(uuid.NAMESPACE_URL, f"{self.table.name}:{company_id}:{linha[self.natural]}"))
+
+    def ids_existentes(self, conexao, company_id, valores):
+        """Valor natural -> id da linha que já existe na empresa (o menor, se houver vários)"""
+        if self.chave != ('id',) or not valores:
+            return {}
+        natural = self.table.c[self.natural]
+        return dict(conexao.execute(
+            select(natural, func.min(self.table.c.id))
+            .where(self.table.c.company_id == company_id, natural.in_(valores))
+            .group_by(natural)
+        ).all())
+
+    def __init__(self, table, campos, chave, natural):
+        self.table = table
+        self.campos = campos
+        self.chave = chave
+        self.natural = natural
+        self.atualizar = tuple(campo.coluna for campo in campos) + ('updated_at',)
+
+
+ENTIDADES = {
+    'customers': Entidade(
+        Customer.__table__,
+        [
+            Campo('name', ('nome', 'razao social', 'name'), texto(255), obrigatorio=True),
+            Campo('document', ('cnpj cpf', 'cpf cnpj', 'documento', 'cnpj', 'cpf', 'document'), documento, obrigatorio=True),
+            Campo('email', ('email', 'e mail'), email),
+            Campo('phone', ('telefone', 'fone', 'phone'), texto(20)),
+            Campo('address', ('endereco', 'address'), texto(255)),
+            Campo('city', ('cidade', 'city'), texto(100)),
+            Campo('state', ('uf', 'estado', 'state'), uf),
+            Campo('postal_code', ('cep', 'postal code', 'codigo postal'), cep),
+        ],
+        # customers não tem chave única além do id (o documento pode se repetir)
+        chave=('id',),
+        natural='document'
+    ),
+    'products': Entidade(
+        Product.__table__,
+        [
+            Campo('sku', ('sku', 'codigo', 'cod', 'code'), texto(60), obrigatorio=True),
+            Campo('name', ('nome', 'descricao curta', 'produto', 'name'), texto(255), obrigatorio=True),
+            Campo('description', ('descricao', 'description'), texto(65535)),
+            Campo('price', ('preco', 'valor', 'preco unitario', 'price'), decimal_br),
+            Campo('cost_price', ('custo', 'preco de custo', 'cost', 'cost price'), decimal_br),
+            Campo('stock_quantity', ('estoque', 'quantidade', 'stock', 'stock quantity'), inteiro),
+            Campo('category', ('categoria', 'category'), texto(100)),
+        ],
+        chave=('company_id', 'sku'),
+        natural='sku'
+    ),
+    'services': Entidade(
+        Service.__table__,
+        [
+            Campo('code', ('codigo', 'cod', 'code'), texto(60), obrigatorio=True),
+            Campo('name', ('nome', 'servico', 'name'), texto(255), obrigatorio=True),
+            Campo('description', ('descricao', 'description'), texto(65535)),
+            Campo('price', ('preco', 'valor', 'price'), decimal_br),
+        ],
+        chave=('company_id', 'code'),
+        natural='code'
+    ),
+}
+
+
+def ler_csv(caminho, encoding='utf-8-sig', delimitador=None):
+    """
+    Lê o CSV linha a linha (sem carregar o arquivo), gerando dicts pelo cabeçalho
+
+    O delimitador (, ; ou tab) é detectado no início do arquivo se não for informado.
+    """
+    with open(caminho, newline='', encoding=encoding) as arquivo:
+        if delimitador is None:
+            amostra = arquivo.read(65536)
+            arquivo.seek(0)
+            try:
+                delimitador = csv.Sniffer().sniff(amostra, delimiters=',;\t').delimiter
+            except csv.Error:
+                delimitador = ','
+        yield from csv.DictReader(arquivo, delimiter=delimitador)
+
+
+def ler_xlsx(caminho, aba=None):
+    """
+    Lê a planilha em modo read_only (linha a linha), usando a primeira linha como cabeçalho
+    """
+    if openpyxl is None:
+        raise ImportError('Importar .xlsx exige o pacote openpyxl (pip install openpyxl)')
+    planilha = openpyxl.load_workbook(caminho, read_only=True, data_only=True)
+    try:
+        folha = planilha[aba] if aba else planilha.active
+        linhas = folha.iter_rows(values_only=True)
+        cabecalho = [str(celula) if celula is not None else '' for celula in next(linhas, ())]
+        for valores in linhas:
+            if any(valor is not None for valor in valores):
+                yield {
+                    nome: '' if valor is None else str(valor)
+                    for nome, valor in zip(cabecalho, valores)
+                }
+    finally:
+        planilha.close()
+
+
+def ler_arquivo(caminho, **kwargs):
+    if str(caminho).lower().endswith(('.xlsx', '.xlsm')):
+        return ler_xlsx(caminho, **kwargs)
+    return ler_csv(caminho, **kwargs)
+
+
+class Importador:
+    """
+    Importa um arquivo grande para customers, products ou services
+
+    O arquivo é lido em streaming e validado linha a linha; as linhas válidas
+    são agrupadas em lotes de `tamanho_lote` e gravadas com upsert (INSERT ...
+    ON DUPLICATE KEY UPDATE no MySQL, ON CONFLICT no SQLite/PostgreSQL) por
+    até `workers` threads, cada uma com sua conexão e transação. As linhas
+    rejeitadas vão para `rejeitados` (CSV com a linha original, o número e o
+    erro). `progresso` recebe o resumo após cada lote gravado.
+    """
+
+    def __init__(self, engine, entidade, company_id, tamanho_lote=IMPORT_BATCH_SIZE,
+                 workers=IMPORT_WORKERS, rejeitados=None, progresso=None):
+        self.engine = engine
+        self.entidade = ENTIDADES[entidade] if isinstance(entidade, str) else entidade
+        self.company_id = company_id
+        self.tamanho_lote = tamanho_lote
+        # O SQLite tem um único escritor: lotes em paralelo só disputariam o lock
+        self.workers = 1 if engine.dialect.name == 'sqlite' else max(1, workers)
+        self.rejeitados = rejeitados
+        self.progresso = progresso or self._logar_progresso
+        self.resumo = {'lidas': 0, 'validas': 0, 'gravadas': 0, 'rejeitadas': 0, 'lotes': 0}
+
+    def _mapear_cabecalho(self, cabecalho):
+        """Coluna do arquivo -> Campo, pelos nomes aceitos"""
+        por_nome = {nome: campo for campo in self.entidade.campos for nome in campo.nomes}
+        mapa = {}
+        for nome in cabecalho:
+            campo = por_nome.get(normalizar(nome))
+            if campo is not None and campo not in mapa.values():
+                mapa[nome] = campo
+        faltando = [campo.coluna for campo in self.entidade.campos if campo.obrigatorio and campo not in mapa.values()]
+        if faltando:
+            raise ValueError(f"Colunas obrigatórias ausentes no arquivo: {', '.join(faltando)}")
+        return mapa
+
+    def validar(self, mapa, original, agora):
+        """Converte uma linha do arquivo em linha da tabela; levanta LinhaInvalida"""
+        linha = {'company_id': self.company_id}
+        for nome, campo in mapa.items():
+            valor = (original.get(nome) or '').strip()
+            if not valor:
+                if campo.obrigatorio:
+                    raise LinhaInvalida(f'{campo.coluna} é obrigatório')
+                linha[campo.coluna] = None
+                continue
+            try:
+                linha[campo.coluna] = campo.converter(valor)
+            except LinhaInvalida as e:
+                raise LinhaInvalida(f'{campo.coluna}: {e}')
+        for campo in self.entidade.campos:
+            linha.setdefault(campo.coluna, None)
+        linha['id'] = self.entidade.gerar_id(self.company_id, linha)
+        linha['created_at'] = agora
+        linha['updated_at'] = agora
+        return linha
+
+    def _gravar_lote(self, linhas):
+        """Grava um lote e retorna quantos registros foram inseridos ou atualizados"""
+        natural = self.entidade.natural
+        with self.engine.begin() as conexao:
+            existentes = self.entidade.ids_existentes(
+                conexao, self.company_id, {linha[natural] for linha in linhas}
+            )
+            for linha in linhas:
+                linha['id'] = existentes.get(linha[natural], linha['id'])
+            # Duplicadas no mesmo lote: vale a última (um upsert não pode tocar a mesma linha duas vezes)
+            unicas = {tuple(linha[c] for c in self.entidade.chave): linha for linha in linhas}
+            return upsert(conexao, self.entidade.table, list(unicas.values()), self.entidade.chave,
+                          self.entidade.atualizar)
+
+    def _logar_progresso(self, resumo):
+        logger.info('Importação em andamento', extra=dict(resumo, tabela=self.entidade.table.name))
+
+    def _rejeitar(self, escritor, numero, original, erro):
+        self.resumo['rejeitadas'] += 1
+        if escritor is not None:
+            escritor.writerow(dict(original, _linha=numero, _erro=erro))
+
+    def importar(self, linhas):
+        """
+        Importa um iterável de dicts (ver ler_csv/ler_xlsx) e retorna o resumo
+        """
+        inicio = time.perf_counter()
+        linhas = iter(linhas)
+        primeira = next(linhas, None)
+        if primeira is None:
+            return dict(self.resumo, segundos=0.0, linhas_por_segundo=0.0)
+        mapa = self._mapear_cabecalho(primeira.keys())
+
+        arquivo_rejeitados = None
+        escritor = None
+        if self.rejeitados:
+            arquivo_rejeitados = open(self.rejeitados, 'w', newline='', encoding='utf-8')
+            escritor = csv.DictWriter(
+                arquivo_rejeitados, fieldnames=['_linha', '_erro', *primeira.keys()], extrasaction='ignore'
+            )
+            escritor.writeheader()
+
+        # Número de lotes em memória aguardando gravação (back-pressure na leitura)
+        janela = self.workers * 2
+        pendentes = deque()
+        executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='importacao')
+
+        def concluir(futuro):
+            self.resumo['gravadas'] += futuro.result()
+            self.resumo['lotes'] += 1
+            decorrido = time.perf_counter() - inicio
+            self.progresso(dict(self.resumo, linhas_por_segundo=round(self.resumo['gravadas'] / decorrido, 1)))
+
+        try:
+            lote = []
+            agora = datetime.utcnow()
+            # Linha 1 é o cabeçalho
+            for numero, original in enumerate(itertools.chain((primeira,), linhas), start=2):
+                self.resumo['lidas'] += 1
+                try:
+                    lote.append(self.validar(mapa, original, agora))
+                except LinhaInvalida as e:
+                    self._rejeitar(escritor, numero, original, str(e))
+                    continue
+                self.resumo['validas'] += 1
+                if len(lote) >= self.tamanho_lote:
+                    pendentes.append(executor.submit(self._gravar_lote, lote))
+                    lote = []
+                    agora = datetime.utcnow()
+                    while len(pendentes) >= janela:
+                        concluir(pendentes.popleft())
+            if lote:
+                pendentes.append(executor.submit(self._gravar_lote, lote))
+            while pendentes:
+                concluir(pendentes.popleft())
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+            if arquivo_rejeitados is not None:
+                arquivo_rejeitados.close()
+
+        segundos = time.perf_counter() - inicio
+        return dict(
+            self.resumo,
+            segundos=round(segundos, 2),
+            linhas_por_segundo=round(self.resumo['lidas'] / segundos, 1) if segundos else 0.0
+        )
+
+    def importar_arquivo(self, caminho, **kwargs):
+        """Importa um .csv ou .xlsx (kwargs vão para ler_csv/ler_xlsx)"""
+        return self.importar(ler_arquivo(caminho, **kwargs))
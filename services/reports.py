@@ -0,0 +1,136 @@
+from datetime import timedelta
+from services.analytics import np, carregar_snapshot
+
+# Relatórios sobre o snapshot colunar (services.analytics): filtros são máscaras
+# booleanas, joins são np.take pelas chaves posicionais e group-bys são
+# np.bincount sobre os códigos das colunas dicionário. Nada aqui toca no banco.
+
+
+class RelatorioIndisponivel(LookupError):
+    """Empresa ainda sem snapshot analítico exportado"""
+
+
+def _vendas_validas(snapshot, inicio=None, fim=None):
+    """Máscara das vendas confirmadas com data em [inicio, fim]"""
+    mascara = snapshot.coluna('sales', 'status') == 0
+    if inicio or fim:
+        criadas = snapshot.coluna('sales', 'created_at')
+        if inicio:
+            mascara &= criadas >= np.datetime64(inicio, 'ms')
+        if fim:
+            mascara &= criadas < np.datetime64(fim + timedelta(days=1), 'ms')
+    return mascara
+
+
+def _itens_validos(snapshot, inicio=None, fim=None):
+    return _vendas_validas(snapshot, inicio, fim)[snapshot.coluna('sale_items', 'sale_key')]
+
+
+def _reais(centavos):
+    return round(int(centavos) / 100, 2)
+
+
+def margem_por_categoria(snapshot, inicio=None, fim=None):
+    """
+    Receita, custo e margem por categoria de produto
+
+    O custo é o custo atual do produto (products.cost_price); itens de
+    produtos sem custo entram só em uncosted_revenue.
+    """
+    produto = snapshot.coluna('sale_items', 'product_key')
+    categoria = snapshot.derivada('item_category', lambda: snapshot.coluna('products', 'category')[produto])
+    custo = snapshot.derivada('item_cost_cents', lambda: (
+        snapshot.coluna('products', 'cost_cents')[produto] * snapshot.coluna('sale_items', 'quantity')
+    ))
+    categorias = snapshot.dicionario('products', 'category')
+
+    mascara = _itens_validos(snapshot, inicio, fim)
+    categoria = categoria[mascara]
+    receita_item = snapshot.coluna('sale_items', 'total_cents')[mascara]
+    custo_item = custo[mascara]
+    com_custo = custo_item >= 0
+    n = len(categorias)
+
+    # bincount com pesos soma em float64: exato até 2^53 centavos
+    quantidade = np.bincount(categoria, weights=snapshot.coluna('sale_items', 'quantity')[mascara], minlength=n)
+    receita = np.bincount(categoria, weights=receita_item, minlength=n)
+    receita_custeada = np.bincount(categoria[com_custo], weights=receita_item[com_custo], minlength=n)
+    custo_total = np.bincount(categoria[com_custo], weights=custo_item[com_custo], minlength=n)
+
+    linhas = []
+    for codigo in np.flatnonzero(quantidade):
+        margem = receita_custeada[codigo] - custo_total[codigo]
+        linhas.append({
+            'category': categorias[codigo],
+            'quantity': int(quantidade[codigo]),
+            'revenue': _reais(receita[codigo]),
+            'cost': _reais(custo_total[codigo]),
+            'margin': _reais(margem),
+            'margin_pct': round(100 * margem / receita_custeada[codigo], 2) if receita_custeada[codigo] else None,
+            'uncosted_revenue': _reais(receita[codigo] - receita_custeada[codigo])
+        })
+    return sorted(linhas, key=lambda linha: linha['revenue'], reverse=True)
+
+
+def _grupo_localidade(snapshot, n_cidades, sem_cliente):
+    """Grupo de cada venda: uf * n_cidades + cidade do cliente, ou `sem_cliente`"""
+    cliente = snapshot.coluna('sales', 'customer_key')
+    if not n_cidades:
+        return np.full(len(cliente), sem_cliente, dtype=np.int64)
+    uf = snapshot.coluna('customers', 'state').astype(np.int64)
+    por_cliente = uf * n_cidades + snapshot.coluna('customers', 'city')
+    return np.where(cliente >= 0, por_cliente[np.maximum(cliente, 0)], sem_cliente)
+
+
+def vendas_por_localidade(snapshot, inicio=None, fim=None):
+    """Vendas, itens e receita por UF e cidade do cliente (vendas sem cliente à parte)"""
+    cidades = snapshot.dicionario('customers', 'city')
+    ufs = snapshot.dicionario('customers', 'state')
+    nomes = snapshot.dicionario('customers', 'state_name')
+    sem_cliente = len(ufs) * len(cidades)
+    grupo_venda = snapshot.derivada('sale_location', lambda: _grupo_localidade(snapshot, len(cidades), sem_cliente))
+    nome_uf = dict(zip(
+        snapshot.coluna('customers', 'state').tolist(), snapshot.coluna('customers', 'state_name').tolist()
+    ))
+
+    vendas = _vendas_validas(snapshot, inicio, fim)
+    grupos = grupo_venda[vendas]
+    n = sem_cliente + 1
+    quantidade_vendas = np.bincount(grupos, minlength=n)
+    receita = np.bincount(grupos, weights=snapshot.coluna('sales', 'total_cents')[vendas], minlength=n)
+
+    chave_item = snapshot.coluna('sale_items', 'sale_key')
+    itens = vendas[chave_item]
+    quantidade_itens = np.bincount(
+        grupo_venda[chave_item[itens]], weights=snapshot.coluna('sale_items', 'quantity')[itens], minlength=n
+    )
+
+    linhas = []
+    for grupo in np.flatnonzero(quantidade_vendas):
+        if grupo == sem_cliente:
+            uf = nome = cidade = None
+        else:
+            codigo_uf, codigo_cidade = divmod(int(grupo), len(cidades))
+            uf, cidade = ufs[codigo_uf], cidades[codigo_cidade]
+            nome = nomes[nome_uf[codigo_uf]]
+        linhas.append({
+            'state': uf, 'state_name': nome, 'city': cidade,
+            'sales_count': int(quantidade_vendas[grupo]),
+            'items_quantity': int(quantidade_itens[grupo]),
+            'revenue': _reais(receita[grupo])
+        })
+    return sorted(linhas, key=lambda linha: linha['revenue'], reverse=True)
+
+
+RELATORIOS = {
+    'margin-by-category': margem_por_categoria,
+    'sales-by-location': vendas_por_localidade,
+}
+
+
+def gerar_relatorio(company_id, nome, inicio=None, fim=None):
+    """Roda o relatório `nome` no snapshot vigente da empresa"""
+    snapshot = carregar_snapshot(company_id)
+    if snapshot is None:
+        raise RelatorioIndisponivel('Snapshot analítico da empresa ainda não foi exportado')
+    return snapshot.nome, RELATORIOS[nome](snapshot, inicio, fim)
@@ -0,0 +1,213 @@
+import logging
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import timedelta
+from decimal import Decimal
+from sqlalchemy import delete, func, insert, literal, select
+from database.upsert import upsert_incremento
+from models.customer import Customer
+from models.product import Product
+from models.rollup import SalesDailyRollup, ProductMonthlyRollup, CustomerMonthlyRollup
+from models.sale import Sale, SaleItem
+from config import ROLLUP_BACKFILL_WORKERS
+
+logger = logging.getLogger(__name__)
+
+STATUS_CONTABILIZADO = 'confirmed'
+
+
+def inicio_do_mes(dia):
+    return dia.replace(day=1)
+
+
+def proximo_mes(mes):
+    return (mes.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+def aplicar_venda(conexao, company_id, dia, customer_id, itens, sinal=1):
+    """
+    Soma uma venda aos resumos (sinal=-1 desfaz, no cancelamento), na transação
+    de `conexao`
+
+    `itens` são dicts com product_id, quantity e total. As linhas de resumo são
+    travadas sempre na mesma ordem (dia, produtos por id, cliente), depois dos
+    produtos travados pela baixa de estoque.
+    """
+    mes = inicio_do_mes(dia)
+    por_produto = defaultdict(lambda: [0, Decimal('0')])
+    for item in itens:
+        acumulado = por_produto[item['product_id']]
+        acumulado[0] += item['quantity']
+        acumulado[1] += item['total']
+    quantidade = sum(q for q, _ in por_produto.values())
+    receita = sum((r for _, r in por_produto.values()), Decimal('0'))
+
+    upsert_incremento(conexao, SalesDailyRollup.__table__, [{
+        'company_id': company_id, 'day': dia, 'sales_count': sinal,
+        'items_quantity': sinal * quantidade, 'revenue': sinal * receita
+    }], ('company_id', 'day'), ('sales_count', 'items_quantity', 'revenue'))
+
+    upsert_incremento(conexao, ProductMonthlyRollup.__table__, [
+        {
+            'company_id': company_id, 'month': mes, 'product_id': product_id,
+            'quantity': sinal * por_produto[product_id][0], 'revenue': sinal * por_produto[product_id][1]
+        }
+        for product_id in sorted(por_produto)
+    ], ('company_id', 'month', 'product_id'), ('quantity', 'revenue'))
+
+    if customer_id:
+        upsert_incremento(conexao, CustomerMonthlyRollup.__table__, [{
+            'company_id': company_id, 'month': mes, 'customer_id': customer_id,
+            'sales_count': sinal, 'revenue': sinal * receita
+        }], ('company_id', 'month', 'customer_id'), ('sales_count', 'revenue'))
+
+
+def reconstruir_mes(engine, company_id, mes):
+    """
+    Recalcula os resumos de um mês de uma empresa a partir de sales/sale_items
+    (apaga e insere com INSERT ... SELECT, numa transação)
+    """
+    fim = proximo_mes(mes)
+    periodo = (
+        Sale.company_id == company_id,
+        Sale.status == STATUS_CONTABILIZADO,
+        Sale.created_at >= mes,
+        Sale.created_at < fim
+    )
+    with engine.begin() as conexao:
+        conexao.execute(delete(SalesDailyRollup.__table__).where(
+            SalesDailyRollup.company_id == company_id,
+            SalesDailyRollup.day >= mes, SalesDailyRollup.day < fim
+        ))
+        for model in (ProductMonthlyRollup, CustomerMonthlyRollup):
+            conexao.execute(delete(model.__table__).where(model.company_id == company_id, model.month == mes))
+
+        dia = func.date(Sale.created_at)
+        conexao.execute(insert(SalesDailyRollup.__table__).from_select(
+            ['company_id', 'day', 'sales_count', 'items_quantity', 'revenue'],
+            select(
+                Sale.company_id, dia, func.count(func.distinct(Sale.id)),
+                func.sum(SaleItem.quantity), func.sum(SaleItem.total)
+            ).join(SaleItem, SaleItem.sale_id == Sale.id).where(*periodo).group_by(Sale.company_id, dia)
+        ))
+        conexao.execute(insert(ProductMonthlyRollup.__table__).from_select(
+            ['company_id', 'month', 'product_id', 'quantity', 'revenue'],
+            select(
+                Sale.company_id, literal(mes, SalesDailyRollup.day.type), SaleItem.product_id,
+                func.sum(SaleItem.quantity), func.sum(SaleItem.total)
+            ).join(SaleItem, SaleItem.sale_id == Sale.id).where(*periodo)
+            .group_by(Sale.company_id, SaleItem.product_id)
+        ))
+        conexao.execute(insert(CustomerMonthlyRollup.__table__).from_select(
+            ['company_id', 'month', 'customer_id', 'sales_count', 'revenue'],
+            select(
+                Sale.company_id, literal(mes, SalesDailyRollup.day.type), Sale.customer_id,
+                func.count(), func.sum(Sale.total)
+            ).where(*periodo, Sale.customer_id.isnot(None))
+            .group_by(Sale.company_id, Sale.customer_id)
+        ))
+
+
+def meses_com_vendas(engine, company_id=None, inicio=None, fim=None):
+    """(company_id, mês) do período com vendas, do mais antigo ao mais recente"""
+    consulta = select(Sale.company_id, func.min(Sale.created_at), func.max(Sale.created_at)).group_by(Sale.company_id)
+    if company_id:
+        consulta = consulta.where(Sale.company_id == company_id)
+    with engine.connect() as conexao:
+        faixas = conexao.execute(consulta).all()
+
+    pedacos = []
+    for empresa, primeira, ultima in faixas:
+        if primeira is None:
+            continue
+        mes = inicio_do_mes(max(primeira.date(), inicio) if inicio else primeira.date())
+        ultimo = inicio_do_mes(min(ultima.date(), fim) if fim else ultima.date())
+        while mes <= ultimo:
+            pedacos.append((empresa, mes))
+            mes = proximo_mes(mes)
+    return sorted(pedacos, key=lambda pedaco: (pedaco[1], pedaco[0]))
+
+
+def reconstruir(engine, company_id=None, inicio=None, fim=None, workers=ROLLUP_BACKFILL_WORKERS, progresso=None):
+    """
+    Backfill: recalcula os resumos em pedaços de (empresa, mês) em paralelo
+
+    Cada pedaço apaga e regrava só as próprias linhas, então pedaços diferentes
+    não disputam bloqueio. SQLite roda com um worker (um escritor por vez).
+    """
+    pedacos = meses_com_vendas(engine, company_id, inicio, fim)
+    workers = 1 if engine.dialect.name == 'sqlite' else max(1, workers)
+    inicio_execucao = time.perf_counter()
+    concluidos = 0
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='rollups') as executor:
+        futuros = [executor.submit(reconstruir_mes, engine, empresa, mes) for empresa, mes in pedacos]
+        for futuro in as_completed(futuros):
+            futuro.result()
+            concluidos += 1
+            if progresso:
+                progresso(concluidos, len(pedacos))
+    resumo = {'pedacos': len(pedacos), 'segundos': round(time.perf_counter() - inicio_execucao, 2)}
+    logger.info('Resumos de vendas reconstruídos', extra=resumo)
+    return resumo
+
+
+# Consultas do dashboard: leem só as tabelas de resumo, então o custo depende
+# do período pedido (dias/itens do mês), não do tamanho do histórico
+
+def receita_diaria(session, company_id, inicio, fim):
+    """Série diária [inicio, fim] com vendas, itens e receita (dias sem venda vêm zerados)"""
+    linhas = session.execute(
+        select(
+            SalesDailyRollup.day, SalesDailyRollup.sales_count,
+            SalesDailyRollup.items_quantity, SalesDailyRollup.revenue
+        ).where(
+            SalesDailyRollup.company_id == company_id,
+            SalesDailyRollup.day >= inicio, SalesDailyRollup.day <= fim
+        )
+    ).all()
+    por_dia = {linha.day: linha for linha in linhas}
+    serie = []
+    dia = inicio
+    while dia <= fim:
+        linha = por_dia.get(dia)
+        serie.append({
+            'day': dia.isoformat(),
+            'sales_count': linha.sales_count if linha else 0,
+            'items_quantity': linha.items_quantity if linha else 0,
+            'revenue': float(linha.revenue) if linha else 0.0
+        })
+        dia += timedelta(days=1)
+    return serie
+
+
+def top_produtos(session, company_id, mes, limite=10):
+    linhas = session.execute(
+        select(ProductMonthlyRollup.product_id, Product.name, ProductMonthlyRollup.quantity, ProductMonthlyRollup.revenue)
+        .join(Product, Product.id == ProductMonthlyRollup.product_id)
+        .where(ProductMonthlyRollup.company_id == company_id, ProductMonthlyRollup.month == mes,
+               ProductMonthlyRollup.quantity > 0)
+        .order_by(ProductMonthlyRollup.revenue.desc(), ProductMonthlyRollup.product_id)
+        .limit(limite)
+    ).all()
+    return [
+        {'product_id': linha.product_id, 'name': linha.name, 'quantity': linha.quantity, 'revenue': float(linha.revenue)}
+        for linha in linhas
+    ]
+
+
+def top_clientes(session, company_id, mes, limite=10):
+    linhas = session.execute(
+        select(CustomerMonthlyRollup.customer_id, Customer.name, CustomerMonthlyRollup.sales_count,
+               CustomerMonthlyRollup.revenue)
+        .join(Customer, Customer.id == CustomerMonthlyRollup.customer_id)
+        .where(CustomerMonthlyRollup.company_id == company_id, CustomerMonthlyRollup.month == mes,
+               CustomerMonthlyRollup.sales_count > 0)
+        .order_by(CustomerMonthlyRollup.revenue.desc(), CustomerMonthlyRollup.customer_id)
+        .limit(limite)
+    ).all()
+    return [
+        {'customer_id': linha.customer_id, 'name': linha.name, 'sales_count': linha.sales_count,
+         'revenue': float(linha.revenue)}
+        for linha in linhas
+    ]
@@ -0,0 +1,208 @@
+import logging
+import random
+import time
+import uuid
+from collections import Counter
+from datetime import datetime
+from decimal import Decimal
+from sqlalchemy import insert, select, update
+from sqlalchemy.exc import OperationalError
+from models.product import Product
+from models.sale import Sale, SaleItem
+from services.rollups import aplicar_venda
+from config import SALE_RETRIES, SALE_MAX_QUANTITY
+
+logger = logging.getLogger(__name__)
+
+_CENTAVOS = Decimal('0.01')
+# Maior valor que cabe em sales.total / sale_items.total (Numeric(10, 2))
+_VALOR_MAXIMO = Decimal('99999999.99')
+
+
+class VendaInvalida(ValueError):
+    """Pedido de venda malformado (itens vazios, quantidade inválida, produto inexistente)"""
+
+
+class EstoqueInsuficiente(Exception):
+    """Produto sem estoque para a quantidade pedida; nada da venda foi gravado"""
+
+    def __init__(self, product_id, quantidade):
+        super().__init__(f'Estoque insuficiente para o produto {product_id} (pedido: {quantidade})')
+        self.product_id = product_id
+        self.quantidade = quantidade
+
+
+def _quantidades(itens):
+    """Soma as quantidades por produto (linhas repetidas viram uma baixa só)"""
+    if not isinstance(itens, list) or not itens:
+        raise VendaInvalida('A venda precisa de uma lista com pelo menos um item')
+    quantidades = Counter()
+    for item in itens:
+        if not isinstance(item, dict):
+            raise VendaInvalida('Cada item deve ser um objeto com product_id e quantity')
+        product_id = item.get('product_id')
+        quantidade = item.get('quantity')
+        if not isinstance(product_id, str) or not product_id or len(product_id) > 36:
+            raise VendaInvalida('Item sem product_id válido')
+        if not isinstance(quantidade, int) or isinstance(quantidade, bool) or not 0 < quantidade <= SALE_MAX_QUANTITY:
+            raise VendaInvalida(f'Quantidade inválida para o produto {product_id} (de 1 a {SALE_MAX_QUANTITY})')
+        quantidades[product_id] += quantidade
+        if quantidades[product_id] > SALE_MAX_QUANTITY:
+            raise VendaInvalida(f'Quantidade inválida para o produto {product_id} (de 1 a {SALE_MAX_QUANTITY})')
+    return quantidades
+
+
+def _travar_produtos(session, company_id, quantidades):
+    """
+    Trava as linhas dos produtos e retorna o preço de cada um
+
+    Produto inexistente (ou de outra empresa) é pedido inválido, não falta de
+    estoque. O FOR UPDATE também manda a leitura ao primário (um produto recém
+    criado pode não ter chegado à réplica) e garante que o preço não muda até o
+    commit. A ordem por id é a mesma das baixas de estoque.
+    """
+    precos = dict(session.execute(
+        select(Product.id, Product.price)
+        .where(Product.id.in_(list(quantidades)), Product.company_id == company_id)
+        .order_by(Product.id)
+        .with_for_update()
+    ).all())
+    for product_id in sorted(quantidades):
+        if product_id not in precos:
+            raise VendaInvalida(f'Produto {product_id} não encontrado')
+    return precos
+
+
+def _postar(session, company_id, quantidades, customer_id, payment_method):
+    precos = _travar_produtos(session, company_id, quantidades)
+    # Ordem fixa de bloqueio: duas vendas com os mesmos produtos travam as linhas
+    # na mesma sequência e uma só espera a outra, sem deadlock
+    for product_id in sorted(quantidades):
+        quantidade = quantidades[product_id]
+        baixa = session.execute(
+            update(Product)
+            .where(
+                Product.id == product_id,
+                Product.company_id == company_id,
+                Product.stock_quantity >= quantidade
+            )
+            .values(stock_quantity=Product.stock_quantity - quantidade)
+            .execution_options(synchronize_session=False)
+        )
+        if baixa.rowcount != 1:
+            raise EstoqueInsuficiente(product_id, quantidade)
+
+    sale_id = str(uuid.uuid4())
+    linhas = []
+    total = Decimal('0')
+    for product_id, quantidade in quantidades.items():
+        preco = precos.get(product_id)
+        if preco is None:
+            raise VendaInvalida(f'Produto {product_id} sem preço')
+        subtotal = (preco * quantidade).quantize(_CENTAVOS)
+        total += subtotal
+        if total > _VALOR_MAXIMO:
+            raise VendaInvalida(f'Valor da venda acima do máximo de {_VALOR_MAXIMO}')
+        linhas.append({
+            'id': str(uuid.uuid4()), 'sale_id': sale_id, 'product_id': product_id,
+            'quantity': quantidade, 'unit_price': preco, 'total': subtotal
+        })
+
+    # created_at explícito: o dia do resumo tem de ser o mesmo gravado na venda
+    agora = datetime.utcnow()
+    session.execute(insert(Sale), [{
+        'id': sale_id, 'company_id': company_id, 'customer_id': customer_id,
+        'total': total, 'status': 'confirmed', 'payment_method': payment_method,
+        'payment_status': 'pending', 'created_at': agora
+    }])
+    session.execute(insert(SaleItem), linhas)
+    aplicar_venda(session.connection(), company_id, agora.date(), customer_id, linhas)
+    return {'id': sale_id, 'total': total, 'items': linhas}
+
+
+def _cancelar(session, company_id, sale_id):
+    # O UPDATE condicional no status garante que só um cancelamento devolve o estoque
+    cancelada = session.execute(
+        update(Sale)
+        .where(Sale.id == sale_id, Sale.company_id == company_id, Sale.status == 'confirmed')
+        .values(status='cancelled')
+        .execution_options(synchronize_session=False)
+    )
+    if cancelada.rowcount != 1:
+        raise VendaInvalida('Venda não encontrada ou já cancelada')
+
+    venda = session.execute(select(Sale.customer_id, Sale.created_at).where(Sale.id == sale_id)).one()
+    linhas = [
+        {'product_id': linha.product_id, 'quantity': linha.quantity, 'total': linha.total}
+        for linha in session.execute(
+            select(SaleItem.product_id, SaleItem.quantity, SaleItem.total).where(SaleItem.sale_id == sale_id)
+        )
+    ]
+    quantidades = Counter()
+    for linha in linhas:
+        quantidades[linha['product_id']] += linha['quantity']
+    # Mesma ordem de bloqueio do registro: produtos por id, depois os resumos
+    for product_id in sorted(quantidades):
+        session.execute(
+            update(Product)
+            .where(Product.id == product_id)
+            .values(stock_quantity=Product.stock_quantity + quantidades[product_id])
+            .execution_options(synchronize_session=False)
+        )
+    aplicar_venda(session.connection(), company_id, venda.created_at.date(), venda.customer_id, linhas, sinal=-1)
+    return {'id': sale_id, 'status': 'cancelled', 'items': linhas}
+
+
+def registrar_venda(session, company_id, itens, customer_id=None, payment_method=None,
+                    tentativas=SALE_RETRIES):
+    """
+    Grava a venda, os itens, a baixa de estoque e os resumos de vendas numa
+    única transação
+
+    `itens` é uma lista de {'product_id', 'quantity'}; o preço unitário vem do
+    cadastro do produto. Cada baixa é um UPDATE ... WHERE stock_quantity >= n,
+    então duas vendas simultâneas nunca vendem a mesma unidade: se alguma baixa
+    não acontecer, a transação inteira é desfeita e EstoqueInsuficiente é
+    levantada. Deadlock e lock wait timeout são repetidos até `tentativas` vezes.
+    """
+    quantidades = _quantidades(itens)
+    for tentativa in range(1, tentativas + 1):
+        try:
+            venda = _postar(session, company_id, quantidades, customer_id, payment_method)
+            session.commit()
+            return venda
+        except OperationalError as e:
+            session.rollback()
+            if tentativa == tentativas:
+                raise
+            logger.warning('Conflito de bloqueio ao registrar venda; repetindo', extra={
+                'tentativa': tentativa, 'erro': str(e.orig)
+            })
+            time.sleep(random.uniform(0, 0.05 * tentativa))
+        except Exception:
+            session.rollback()
+            raise
+
+
+def cancelar_venda(session, company_id, sale_id, tentativas=SALE_RETRIES):
+    """
+    Cancela uma venda confirmada: devolve o estoque e desconta a venda dos
+    resumos, na mesma transação. Venda inexistente ou já cancelada levanta
+    VendaInvalida.
+    """
+    for tentativa in range(1, tentativas + 1):
+        try:
+            venda = _cancelar(session, company_id, sale_id)
+            session.commit()
+            return venda
+        except OperationalError as e:
+            session.rollback()
+            if tentativa == tentativas:
+                raise
+            logger.warning('Conflito de bloqueio ao cancelar venda; repetindo', extra={
+                'tentativa': tentativa, 'erro': str(e.orig)
+            })
+            time.sleep(random.uniform(0, 0.05 * tentativa))
+        except Exception:
+            session.rollback()
+            raise
@@ -0,0 +1,532 @@
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import insert, select, update
+from models.service_order import ServiceOrder
+from models.user import User
+from config import (
+    SCHEDULING_MAX_HOURS, SCHEDULING_DAY_CAPACITY_MINUTES, SCHEDULING_REFRESH_SECONDS, SCHEDULING_MAX_AGENDAS
+)
+
+logger = logging.getLogger(__name__)
+
+# Ordens nesses status ocupam a agenda do técnico (cancelada libera o horário)
+STATUS_OCUPANDO = ('pending', 'in_progress', 'completed')
+_DIA = 86400
+
+_agendador = None
+_agendador_lock = threading.Lock()
+
+
+class AgendamentoInvalido(ValueError):
+    """Período inválido, técnico inexistente ou ordem que não pode mudar de status"""
+
+
+class ConflitoAgenda(Exception):
+    """O período pedido se sobrepõe a ordens já reservadas para o técnico"""
+
+    def __init__(self, conflitos):
+        super().__init__(f'{len(conflitos)} ordem(ns) no mesmo horário')
+        self.conflitos = conflitos
+
+
+def _segundos(momento):
+    """datetime (UTC, sem fuso) para segundos desde a época"""
+    if momento.tzinfo is not None:
+        momento = momento.astimezone(timezone.utc).replace(tzinfo=None)
+    return int((momento - datetime(1970, 1, 1)).total_seconds())
+
+
+def _momento(segundos):
+    return datetime(1970, 1, 1) + timedelta(seconds=segundos)
+
+
+class _No:
+    __slots__ = ('inicio', 'fim', 'id', 'max_fim', 'min_inicio', 'max_vao', 'altura', 'esquerda', 'direita')
+
+    def __init__(self, inicio, fim, id):
+        self.inicio = inicio
+        self.fim = fim
+        self.id = id
+        self.max_fim = fim
+        self.min_inicio = inicio
+        self.max_vao = 0
+        self.altura = 1
+        self.esquerda = None
+        self.direita = None
+
+    def chave(self):
+        return (self.inicio, self.fim, self.id)
+
+
+def _altura(no):
+    return no.altura if no else 0
+
+
+def _atualizar(no):
+    # max_vao: maior intervalo livre entre os intervalos da subárvore (limite
+    # superior quando há sobreposição entre subárvores)
+    esquerda, direita = no.esquerda, no.direita
+    no.altura = 1 + max(_altura(esquerda), _altura(direita))
+    no.min_inicio = esquerda.min_inicio if esquerda else no.inicio
+    vao = 0
+    fim = no.fim
+    if esquerda:
+        vao = max(esquerda.max_vao, no.inicio - esquerda.max_fim)
+        fim = max(fim, esquerda.max_fim)
+    if direita:
+        vao = max(vao, direita.max_vao, direita.min_inicio - fim)
+        fim = max(fim, direita.max_fim)
+    no.max_fim = fim
+    no.max_vao = vao
+    return no
+
+
+def _primeiro_vao(no, duracao, livre_desde):
+    """
+    (início do primeiro vão de `duracao` na subárvore, instante a partir do qual
+    fica livre depois dela), sendo `livre_desde` o início do tempo livre antes
+    da subárvore
+    """
+    if no is None or no.max_fim <= livre_desde:
+        return None, livre_desde
+    # Nenhum vão da subárvore comporta a duração: pula inteira
+    if max(no.max_vao, no.min_inicio - livre_desde) < duracao:
+        return None, no.max_fim
+    achado, livre_desde = _primeiro_vao(no.esquerda, duracao, livre_desde)
+    if achado is not None:
+        return achado, livre_desde
+    if no.inicio - livre_desde >= duracao:
+        return livre_desde, livre_desde
+    return _primeiro_vao(no.direita, duracao, max(livre_desde, no.fim))
+
+
+def _girar_direita(no):
+    raiz = no.esquerda
+    no.esquerda = raiz.direita
+    raiz.direita = _atualizar(no)
+    return _atualizar(raiz)
+
+
+def _girar_esquerda(no):
+    raiz = no.direita
+    no.direita = raiz.esquerda
+    raiz.esquerda = _atualizar(no)
+    return _atualizar(raiz)
+
+
+def _balancear(no):
+    _atualizar(no)
+    fator = _altura(no.esquerda) - _altura(no.direita)
+    if fator > 1:
+        if _altura(no.esquerda.esquerda) < _altura(no.esquerda.direita):
+            no.esquerda = _girar_esquerda(no.esquerda)
+        return _girar_direita(no)
+    if fator < -1:
+        if _altura(no.direita.direita) < _altura(no.direita.esquerda):
+            no.direita = _girar_direita(no.direita)
+        return _girar_esquerda(no)
+    return no
+
+
+class ArvoreIntervalos:
+    """
+    Árvore AVL de intervalos [inicio, fim) ordenada por (inicio, fim, id), com o
+    maior fim de cada subárvore no nó
+
+    Inserção e remoção são O(log n); listar os k intervalos que cruzam um
+    período é O(log n + k), porque subárvores cujo max_fim não alcança o
+    período são descartadas inteiras.
+    """
+
+    def __init__(self, intervalos=()):
+        self.raiz = self._construir(sorted(intervalos), 0, len(intervalos))
+        self.tamanho = len(intervalos)
+
+    def _construir(self, ordenados, inicio, fim):
+        # Carga do banco: árvore balanceada direto da lista ordenada, em O(n)
+        if inicio >= fim:
+            return None
+        meio = (inicio + fim) // 2
+        no = _No(*ordenados[meio])
+        no.esquerda = self._construir(ordenados, inicio, meio)
+        no.direita = self._construir(ordenados, meio + 1, fim)
+        return _atualizar(no)
+
+    def inserir(self, inicio, fim, id):
+        self.raiz = self._inserir(self.raiz, _No(inicio, fim, id))
+        self.tamanho += 1
+
+    def _inserir(self, no, novo):
+        if no is None:
+            return novo
+        if novo.chave() < no.chave():
+            no.esquerda = self._inserir(no.esquerda, novo)
+        else:
+            no.direita = self._inserir(no.direita, novo)
+        return _balancear(no)
+
+    def remover(self, inicio, fim, id):
+        self.raiz, removido = self._remover(self.raiz, (inicio, fim, id))
+        if removido:
+            self.tamanho -= 1
+        return removido
+
+    def _remover(self, no, chave):
+        if no is None:
+            return None, False
+        if chave < no.chave():
+            no.esquerda, removido = self._remover(no.esquerda, chave)
+        elif chave > no.chave():
+            no.direita, removido = self._remover(no.direita, chave)
+        else:
+            if no.esquerda is None or no.direita is None:
+                return no.esquerda or no.direita, True
+            sucessor = no.direita
+            while sucessor.esquerda:
+                sucessor = sucessor.esquerda
+            no.inicio, no.fim, no.id = sucessor.inicio, sucessor.fim, sucessor.id
+            no.direita, removido = self._remover(no.direita, sucessor.chave())
+        return _balancear(no), removido
+
+    def sobrepostos(self, inicio, fim):
+        """Intervalos que cruzam [inicio, fim), em ordem de início"""
+        resultado = []
+        pilha = []
+        no = self.raiz
+        while pilha or no:
+            # Desce pela esquerda enquanto a subárvore ainda pode alcançar `inicio`
+            while no and no.max_fim > inicio:
+                pilha.append(no)
+                no = no.esquerda
+            if not pilha:
+                break
+            no = pilha.pop()
+            if no.inicio >= fim:
+                break
+            if no.fim > inicio:
+                resultado.append((no.inicio, no.fim, no.id))
+            no = no.direita
+        return resultado
+
+    def primeiro_livre(self, apos, duracao, limite=None):
+        """
+        Início do primeiro período livre de `duracao` a partir de `apos` (ou None
+        se não couber antes de `limite`)
+
+        Desce só pelas subárvores cujo maior vão comporta a duração, então é
+        O(log n) em agendas sem sobreposição, por mais cheia que esteja.
+        """
+        achado, livre_desde = _primeiro_vao(self.raiz, duracao, apos)
+        inicio = livre_desde if achado is None else achado
+        if limite is not None and inicio + duracao > limite:
+            return None
+        return inicio
+
+
+class Agenda:
+    """
+    Agenda em memória de um técnico: árvore de intervalos das ordens mais os
+    segundos reservados por dia (utilização em O(dias) sem percorrer ordens)
+    """
+
+    def __init__(self, ordens=()):
+        self.lock = threading.RLock()
+        self.ordens = {id: (inicio, fim) for inicio, fim, id in ordens}
+        self.arvore = ArvoreIntervalos(list(ordens))
+        self.por_dia = {}
+        for inicio, fim, _ in ordens:
+            self._somar_dias(inicio, fim, 1)
+        self.carregada_em = time.monotonic()
+
+    def _somar_dias(self, inicio, fim, sinal):
+        dia = inicio // _DIA
+        while dia * _DIA < fim:
+            trecho = min(fim, (dia + 1) * _DIA) - max(inicio, dia * _DIA)
+            self.por_dia[dia] = self.por_dia.get(dia, 0) + sinal * trecho
+            dia += 1
+
+    def adicionar(self, id, inicio, fim):
+        with self.lock:
+            if id in self.ordens:
+                return
+            self.ordens[id] = (inicio, fim)
+            self.arvore.inserir(inicio, fim, id)
+            self._somar_dias(inicio, fim, 1)
+
+    def remover(self, id):
+        with self.lock:
+            periodo = self.ordens.pop(id, None)
+            if periodo is not None:
+                self.arvore.remover(periodo[0], periodo[1], id)
+                self._somar_dias(periodo[0], periodo[1], -1)
+
+    def conflitos(self, inicio, fim):
+        with self.lock:
+            return self.arvore.sobrepostos(inicio, fim)
+
+    def proximo_livre(self, apos, duracao, limite=None):
+        with self.lock:
+            return self.arvore.primeiro_livre(apos, duracao, limite)
+
+    def utilizacao(self, primeiro_dia, ultimo_dia, capacidade=SCHEDULING_DAY_CAPACITY_MINUTES * 60):
+        """Segundos reservados por dia, de primeiro_dia a ultimo_dia (números de dia)"""
+        with self.lock:
+            return [(dia, self.por_dia.get(dia, 0), capacidade) for dia in range(primeiro_dia, ultimo_dia + 1)]
+
+
+class Agendador:
+    """
+    Agendas em memória por (empresa, técnico), carregadas do banco na primeira
+    consulta e atualizadas a cada reserva/cancelamento deste processo
+
+    Reservas e cancelamentos feitos por outros processos aparecem quando a
+    agenda é relida (SCHEDULING_REFRESH_SECONDS) ou quando o banco e a árvore
+    divergem numa reserva; a checagem no banco, com o técnico travado, é o que
+    garante que duas reservas nunca se sobreponham.
+
+    Só técnicos existentes na empresa ganham agenda, e no máximo `max_agendas`
+    ficam em memória (as usadas há mais tempo saem primeiro).
+    """
+
+    def __init__(self, validade=SCHEDULING_REFRESH_SECONDS, max_agendas=SCHEDULING_MAX_AGENDAS):
+        self.validade = validade
+        self.max_agendas = max_agendas
+        self.agendas = OrderedDict()
+        self._lock = threading.Lock()
+        # Um lock de carga por (empresa, técnico): a leitura do banco acontece
+        # fora de _lock, que só protege o dicionário e a ordem do LRU
+        self._cargas = {}
+
+    def _em_memoria(self, chave):
+        """Agenda ainda válida da chave, já marcada como a mais recente (chamar com _lock)"""
+        agenda = self.agendas.get(chave)
+        if agenda is None or time.monotonic() - agenda.carregada_em >= self.validade:
+            return None
+        self.agendas.move_to_end(chave)
+        return agenda
+
+    def agenda(self, session, company_id, technician_id):
+        chave = (company_id, technician_id)
+        with self._lock:
+            agenda = self._em_memoria(chave)
+            if agenda is not None:
+                return agenda
+            carga = self._cargas.setdefault(chave, threading.Lock())
+
+        with carga:
+            try:
+                # Outra requisição pode ter carregado a agenda enquanto esta esperava
+                with self._lock:
+                    agenda = self._em_memoria(chave)
+                if agenda is not None:
+                    return agenda
+                if not tecnico_existe(session, company_id, technician_id):
+                    with self._lock:
+                        self.agendas.pop(chave, None)
+                    raise AgendamentoInvalido('Técnico não encontrado')
+                agenda = Agenda(carregar_ordens(session, company_id, technician_id))
+                with self._lock:
+                    self.agendas[chave] = agenda
+                    self.agendas.move_to_end(chave)
+                    while len(self.agendas) > self.max_agendas:
+                        self.agendas.popitem(last=False)
+                return agenda
+            finally:
+                with self._lock:
+                    if self._cargas.get(chave) is carga:
+                        del self._cargas[chave]
+
+    def descartar(self, company_id, technician_id):
+        with self._lock:
+            self.agendas.pop((company_id, technician_id), None)
+
+
+def get_agendador():
+    """
+    Retorna o agendador compartilhado pelo processo
+    """
+    global _agendador
+    if _agendador is None:
+        with _agendador_lock:
+            if _agendador is None:
+                _agendador = Agendador()
+    return _agendador
+
+
+def tecnico_existe(session, company_id, technician_id):
+    return session.execute(
+        select(User.id).where(User.id == technician_id, User.company_id == company_id)
+    ).scalar() is not None
+
+
+def carregar_ordens(session, company_id, technician_id):
+    """(inicio, fim, id) em segundos das ordens que ocupam a agenda do técnico"""
+    return [
+        (_segundos(linha.scheduled_date), _segundos(linha.scheduled_end), linha.id)
+        for linha in session.execute(
+            select(ServiceOrder.id, ServiceOrder.scheduled_date, ServiceOrder.scheduled_end)
+            .where(
+                ServiceOrder.company_id == company_id,
+                ServiceOrder.technician_id == technician_id,
+                ServiceOrder.status.in_(STATUS_OCUPANDO)
+            )
+        )
+    ]
+
+
+def _validar_periodo(inicio, fim):
+    if fim <= inicio:
+        raise AgendamentoInvalido('O fim precisa ser depois do início')
+    if fim - inicio > timedelta(hours=SCHEDULING_MAX_HOURS):
+        raise AgendamentoInvalido(f'Uma ordem pode reservar no máximo {SCHEDULING_MAX_HOURS} h')
+
+
+def _descrever(conflitos):
+    return [
+        {'id': id, 'scheduled_date': _momento(inicio).isoformat(), 'scheduled_end': _momento(fim).isoformat()}
+        for inicio, fim, id in conflitos
+    ]
+
+
+def _conflitos_no_banco(session, company_id, technician_id, inicio, fim):
+    # A duração máxima limita a varredura do índice (company_id, technician_id, scheduled_date)
+    return [
+        (_segundos(linha.scheduled_date), _segundos(linha.scheduled_end), linha.id)
+        for linha in session.execute(
+            select(ServiceOrder.id, ServiceOrder.scheduled_date, ServiceOrder.scheduled_end)
+            .where(
+                ServiceOrder.company_id == company_id,
+                ServiceOrder.technician_id == technician_id,
+                ServiceOrder.scheduled_date > inicio - timedelta(hours=SCHEDULING_MAX_HOURS),
+                ServiceOrder.scheduled_date < fim,
+                ServiceOrder.scheduled_end > inicio,
+                ServiceOrder.status.in_(STATUS_OCUPANDO)
+            )
+        )
+    ]
+
+
+def agendar(session, company_id, technician_id, inicio, fim, customer_id, service_id, notes=None):
+    """
+    Reserva [inicio, fim) na agenda do técnico e grava a ordem de serviço
+
+    Um conflito acusado pela árvore em memória é confirmado no banco antes da
+    recusa, e a agenda é descartada se os dois divergirem. A linha do técnico é travada (SELECT ...
+    FOR UPDATE) e o conflito é conferido de novo no banco antes do INSERT, na
+    mesma transação: reservas simultâneas para o mesmo técnico, de qualquer
+    processo, são serializadas.
+    """
+    _validar_periodo(inicio, fim)
+    agendador = get_agendador()
+    agenda = agendador.agenda(session, company_id, technician_id)
+    a, b = _segundos(inicio), _segundos(fim)
+
+    with agenda.lock:
+        desatualizada = False
+        try:
+            conhecidos = agenda.conflitos(a, b)
+            if conhecidos:
+                # A árvore pode estar desatualizada (ordem cancelada ou remarcada por
+                # outro processo): o banco confirma antes da recusa
+                conflitos = _conflitos_no_banco(session, company_id, technician_id, inicio, fim)
+                if sorted(conflitos) != sorted(conhecidos):
+                    agendador.descartar(company_id, technician_id)
+                    desatualizada = True
+                if conflitos:
+                    raise ConflitoAgenda(_descrever(conflitos))
+            tecnico = session.execute(
+                select(User.id)
+                .where(User.id == technician_id, User.company_id == company_id)
+                .with_for_update()
+            ).scalar()
+            if tecnico is None:
+                raise AgendamentoInvalido('Técnico não encontrado')
+            conflitos = _conflitos_no_banco(session, company_id, technician_id, inicio, fim)
+            if conflitos:
+                # Reserva de outro processo que esta agenda ainda não viu
+                agendador.descartar(company_id, technician_id)
+                raise ConflitoAgenda(_descrever(conflitos))
+
+            order_id = str(uuid.uuid4())
+            session.execute(insert(ServiceOrder), [{
+                'id': order_id, 'company_id': company_id, 'customer_id': customer_id,
+                'service_id': service_id, 'technician_id': technician_id, 'status': 'pending',
+                'notes': notes, 'scheduled_date': inicio, 'scheduled_end': fim
+            }])
+            session.commit()
+        except Exception:
+            session.rollback()
+            raise
+        if not desatualizada:
+            agenda.adicionar(order_id, a, b)
+
+    logger.info('Ordem de serviço agendada', extra={'order_id': order_id, 'technician_id': technician_id})
+    return {'id': order_id, 'technician_id': technician_id,
+            'scheduled_date': inicio.isoformat(), 'scheduled_end': fim.isoformat()}
+
+
+def cancelar_ordem(session, company_id, order_id):
+    """Cancela uma ordem pendente ou em andamento e libera o horário na agenda"""
+    try:
+        cancelada = session.execute(
+            update(ServiceOrder)
+            .where(
+                ServiceOrder.id == order_id,
+                ServiceOrder.company_id == company_id,
+                ServiceOrder.status.in_(('pending', 'in_progress'))
+            )
+            .values(status='cancelled')
+            .execution_options(synchronize_session=False)
+        )
+        if cancelada.rowcount != 1:
+            raise AgendamentoInvalido('Ordem não encontrada ou já encerrada')
+        technician_id = session.execute(
+            select(ServiceOrder.technician_id).where(ServiceOrder.id == order_id)
+        ).scalar()
+        session.commit()
+    except Exception:
+        session.rollback()
+        raise
+
+    if technician_id:
+        agenda = get_agendador().agendas.get((company_id, technician_id))
+        if agenda is not None:
+            agenda.remover(order_id)
+    return {'id': order_id, 'status': 'cancelled'}
+
+
+def conflitos(session, company_id, technician_id, inicio, fim):
+    """Ordens do técnico que cruzam [inicio, fim)"""
+    if fim <= inicio:
+        raise AgendamentoInvalido('O fim precisa ser depois do início')
+    agenda = get_agendador().agenda(session, company_id, technician_id)
+    return _descrever(agenda.conflitos(_segundos(inicio), _segundos(fim)))
+
+
+def proximo_horario(session, company_id, technician_id, apos, duracao, limite=None):
+    """Primeiro início livre para `duracao` a partir de `apos` (None se não houver até `limite`)"""
+    _validar_periodo(apos, apos + duracao)
+    agenda = get_agendador().agenda(session, company_id, technician_id)
+    inicio = agenda.proximo_livre(
+        _segundos(apos), int(duracao.total_seconds()), _segundos(limite) if limite else None
+    )
+    return None if inicio is None else _momento(inicio)
+
+
+def utilizacao(session, company_id, technician_id, primeiro_dia, ultimo_dia):
+    """Minutos reservados e fração da capacidade diária, dia a dia"""
+    agenda = get_agendador().agenda(session, company_id, technician_id)
+    base = primeiro_dia.toordinal() - datetime(1970, 1, 1).toordinal()
+    return [
+        {
+            'day': _momento(dia * _DIA).date().isoformat(),
+            'booked_minutes': round(reservado / 60, 1),
+            'capacity_minutes': capacidade // 60,
+            'utilization': round(reservado / capacidade, 4) if capacidade else None
+        }
+        for dia, reservado, capacidade in agenda.utilizacao(base, base + (ultimo_dia - primeiro_dia).days)
+    ]
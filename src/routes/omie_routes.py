@@ -1,16 +1,19 @@
 from fastapi import APIRouter, Query
+from fastapi.responses import JSONResponse
 from typing import Optional
-from omie_api import OmieAPI
+from async_omie_api import get_async_omie_client, close_async_omie_client
+from omie_api import get_omie_client
+from cliente_search import get_cliente_index
 
-router = APIRouter(prefix="/omie", tags=["omie"])
+router = APIRouter(prefix="/omie", tags=["omie"], on_shutdown=[close_async_omie_client])
 
 @router.get("/clientes")
 async def get_clientes(
     page: int = Query(1, ge=1),
     page_size: int = Query(50, ge=1, le=100)
 ):
-    omie = OmieAPI()
-    response = omie.listar_clientes(pagina=page, registros_por_pagina=page_size)
+    omie = get_async_omie_client()
+    response = await omie.listar_clientes(pagina=page, registros_por_pagina=page_size)
     return response
 
 @router.get("/clientes/busca")
@@ -19,20 +22,12 @@ async def search_clientes(
     page: int = Query(1, ge=1),
     page_size: int = Query(50, ge=1, le=100)
 ):
-    omie = OmieAPI()
-    response = omie.listar_clientes(pagina=1, registros_por_pagina=page_size)
-    
-    if response['success'] and response['data']:
-        clientes = response['data']['clientes_cadastro']
-        filtered = [
-            c for c in clientes 
-            if q.lower() in c['razao_social'].lower() or 
-               q.lower() in c.get('cnpj_cpf', '').lower() or 
-               q.lower() in c.get('cidade', '').lower()
-        ]
-        
-        response['data']['clientes_cadastro'] = filtered
-        response['data']['total_de_registros'] = len(filtered)
-        response['data']['registros'] = len(filtered)
-        
-    return response
+    index = get_cliente_index()
+    # A carga e os deltas rodam em segundo plano; até a primeira carga terminar, 503
+    if not index.garantir_atualizado(get_omie_client()):
+        return JSONResponse(
+            {'success': False, 'error': 'Índice de clientes em carregamento'},
+            status_code=503, headers={'Retry-After': '5'}
+        )
+
+    return index.search(q, pagina=page, registros_por_pagina=page_size)